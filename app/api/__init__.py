@@ -8,6 +8,10 @@ from .users import router as users_router
 from .workspaces import router as workspaces_router # This is for /workspaces
 from .connected_accounts import router as connected_accounts_router
 from .social_platforms import router as social_platforms_router
+from .admin import router as admin_router
+from .deletion_jobs import router as deletion_jobs_router
+from .post_groups import router as post_groups_router
+from .post_series import router as post_series_router
 
 # Main API router
 api_router = APIRouter()
@@ -18,6 +22,10 @@ api_router.include_router(users_router)
 api_router.include_router(workspaces_router) # Handles /workspaces
 api_router.include_router(posts_router) # Handles /posts
 api_router.include_router(posts_workspace_router) # Handles /workspaces/{workspace_id}/posts
+api_router.include_router(post_groups_router) # Handles /workspaces/{workspace_id}/post_groups
+api_router.include_router(post_series_router) # Handles /workspaces/{workspace_id}/post_series
 api_router.include_router(connected_accounts_router) # Handles /workspaces/{workspace_id}/connected_accounts
 api_router.include_router(social_platforms_router)
+api_router.include_router(admin_router)
+api_router.include_router(deletion_jobs_router)
 api_router.include_router(ai_assistant_router, prefix="/ai", tags=["AI Assistant"]) # /ai prefix added here
\ No newline at end of file
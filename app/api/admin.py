@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+
+from app import schemas
+from app.core.profiling import slow_requests
+from app.crud import crud_publish_attempt
+from app.database import get_read_db
+from app.dependencies import get_current_active_superuser
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_current_active_superuser)]
+)
+
+@router.get("/slow-requests", response_model=List[schemas.SlowRequestSummary])
+async def read_slow_requests():
+    """
+    List captured slow-request reports, newest first.
+    Only requests selected for profiling (see PROFILING_* settings) are captured.
+    """
+    return slow_requests.list()
+
+@router.get("/slow-requests/{report_id}", response_model=schemas.SlowRequestReport)
+async def read_slow_request(report_id: int):
+    """
+    Get a slow-request report with its SQL statements and profile.
+    """
+    report = slow_requests.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found (it may have been evicted)")
+    return report
+
+@router.delete("/slow-requests", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_requests():
+    """
+    Drop all captured slow-request reports.
+    """
+    slow_requests.clear()
+    return None
+
+@router.get("/publish-attempts/stats", response_model=List[schemas.PublishAttemptStats])
+def read_publish_attempt_stats(
+    window_hours: int = Query(24, ge=1, le=24 * 90),
+    group_by: Literal["platform", "account"] = "platform",
+    bucket: Literal["window", "hour", "day"] = "window",
+    platform: Optional[str] = None,
+    connected_account_id: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Failure rate and p95 publish latency per platform (or per account), over the
+    last `window_hours`, optionally bucketed by hour or day.
+    Served from the hourly rollups, which lag the ledger by up to PUBLISH_ATTEMPT_ROLLUP_INTERVAL_SECONDS.
+    """
+    start = datetime.now(timezone.utc) - timedelta(hours=window_hours)
+    return crud_publish_attempt.get_attempt_stats(
+        db,
+        start=start,
+        group_by=group_by,
+        bucket=bucket,
+        platform=platform,
+        connected_account_id=connected_account_id,
+    )
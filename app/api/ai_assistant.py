@@ -1,4 +1,5 @@
-import google.generativeai as genai
+from functools import lru_cache
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 
@@ -8,45 +9,77 @@ from app.core.config import settings
 
 router = APIRouter()
 
-# Configure the Gemini API key at the module level or within a dependency
-if settings.GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # Optional: Check if the API key is valid by making a simple model list call
-        # models = [m for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-        # if not models:
-        #     print("Warning: No models found that support 'generateContent'. Check API key and permissions.")
-    except Exception as e:
-        print(f"Error configuring Gemini API: {e}. Ensure GEMINI_API_KEY is set correctly.")
-        # Depending on policy, you might want to raise an error here or allow app to start
-else:
-    print("Warning: GEMINI_API_KEY not found in settings. AI features will not work.")
+@lru_cache(maxsize=1)
+def get_genai():
+    """
+    Import and configure the Gemini SDK on first use. The SDK (and its gRPC/protobuf
+    stack) is by far the heaviest import in the API, so it is kept off the startup path.
+    """
+    import google.generativeai as genai
+
+    if settings.GEMINI_API_KEY:
+        try:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            # Optional: Check if the API key is valid by making a simple model list call
+            # models = [m for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+            # if not models:
+            #     print("Warning: No models found that support 'generateContent'. Check API key and permissions.")
+        except Exception as e:
+            print(f"Error configuring Gemini API: {e}. Ensure GEMINI_API_KEY is set correctly.")
+    else:
+        print("Warning: GEMINI_API_KEY not found in settings. AI features will not work.")
+    return genai
 
 # Placeholder for Gemini model - choose an appropriate one
 # For text generation, 'gemini-pro' is a common choice.
 # Ensure the model you choose supports the type of generation you need.
 GENERATIVE_MODEL_NAME = "gemini-1.0-pro" # Or "gemini-pro", "gemini-1.5-flash-latest" etc.
 
+@lru_cache(maxsize=1)
+def get_ollama_client():
+    import httpx
+
+    # One pooled client per process; requests to a local server reuse connections
+    return httpx.AsyncClient(base_url=settings.OLLAMA_BASE_URL, timeout=settings.AI_REQUEST_TIMEOUT_SECONDS)
+
+def ai_available() -> bool:
+    if settings.AI_PROVIDER == "ollama":
+        return True
+    return bool(settings.GEMINI_API_KEY) and bool(get_genai().get_model(GENERATIVE_MODEL_NAME))
+
+async def generate_text(prompt: str) -> str:
+    """
+    Run a prompt through the configured AI_PROVIDER and return the generated text.
+    """
+    if settings.AI_PROVIDER == "ollama":
+        response = await get_ollama_client().post(
+            "/api/generate", json={"model": settings.OLLAMA_MODEL, "prompt": prompt, "stream": False}
+        )
+        response.raise_for_status()
+        return response.json().get("response") or ""
+    model = get_genai().GenerativeModel(GENERATIVE_MODEL_NAME)
+    response = await model.generate_content_async(prompt)
+    return response.text
+
 @router.post("/generate-caption", response_model=schemas.AIGeneratedCaptionsResponse)
 async def generate_caption(
     request: schemas.AICaptionRequest,
     # current_user: models.User = Depends(get_current_active_user) # Protect endpoint
 ):
-    if not settings.GEMINI_API_KEY or not genai.get_model(GENERATIVE_MODEL_NAME):
+    if not ai_available():
         raise HTTPException(status_code=503, detail="AI service is not configured or unavailable.")
 
     prompt_template = f"Generate 3 distinct social media captions for a post about: '{request.prompt}'. The tone should be {request.tone}. Each caption should be concise and engaging. Return as a numbered list."
     
     try:
-        model = genai.GenerativeModel(GENERATIVE_MODEL_NAME)
-        response = await model.generate_content_async(prompt_template)
+        text = await generate_text(prompt_template)
         
         # Basic parsing assuming Gemini returns text that can be split into a list
         # This might need refinement based on actual Gemini API response format
         captions = []
-        if response.text:
+        if text:
             # Attempt to parse numbered or bulleted lists
-            raw_captions = response.text.strip().split('\n')
+            raw_captions = text.strip().split('\n')
             for cap in raw_captions:
                 cap_cleaned = cap.strip()
                 # Remove potential numbering like "1. ", "- ", "* "
@@ -59,11 +92,11 @@ async def generate_caption(
         
         if not captions:
              # Fallback if parsing fails or response is not as expected
-            captions = [response.text.strip()] if response.text else ["Could not generate captions at this time."]
+            captions = [text.strip()] if text else ["Could not generate captions at this time."]
 
         return schemas.AIGeneratedCaptionsResponse(captions=captions)
     except Exception as e:
-        print(f"Error calling Gemini API for captions: {e}")
+        print(f"Error calling AI provider for captions: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate captions: {str(e)}")
 
 @router.post("/generate-hashtags", response_model=schemas.AIGeneratedHashtagsResponse)
@@ -71,19 +104,18 @@ async def generate_hashtags(
     request: schemas.AIHashtagRequest,
     # current_user: models.User = Depends(get_current_active_user)
 ):
-    if not settings.GEMINI_API_KEY or not genai.get_model(GENERATIVE_MODEL_NAME):
+    if not ai_available():
         raise HTTPException(status_code=503, detail="AI service is not configured or unavailable.")
 
     prompt_template = f"Based on the following social media post content, generate 15 relevant and trending hashtags. Prioritize a mix of broad and niche tags. Return as a comma-separated list: '{request.post_content}'"
     
     try:
-        model = genai.GenerativeModel(GENERATIVE_MODEL_NAME)
-        response = await model.generate_content_async(prompt_template)
+        text = await generate_text(prompt_template)
         
         hashtags = []
-        if response.text:
+        if text:
             # Assuming Gemini returns a comma-separated string of hashtags
-            hashtags = [tag.strip().replace('#', '') for tag in response.text.split(',') if tag.strip()]
+            hashtags = [tag.strip().replace('#', '') for tag in text.split(',') if tag.strip()]
             hashtags = [f"#{tag}" for tag in hashtags if tag] # Ensure '#' prefix and non-empty
         
         if not hashtags:
@@ -91,7 +123,7 @@ async def generate_hashtags(
             
         return schemas.AIGeneratedHashtagsResponse(hashtags=list(set(hashtags))[:15]) # Ensure unique and limit
     except Exception as e:
-        print(f"Error calling Gemini API for hashtags: {e}")
+        print(f"Error calling AI provider for hashtags: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate hashtags: {str(e)}")
 
 @router.post("/generate-ideas", response_model=schemas.AIGeneratedIdeasResponse)
@@ -99,20 +131,19 @@ async def generate_ideas(
     request: schemas.AIIdeaRequest,
     # current_user: models.User = Depends(get_current_active_user)
 ):
-    if not settings.GEMINI_API_KEY or not genai.get_model(GENERATIVE_MODEL_NAME):
+    if not ai_available():
         raise HTTPException(status_code=503, detail="AI service is not configured or unavailable.")
 
     prompt_template = f"Generate 5 distinct social media post ideas on the topic of '{request.topic}'. For each idea, provide a short, catchy title and a brief (1-2 sentences) description or angle for the post. Format each idea with 'Title:' and 'Brief:' labels."
     
     try:
-        model = genai.GenerativeModel(GENERATIVE_MODEL_NAME)
-        response = await model.generate_content_async(prompt_template)
+        text = await generate_text(prompt_template)
         
         ideas = []
-        if response.text:
+        if text:
             # This parsing is highly dependent on Gemini's output format. 
             # It might need significant refinement.
-            content_blocks = response.text.strip().split('\n\n') # Assuming ideas are separated by double newlines
+            content_blocks = text.strip().split('\n\n') # Assuming ideas are separated by double newlines
             for block in content_blocks:
                 title = None
                 brief = None
@@ -125,14 +156,14 @@ async def generate_ideas(
                 if title and brief:
                     ideas.append(schemas.PostIdea(title=title, brief=brief))
         
-        if not ideas and response.text: # Fallback if parsing fails
-            ideas.append(schemas.PostIdea(title="General Idea", brief=response.text.strip()))
+        if not ideas and text: # Fallback if parsing fails
+            ideas.append(schemas.PostIdea(title="General Idea", brief=text.strip()))
         elif not ideas:
             ideas.append(schemas.PostIdea(title="Error", brief="Could not generate ideas at this time."))
             
         return schemas.AIGeneratedIdeasResponse(ideas=ideas[:5]) # Limit to 5 ideas
     except Exception as e:
-        print(f"Error calling Gemini API for ideas: {e}")
+        print(f"Error calling AI provider for ideas: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate ideas: {str(e)}")
 
 # Note: You'll need to add `GEMINI_API_KEY="your_actual_api_key"` to your .env file
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app import models, schemas, crud
+import app.crud.crud_connected_account  # noqa: F401  (crud.crud_connected_account below; app.crud does not import it)
+from app.database import get_workspace_db, get_workspace_read_db
 from app.dependencies import get_db, get_current_active_user
 
 # The prefix will be /workspaces/{workspace_id}/connected_accounts
@@ -31,7 +33,7 @@ async def create_new_connected_account(
     account_in: schemas.ConnectedAccountCreate,
     workspace_id: int = Depends(verify_workspace_membership), # workspace_id from path, verified
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_workspace_db) # Accounts live on the workspace's shard
 ):
     """
     Create a new connected account within a specific workspace.
@@ -44,9 +46,8 @@ async def create_new_connected_account(
                    f"does not match the workspace_id in the URL path ({workspace_id})."
         )
 
-    # crud_connected_account.create_connected_account already checks membership via account_in.workspace_id
-    # but verify_workspace_membership does it for the path workspace_id.
-    # The user_id for creating the account is current_user.id.
+    # Membership was checked by verify_workspace_membership (it is global data, so the
+    # shard-local CRUD does not check it). The user_id for creating the account is current_user.id.
     db_account = crud.crud_connected_account.create_connected_account(
         db=db, account_in=account_in, user_id=current_user.id
     )
@@ -59,7 +60,7 @@ async def read_connected_accounts_in_workspace(
     workspace_id: int = Depends(verify_workspace_membership), # Path param
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_workspace_read_db)
 ):
     """
     Get all connected accounts for a specific workspace.
@@ -74,7 +75,7 @@ async def read_connected_accounts_in_workspace(
 async def read_connected_account_by_id(
     account_id: int,
     workspace_id: int = Depends(verify_workspace_membership), # Path param
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_workspace_read_db)
 ):
     """
     Get a specific connected account by ID from a workspace.
@@ -90,7 +91,7 @@ async def update_existing_connected_account(
     account_id: int,
     account_in: schemas.ConnectedAccountUpdate,
     workspace_id: int = Depends(verify_workspace_membership), # Path param
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_workspace_db)
 ):
     """
     Update a connected account.
@@ -107,22 +108,27 @@ async def update_existing_connected_account(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connected account not found for update.")
     return updated_account
 
-@router.delete("/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{account_id}", response_model=schemas.DeletionJob, status_code=status.HTTP_202_ACCEPTED)
 async def delete_existing_connected_account(
     account_id: int,
     workspace_id: int = Depends(verify_workspace_membership), # Path param
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db)
 ):
     """
     Delete a connected account.
     User must be a member of the workspace.
+    The account stops publishing immediately; its posts are removed in the background.
     """
-    db_account_check = crud.crud_connected_account.get_connected_account(db, account_id=account_id)
+    db_account_check = crud.crud_connected_account.get_connected_account(shard_db, account_id=account_id)
     if db_account_check is None or db_account_check.workspace_id != workspace_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connected account not found for deletion in this workspace.")
 
-    deleted_account = crud.crud_connected_account.delete_connected_account(db, account_id=account_id)
-    if not deleted_account: # Should be caught by the check above
+    job = crud.crud_connected_account.delete_connected_account(
+        db, account_id=account_id, requested_by=current_user.id, account_dbs=[shard_db]
+    )
+    if not job: # Should be caught by the check above
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connected account not found for deletion.")
 
-    return None # For 204 No Content
+    return job
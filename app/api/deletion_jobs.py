@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.crud import crud_deletion_job
+from app.database import get_read_db
+from app.dependencies import get_current_active_user
+
+router = APIRouter(
+    prefix="/deletion-jobs",
+    tags=["deletion_jobs"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+@router.get("/{job_id}", response_model=schemas.DeletionJob)
+def read_deletion_job(
+    job_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Progress of a background deletion (returned by the DELETE endpoints for
+    workspaces, users and connected accounts). Visible to whoever requested it and to superusers.
+    """
+    job = crud_deletion_job.get_job(db, job_id)
+    if job is None or (job.requested_by != current_user.id and not current_user.is_superuser):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion job not found")
+    return job
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.crud import crud_post_group, crud_schedule, crud_workspace
+from app.database import get_db, get_read_db, get_workspace_db, get_workspace_read_db
+from app.dependencies import get_current_active_user
+
+# Posts created for several accounts at once share their content through a group
+router = APIRouter(
+    prefix="/workspaces/{workspace_id}/post_groups",
+    tags=["post_groups"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+def _with_targets(db: Session, db_group: models.PostGroup) -> schemas.PostGroup:
+    group = schemas.PostGroup.model_validate(db_group)
+    group.targets = [schemas.PostGroupTarget.model_validate(post) for post in crud_post_group.get_group_targets(db, db_group.id)]
+    return group
+
+@router.get("/{group_id}", response_model=schemas.PostGroup)
+def read_post_group(
+    workspace_id: int,
+    group_id: int,
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    The shared content of a post group and the per-account status of each of its posts.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
+    db_group = crud_post_group.get_post_group(shard_db, group_id)
+    if db_group is None or db_group.workspace_id != workspace_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post group not found in this workspace")
+    return _with_targets(shard_db, db_group)
+
+@router.put("/{group_id}", response_model=schemas.PostGroup)
+def update_existing_post_group(
+    workspace_id: int,
+    group_id: int,
+    group_in: schemas.PostGroupUpdate,
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Edit the content of every post in the group with a single row update, and/or
+    reschedule the ones not published yet.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update posts in this workspace")
+    db_group = crud_post_group.get_post_group(shard_db, group_id)
+    if db_group is None or db_group.workspace_id != workspace_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post group not found in this workspace")
+
+    try:
+        updated_group = crud_post_group.update_post_group(shard_db, group_id, group_in)
+    except crud_schedule.ScheduleConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return _with_targets(shard_db, updated_group)
@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.core.config import settings
+from app.crud import crud_post_series, crud_schedule, crud_workspace
+from app.database import get_db, get_read_db, get_workspace_db, get_workspace_read_db
+from app.dependencies import get_current_active_user
+
+# Recurring posts: a content template and a daily/weekly rule. Occurrences become posts
+# as they enter the scheduling horizon; later ones are listed by /occurrences.
+router = APIRouter(
+    prefix="/workspaces/{workspace_id}/post_series",
+    tags=["post_series"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+def _check_member(db: Session, user: models.User, workspace_id: int, action: str) -> None:
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Not authorized to {action} posts in this workspace")
+
+def _get_series_or_404(shard_db: Session, workspace_id: int, series_id: int) -> models.PostSeries:
+    db_series = crud_post_series.get_series(shard_db, series_id)
+    if db_series is None or db_series.workspace_id != workspace_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post series not found in this workspace")
+    return db_series
+
+@router.post("/", response_model=schemas.PostSeries, status_code=status.HTTP_201_CREATED)
+def create_post_series(
+    workspace_id: int,
+    series_in: schemas.PostSeriesCreate,
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Create a series; its occurrences within the next POST_SERIES_HORIZON_HOURS are
+    scheduled as posts right away.
+    """
+    _check_member(db, current_user, workspace_id, "create")
+    try:
+        return crud_post_series.create_series(shard_db, workspace_id, series_in, author_id=current_user.id)
+    except crud_schedule.ScheduleConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e: # Account not in the workspace, invalid weekdays
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/", response_model=List[schemas.PostSeries])
+def read_post_series_for_workspace(
+    workspace_id: int,
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    _check_member(db, current_user, workspace_id, "view")
+    return crud_post_series.get_series_for_workspace(shard_db, workspace_id)
+
+@router.get("/occurrences", response_model=List[schemas.SeriesOccurrence])
+def read_series_occurrences(
+    workspace_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    connected_account_id: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=settings.POST_SERIES_MAX_OCCURRENCES),
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Upcoming occurrences in a date range that are not posts yet, ordered by time, for
+    the calendar. Combine with /posts/history for the ones already scheduled.
+    """
+    _check_member(db, current_user, workspace_id, "view")
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date")
+    return crud_post_series.get_virtual_occurrences(
+        shard_db, workspace_id, start_date, end_date, connected_account_id=connected_account_id, limit=limit
+    )
+
+@router.get("/{series_id}", response_model=schemas.PostSeries)
+def read_post_series(
+    workspace_id: int,
+    series_id: int,
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    _check_member(db, current_user, workspace_id, "view")
+    return _get_series_or_404(shard_db, workspace_id, series_id)
+
+@router.put("/{series_id}", response_model=schemas.PostSeries)
+def update_post_series(
+    workspace_id: int,
+    series_id: int,
+    series_in: schemas.PostSeriesUpdate,
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Edit the content and/or the rule. Published occurrences keep the content they went
+    out with; occurrences not published yet follow the edit.
+    """
+    _check_member(db, current_user, workspace_id, "update")
+    _get_series_or_404(shard_db, workspace_id, series_id)
+    try:
+        return crud_post_series.update_series(shard_db, series_id, series_in)
+    except crud_schedule.ScheduleConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.delete("/{series_id}", response_model=schemas.PostSeries)
+def end_post_series(
+    workspace_id: int,
+    series_id: int,
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    End the series now: occurrences not published yet are removed, published ones stay.
+    """
+    _check_member(db, current_user, workspace_id, "delete")
+    _get_series_or_404(shard_db, workspace_id, series_id)
+    return crud_post_series.end_series(shard_db, series_id)
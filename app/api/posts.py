@@ -1,12 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 from .. import crud, models, schemas
-from ..crud import crud_workspace # Import crud_workspace
-from ..database import get_db
-from ..core.celery_app import publish_post_task
+from ..crud import crud_post_group, crud_post_rollup, crud_post_search, crud_schedule, crud_workspace # Import crud_workspace
+from ..database import get_db, get_post_db, get_post_read_db, get_read_db, get_workspace_db, get_workspace_read_db
 from ..dependencies import get_current_active_user
 
 router = APIRouter(
@@ -21,8 +20,13 @@ router = APIRouter(
 # This will be in a workspace-specific router or handled differently if we want to keep /posts clean
 
 @router.get("/{post_id}", response_model=schemas.Post)
-def read_post(post_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    db_post = crud.crud_post.get_post(db, post_id=post_id)
+def read_post(
+    post_id: int,
+    db: Session = Depends(get_read_db),
+    post_db: Session = Depends(get_post_read_db), # The post's shard; same session as db on the default shard
+    current_user: models.User = Depends(get_current_active_user)
+):
+    db_post = crud.crud_post.get_post(post_db, post_id=post_id)
     if db_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
@@ -35,59 +39,60 @@ def update_existing_post(
     post_id: int, 
     post_in: schemas.PostUpdate, 
     db: Session = Depends(get_db),
+    post_db: Session = Depends(get_post_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    db_post = crud.crud_post.get_post(db, post_id=post_id)
+    db_post = crud.crud_post.get_post(post_db, post_id=post_id)
     if not db_post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
     if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=db_post.workspace_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this post")
+
+    if isinstance(db_post, models.PostArchive):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Archived posts are read-only")
     
-    # If scheduling, trigger Celery task
-    if post_in.scheduled_at and post_in.status == models.PostStatus.SCHEDULED.value:
-        # existing_schedule = db_post.scheduled_at
-        # if existing_schedule != post_in.scheduled_at or db_post.status != models.PostStatus.SCHEDULED:
-            # Potentially cancel old Celery task if schedule changed, then create new one
-            # Ensure that scheduled_at is a datetime object
-            if post_in.scheduled_at:
-                publish_post_task.apply_async(args=[db_post.id], eta=post_in.scheduled_at)
-                print(f"Re-scheduling post {db_post.id} for {post_in.scheduled_at}") # Placeholder
-            else:
-                # If scheduled_at is removed, consider canceling existing task if any
-                pass
-
-    updated_post = crud.crud_post.update_post(db=db, post_id=post_id, post_update=post_in)
+    # Scheduling is handled by crud_post.update_post: the publish task is written to the
+    # outbox in the same transaction and sent to the broker by the outbox relay.
+    try:
+        updated_post = crud.crud_post.update_post(db=post_db, post_id=post_id, post_update=post_in)
+    except crud_schedule.ScheduleConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     return updated_post
 
 @router.delete("/{post_id}", response_model=schemas.Post)
 def delete_existing_post(
     post_id: int, 
     db: Session = Depends(get_db),
+    post_db: Session = Depends(get_post_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    db_post = crud.crud_post.get_post(db, post_id=post_id)
+    db_post = crud.crud_post.get_post(post_db, post_id=post_id)
     if not db_post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
     if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=db_post.workspace_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this post")
 
+    if isinstance(db_post, models.PostArchive):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Archived posts are read-only")
+
     # Add logic: only delete if status is 'draft' or 'scheduled'
     if db_post.status in [models.PostStatus.POSTED.value, models.PostStatus.ERROR.value]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot delete post with status '{db_post.status}'")
 
-    # If it was a scheduled post, cancel the Celery task
-    # if db_post.status == models.PostStatus.SCHEDULED and db_post.scheduled_at:
-        # Need a way to find and revoke the Celery task by post_id or a unique task_id stored with the post
-        # pass
-        
-    deleted_post = crud.crud_post.delete_post(db=db, post_id=post_id)
+    # A pending publish in the outbox is cancelled by crud_post.delete_post; a task already
+    # relayed to the broker finds the post gone and exits.
+
+    deleted_post = crud.crud_post.delete_post(db=post_db, post_id=post_id)
     return deleted_post
 
 # The following endpoints are workspace-specific as per the request
 # We might create a separate router for /workspaces/{workspace_id}/posts
 
+MAX_DAILY_COUNT_DAYS = 62
+MAX_SCHEDULE_BATCH = 500 # Posts per bulk reschedule or conflict check
+
 workspace_router = APIRouter(
     prefix="/workspaces/{workspace_id}/posts",
     tags=["workspace-posts"],
@@ -100,11 +105,31 @@ def create_new_posts_for_workspace(
     workspace_id: int,
     post_request: schemas.PostCreateRequest, # This was PostCreate in previous context, changed to PostCreateRequest
     db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db), # The workspace's shard; same session as db on the default shard
     current_user: models.User = Depends(get_current_active_user)
 ):
     if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to create posts in this workspace")
 
+    if len(post_request.connected_account_ids) > 1:
+        # Cross-posted: the content is stored once in a post group, each account gets a
+        # lightweight post with its own status. Edit them together via /post_groups/{id}.
+        post_create_data = schemas.PostCreateData(
+            workspace_id=workspace_id,
+            content_text=post_request.post_data.content_text,
+            media_url=post_request.post_data.media_url,
+            scheduled_at=post_request.post_data.scheduled_at,
+            status=models.PostStatus.SCHEDULED.value if post_request.post_data.scheduled_at else models.PostStatus.DRAFT.value,
+        )
+        try:
+            return crud_post_group.create_grouped_posts(
+                db=shard_db, post=post_create_data, connected_account_ids=post_request.connected_account_ids, author_id=current_user.id
+            )
+        except crud_schedule.ScheduleConflictError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except ValueError as e: # Account not in the workspace
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     created_posts = []
     for acc_id in post_request.connected_account_ids:
         # Verify connected_account_id belongs to the workspace_id (assuming this check is done in crud_connected_account or similar)
@@ -122,15 +147,67 @@ def create_new_posts_for_workspace(
             # author_id field is not in PostCreateData, it's passed to crud_post.create_post directly
         )
 
-        db_post = crud.crud_post.create_post(db=db, post_create_data=post_create_data, author_id=current_user.id) # Pass author_id
-        
-        # If scheduled, trigger Celery task
-        if db_post.status == models.PostStatus.SCHEDULED.value and db_post.scheduled_at:
-            publish_post_task.apply_async(args=[db_post.id], eta=db_post.scheduled_at)
-            print(f"Scheduling post {db_post.id} for {db_post.scheduled_at}")
+        # Scheduled posts get their publish task staged in the outbox in the same transaction
+        try:
+            db_post = crud.crud_post.create_post(db=shard_db, post=post_create_data, author_id=current_user.id) # Pass author_id
+        except crud_schedule.ScheduleConflictError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except ValueError as e: # Account not in the workspace
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         created_posts.append(db_post)
     return created_posts
 
+@workspace_router.post("/reschedule", response_model=List[schemas.Post])
+def reschedule_posts_in_workspace(
+    workspace_id: int,
+    request: schemas.PostRescheduleRequest,
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Move several drafts and scheduled posts at once, all or nothing. 409 if a scheduled
+    post would end up closer to another post of its account than the account's minimum
+    spacing (see /conflicts for the full list).
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update posts in this workspace")
+    if not request.posts or len(request.posts) > MAX_SCHEDULE_BATCH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Between 1 and {MAX_SCHEDULE_BATCH} posts at a time")
+    changes = {change.post_id: change.scheduled_at for change in request.posts}
+    if len(changes) != len(request.posts):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each post may appear only once")
+    try:
+        return crud.crud_post.reschedule_posts(shard_db, workspace_id, changes)
+    except crud_schedule.ScheduleConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e: # Unknown or published posts
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@workspace_router.post("/conflicts", response_model=List[schemas.ScheduleConflict])
+def check_schedule_conflicts_in_workspace(
+    workspace_id: int,
+    request: schemas.ScheduleConflictCheck,
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    The conflicts a batch of proposed schedules (new posts, or existing ones with their
+    post_id) would have with each other and with the posts already scheduled: pairs of
+    posts of one account closer than its minimum spacing. Empty if the batch can be
+    scheduled as is. Nothing is changed.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
+    if len(request.posts) > MAX_SCHEDULE_BATCH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_SCHEDULE_BATCH} posts at a time")
+    proposals = [crud_schedule.Proposal(post.connected_account_id, post.scheduled_at, post.post_id) for post in request.posts]
+    try:
+        return crud_schedule.find_conflicts(shard_db, workspace_id, proposals)
+    except ValueError as e: # Account not in the workspace
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @workspace_router.get("/", response_model=List[schemas.Post])
 def read_posts_for_workspace(
     workspace_id: int, 
@@ -138,13 +215,121 @@ def read_posts_for_workspace(
     end_date: Optional[datetime] = None, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
 
     posts = crud.crud_post.get_posts_by_workspace(
-        db, workspace_id=workspace_id, skip=skip, limit=limit, start_date=start_date, end_date=end_date
+        shard_db, workspace_id=workspace_id, skip=skip, limit=limit, start_date=start_date, end_date=end_date
     )
-    return posts
\ No newline at end of file
+    return posts
+
+@workspace_router.get("/history", response_model=List[schemas.Post])
+def read_post_history_for_workspace(
+    workspace_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Posts scheduled within a date range, including archived ones, ordered by scheduled_at.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date")
+
+    return crud.crud_post.get_posts_in_range(
+        shard_db, workspace_id=workspace_id, start_date=start_date, end_date=end_date, skip=skip, limit=limit
+    )
+
+@workspace_router.get("/daily_counts", response_model=List[schemas.PostDayCount])
+def read_daily_post_counts_for_workspace(
+    workspace_id: int,
+    start_date: date,
+    end_date: date,
+    connected_account_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Number of posts per UTC day (by scheduled_at, or created_at for unscheduled posts)
+    in [start_date, end_date], split by status, from the precomputed rollups. At most
+    MAX_DAILY_COUNT_DAYS days, enough for a month view with its leading and trailing weeks.
+    Days without posts are left out.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_DAILY_COUNT_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_DAILY_COUNT_DAYS} days at a time")
+
+    return crud_post_rollup.get_daily_counts(
+        shard_db, workspace_id, start_date, end_date, connected_account_id=connected_account_id
+    )
+
+@workspace_router.get("/best_times", response_model=List[schemas.BestTimeSuggestion])
+def suggest_best_times_for_workspace(
+    workspace_id: int,
+    account_ids: Optional[List[int]] = Query(None, alias="connected_account_id", description="Default: every active account of the workspace"),
+    count: int = Query(5, ge=1, le=24),
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    The next `count` best hours to post for each account, from the hours its posts (and
+    its platform's) have been published at, avoiding hours next to posts already scheduled.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
+    query = shard_db.query(models.ConnectedAccount).filter(
+        models.ConnectedAccount.workspace_id == workspace_id, models.ConnectedAccount.deleting_at.is_(None)
+    )
+    if account_ids:
+        accounts = query.filter(models.ConnectedAccount.id.in_(account_ids)).all()
+        missing = set(account_ids) - {account.id for account in accounts}
+        if missing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Connected accounts not found in this workspace: {sorted(missing)}")
+    else:
+        accounts = query.filter(models.ConnectedAccount.is_active.is_(True)).order_by(models.ConnectedAccount.id).all()
+    from ..services.best_time import best_times # On first use: NumPy stays out of API startup
+    return best_times.suggest(shard_db, accounts, count=count)
+
+@workspace_router.get("/search", response_model=schemas.PostSearchResults)
+def search_posts_in_workspace(
+    workspace_id: int,
+    q: str = Query(..., min_length=1, max_length=200, description="Words the content must contain; end with * to match the last one as a prefix"),
+    post_status: Optional[List[models.PostStatus]] = Query(None, alias="status"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    shard_db: Session = Depends(get_workspace_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Full-text search over the content of the workspace's current (not archived) posts,
+    best match first. Page with the returned next_cursor.
+    """
+    if not crud_workspace.is_user_member_of_workspace(db, user_id=current_user.id, workspace_id=workspace_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view posts in this workspace")
+    try:
+        items, next_cursor = crud_post_search.search_posts(
+            shard_db, workspace_id, q, statuses=post_status, start_date=start_date, end_date=end_date, limit=limit, cursor=cursor
+        )
+    except ValueError as e: # Malformed cursor
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except NotImplementedError as e: # No search index on this database (SQLite and Postgres only)
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    return schemas.PostSearchResults(items=items, next_cursor=next_cursor)
@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from app import models, schemas, crud
+from app import models, schemas
+from app.core.platform_catalog import platform_catalog
+from app.crud import crud_social_platform # Not imported by app.crud itself
+from app.database import sync_platforms_to_shards
 from app.dependencies import get_db, get_current_active_user
 # For admin-only POST, you might need a get_current_active_superuser dependency
 
@@ -15,24 +18,22 @@ router = APIRouter(
 @router.get("/", response_model=List[schemas.SocialPlatform])
 async def read_social_platforms_list(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = 100
 ):
     """
     Get a list of all available social platforms.
+    Served from the in-process platform catalog, without a database query.
     """
-    platforms = crud.crud_social_platform.get_social_platforms(db, skip=skip, limit=limit)
-    return platforms
+    return platform_catalog.all()[skip:skip + limit]
 
 @router.get("/{platform_id}", response_model=schemas.SocialPlatform)
 async def read_social_platform_by_id(
-    platform_id: int,
-    db: Session = Depends(get_db)
+    platform_id: int
 ):
     """
     Get a specific social platform by its ID.
     """
-    db_platform = crud.crud_social_platform.get_social_platform(db, platform_id=platform_id)
+    db_platform = platform_catalog.get(platform_id)
     if db_platform is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Social platform not found")
     return db_platform
@@ -50,7 +51,8 @@ async def create_new_social_platform(
     (This endpoint would typically be restricted to admin users).
     """
     try:
-        db_platform = crud.crud_social_platform.create_social_platform(db, platform_in=platform_in)
+        db_platform = crud_social_platform.create_social_platform(db, platform_in=platform_in)
     except ValueError as e: # Catch duplicate name error from CRUD
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    sync_platforms_to_shards() # The catalog is mirrored to every shard (app.core.sharding)
     return db_platform
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app import models, schemas, crud
-from app.dependencies import get_db, get_current_active_user
+from app.database import shard_sessions
+from app.dependencies import get_db, get_read_db, get_current_active_user
 
 router = APIRouter(
     prefix="/users",
@@ -42,7 +43,7 @@ async def read_users(
     skip: int = 0,
     limit: int = 100,
     # current_user: models.User = Depends(get_current_active_superuser), # Example for superuser
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Retrieve users. (Example of an admin-restricted endpoint)
@@ -55,7 +56,7 @@ async def read_users(
 async def read_user_by_id(
     user_id: int,
     # current_user: models.User = Depends(get_current_active_superuser), # Example for superuser
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get a specific user by ID. (Example of an admin-restricted endpoint)
@@ -66,7 +67,7 @@ async def read_user_by_id(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return db_user
 
-@router.delete("/{user_id}", response_model=schemas.User)
+@router.delete("/{user_id}", response_model=schemas.DeletionJob, status_code=status.HTTP_202_ACCEPTED)
 async def delete_user_by_id(
     user_id: int,
     current_user: models.User = Depends(get_current_active_user), # For checking if user is deleting themselves or is superuser
@@ -85,7 +86,9 @@ async def delete_user_by_id(
     # if not current_user.is_superuser:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
 
-    deleted_user = crud.crud_user.delete_user(db, user_id=user_id)
-    if not deleted_user:
+    # The user is hidden (and signed out) right away; their data is removed in the background
+    with shard_sessions(default_db=db) as sessions: # Their accounts may be on any shard
+        job = crud.crud_user.delete_user(db, user_id=user_id, requested_by=current_user.id, account_dbs=list(sessions.values()))
+    if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return deleted_user
+    return job
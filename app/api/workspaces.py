@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from collections import defaultdict
 
 from app import models, schemas, crud
-from app.dependencies import get_db, get_current_active_user
+from app.database import get_workspace_db, shard_map, shard_sessions
+from app.dependencies import get_db, get_read_db, get_current_active_user
 
 router = APIRouter(
     prefix="/workspaces",
@@ -26,26 +28,45 @@ async def create_workspace(
     )
     return db_workspace
 
-@router.get("/", response_model=List[schemas.Workspace])
+@router.get("/", response_model=List[schemas.WorkspaceWithStats])
 async def read_workspaces_for_current_user(
     skip: int = 0,
     limit: int = 100,
+    include_stats: bool = False,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all workspaces the current user is a member of.
+    With include_stats=true each one comes with its number of accounts, posts by status
+    and next scheduled post, computed for the whole page at once (a few grouped queries
+    per shard) rather than by one accounts and one posts request per workspace.
     """
     workspaces = crud.crud_workspace.get_workspaces_for_user(
         db=db, user_id=current_user.id, skip=skip, limit=limit
     )
-    return workspaces
+    if not include_stats:
+        return workspaces
+
+    by_shard = defaultdict(list)
+    for workspace in workspaces:
+        by_shard[shard_map.shard_for(workspace.id)].append(workspace.id)
+    stats = {}
+    with shard_sessions(default_db=db) as sessions:
+        for shard, workspace_ids in by_shard.items():
+            stats.update(crud.crud_workspace.get_workspace_stats(sessions[shard], workspace_ids))
+    results = []
+    for workspace in workspaces:
+        result = schemas.WorkspaceWithStats.model_validate(workspace)
+        result.stats = schemas.WorkspaceStats(**stats[workspace.id])
+        results.append(result)
+    return results
 
 @router.get("/{workspace_id}", response_model=schemas.Workspace)
 async def read_workspace_by_id(
     workspace_id: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get a specific workspace by ID.
@@ -83,15 +104,18 @@ async def update_workspace_by_id(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found for update")
     return updated_workspace
 
-@router.delete("/{workspace_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{workspace_id}", response_model=schemas.DeletionJob, status_code=status.HTTP_202_ACCEPTED)
 async def delete_workspace_by_id(
     workspace_id: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    shard_db: Session = Depends(get_workspace_db) # Where its connected accounts live
 ):
     """
     Delete a workspace.
     User must be a member (typically owner) of the workspace.
+    The workspace disappears immediately; its posts and accounts are removed in the
+    background. Poll GET /deletion-jobs/{id} for progress.
     """
     # TODO: Add more granular permission check, e.g., only workspace owner can delete.
     # For now, any member can attempt, but is_user_member_of_workspace will check membership.
@@ -108,9 +132,11 @@ async def delete_workspace_by_id(
     # if db_workspace_to_check.owner_id != current_user.id:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the workspace owner can delete the workspace")
 
-    deleted_workspace = crud.crud_workspace.delete_workspace(db, workspace_id=workspace_id)
-    if not deleted_workspace:
+    job = crud.crud_workspace.delete_workspace(
+        db, workspace_id=workspace_id, requested_by=current_user.id, account_dbs=[shard_db]
+    )
+    if not job:
         # This case should have been caught by the check above, but for safety:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found for deletion")
 
-    return None # For 204 No Content
+    return job
@@ -0,0 +1,202 @@
+"""
+Operational commands for the Social Media Manager backend.
+
+Usage:
+    python -m app.cli init-db
+    python -m app.cli outbox-relay [--once] [--batch-size N] [--poll-interval SECONDS]
+    python -m app.cli purge-outbox [--older-than-days N] [--batch-size N]
+    python -m app.cli rollup-publish-attempts [--hours N]
+    python -m app.cli refresh-tokens [--horizon SECONDS] [--concurrency N] [--batch-size N]
+    python -m app.cli archive-posts [--older-than-days N] [--batch-size N] [--max-batches N]
+    python -m app.cli run-deletion-jobs [--job-id N] [--batch-size N]
+    python -m app.cli move-workspace WORKSPACE_ID SHARD [--batch-size N]
+    python -m app.cli reindex-posts [--workspace-id N] [--batch-size N]
+    python -m app.cli reconcile-post-rollups [--workspace-id N]
+    python -m app.cli rebuild-best-times [--workspace-id N]
+    python -m app.cli materialize-post-series [--batch-size N]
+"""
+import argparse
+
+def init_db_command(args):
+    from .database import init_db
+    init_db()
+    print("Database tables created.")
+
+def outbox_relay_command(args):
+    from .core.outbox_relay import run_relay
+    run_relay(once=args.once, batch_size=args.batch_size, poll_interval=args.poll_interval)
+
+def purge_outbox_command(args):
+    from .core.outbox_relay import purge_outbox
+    from .database import each_shard_session
+
+    deleted = 0
+    for shard, db in each_shard_session():
+        deleted += purge_outbox(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    print(f"Deleted {deleted} dispatched outbox messages.")
+
+def rollup_publish_attempts_command(args):
+    from datetime import datetime, timedelta, timezone
+    from .database import SessionLocal
+    from .crud import crud_publish_attempt
+
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        written = crud_publish_attempt.rollup_hours(db, now - timedelta(hours=args.hours - 1), now)
+    finally:
+        db.close()
+    print(f"Rebuilt {written} publish attempt rollup rows over the last {args.hours} hours.")
+
+def refresh_tokens_command(args):
+    from .database import each_shard_session, shard_map
+    from .services.token_refresh import refresh_expiring_tokens
+
+    totals = {"refreshed": 0, "failed": 0, "deactivated": 0, "skipped": 0}
+    for shard, db in each_shard_session():
+        shard_totals = refresh_expiring_tokens(
+            db, horizon_seconds=args.horizon, concurrency=args.concurrency, batch_size=args.batch_size,
+            exclude_workspace_ids=shard_map.moving_workspaces(),
+        )
+        totals = {key: totals[key] + shard_totals[key] for key in totals}
+    print(f"Refreshed {totals['refreshed']} tokens ({totals['failed']} failed, {totals['deactivated']} accounts deactivated, "
+          f"{totals['skipped']} on simulated platforms skipped).")
+
+def archive_posts_command(args):
+    from .database import each_shard_session, shard_map
+    from .services.post_archiver import archive_old_posts
+
+    moved = 0
+    for shard, db in each_shard_session():
+        moved += archive_old_posts(
+            db, older_than_days=args.older_than_days, batch_size=args.batch_size, max_batches=args.max_batches,
+            exclude_workspace_ids=shard_map.moving_workspaces(),
+        )
+    print(f"Moved {moved} posts to the archive.")
+
+def run_deletion_jobs_command(args):
+    from .database import SessionLocal
+    from .services.deletion import resume_deletion_jobs, run_deletion_job
+
+    db = SessionLocal()
+    try:
+        if args.job_id is not None:
+            finished = int(run_deletion_job(db, args.job_id, batch_size=args.batch_size))
+        else:
+            finished = resume_deletion_jobs(db)
+    finally:
+        db.close()
+    print(f"Finished {finished} deletion jobs.")
+
+def move_workspace_command(args):
+    from .services.shard_mover import move_workspace
+
+    copied = move_workspace(args.workspace_id, args.shard, batch_size=args.batch_size)
+    print(f"Moved workspace {args.workspace_id} to shard {args.shard}: {copied}")
+
+def reindex_posts_command(args):
+    from .crud.crud_post_search import rebuild_index
+    from .database import each_shard_session
+
+    indexed = 0
+    for shard, db in each_shard_session():
+        indexed += rebuild_index(db, workspace_id=args.workspace_id, batch_size=args.batch_size)
+    print(f"Indexed {indexed} posts for search.")
+
+def reconcile_post_rollups_command(args):
+    from .crud.crud_post_rollup import reconcile
+    from .database import each_shard_session, shard_map
+
+    totals = {"workspaces": 0, "corrected": 0}
+    for shard, db in each_shard_session():
+        workspace_ids = None if args.workspace_id is None else [args.workspace_id]
+        shard_totals = reconcile(db, workspace_ids=workspace_ids, exclude_workspace_ids=shard_map.moving_workspaces())
+        for key in totals:
+            totals[key] += shard_totals[key]
+    print(f"Reconciled {totals['workspaces']} workspaces, corrected {totals['corrected']} daily post counts.")
+
+def rebuild_best_times_command(args):
+    from .crud.crud_best_time import rebuild_histograms
+    from .database import each_shard_session
+
+    counted = 0
+    for shard, db in each_shard_session():
+        counted += rebuild_histograms(db, workspace_id=args.workspace_id)
+    print(f"Rebuilt best-time histograms from {counted} published posts.")
+
+def materialize_post_series_command(args):
+    from .crud.crud_post_series import materialize_due
+    from .database import each_shard_session, shard_map
+
+    created = 0
+    for shard, db in each_shard_session():
+        created += materialize_due(db, batch_size=args.batch_size, exclude_workspace_ids=shard_map.moving_workspaces())
+    print(f"Scheduled {created} post series occurrences.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Social Media Manager backend commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_db_parser = subparsers.add_parser("init-db", help="Create any missing database tables")
+    init_db_parser.set_defaults(func=init_db_command)
+
+    relay_parser = subparsers.add_parser("outbox-relay", help="Send staged tasks from the outbox to the broker")
+    relay_parser.add_argument("--once", action="store_true", help="Drain what is due now and exit")
+    relay_parser.add_argument("--batch-size", type=int, default=None)
+    relay_parser.add_argument("--poll-interval", type=float, default=None)
+    relay_parser.set_defaults(func=outbox_relay_command)
+
+    purge_parser = subparsers.add_parser("purge-outbox", help="Delete outbox messages dispatched long ago")
+    purge_parser.add_argument("--older-than-days", type=int, default=None)
+    purge_parser.add_argument("--batch-size", type=int, default=None)
+    purge_parser.set_defaults(func=purge_outbox_command)
+
+    rollup_parser = subparsers.add_parser("rollup-publish-attempts", help="Rebuild hourly publish attempt rollups (e.g. to backfill)")
+    rollup_parser.add_argument("--hours", type=int, default=2, help="How many hours back to rebuild, including the current one")
+    rollup_parser.set_defaults(func=rollup_publish_attempts_command)
+
+    refresh_parser = subparsers.add_parser("refresh-tokens", help="Refresh OAuth tokens that expire soon")
+    refresh_parser.add_argument("--horizon", type=int, default=None, help="Refresh tokens expiring within this many seconds")
+    refresh_parser.add_argument("--concurrency", type=int, default=None)
+    refresh_parser.add_argument("--batch-size", type=int, default=None)
+    refresh_parser.set_defaults(func=refresh_tokens_command)
+
+    archive_parser = subparsers.add_parser("archive-posts", help="Move old published posts to the archive table")
+    archive_parser.add_argument("--older-than-days", type=int, default=None)
+    archive_parser.add_argument("--batch-size", type=int, default=None)
+    archive_parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+    archive_parser.set_defaults(func=archive_posts_command)
+
+    deletion_parser = subparsers.add_parser("run-deletion-jobs", help="Run a deletion job, or resume stalled ones")
+    deletion_parser.add_argument("--job-id", type=int, default=None, help="Run (or resume) this job; default: all stalled jobs")
+    deletion_parser.add_argument("--batch-size", type=int, default=None)
+    deletion_parser.set_defaults(func=run_deletion_jobs_command)
+
+    move_parser = subparsers.add_parser("move-workspace", help="Move a workspace's data to another shard")
+    move_parser.add_argument("workspace_id", type=int)
+    move_parser.add_argument("shard", help="Target shard name from DATABASE_SHARD_URLS, or 'default'")
+    move_parser.add_argument("--batch-size", type=int, default=None)
+    move_parser.set_defaults(func=move_workspace_command)
+
+    reindex_parser = subparsers.add_parser("reindex-posts", help="Rebuild the post search index (e.g. after a bulk load)")
+    reindex_parser.add_argument("--workspace-id", type=int, default=None, help="Only this workspace; default: all posts")
+    reindex_parser.add_argument("--batch-size", type=int, default=5000)
+    reindex_parser.set_defaults(func=reindex_posts_command)
+
+    reconcile_parser = subparsers.add_parser("reconcile-post-rollups", help="Recount daily post counts and repair drift")
+    reconcile_parser.add_argument("--workspace-id", type=int, default=None, help="Only this workspace; default: all workspaces")
+    reconcile_parser.set_defaults(func=reconcile_post_rollups_command)
+
+    best_times_parser = subparsers.add_parser("rebuild-best-times", help="Recompute the hour-of-week publishing histograms from history")
+    best_times_parser.add_argument("--workspace-id", type=int, default=None, help="Only this workspace; default: all workspaces")
+    best_times_parser.set_defaults(func=rebuild_best_times_command)
+
+    series_parser = subparsers.add_parser("materialize-post-series", help="Schedule the post series occurrences entering the horizon")
+    series_parser.add_argument("--batch-size", type=int, default=None, help="Series per transaction")
+    series_parser.set_defaults(func=materialize_post_series_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,16 @@
-from .config import settings
-from .security import get_password_hash, verify_password, encrypt_data, decrypt_data
\ No newline at end of file
+# Re-exports are resolved lazily so importing a single submodule (e.g. app.core.config
+# from a Celery worker) does not pull in passlib, cryptography and jose.
+_LAZY_EXPORTS = {
+    "settings": ".config",
+    "get_password_hash": ".security",
+    "verify_password": ".security",
+    "encrypt_data": ".security",
+    "decrypt_data": ".security",
+}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,93 @@
+"""
+Buffers publish attempt rows in the worker process and writes them to
+publish_attempts in batches, so the ledger costs one INSERT per batch rather
+than one transaction per platform call.
+
+The buffer is flushed when it reaches PUBLISH_ATTEMPT_FLUSH_SIZE rows, by a
+background thread every PUBLISH_ATTEMPT_FLUSH_INTERVAL_SECONDS, and on worker
+shutdown. Rows still buffered when a process is killed are lost; the ledger is
+for analytics, and the post's own status remains authoritative.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .config import settings
+
+class AttemptLedger:
+    def __init__(self, flush_size: int, flush_interval: float):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+        self._flusher_pid = None
+
+    def record(self, *, post_id: int, connected_account_id: int | None, platform: str, attempt: int,
+               latency_seconds: float, outcome: str, error_class: str | None = None):
+        row = {
+            "post_id": post_id,
+            "connected_account_id": connected_account_id,
+            "platform": platform[:32],
+            "attempt": attempt,
+            "latency_ms": int(latency_seconds * 1000),
+            "outcome": outcome,
+            "error_class": error_class,
+            "created_at": datetime.now(timezone.utc),
+        }
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.flush_size
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write buffered rows in one batch. On failure the rows are put back for the next flush.
+        """
+        from ..database import SessionLocal
+        from ..crud import crud_publish_attempt
+
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            db = SessionLocal()
+            try:
+                crud_publish_attempt.insert_attempts(db, rows)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Attempt ledger: failed to write {len(rows)} rows: {e}")
+                with self._lock:
+                    # Keep the newest rows if the database stays down
+                    self._rows = (rows + self._rows)[-self.flush_size * 10:]
+                return 0
+            finally:
+                db.close()
+            return len(rows)
+
+    def _ensure_flusher(self):
+        # Prefork children inherit the object but not the thread
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._run_flusher, name="attempt-ledger-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+attempt_ledger = AttemptLedger(
+    flush_size=settings.PUBLISH_ATTEMPT_FLUSH_SIZE,
+    flush_interval=settings.PUBLISH_ATTEMPT_FLUSH_INTERVAL_SECONDS,
+)
@@ -0,0 +1,24 @@
+"""
+Shared Redis connection for cross-process state (circuit breakers, dedup
+caches, invalidation). Falls back to None when no Redis is configured, in which
+case callers use their in-process fallback.
+"""
+from functools import lru_cache
+
+from .config import settings
+
+def redis_url() -> str | None:
+    if settings.REDIS_URL:
+        return settings.REDIS_URL
+    broker = settings.CELERY_BROKER_URL or ""
+    if broker.startswith(("redis://", "rediss://")):
+        return broker
+    return None
+
+@lru_cache(maxsize=1)
+def get_redis():
+    url = redis_url()
+    if not url:
+        return None
+    import redis # Only imported when Redis is actually configured
+    return redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
@@ -1,10 +1,21 @@
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
 from celery import Celery
+from celery.exceptions import Retry
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from kombu import Queue
 
 from .config import settings
-from ..database import SessionLocal
-from ..crud import crud_post
-from .. import models
+from . import metrics, tracing
+from .circuit_breaker import circuit_breaker_for
+from .attempt_ledger import attempt_ledger
+from .platform_catalog import platform_catalog
+from .idempotency import publish_idempotency_key, recently_published
+from ..services.platforms import ErrorClass, classify_error, get_adapter
+from ..services.token_refresh import refresh_account_token, refresh_expiring_tokens, token_needs_refresh
 
 # Initialize Celery
 celery_app = Celery(
@@ -14,9 +25,15 @@ celery_app = Celery(
     include=['app.core.celery_app'] # Points to this module for task discovery
 )
 
+# Publishing is split into two queues so a bulk backlog of scheduled posts
+# never delays a "publish now" request.
+PUBLISH_NOW_QUEUE = 'social_posting.now'
+PUBLISH_BULK_QUEUE = 'social_posting.bulk'
+
 celery_app.conf.update(
     task_serializer='json',
-    accept_content=['json'],  # Ignore other content
+    # msgpack is accepted so workers can consume the compact social_posting messages
+    accept_content=['json', 'msgpack'],  # Ignore other content
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
@@ -25,93 +42,491 @@ celery_app.conf.update(
     task_default_queue='default',
     task_queues=(
         Queue('default'),
-        Queue('social_posting'),
+        Queue(PUBLISH_NOW_QUEUE),
+        Queue(PUBLISH_BULK_QUEUE),
+        Queue('social_posting'), # Legacy queue, kept declared so queued messages still drain
     )
 )
 
-@celery_app.task(name="publish_post_task", bind=True, max_retries=3, default_retry_delay=60, queue='social_posting')
-def publish_post_task(self, post_id: int):
+# Task-level options for publish_post_task. These travel with every call, so the
+# producer (API) and the worker agree on them regardless of worker profile.
+SOCIAL_POSTING_TASK_OPTIONS = dict(
+    acks_late=True, # Ack after the task finishes; a crashed worker's task is redelivered
+    reject_on_worker_lost=True, # ...including when the child process is killed (OOM, SIGKILL)
+    ignore_result=True, # Outcomes are recorded on the posts table; skip the result backend write
+    serializer='msgpack', # Smaller and faster than JSON for the (post_id,) payload
+)
+
+# Named worker profiles, selected with CELERY_WORKER_PROFILE, e.g.
+#   CELERY_WORKER_PROFILE=social_posting celery -A app.core.celery_app worker \
+#       -Q social_posting.now,social_posting.bulk,social_posting
+WORKER_PROFILES = {
+    "default": {},
+    "social_posting": dict(
+        # Publishing calls external APIs and is slow; never reserve more than
+        # one message per process, so idle processes can pick up waiting work.
+        worker_prefetch_multiplier=1,
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        task_ignore_result=True,
+        # With Redis, always poll the queues in the order given on -Q so the
+        # "now" queue is drained before the bulk queue.
+        broker_transport_options={"queue_order_strategy": "priority"},
+    ),
+}
+
+if settings.CELERY_WORKER_PROFILE not in WORKER_PROFILES:
+    raise ValueError(f"Unknown CELERY_WORKER_PROFILE '{settings.CELERY_WORKER_PROFILE}'. Known: {', '.join(WORKER_PROFILES)}")
+celery_app.conf.update(WORKER_PROFILES[settings.CELERY_WORKER_PROFILE])
+
+def publish_queue_for(eta: datetime | None) -> str:
+    """
+    Route a publish to the "now" queue when it is due within
+    PUBLISH_NOW_WINDOW_SECONDS, otherwise to the bulk scheduled queue.
+    """
+    if eta is None:
+        return PUBLISH_NOW_QUEUE
+    if eta.tzinfo is None:
+        eta = eta.replace(tzinfo=timezone.utc)
+    if eta <= datetime.now(timezone.utc) + timedelta(seconds=settings.PUBLISH_NOW_WINDOW_SECONDS):
+        return PUBLISH_NOW_QUEUE
+    return PUBLISH_BULK_QUEUE
+
+# Trace context travels in the task message headers (see app.core.tracing)
+tracing.connect_celery_signals()
+
+@worker_init.connect
+def start_worker_metrics_server(sender=None, **kwargs):
+    # Each worker node exposes the same metrics as the API on its own port.
+    # For prefork pools set PROMETHEUS_MULTIPROC_DIR so child processes are aggregated.
+    if getattr(sender, "app", celery_app) is not celery_app:
+        return # Another Celery app in this process (e.g. benchmarks)
+    if settings.CELERY_METRICS_PORT:
+        try:
+            metrics.start_metrics_server(settings.CELERY_METRICS_PORT)
+        except OSError as e:
+            print(f"Could not start worker metrics server on port {settings.CELERY_METRICS_PORT}: {e}")
+
+@worker_process_init.connect
+def preload_platform_catalog(sender=None, **kwargs):
+    # After the fork, so the load's database connection belongs to the child; solo pools load on first use
+    try:
+        platform_catalog.load()
+    except Exception as e:
+        print(f"Platform catalog preload failed: {e}")
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_attempt_ledger(sender=None, **kwargs):
+    # Write buffered publish attempts before the process exits
+    attempt_ledger.flush()
+
+def _queue_lag_seconds(scheduled_at: datetime | None) -> float | None:
+    if scheduled_at is None:
+        return None
+    if scheduled_at.tzinfo is None: # SQLite drops tzinfo; values are stored as UTC
+        scheduled_at = scheduled_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - scheduled_at).total_seconds()
+
+def retry_backoff_seconds(attempt: int, retry_after: float | None = None) -> float:
+    """
+    Exponential backoff with full jitter, so tasks failing together do not retry together.
+    A platform's Retry-After is honoured as a floor.
+    """
+    cap = min(settings.PUBLISH_RETRY_MAX_SECONDS, settings.PUBLISH_RETRY_BASE_SECONDS * (2 ** attempt))
+    delay = random.uniform(0, cap)
+    if retry_after:
+        delay += retry_after
+    return delay
+
+def _handle_publish_failure(task, db, post, platform_name: str, exc: Exception, breaker, scheduled_for, attempt: int, latency: float):
+    from ..crud import crud_post
+    from .. import models
+
+    error_class = classify_error(exc)
+    metrics.PUBLISH_OUTCOMES.labels(platform_name, error_class.value).inc()
+    if error_class in (ErrorClass.TRANSIENT, ErrorClass.RATE_LIMITED):
+        breaker.record_failure() # Auth/permanent errors are about this post/account, not the platform
+
+    next_attempt = attempt + 1
+    give_up = error_class in (ErrorClass.AUTH, ErrorClass.PERMANENT) or next_attempt >= settings.PUBLISH_MAX_ATTEMPTS
+    attempt_ledger.record(
+        post_id=post.id,
+        connected_account_id=post.connected_account_id,
+        platform=platform_name,
+        attempt=next_attempt,
+        latency_seconds=latency,
+        outcome="failed" if give_up else "retrying",
+        error_class=error_class.value,
+    )
+    if give_up:
+        crud_post.update_post_status(db, post.id, models.PostStatus.ERROR, f"{error_class.value}: {exc}")
+        print(f"Giving up on Post ID {post.id} after attempt {next_attempt} ({error_class.value}): {exc}")
+        metrics.PUBLISH_OUTCOMES.labels(platform_name, "failed").inc()
+        return f"Error: Post ID {post.id} failed ({error_class.value})."
+
+    # The post stays SCHEDULED while a retry is pending
+    countdown = retry_backoff_seconds(attempt, getattr(exc, "retry_after", None))
+    print(f"{error_class.value} error for Post ID {post.id} on {platform_name} (attempt {next_attempt}/{settings.PUBLISH_MAX_ATTEMPTS}); retrying in {countdown:.0f}s: {exc}")
+    raise task.retry(exc=exc, kwargs=dict(scheduled_for=scheduled_for, attempt=next_attempt, workspace_id=task.request.kwargs.get("workspace_id")), countdown=countdown)
+
+def _handle_token_refresh_failure(task, db, post_id: int, platform_name: str, exc: Exception, scheduled_for, attempt: int):
+    from ..crud import crud_post
+    from .. import models
+
+    db.rollback()
+    error_class = classify_error(exc)
+    metrics.PUBLISH_OUTCOMES.labels(platform_name, "token_refresh_failed").inc()
+    next_attempt = attempt + 1
+    if error_class in (ErrorClass.AUTH, ErrorClass.PERMANENT) or next_attempt >= settings.PUBLISH_MAX_ATTEMPTS:
+        # Fail now rather than letting the publish call fail with an expired token
+        crud_post.update_post_status(db, post_id, models.PostStatus.ERROR, f"auth: token refresh failed: {exc}")
+        print(f"Token refresh failed for Post ID {post_id}; giving up: {exc}")
+        return f"Error: Post ID {post_id} failed (token refresh)."
+    countdown = retry_backoff_seconds(attempt, getattr(exc, "retry_after", None))
+    print(f"Token refresh failed for Post ID {post_id} ({error_class.value}); retrying in {countdown:.0f}s: {exc}")
+    raise task.retry(exc=exc, kwargs=dict(scheduled_for=scheduled_for, attempt=next_attempt, workspace_id=task.request.kwargs.get("workspace_id")), countdown=countdown)
+
+def _mark_published(db, post_id: int, idempotency_key: str, platform_post_id: str):
+    from ..crud import crud_post, crud_publish_lease
+    from .. import models
+
+    # Lease completion and post status commit together
+    crud_publish_lease.complete_lease(db, idempotency_key, platform_post_id)
+    crud_post.update_post_status(db, post_id, models.PostStatus.POSTED, platform_post_id=platform_post_id)
+
+# max_retries=None: attempts are counted in the `attempt` kwarg (parking on an open circuit
+# is not an attempt) and capped by PUBLISH_MAX_ATTEMPTS.
+@celery_app.task(name="publish_post_task", bind=True, max_retries=None, queue=PUBLISH_BULK_QUEUE, **SOCIAL_POSTING_TASK_OPTIONS)
+def publish_post_task(self, post_id: int, scheduled_for: str | None = None, attempt: int = 0, workspace_id: int | None = None):
     """
     Celery task to publish a post to a social media platform.
+    `scheduled_for` is the post's scheduled_at when the task was staged in the outbox;
+    if the post has since been rescheduled, this task is stale and exits.
+    `attempt` counts platform calls made so far for this schedule.
+    Each schedule has one idempotency key (app.core.idempotency), shared by all
+    retries and redeliveries, so the post is published at most once.
+    `workspace_id` selects the shard holding the post (app.core.sharding); tasks
+    staged before sharding lack it and use the default shard.
     """
-    db = SessionLocal()
+    # The DB/CRUD layer is imported on first use so `celery worker` boots (and
+    # answers health checks) without loading the ORM models.
+    from ..database import session_for_workspace, shard_map
+    from ..crud import crud_post, crud_outbox, crud_publish_lease
+    from .. import models
+
+    task_span = tracing.current_span()
+    if task_span is not None:
+        task_span.set_attribute("post_id", post_id)
+
+    if shard_map.is_moving(workspace_id):
+        # Its rows are being copied to another shard; a status written now could be lost
+        countdown = settings.SHARD_MOVE_DRAIN_SECONDS + random.uniform(0, settings.SHARD_MOVE_DRAIN_SECONDS)
+        print(f"Workspace {workspace_id} is moving between shards; parking Post ID {post_id} for {countdown:.0f}s")
+        metrics.PUBLISH_OUTCOMES.labels("unknown", "workspace_moving").inc()
+        raise self.retry(kwargs=dict(scheduled_for=scheduled_for, attempt=attempt, workspace_id=workspace_id), countdown=countdown)
+
+    db = session_for_workspace(workspace_id)
+    lease_holder = uuid.uuid4().hex # Identifies this execution, not the (redeliverable) task id
+    lease_acquired = False
+    idempotency_key = None
     try:
-        post = crud_post.get_post(db, post_id)
+        post = crud_post.get_post(db, post_id, include_archived=False) # Archived posts are published and read-only
         if not post:
             print(f"Post ID {post_id} not found. Task cannot proceed.")
+            metrics.PUBLISH_OUTCOMES.labels("unknown", "not_found").inc()
             # Potentially mark as error or handle differently
             return f"Error: Post ID {post_id} not found."
 
         if post.status != models.PostStatus.SCHEDULED:
             print(f"Post ID {post_id} is not in 'scheduled' status (current: {post.status}). Skipping.")
+            metrics.PUBLISH_OUTCOMES.labels("unknown", "skipped").inc()
             return f"Skipped: Post ID {post_id} status is {post.status}."
 
+        if scheduled_for and post.scheduled_at and crud_outbox.as_utc(post.scheduled_at) != datetime.fromisoformat(scheduled_for):
+            print(f"Post ID {post_id} was rescheduled to {post.scheduled_at} (task was for {scheduled_for}). Skipping stale task.")
+            metrics.PUBLISH_OUTCOMES.labels("unknown", "stale").inc()
+            return f"Skipped: Post ID {post_id} was rescheduled."
+
         connected_account = post.connected_account
+        if connected_account is not None and connected_account.deleting_at is not None:
+            print(f"Post ID {post_id}: connected account {connected_account.id} is being deleted. Skipping.")
+            metrics.PUBLISH_OUTCOMES.labels("unknown", "skipped").inc()
+            return f"Skipped: connected account for Post ID {post_id} is being deleted."
+
         if not connected_account or not connected_account.is_active:
             crud_post.update_post_status(db, post_id, models.PostStatus.ERROR, "Connected account is inactive or missing.")
             print(f"Error for Post ID {post_id}: Connected account inactive or missing.")
+            metrics.PUBLISH_OUTCOMES.labels("unknown", "account_inactive").inc()
             return f"Error: Connected account for Post ID {post_id} inactive/missing."
 
+        # From the in-process catalog; the relationship is only a fallback (no lazy load per post)
+        platform = platform_catalog.get(connected_account.platform_id) or connected_account.platform
+        platform_name = platform.name.lower()
+        idempotency_key = publish_idempotency_key(post_id, crud_outbox.as_utc(post.scheduled_at) if post.scheduled_at else None)
+
+        # Redelivered after the platform accepted the post but before we committed
+        cached_platform_post_id = recently_published.get(idempotency_key)
+        if cached_platform_post_id:
+            _mark_published(db, post_id, idempotency_key, cached_platform_post_id)
+            print(f"Post ID {post_id} already published as {cached_platform_post_id}; skipping duplicate delivery.")
+            metrics.PUBLISH_OUTCOMES.labels(platform_name, "duplicate").inc()
+            return f"Skipped: Post ID {post_id} already published to {platform_name}."
+
+        breaker = circuit_breaker_for(platform_name)
+        allowed, wait_seconds = breaker.allow()
+        if not allowed:
+            # Park without spending an attempt; jitter spreads the wake-ups
+            countdown = wait_seconds + random.uniform(0, settings.PUBLISH_RETRY_BASE_SECONDS)
+            print(f"Circuit open for {platform_name}; parking Post ID {post_id} for {countdown:.0f}s")
+            metrics.PUBLISH_OUTCOMES.labels(platform_name, "circuit_open").inc()
+            raise self.retry(kwargs=dict(scheduled_for=scheduled_for, attempt=attempt, workspace_id=workspace_id), countdown=countdown)
+
+        if token_needs_refresh(connected_account):
+            # Normally done ahead of time by refresh_expiring_tokens_task; this catches stragglers
+            try:
+                with tracing.start_span("platform.refresh_token", platform=platform_name, account_id=connected_account.id):
+                    refresh_account_token(db, connected_account.id)
+            except Exception as e:
+                return _handle_token_refresh_failure(self, db, post_id, platform_name, e, scheduled_for, attempt)
+
+        lease_state, lease = crud_publish_lease.acquire_lease(db, idempotency_key, post_id, lease_holder, settings.PUBLISH_LEASE_SECONDS)
+        if lease_state == crud_publish_lease.LEASE_COMPLETED:
+            _mark_published(db, post_id, idempotency_key, lease.platform_post_id)
+            recently_published.remember(idempotency_key, lease.platform_post_id)
+            print(f"Post ID {post_id} already published as {lease.platform_post_id}; skipping duplicate delivery.")
+            metrics.PUBLISH_OUTCOMES.labels(platform_name, "duplicate").inc()
+            return f"Skipped: Post ID {post_id} already published to {platform_name}."
+        if lease_state == crud_publish_lease.LEASE_HELD:
+            # Another execution is mid-call (or died holding the lease); check back once it expires
+            countdown = crud_publish_lease.lease_seconds_remaining(lease) + random.uniform(1, 5)
+            print(f"Post ID {post_id} is being published by another worker; re-checking in {countdown:.0f}s")
+            metrics.PUBLISH_OUTCOMES.labels(platform_name, "lease_held").inc()
+            raise self.retry(kwargs=dict(scheduled_for=scheduled_for, attempt=attempt, workspace_id=workspace_id), countdown=countdown)
+        lease_acquired = True
+
         # Decrypt token (already handled by @property in model)
         access_token = connected_account.access_token
-        platform_name = connected_account.platform.name.lower()
 
         print(f"Attempting to publish Post ID {post_id} to {platform_name} for account {connected_account.platform_account_name} ({connected_account.platform_account_id})")
-        print(f"Content: {post.content_text[:50]}...")
+        print(f"Content: {(post.content_text or '')[:50]}...")
         # print(f"Access Token (masked): {access_token[:5]}...{access_token[-5:]}") # For debug, be careful with real tokens
 
-        # TODO: Implement actual API call logic for each platform
-        # This is a placeholder for platform-specific API interaction
-        platform_post_id_from_api = None
+        publish_started = time.perf_counter()
         try:
-            if platform_name == "facebook":
-                # from ..services.facebook_service import post_to_facebook # Example
-                # platform_post_id_from_api = post_to_facebook(access_token, connected_account.platform_account_id, post.content_text, post.media_url)
-                print(f"[SIMULATE] Posting to Facebook for Post ID {post_id}")
-                platform_post_id_from_api = f"fb_sim_{post_id}"
-                pass
-            elif platform_name == "twitter":
-                # from ..services.twitter_service import post_to_twitter # Example
-                # platform_post_id_from_api = post_to_twitter(access_token, post.content_text, post.media_url)
-                print(f"[SIMULATE] Posting to Twitter for Post ID {post_id}")
-                platform_post_id_from_api = f"tw_sim_{post_id}"
-                pass
-            elif platform_name == "instagram":
-                print(f"[SIMULATE] Posting to Instagram for Post ID {post_id}")
-                platform_post_id_from_api = f"ig_sim_{post_id}"
-                pass
-            elif platform_name == "linkedin":
-                print(f"[SIMULATE] Posting to LinkedIn for Post ID {post_id}")
-                platform_post_id_from_api = f"li_sim_{post_id}"
-                pass                
-            else:
-                raise NotImplementedError(f"Platform '{platform_name}' not supported for automated posting.")
-            
-            # If successful:
-            crud_post.update_post_status(db, post_id, models.PostStatus.POSTED, platform_post_id=platform_post_id_from_api)
-            print(f"Successfully posted Post ID {post_id} to {platform_name}. Platform Post ID: {platform_post_id_from_api}")
-            return f"Success: Post ID {post_id} published to {platform_name}."
-
+            adapter = get_adapter(platform_name, platform.api_base_url)
+            with tracing.start_span("platform.publish", platform=platform_name, attempt=attempt + 1, idempotency_key=idempotency_key):
+                platform_post_id_from_api = adapter.publish(
+                    access_token=access_token,
+                    account_id=connected_account.platform_account_id,
+                    content_text=post.content_text,
+                    media_url=post.media_url,
+                    idempotency_key=idempotency_key,
+                )
         except Exception as e:
-            print(f"API Error for Post ID {post_id} on {platform_name}: {str(e)}")
-            crud_post.update_post_status(db, post_id, models.PostStatus.ERROR, str(e))
-            # Retry logic is handled by Celery's `bind=True, max_retries, default_retry_delay`
-            # self.retry(exc=e) # This would trigger a retry
-            raise # Re-raise to let Celery handle retry based on task decorator settings
+            publish_latency = time.perf_counter() - publish_started
+            metrics.PUBLISH_LATENCY.labels(platform_name).observe(publish_latency)
+            crud_publish_lease.release_lease(db, idempotency_key, lease_holder)
+            lease_acquired = False
+            return _handle_publish_failure(self, db, post, platform_name, e, breaker, scheduled_for, attempt, publish_latency)
+
+        # Remember the result before touching the DB: if we die before the commit,
+        # the redelivered task finds it here instead of posting again.
+        recently_published.remember(idempotency_key, platform_post_id_from_api)
+        publish_latency = time.perf_counter() - publish_started
+        metrics.PUBLISH_LATENCY.labels(platform_name).observe(publish_latency)
+        attempt_ledger.record(
+            post_id=post_id,
+            connected_account_id=connected_account.id,
+            platform=platform_name,
+            attempt=attempt + 1,
+            latency_seconds=publish_latency,
+            outcome="posted",
+        )
+        breaker.record_success()
+        queue_lag = _queue_lag_seconds(post.scheduled_at)
+
+        # If successful:
+        _mark_published(db, post_id, idempotency_key, platform_post_id_from_api)
+        lease_acquired = False
+        print(f"Successfully posted Post ID {post_id} to {platform_name}. Platform Post ID: {platform_post_id_from_api}")
+        metrics.PUBLISH_OUTCOMES.labels(platform_name, "posted").inc()
+        if queue_lag is not None:
+            metrics.PUBLISH_QUEUE_LAG.labels(platform_name).observe(max(queue_lag, 0.0))
+        return f"Success: Post ID {post_id} published to {platform_name}."
 
+    except Retry:
+        raise
     except Exception as e:
-        # Catch-all for unexpected errors during task execution (e.g., DB issues before API call)
+        # Unexpected errors outside the platform call (e.g. DB issues): treat as transient.
+        # The post stays SCHEDULED unless attempts are exhausted.
         print(f"General Error in publish_post_task for Post ID {post_id}: {str(e)}")
-        # Attempt to mark post as error if possible, but the DB session might be compromised
-        try:
-            crud_post.update_post_status(db, post_id, models.PostStatus.ERROR, f"Task execution error: {str(e)}")
-        except Exception as db_error:
-            print(f"Failed to update post status to ERROR for Post ID {post_id} after general task error: {db_error}")
-        # self.retry(exc=e) # Consider if retryable
-        raise # Re-raise to let Celery handle retry
+        db.rollback()
+        if lease_acquired:
+            try:
+                crud_publish_lease.release_lease(db, idempotency_key, lease_holder)
+            except Exception as db_error:
+                print(f"Failed to release publish lease for Post ID {post_id}: {db_error}")
+        if attempt + 1 >= settings.PUBLISH_MAX_ATTEMPTS:
+            try:
+                crud_post.update_post_status(db, post_id, models.PostStatus.ERROR, f"Task execution error: {str(e)}")
+            except Exception as db_error:
+                print(f"Failed to update post status to ERROR for Post ID {post_id} after general task error: {db_error}")
+            raise
+        raise self.retry(exc=e, kwargs=dict(scheduled_for=scheduled_for, attempt=attempt + 1, workspace_id=workspace_id), countdown=retry_backoff_seconds(attempt))
     finally:
         db.close()
 
+@celery_app.task(name="rollup_publish_attempts_task", ignore_result=True)
+def rollup_publish_attempts_task(hours: int = 2):
+    """
+    Rebuild the hourly publish attempt rollups for the last `hours` hours
+    (the current hour plus late-flushed rows in the previous one).
+    """
+    from ..database import SessionLocal
+    from ..crud import crud_publish_attempt
+
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        return crud_publish_attempt.rollup_hours(db, now - timedelta(hours=hours - 1), now)
+    finally:
+        db.close()
+
+@celery_app.task(name="refresh_expiring_tokens_task", ignore_result=True)
+def refresh_expiring_tokens_task():
+    """
+    Refresh OAuth tokens expiring within TOKEN_REFRESH_HORIZON_SECONDS.
+    """
+    from ..database import each_shard_session, shard_map
+
+    totals = {"refreshed": 0, "failed": 0, "deactivated": 0, "skipped": 0}
+    for shard, db in each_shard_session():
+        # Accounts of a workspace being moved are left alone until it lands on its new shard
+        shard_totals = refresh_expiring_tokens(db, exclude_workspace_ids=shard_map.moving_workspaces())
+        totals = {key: totals[key] + shard_totals[key] for key in totals}
+    print(f"Token refresh: {totals}")
+    return totals
+
+@celery_app.task(name="archive_posts_task", ignore_result=True)
+def archive_posts_task():
+    """
+    Move old POSTED/ARCHIVED posts to the posts_archive table.
+    """
+    from ..database import each_shard_session, shard_map
+    from ..services.post_archiver import archive_old_posts
+
+    moved = 0
+    for shard, db in each_shard_session():
+        moved += archive_old_posts(db, exclude_workspace_ids=shard_map.moving_workspaces())
+    print(f"Post archiver: moved {moved} posts to the archive")
+    return moved
+
+@celery_app.task(name="purge_outbox_task", ignore_result=True)
+def purge_outbox_task():
+    """
+    Delete outbox messages dispatched more than OUTBOX_RETENTION_DAYS ago.
+    """
+    from ..database import each_shard_session
+    from .outbox_relay import purge_outbox
+
+    deleted = 0
+    for shard, db in each_shard_session():
+        deleted += purge_outbox(db)
+    print(f"Outbox purge: deleted {deleted} dispatched message(s)")
+    return deleted
+
+@celery_app.task(name="reconcile_post_rollups_task", ignore_result=True)
+def reconcile_post_rollups_task():
+    """
+    Recount every workspace's daily post counts and repair drift.
+    """
+    from ..crud import crud_post_rollup
+    from ..database import each_shard_session, shard_map
+
+    corrected = 0
+    for shard, db in each_shard_session():
+        corrected += crud_post_rollup.reconcile(db, exclude_workspace_ids=shard_map.moving_workspaces())["corrected"]
+    print(f"Post rollups: corrected {corrected} bucket(s)")
+    return corrected
+
+@celery_app.task(name="materialize_post_series_task", ignore_result=True)
+def materialize_post_series_task():
+    """
+    Schedule the occurrences of recurring post series that entered the horizon.
+    """
+    from ..crud import crud_post_series
+    from ..database import each_shard_session, shard_map
+
+    created = 0
+    for shard, db in each_shard_session():
+        created += crud_post_series.materialize_due(db, exclude_workspace_ids=shard_map.moving_workspaces())
+    print(f"Post series: scheduled {created} occurrence(s)")
+    return created
+
+@celery_app.task(name="run_deletion_job_task", ignore_result=True)
+def run_deletion_job_task(job_id: int):
+    """
+    Remove a deleted workspace, user or connected account and its data, in batches.
+    Staged in the outbox by crud_deletion_job.request_deletion.
+    """
+    from ..database import SessionLocal
+    from ..services.deletion import run_deletion_job
+
+    db = SessionLocal()
+    try:
+        return run_deletion_job(db, job_id)
+    finally:
+        db.close()
+
+@celery_app.task(name="resume_deletion_jobs_task", ignore_result=True)
+def resume_deletion_jobs_task():
+    """
+    Pick up deletion jobs whose task was lost or whose worker died mid-way.
+    """
+    from ..database import SessionLocal
+    from ..services.deletion import resume_deletion_jobs
+
+    db = SessionLocal()
+    try:
+        return resume_deletion_jobs(db)
+    finally:
+        db.close()
+
+celery_app.conf.beat_schedule = {
+    "rollup-publish-attempts": {
+        "task": "rollup_publish_attempts_task",
+        "schedule": settings.PUBLISH_ATTEMPT_ROLLUP_INTERVAL_SECONDS,
+    },
+    "refresh-expiring-tokens": {
+        "task": "refresh_expiring_tokens_task",
+        "schedule": settings.TOKEN_REFRESH_INTERVAL_SECONDS,
+    },
+    "archive-posts": {
+        "task": "archive_posts_task",
+        "schedule": settings.POST_ARCHIVE_INTERVAL_SECONDS,
+    },
+    "resume-deletion-jobs": {
+        "task": "resume_deletion_jobs_task",
+        "schedule": settings.DELETION_JOB_SWEEP_INTERVAL_SECONDS,
+    },
+    "reconcile-post-rollups": {
+        "task": "reconcile_post_rollups_task",
+        "schedule": settings.POST_ROLLUP_RECONCILE_INTERVAL_SECONDS,
+    },
+    "materialize-post-series": {
+        "task": "materialize_post_series_task",
+        "schedule": settings.POST_SERIES_MATERIALIZE_INTERVAL_SECONDS,
+    },
+    "purge-outbox": {
+        "task": "purge_outbox_task",
+        "schedule": settings.OUTBOX_PURGE_INTERVAL_SECONDS,
+    },
+}
+
 # To run Celery worker (example command, adjust as needed):
-# celery -A app.core.celery_app worker -l info -Q social_posting,default
+# celery -A app.core.celery_app worker -l info -Q default
+# CELERY_WORKER_PROFILE=social_posting celery -A app.core.celery_app worker -l info -Q social_posting.now,social_posting.bulk,social_posting
+# celery -A app.core.celery_app beat -l info  (schedules the publish attempt rollups, token refresh, post archiving, the deletion job sweeper, the post rollup reconciliation, the post series materializer and the outbox purge)
+# python -m app.cli outbox-relay  (sends tasks staged in the outbox to the broker)
 # celery -A app.main.celery_app worker -l INFO  (if celery_app is exposed via main)
\ No newline at end of file
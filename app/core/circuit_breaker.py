@@ -0,0 +1,125 @@
+"""
+Per-platform circuit breakers shared by all workers through Redis.
+
+closed    -> calls flow; transient/rate-limit failures are counted in a sliding window
+open      -> after CIRCUIT_BREAKER_FAILURE_THRESHOLD failures within the window the
+             circuit opens for CIRCUIT_BREAKER_OPEN_SECONDS; tasks are parked (re-queued
+             with a countdown) instead of calling the platform
+half-open -> when the open period ends exactly one worker wins a probe slot; its
+             success closes the circuit, its failure re-opens it
+
+Without Redis the breaker state is per process, which still protects a platform
+from each worker's own retry storm.
+"""
+import threading
+import time
+
+from .cache import get_redis
+from .config import settings
+
+class _LocalState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.failures: list[float] = []
+        self.open_until = 0.0
+        self.probe_until = 0.0
+
+_local_states: dict[str, _LocalState] = {}
+_local_states_lock = threading.Lock()
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int | None = None, window_seconds: float | None = None,
+                 open_seconds: float | None = None, redis_client=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.window_seconds = window_seconds or settings.CIRCUIT_BREAKER_WINDOW_SECONDS
+        self.open_seconds = open_seconds or settings.CIRCUIT_BREAKER_OPEN_SECONDS
+        self.redis = redis_client if redis_client is not None else get_redis()
+        prefix = f"circuit:{name}"
+        self._failures_key = f"{prefix}:failures"
+        self._open_key = f"{prefix}:open"
+        self._probe_key = f"{prefix}:probe"
+
+    def _local(self) -> _LocalState:
+        with _local_states_lock:
+            return _local_states.setdefault(self.name, _LocalState())
+
+    def allow(self) -> tuple[bool, float]:
+        """
+        Return (allowed, seconds_until_retry). When the circuit is open, callers
+        should park the work for roughly seconds_until_retry.
+        """
+        if self.redis is not None:
+            try:
+                ttl_ms = self.redis.pttl(self._open_key)
+                if ttl_ms and ttl_ms > 0:
+                    return False, ttl_ms / 1000
+                if self.redis.exists(self._failures_key) and int(self.redis.get(self._failures_key) or 0) >= self.failure_threshold:
+                    # Half-open: let one worker probe, park the rest briefly
+                    if self.redis.set(self._probe_key, "1", nx=True, px=int(self.open_seconds * 1000)):
+                        return True, 0.0
+                    return False, min(self.open_seconds, 10.0)
+                return True, 0.0
+            except Exception as e: # Redis trouble must not stop publishing
+                print(f"Circuit breaker '{self.name}': Redis unavailable ({e}); using local state")
+
+        state = self._local()
+        now = time.monotonic()
+        with state.lock:
+            if state.open_until > now:
+                return False, state.open_until - now
+            state.failures = [t for t in state.failures if now - t < self.window_seconds + self.open_seconds]
+            if len(state.failures) >= self.failure_threshold:
+                if state.probe_until <= now:
+                    state.probe_until = now + self.open_seconds
+                    return True, 0.0
+                return False, min(self.open_seconds, 10.0)
+            return True, 0.0
+
+    def record_success(self):
+        if self.redis is not None:
+            try:
+                self.redis.delete(self._failures_key, self._open_key, self._probe_key)
+                return
+            except Exception:
+                pass
+        state = self._local()
+        with state.lock:
+            state.failures.clear()
+            state.open_until = 0.0
+            state.probe_until = 0.0
+
+    def record_failure(self):
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                # Fixed window: the counter expires window_seconds after the first failure
+                pipe.set(self._failures_key, 0, nx=True, ex=int(self.window_seconds))
+                pipe.incr(self._failures_key)
+                _, failures = pipe.execute()
+                if failures >= self.failure_threshold:
+                    # Open (or re-open after a failed probe). The failure count is kept
+                    # alive past the open period so the next call is a half-open probe.
+                    pipe = self.redis.pipeline()
+                    pipe.set(self._open_key, "1", px=int(self.open_seconds * 1000))
+                    pipe.expire(self._failures_key, int(self.open_seconds + self.window_seconds))
+                    pipe.delete(self._probe_key)
+                    pipe.execute()
+                return
+            except Exception as e:
+                print(f"Circuit breaker '{self.name}': Redis unavailable ({e}); using local state")
+        state = self._local()
+        now = time.monotonic()
+        with state.lock:
+            state.failures = [t for t in state.failures if now - t < self.window_seconds + self.open_seconds]
+            state.failures.append(now)
+            if len(state.failures) >= self.failure_threshold:
+                state.open_until = now + self.open_seconds
+                state.probe_until = 0.0
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+def circuit_breaker_for(platform_name: str) -> CircuitBreaker:
+    if platform_name not in _breakers:
+        _breakers[platform_name] = CircuitBreaker(f"platform:{platform_name}")
+    return _breakers[platform_name]
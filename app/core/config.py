@@ -10,6 +10,28 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+    # Read replicas for GET routes (app.database.get_read_db), comma-separated URLs. Empty: all
+    # reads go to DATABASE_URL. A replica whose lag (measured every LAG_CHECK_INTERVAL through
+    # the replication_heartbeat row) exceeds MAX_LAG is skipped, and a user's reads stay on the
+    # primary for READ_YOUR_WRITES_SECONDS after any successful write they make.
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL_SECONDS", "1"))
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+    # Workspace sharding (app.core.sharding), optional: extra databases as comma-separated
+    # name=url pairs. Workspaces listed in workspace_shards live on that shard, all others on
+    # DATABASE_URL. The map is cached per process for CACHE_SECONDS; a move waits that long plus
+    # MOVE_DRAIN before copying, so every process has stopped writing the workspace. On Postgres
+    # each shard allocates ids from its own range of ID_STRIDE (shard index * stride).
+    DATABASE_SHARD_URLS: str = os.getenv("DATABASE_SHARD_URLS", "")
+    SHARD_MAP_CACHE_SECONDS: float = float(os.getenv("SHARD_MAP_CACHE_SECONDS", "5"))
+    SHARD_MOVE_DRAIN_SECONDS: float = float(os.getenv("SHARD_MOVE_DRAIN_SECONDS", "10"))
+    SHARD_MOVE_BATCH_SIZE: int = int(os.getenv("SHARD_MOVE_BATCH_SIZE", "1000"))
+    SHARD_ID_STRIDE: int = int(os.getenv("SHARD_ID_STRIDE", "100000000"))
+
+    # Run Base.metadata.create_all in the API lifespan (handy for local SQLite).
+    # Disable in production and run `python -m app.cli init-db` then `alembic upgrade head` instead.
+    DB_CREATE_TABLES_ON_STARTUP: bool = os.getenv("DB_CREATE_TABLES_ON_STARTUP", "true").lower() == "true"
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "a_very_secret_key_that_should_be_changed") # CHANGE THIS!
@@ -19,9 +41,126 @@ class Settings(BaseSettings):
     # Celery (if used for background tasks like posting)
     CELERY_BROKER_URL: str | None = os.getenv("CELERY_BROKER_URL")
     CELERY_RESULT_BACKEND: str | None = os.getenv("CELERY_RESULT_BACKEND")
+    # Named worker profile from app.core.celery_app.WORKER_PROFILES ("default" or "social_posting")
+    CELERY_WORKER_PROFILE: str = os.getenv("CELERY_WORKER_PROFILE", "default")
+    # Posts due within this many seconds go to the "publish now" queue instead of the bulk queue
+    PUBLISH_NOW_WINDOW_SECONDS: int = int(os.getenv("PUBLISH_NOW_WINDOW_SECONDS", "60"))
+    # Outbox relay: how far ahead of a post's scheduled time its task is handed to the broker,
+    # how many outbox rows are sent per transaction, and the idle poll interval.
+    OUTBOX_RELAY_LOOKAHEAD_SECONDS: int = int(os.getenv("OUTBOX_RELAY_LOOKAHEAD_SECONDS", "300"))
+    OUTBOX_RELAY_BATCH_SIZE: int = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "200"))
+    OUTBOX_RELAY_POLL_INTERVAL_SECONDS: float = float(os.getenv("OUTBOX_RELAY_POLL_INTERVAL_SECONDS", "1.0"))
+    # A message whose send fails is retried after RETRY_BASE seconds, doubling per attempt up to
+    # RETRY_MAX, and dead-lettered (kept with its last error, never sent) after MAX_ATTEMPTS.
+    # Dispatched messages are purged RETENTION_DAYS after dispatch, every PURGE_INTERVAL,
+    # PURGE_BATCH_SIZE rows per transaction.
+    OUTBOX_RELAY_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_RELAY_MAX_ATTEMPTS", "20"))
+    OUTBOX_RELAY_RETRY_BASE_SECONDS: float = float(os.getenv("OUTBOX_RELAY_RETRY_BASE_SECONDS", "5"))
+    OUTBOX_RELAY_RETRY_MAX_SECONDS: float = float(os.getenv("OUTBOX_RELAY_RETRY_MAX_SECONDS", "900"))
+    OUTBOX_RETENTION_DAYS: int = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+    OUTBOX_PURGE_INTERVAL_SECONDS: int = int(os.getenv("OUTBOX_PURGE_INTERVAL_SECONDS", "3600"))
+    OUTBOX_PURGE_BATCH_SIZE: int = int(os.getenv("OUTBOX_PURGE_BATCH_SIZE", "5000"))
+    # Redis for state shared across workers (circuit breakers, caches). Defaults to the broker if it is Redis.
+    REDIS_URL: str | None = os.getenv("REDIS_URL")
+    # Publish retries: attempts per post and exponential backoff (full jitter) bounds
+    PUBLISH_MAX_ATTEMPTS: int = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5"))
+    PUBLISH_RETRY_BASE_SECONDS: float = float(os.getenv("PUBLISH_RETRY_BASE_SECONDS", "30"))
+    PUBLISH_RETRY_MAX_SECONDS: float = float(os.getenv("PUBLISH_RETRY_MAX_SECONDS", "1800"))
+    # Idempotent publishing: how long a worker's claim on a publish attempt lasts (must exceed the
+    # platform call timeout) and how long successful publishes are remembered for redeliveries.
+    PUBLISH_LEASE_SECONDS: int = int(os.getenv("PUBLISH_LEASE_SECONDS", "120"))
+    PUBLISH_DEDUP_TTL_SECONDS: int = int(os.getenv("PUBLISH_DEDUP_TTL_SECONDS", "86400"))
+    # Publish attempt ledger: workers buffer attempt rows and insert them in batches of up to
+    # FLUSH_SIZE, at least every FLUSH_INTERVAL; hourly rollups are rebuilt every ROLLUP_INTERVAL.
+    PUBLISH_ATTEMPT_FLUSH_SIZE: int = int(os.getenv("PUBLISH_ATTEMPT_FLUSH_SIZE", "100"))
+    PUBLISH_ATTEMPT_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("PUBLISH_ATTEMPT_FLUSH_INTERVAL_SECONDS", "5"))
+    PUBLISH_ATTEMPT_ROLLUP_INTERVAL_SECONDS: int = int(os.getenv("PUBLISH_ATTEMPT_ROLLUP_INTERVAL_SECONDS", "300"))
+    # OAuth token refresh: every INTERVAL, refresh tokens expiring within HORIZON, CONCURRENCY
+    # calls at a time in batches of BATCH_SIZE. publish_post_task refreshes inline when the
+    # token expires within SKEW, so an expired token never costs a publish retry. Accounts on
+    # simulated platforms (no api_base_url) are skipped by the periodic job unless SIMULATED is
+    # set, so it never overwrites stored tokens with made-up ones.
+    TOKEN_REFRESH_HORIZON_SECONDS: int = int(os.getenv("TOKEN_REFRESH_HORIZON_SECONDS", "3600"))
+    TOKEN_REFRESH_INTERVAL_SECONDS: int = int(os.getenv("TOKEN_REFRESH_INTERVAL_SECONDS", "600"))
+    TOKEN_REFRESH_CONCURRENCY: int = int(os.getenv("TOKEN_REFRESH_CONCURRENCY", "8"))
+    TOKEN_REFRESH_BATCH_SIZE: int = int(os.getenv("TOKEN_REFRESH_BATCH_SIZE", "100"))
+    TOKEN_REFRESH_SKEW_SECONDS: int = int(os.getenv("TOKEN_REFRESH_SKEW_SECONDS", "120"))
+    TOKEN_REFRESH_SIMULATED: bool = os.getenv("TOKEN_REFRESH_SIMULATED", "false").lower() == "true"
+    # Post archiving: POSTED/ARCHIVED posts scheduled more than AFTER_DAYS ago move to the
+    # posts_archive table every INTERVAL, BATCH_SIZE posts per transaction with a short
+    # pause between batches so the archiver never holds locks for long.
+    POST_ARCHIVE_AFTER_DAYS: int = int(os.getenv("POST_ARCHIVE_AFTER_DAYS", "180"))
+    POST_ARCHIVE_BATCH_SIZE: int = int(os.getenv("POST_ARCHIVE_BATCH_SIZE", "500"))
+    POST_ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("POST_ARCHIVE_INTERVAL_SECONDS", "3600"))
+    POST_ARCHIVE_BATCH_PAUSE_SECONDS: float = float(os.getenv("POST_ARCHIVE_BATCH_PAUSE_SECONDS", "0.05"))
+    # Daily post counts (app.crud.crud_post_rollup) are updated with every post change; the
+    # reconciliation job recounts each workspace every RECONCILE_INTERVAL and repairs drift.
+    POST_ROLLUP_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("POST_ROLLUP_RECONCILE_INTERVAL_SECONDS", "86400"))
+    # Best-time recommendations (app.services.best_time): platform hour-of-week histograms are
+    # cached per platform for CACHE_SECONDS. An account's history counts as PRIOR_WEIGHT posts
+    # of its platform's histogram; suggested slots are at least MIN_GAP_HOURS apart (and from
+    # the account's scheduled posts), within the next HORIZON_HOURS.
+    BEST_TIME_CACHE_SECONDS: int = int(os.getenv("BEST_TIME_CACHE_SECONDS", "300"))
+    BEST_TIME_PRIOR_WEIGHT: float = float(os.getenv("BEST_TIME_PRIOR_WEIGHT", "20"))
+    BEST_TIME_MIN_GAP_HOURS: int = int(os.getenv("BEST_TIME_MIN_GAP_HOURS", "3"))
+    BEST_TIME_HORIZON_HOURS: int = int(os.getenv("BEST_TIME_HORIZON_HOURS", "168"))
+    # Scheduling spacing (app.crud.crud_schedule): an account's scheduled posts must be at least
+    # MIN_SPACING apart. PLATFORM_MIN_SPACING overrides it per platform as comma-separated
+    # name=seconds pairs (e.g. "instagram=900,twitter=60"); an account's own
+    # min_post_spacing_seconds overrides both. 0 turns the check off.
+    SCHEDULE_MIN_SPACING_SECONDS: int = int(os.getenv("SCHEDULE_MIN_SPACING_SECONDS", "300"))
+    SCHEDULE_PLATFORM_MIN_SPACING: str = os.getenv("SCHEDULE_PLATFORM_MIN_SPACING", "")
+    # Recurring post series (app.crud.crud_post_series): occurrences become posts HORIZON_HOURS
+    # ahead, materialized every MATERIALIZE_INTERVAL, BATCH_SIZE series per transaction;
+    # calendar reads expand later ones on the fly, at most MAX_OCCURRENCES per request. New and
+    # edited series are checked against the account's spacing over their next CHECK_DAYS; later
+    # occurrences are checked again as they are materialized.
+    POST_SERIES_HORIZON_HOURS: int = int(os.getenv("POST_SERIES_HORIZON_HOURS", "48"))
+    POST_SERIES_MATERIALIZE_INTERVAL_SECONDS: int = int(os.getenv("POST_SERIES_MATERIALIZE_INTERVAL_SECONDS", "900"))
+    POST_SERIES_BATCH_SIZE: int = int(os.getenv("POST_SERIES_BATCH_SIZE", "100"))
+    POST_SERIES_MAX_OCCURRENCES: int = int(os.getenv("POST_SERIES_MAX_OCCURRENCES", "2000"))
+    POST_SERIES_CHECK_DAYS: int = int(os.getenv("POST_SERIES_CHECK_DAYS", "364"))
+    # Background deletion of workspaces, users and connected accounts: children are removed
+    # BATCH_SIZE rows per transaction with a short pause between batches. Jobs whose runner
+    # stopped reporting for STALL_SECONDS are resumed by the sweeper every SWEEP_INTERVAL.
+    DELETION_BATCH_SIZE: int = int(os.getenv("DELETION_BATCH_SIZE", "1000"))
+    DELETION_BATCH_PAUSE_SECONDS: float = float(os.getenv("DELETION_BATCH_PAUSE_SECONDS", "0.05"))
+    DELETION_JOB_STALL_SECONDS: int = int(os.getenv("DELETION_JOB_STALL_SECONDS", "300"))
+    DELETION_JOB_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("DELETION_JOB_SWEEP_INTERVAL_SECONDS", "60"))
+    # Platform catalog (app.core.platform_catalog): processes compare their cached snapshot
+    # with the version in Redis every CHECK seconds; without Redis they reload every TTL.
+    PLATFORM_CATALOG_CHECK_SECONDS: float = float(os.getenv("PLATFORM_CATALOG_CHECK_SECONDS", "5"))
+    PLATFORM_CATALOG_TTL_SECONDS: float = float(os.getenv("PLATFORM_CATALOG_TTL_SECONDS", "300"))
+    # Per-platform circuit breaker: open after N transient failures within the window
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "20"))
+    CIRCUIT_BREAKER_WINDOW_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_WINDOW_SECONDS", "60"))
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "120"))
+    # Tracing (off by default): fraction of new traces sampled, and where finished spans go
+    # ("memory", "file" -> TRACING_FILE_PATH as JSON lines, or "package.module:factory").
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "0.01"))
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "memory")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    # Port on which each Celery worker serves its own /metrics endpoint (0 disables it)
+    CELERY_METRICS_PORT: int = int(os.getenv("CELERY_METRICS_PORT", "9540"))
+
+    # Request profiling (off by default). When enabled, PROFILING_SAMPLE_RATE of requests
+    # are profiled, plus any request sending PROFILING_HEADER with PROFILING_HEADER_TOKEN.
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.0"))
+    PROFILING_HEADER: str = os.getenv("PROFILING_HEADER", "X-Profile-Request")
+    PROFILING_HEADER_TOKEN: str | None = os.getenv("PROFILING_HEADER_TOKEN")
+    PROFILING_SLOW_THRESHOLD_MS: float = float(os.getenv("PROFILING_SLOW_THRESHOLD_MS", "500"))
+    PROFILING_BUFFER_SIZE: int = int(os.getenv("PROFILING_BUFFER_SIZE", "50"))
 
     # Gemini API Key
     GEMINI_API_KEY: str | None = os.getenv("GEMINI_API_KEY")
+    # AI text generation backend: "gemini" (needs GEMINI_API_KEY) or "ollama", a local
+    # Ollama-compatible server at OLLAMA_BASE_URL (development, load tests, self-hosting)
+    AI_PROVIDER: str = os.getenv("AI_PROVIDER", "gemini")
+    OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+    OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3.2")
+    AI_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "60"))
 
     class Config:
         case_sensitive = True
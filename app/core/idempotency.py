@@ -0,0 +1,76 @@
+"""
+Idempotency for publish_post_task.
+
+Every publish attempt (a post at a given scheduled time) has a stable idempotency
+key. It is sent to the platform, names the attempt's lease row (see
+app.crud.crud_publish_lease) and keys the recently-published cache below, which
+maps the key to the platform's post id. The cache is written as soon as the platform
+accepts the post, before the database commit, so a task redelivered after a
+worker crash finds it and completes without calling the platform again.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from .cache import get_redis
+from .config import settings
+
+# Namespace for idempotency keys; keys are stable across retries and redeliveries
+PUBLISH_IDEMPOTENCY_NAMESPACE = uuid.UUID("0b6f9a52-6d0e-4c1e-8f87-2f4f3c1d7e25")
+
+def publish_idempotency_key(post_id: int, scheduled_at: datetime | str | None) -> str:
+    if isinstance(scheduled_at, datetime):
+        scheduled_at = scheduled_at.isoformat()
+    return str(uuid.uuid5(PUBLISH_IDEMPOTENCY_NAMESPACE, f"post:{post_id}:{scheduled_at or 'unscheduled'}"))
+
+class RecentlyPublishedCache:
+    """
+    idempotency key -> platform post id, in Redis when configured (shared by all
+    workers), otherwise in a bounded per-process LRU.
+    """
+
+    def __init__(self, ttl_seconds: int, max_local_entries: int = 10000, redis_client=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self.redis = redis_client if redis_client is not None else get_redis()
+        self._local: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"published:{key}"
+
+    def get(self, key: str) -> str | None:
+        if self.redis is not None:
+            try:
+                value = self.redis.get(self._redis_key(key))
+                if value is not None:
+                    return value.decode() if isinstance(value, bytes) else value
+            except Exception as e:
+                print(f"Recently-published cache: Redis unavailable ({e}); using local cache")
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            platform_post_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            return platform_post_id
+
+    def remember(self, key: str, platform_post_id: str):
+        if self.redis is not None:
+            try:
+                self.redis.set(self._redis_key(key), platform_post_id, ex=self.ttl_seconds)
+            except Exception as e:
+                print(f"Recently-published cache: Redis unavailable ({e}); using local cache")
+        # Always kept locally too: a redelivery often lands on the same worker
+        with self._lock:
+            self._local[key] = (platform_post_id, time.monotonic() + self.ttl_seconds)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+recently_published = RecentlyPublishedCache(ttl_seconds=settings.PUBLISH_DEDUP_TTL_SECONDS)
@@ -0,0 +1,228 @@
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+# All metrics live on the default registry so the API and the Celery workers
+# expose exactly the same names. When PROMETHEUS_MULTIPROC_DIR is set (prefork
+# Celery pool, gunicorn with several workers) scrapes aggregate across processes.
+
+# --- API ---
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Number of HTTP requests currently being served.",
+    multiprocess_mode="livesum",
+)
+
+# --- Database ---
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements issued while serving one HTTP request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float("inf")),
+)
+DB_QUERY_TIME_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request",
+    "Total time spent in SQL statements while serving one HTTP request.",
+    ["route"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Latency of individual SQL statements.",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the SQLAlchemy pool.",
+    multiprocess_mode="livesum",
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of each read replica as last measured (-1 when unreachable).",
+    ["replica"],
+    multiprocess_mode="max",
+)
+DB_READ_ROUTING = Counter(
+    "db_read_sessions_total",
+    "Read sessions handed to GET routes, by target (replica/primary) and reason.",
+    ["target", "reason"],
+)
+
+# --- Celery worker ---
+PUBLISH_LATENCY = Histogram(
+    "publish_post_duration_seconds",
+    "Latency of the platform publish call by platform.",
+    ["platform"],
+)
+PUBLISH_OUTCOMES = Counter(
+    "publish_post_outcomes_total",
+    "Outcomes of publish_post_task by platform.",
+    ["platform", "outcome"],
+)
+PUBLISH_QUEUE_LAG = Histogram(
+    "publish_post_queue_lag_seconds",
+    "Delay between a post's scheduled_at and the moment it was actually published.",
+    ["platform"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, float("inf")),
+)
+
+
+class _QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Per-request accumulator for SQL statements; None outside an HTTP request.
+_request_query_stats: ContextVar[_QueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = _request_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def instrument_engine(engine):
+    """
+    Attach query and pool instrumentation to a SQLAlchemy engine.
+    """
+    from sqlalchemy import event # Not at module level: workers import this module at boot
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    pool = engine.pool
+    pool_connect = pool.connect
+
+    # The pool has no "checkout requested" event, so time the call the engine
+    # makes to obtain a connection; this includes any wait on an exhausted pool.
+    @wraps(pool_connect)
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+    return engine
+
+
+def route_template(scope) -> str:
+    """
+    Route template for the matched endpoint (e.g. /api/v1/posts/{post_id}), or
+    "unmatched". Templates keep label cardinality bounded.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not path_format:
+        return "unmatched"
+    # Routes from included routers may carry only their own path; recover the
+    # mount prefix from the concrete request path.
+    path = scope.get("path", "")
+    rendered = path_format
+    for name, value in (scope.get("path_params") or {}).items():
+        rendered = rendered.replace("{" + name + "}", str(value))
+    if path != rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + path_format
+    return path_format
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording per-route latency, in-flight requests and the
+    number/time of SQL statements issued while serving each request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = _QueryStats()
+        token = _request_query_stats.set(stats)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _request_query_stats.reset(token)
+            route_label = route_template(scope)
+            HTTP_REQUEST_LATENCY.labels(scope["method"], route_label, str(status_code)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route_label).observe(stats.count)
+            DB_QUERY_TIME_PER_REQUEST.labels(route_label).observe(stats.seconds)
+
+
+def _registry():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    from prometheus_client import REGISTRY
+    return REGISTRY
+
+
+def render_latest() -> tuple[bytes, str]:
+    """
+    Return the current metrics in the Prometheus text exposition format.
+    """
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0"):
+    """
+    Serve /metrics on a dedicated port (used by Celery workers).
+    """
+    start_http_server(port, addr=addr, registry=_registry())
@@ -0,0 +1,118 @@
+"""
+Outbox relay: drains `outbox_messages` to the Celery broker in batches.
+
+Rows are written by the CRUD layer in the same transaction as the post change,
+so nothing is enqueued for a change that never committed and no committed change
+is lost if the broker is down. Each message is sent with a Celery task id derived
+from its dedup key and id; if the relay dies after sending but before committing,
+the resend carries the same task id and publish_post_task skips stale or finished
+work. A task staged again once dispatched (same key, new row) gets a new task id.
+
+A message that fails to send is pushed back with exponential backoff and the relay
+moves on to the next one, so it never holds up the rest of the outbox; after
+OUTBOX_RELAY_MAX_ATTEMPTS failures it is dead-lettered (dead_lettered_at, last_error).
+purge_outbox() deletes messages dispatched more than OUTBOX_RETENTION_DAYS ago
+(Celery beat task purge_outbox_task, or `python -m app.cli purge-outbox`).
+
+With workspace sharding every shard has its own outbox; the relay drains them in turn.
+
+Run with:
+    python -m app.cli outbox-relay
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from .config import settings
+from . import tracing
+
+# Namespace for deriving stable Celery task ids from outbox dedup keys
+OUTBOX_TASK_ID_NAMESPACE = uuid.UUID("5d1c6f0e-3a8e-4f43-9d6c-7f2b1f0c9a11")
+
+def task_id_for(dedup_key: str, message_id: int) -> str:
+    return str(uuid.uuid5(OUTBOX_TASK_ID_NAMESPACE, f"{dedup_key}:{message_id}"))
+
+def relay_batch(db, batch_size: int | None = None) -> int:
+    """
+    Send one batch of due outbox messages over a single broker connection and
+    mark them dispatched in one commit. Returns the number of messages sent.
+    """
+    from .celery_app import celery_app, publish_queue_for
+    from ..crud import crud_outbox
+
+    now = datetime.now(timezone.utc)
+    messages = crud_outbox.get_pending_messages(db, now=now, limit=batch_size or settings.OUTBOX_RELAY_BATCH_SIZE)
+    if not messages:
+        db.rollback() # Release the row locks
+        return 0
+
+    sent = 0
+    with celery_app.producer_or_acquire() as producer:
+        for message in messages:
+            eta = crud_outbox.as_utc(message.eta) if message.eta else None
+            try:
+                task = celery_app.tasks[message.task_name]
+                # Continue the trace of the request that staged the message; the span is
+                # injected into the task headers by tracing.inject_task_headers
+                with tracing.start_span("outbox.dispatch", parent=tracing.parse_traceparent(message.traceparent), dedup_key=message.dedup_key):
+                    task.apply_async(
+                        args=message.args,
+                        kwargs=message.kwargs,
+                        eta=eta,
+                        # Publish tasks go to the now/bulk queues; anything else to its default queue
+                        queue=publish_queue_for(eta) if message.task_name == crud_outbox.PUBLISH_POST_TASK else None,
+                        task_id=task_id_for(message.dedup_key, message.id),
+                        producer=producer,
+                    )
+            except Exception as e:
+                # Back off this message only; the rest of the batch is still sent
+                crud_outbox.mark_failed(db, message, repr(e), now)
+                if message.dead_lettered_at is not None:
+                    print(f"Outbox relay: dead-lettered message {message.id} ({message.dedup_key}) after {message.attempts} attempts: {e!r}")
+                else:
+                    print(f"Outbox relay: failed to send message {message.id} ({message.dedup_key}), retrying at {message.available_at}: {e!r}")
+                continue
+            crud_outbox.mark_dispatched(db, message, dispatched_at=now)
+            sent += 1
+    db.commit()
+    return sent
+
+def purge_outbox(db, older_than_days: int | None = None, batch_size: int | None = None) -> int:
+    """
+    Delete messages dispatched more than older_than_days ago on the shard `db` is bound to,
+    in batches. Returns the number deleted.
+    """
+    from ..crud import crud_outbox
+
+    older_than_days = settings.OUTBOX_RETENTION_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.OUTBOX_PURGE_BATCH_SIZE
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        deleted = crud_outbox.purge_dispatched(db, before, batch_size)
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+def run_relay(once: bool = False, batch_size: int | None = None, poll_interval: float | None = None):
+    """
+    Relay loop: drain full batches back to back, sleep when idle.
+    """
+    from ..database import each_shard_session
+
+    poll_interval = settings.OUTBOX_RELAY_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    while True:
+        busy = False # Some shard had a full batch, so there is probably more to send
+        for shard, db in each_shard_session(): # Each shard has its own outbox
+            try:
+                sent = relay_batch(db, batch_size=batch_size)
+            except Exception as e:
+                db.rollback()
+                print(f"Outbox relay error on shard {shard}: {e}")
+                sent = 0
+            busy = busy or sent >= batch_size
+        if once and not busy:
+            return
+        if not busy:
+            time.sleep(poll_interval)
@@ -0,0 +1,126 @@
+"""
+In-process catalog of social platforms.
+
+The social_platforms table is reference data that changes perhaps once a year,
+yet it is read on every platform listing and every publish. The catalog keeps
+an immutable snapshot of it per process:
+
+- Loaded at startup (API lifespan, Celery worker_process_init) and lazily on
+  first use otherwise.
+- crud_social_platform calls invalidate() after every create, update or delete.
+  That bumps a version counter in Redis; every process compares its snapshot's
+  version with it at most every PLATFORM_CATALOG_CHECK_SECONDS and reloads when
+  it moved. Without Redis only the writing process reloads at once; the others
+  reload every PLATFORM_CATALOG_TTL_SECONDS.
+- A lookup for an unknown id or name reloads once (rate limited to the check
+  interval), so a platform created elsewhere is found without waiting.
+
+Lookups never touch the database otherwise. The snapshot is read from the
+default shard, which holds the authoritative copy (see app.core.sharding).
+"""
+import threading
+import time
+from typing import NamedTuple
+
+from .cache import get_redis
+from .config import settings
+
+VERSION_KEY = "platform-catalog:version"
+
+class CachedPlatform(NamedTuple):
+    id: int
+    name: str
+    api_base_url: str | None
+    created_at: object
+
+class PlatformCatalog:
+    def __init__(self, check_seconds: float | None = None, ttl_seconds: float | None = None):
+        self.check_seconds = settings.PLATFORM_CATALOG_CHECK_SECONDS if check_seconds is None else check_seconds
+        self.ttl_seconds = settings.PLATFORM_CATALOG_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._by_id: dict[int, CachedPlatform] = {}
+        self._by_name: dict[str, CachedPlatform] = {}
+        self._ordered: list[CachedPlatform] = []
+        self._version = None # Redis version the snapshot was loaded at
+        self._loaded_at = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _remote_version(self):
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            return redis.get(VERSION_KEY)
+        except Exception:
+            return None # Unknown: keep the snapshot until the TTL runs out
+
+    def load(self) -> None:
+        """
+        (Re)load the snapshot from the database.
+        """
+        from .. import models
+        from ..database import SessionLocal
+
+        version = self._remote_version() # Read first: a change racing the load triggers another load
+        db = SessionLocal()
+        try:
+            rows = db.query(models.SocialPlatform).order_by(models.SocialPlatform.id).all()
+            platforms = [CachedPlatform(p.id, p.name, p.api_base_url, p.created_at) for p in rows]
+        finally:
+            db.close()
+        # Swap whole dicts so readers never see a half-built snapshot
+        self._by_id = {p.id: p for p in platforms}
+        self._by_name = {p.name.lower(): p for p in platforms}
+        self._ordered = platforms
+        self._version = version
+        self._loaded_at = self._checked_at = time.monotonic()
+
+    def _refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if self._loaded_at is not None and not force:
+            if now - self._loaded_at >= self.ttl_seconds:
+                force = True
+            elif now - self._checked_at < self.check_seconds:
+                return
+        with self._lock:
+            if self._loaded_at is None or force or self._remote_version() != self._version:
+                self.load()
+            self._checked_at = time.monotonic()
+
+    def _refresh_on_miss(self) -> bool:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.check_seconds:
+            return False
+        self._refresh(force=True)
+        return True
+
+    def all(self) -> list[CachedPlatform]:
+        self._refresh()
+        return self._ordered
+
+    def get(self, platform_id: int) -> CachedPlatform | None:
+        self._refresh()
+        platform = self._by_id.get(platform_id)
+        if platform is None and self._refresh_on_miss():
+            platform = self._by_id.get(platform_id)
+        return platform
+
+    def get_by_name(self, name: str) -> CachedPlatform | None:
+        self._refresh()
+        platform = self._by_name.get(name.lower())
+        if platform is None and self._refresh_on_miss():
+            platform = self._by_name.get(name.lower())
+        return platform
+
+    def invalidate(self) -> None:
+        """
+        Drop this process's snapshot and tell the other processes to drop theirs.
+        """
+        redis = get_redis()
+        if redis is not None:
+            try:
+                redis.incr(VERSION_KEY)
+            except Exception as e:
+                print(f"Platform catalog: Redis unavailable ({e}); other processes reload within the TTL")
+        self._loaded_at = None
+
+platform_catalog = PlatformCatalog()
@@ -0,0 +1,246 @@
+import asyncio
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+
+from sqlalchemy import event
+
+from .config import settings
+from .metrics import route_template
+
+# Cap what a single report can hold so a pathological request (N+1 over a
+# month of posts) cannot blow up memory.
+MAX_STATEMENTS_PER_REPORT = 500
+MAX_STATEMENT_CHARS = 2000
+PROFILE_TOP_FUNCTIONS = 40
+
+
+class _RequestProfile:
+    __slots__ = ("statements", "profilers", "lock")
+
+    def __init__(self):
+        self.statements = []
+        self.profilers = []
+        self.lock = threading.Lock()
+
+    def add_statement(self, statement: str, seconds: float):
+        with self.lock:
+            if len(self.statements) < MAX_STATEMENTS_PER_REPORT:
+                self.statements.append((statement[:MAX_STATEMENT_CHARS], seconds))
+
+    def add_profiler(self, profiler: cProfile.Profile):
+        with self.lock:
+            self.profilers.append(profiler)
+
+
+# Set only for requests selected for profiling; everything else pays one ContextVar lookup.
+_active_profile: ContextVar[_RequestProfile | None] = ContextVar("active_profile", default=None)
+
+
+class SlowRequestBuffer:
+    """
+    Bounded, thread-safe ring buffer of slow-request reports (oldest dropped first).
+    """
+
+    def __init__(self, maxlen: int):
+        self._reports = deque(maxlen=maxlen)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, report: dict) -> dict:
+        with self._lock:
+            report["id"] = next(self._ids)
+            self._reports.append(report)
+        return report
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._reports)) # Newest first
+
+    def get(self, report_id: int) -> dict | None:
+        with self._lock:
+            for report in self._reports:
+                if report["id"] == report_id:
+                    return report
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._reports.clear()
+
+
+slow_requests = SlowRequestBuffer(maxlen=settings.PROFILING_BUFFER_SIZE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is None:
+        return
+    conn.info.setdefault("profile_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    if profile is None:
+        return
+    starts = conn.info.get("profile_query_start_time")
+    if not starts:
+        return
+    profile.add_statement(statement, time.perf_counter() - starts.pop())
+
+
+def instrument_engine(engine):
+    """
+    Record SQL statements (text and timing, never parameters) for profiled requests.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+def _start_profiler(profile: _RequestProfile) -> cProfile.Profile | None:
+    # Only one profiler can be active per thread; if another profiled request
+    # already owns this thread, report SQL timings without a CPU profile.
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    profile.add_profiler(profiler)
+    return profiler
+
+
+def _profiled_sync_call(call):
+    # Sync endpoints run in the threadpool, outside the profiler enabled by the
+    # middleware; the request's ContextVar is copied there, so profile this thread too.
+    @wraps(call)
+    def wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        profiler = _start_profiler(profile)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+    return wrapper
+
+
+def _iter_api_routes(routes):
+    from fastapi.routing import APIRoute # Imported here: workers load this module via app.database
+
+    for route in routes:
+        if isinstance(route, APIRoute):
+            yield route
+        else:
+            # Mounts and (on newer FastAPI) included routers keep their own route lists
+            nested = getattr(route, "routes", None) or getattr(getattr(route, "original_router", None), "routes", None)
+            if nested:
+                yield from _iter_api_routes(nested)
+
+
+def instrument_routes(app):
+    """
+    Make sync endpoints profileable. Call once after all routers are included.
+    """
+    for route in _iter_api_routes(app.routes):
+        call = route.dependant.call
+        if call is None or asyncio.iscoroutinefunction(route.endpoint) or getattr(call, "_profiled", False):
+            continue
+        wrapped = _profiled_sync_call(call)
+        wrapped._profiled = True
+        # Older FastAPI calls dependant.call; newer versions rebuild the
+        # dependant from route.endpoint when the route is first matched.
+        route.dependant.call = wrapped
+        route.endpoint = wrapped
+
+
+def _format_profile(profilers: list[cProfile.Profile]) -> str | None:
+    if not profilers:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(profilers[0], stream=out)
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a sampled fraction of requests (PROFILING_SAMPLE_RATE) or requests
+    carrying PROFILING_HEADER with the configured token. Profiled requests slower
+    than PROFILING_SLOW_THRESHOLD_MS are stored in `slow_requests`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = settings.PROFILING_HEADER.lower().encode("latin-1")
+
+    def _should_profile(self, scope) -> bool:
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return True
+        token = settings.PROFILING_HEADER_TOKEN
+        if token:
+            for name, value in scope.get("headers", ()):
+                if name == self.header:
+                    return value.decode("latin-1") == token
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = _RequestProfile()
+        token = _active_profile.set(profile)
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        # Profiles the event-loop thread (async handlers, middleware, serialization).
+        # Other requests interleaving on the loop may show up in this profile.
+        profiler = _start_profiler(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _active_profile.reset(token)
+            if elapsed_ms >= settings.PROFILING_SLOW_THRESHOLD_MS:
+                slow_requests.add(_build_report(scope, status_code, started_at, elapsed_ms, profile))
+
+
+def _build_report(scope, status_code: int, started_at: datetime, elapsed_ms: float, profile: _RequestProfile) -> dict:
+    statements = [
+        {"statement": statement, "duration_ms": round(seconds * 1000, 3)}
+        for statement, seconds in profile.statements
+    ]
+    return {
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": route_template(scope),
+        "status_code": status_code,
+        "started_at": started_at.isoformat(),
+        "duration_ms": round(elapsed_ms, 3),
+        "sql_count": len(statements),
+        "sql_total_ms": round(sum(s["duration_ms"] for s in statements), 3),
+        "sql_statements": statements,
+        "profile": _format_profile(profile.profilers),
+    }
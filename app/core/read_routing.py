@@ -0,0 +1,192 @@
+"""
+Read/write routing for the API.
+
+GET routes take their session from app.database.get_read_db, which binds it to
+one of the DATABASE_REPLICA_URLS engines when that is safe, and to the primary
+otherwise:
+
+- Lag: ReplicaLagMonitor bumps the replication_heartbeat row on the primary every
+  REPLICA_LAG_CHECK_INTERVAL_SECONDS and reads it back from each replica; the
+  row's age there is the replica's lag. Replicas lagging more than
+  REPLICA_MAX_LAG_SECONDS, unreachable, or not measured recently are skipped.
+  This works with any replication that copies rows (streaming, logical, or
+  copying a SQLite file for local testing).
+- Read-your-writes: ReadYourWritesMiddleware pins the token subject of every
+  successful non-GET request to the primary for READ_YOUR_WRITES_SECONDS, before
+  the response goes out, so the writer's next reads see the write. Pins live in
+  Redis when configured (shared by all API processes), in process memory otherwise.
+
+Everything else (writes, Celery tasks, the outbox relay) keeps using the primary.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from .cache import get_redis
+from .config import settings
+from .metrics import DB_READ_ROUTING, DB_REPLICA_LAG
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def _as_utc(value) -> datetime | None:
+    if value is None:
+        return None
+    if isinstance(value, str): # SQLite hands back text through raw SQL
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class ReplicaLagMonitor:
+    def __init__(self, primary, replicas: list, max_lag_seconds: float | None = None,
+                 interval_seconds: float | None = None):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = settings.REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+        self.interval_seconds = interval_seconds or settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+        self.lags: list[float | None] = [None] * len(replicas) # None: unknown or unreachable
+        self.checked_at = 0.0 # time.monotonic() of the last completed check
+        self._thread = None
+        self._stop = threading.Event()
+
+    def beat(self, now: datetime) -> None:
+        from sqlalchemy import text
+        with self.primary.begin() as conn:
+            if not conn.execute(text("UPDATE replication_heartbeat SET beat_at = :now WHERE id = 1"), {"now": now}).rowcount:
+                conn.execute(text("INSERT INTO replication_heartbeat (id, beat_at) VALUES (1, :now)"), {"now": now})
+
+    def check(self) -> list[float | None]:
+        """
+        Bump the heartbeat on the primary and measure every replica against it.
+        """
+        from sqlalchemy import text
+        now = datetime.now(timezone.utc)
+        try:
+            self.beat(now)
+        except Exception as e: # No heartbeat: lags would only grow, so stop trusting replicas
+            print(f"Replica lag check: heartbeat write failed ({e}); reads go to the primary")
+            self.lags = [None] * len(self.replicas)
+            return self.lags
+        lags = []
+        for index, replica in enumerate(self.replicas):
+            try:
+                with replica.connect() as conn:
+                    beat_at = _as_utc(conn.execute(text("SELECT beat_at FROM replication_heartbeat WHERE id = 1")).scalar())
+                lag = max(0.0, (now - beat_at).total_seconds()) if beat_at else None
+            except Exception as e:
+                if self.lags[index] is not None or not self.checked_at: # Report once, not every interval
+                    print(f"Replica lag check: replica {index} unreachable ({e})")
+                lag = None
+            DB_REPLICA_LAG.labels(str(index)).set(-1 if lag is None else lag)
+            lags.append(lag)
+        self.lags = lags
+        self.checked_at = time.monotonic()
+        return lags
+
+    def pick(self):
+        """
+        A replica engine within the lag budget, or None to read from the primary.
+        """
+        if time.monotonic() - self.checked_at > 3 * self.interval_seconds:
+            return None # Measurements are stale (monitor not running or stuck)
+        fresh = [replica for replica, lag in zip(self.replicas, self.lags) if lag is not None and lag <= self.max_lag_seconds]
+        return random.choice(fresh) if fresh else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> None:
+        if self.replicas and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-lag-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 5)
+            self._thread = None
+
+# --- Read-your-writes pins ---
+
+_local_pins: dict[str, float] = {}
+_local_pins_lock = threading.Lock()
+
+def pin_to_primary(subject: str, seconds: float | None = None) -> None:
+    seconds = settings.READ_YOUR_WRITES_SECONDS if seconds is None else seconds
+    redis = get_redis()
+    if redis is not None:
+        try:
+            redis.set(f"rw-pin:{subject}", "1", px=int(seconds * 1000))
+            return
+        except Exception as e: # Redis trouble must not fail the write that was just made
+            print(f"Read-your-writes: Redis unavailable ({e}); pinning in process memory")
+    with _local_pins_lock:
+        _local_pins[subject] = time.monotonic() + seconds
+
+def is_pinned(subject: str | None) -> bool:
+    if subject is None:
+        return False
+    redis = get_redis()
+    if redis is not None:
+        try:
+            return bool(redis.exists(f"rw-pin:{subject}"))
+        except Exception:
+            pass # Fall back to the local pins (and the primary for this read if unsure)
+    with _local_pins_lock:
+        until = _local_pins.get(subject)
+        if until is not None and until <= time.monotonic():
+            del _local_pins[subject]
+            until = None
+    return until is not None
+
+def token_subject(authorization: str | None) -> str | None:
+    """
+    The "sub" of a valid bearer token in an Authorization header value, if any.
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    from jose import JWTError, jwt
+    try:
+        return jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+def route_read(monitor: ReplicaLagMonitor, authorization: str | None):
+    """
+    The engine a read session should use for this request, or None for the primary.
+    """
+    if not monitor.replicas:
+        return None
+    if is_pinned(token_subject(authorization)):
+        DB_READ_ROUTING.labels("primary", "pinned").inc()
+        return None
+    replica = monitor.pick()
+    DB_READ_ROUTING.labels("replica" if replica is not None else "primary", "replica" if replica is not None else "lagging").inc()
+    return replica
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware pinning the caller to the primary after a successful write.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            # Pin before the response leaves, so an immediate follow-up read is already pinned
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = dict(scope["headers"])
+                authorization = headers.get(b"authorization")
+                subject = token_subject(authorization.decode("latin-1") if authorization else None)
+                if subject is not None:
+                    pin_to_primary(subject)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,6 +1,7 @@
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
 from .config import settings
+from .tracing import traced
 
 # Password Hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -23,9 +24,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+@traced("security.encrypt")
 def encrypt_data(data: str) -> bytes:
     return fernet.encrypt(data.encode())
 
+@traced("security.decrypt")
 def decrypt_data(encrypted_data: bytes) -> str:
     return fernet.decrypt(encrypted_data).decode()
 
@@ -0,0 +1,143 @@
+"""
+Workspace-based sharding.
+
+Optional: with DATABASE_SHARD_URLS empty there is a single "default" shard
+(DATABASE_URL) and none of this changes behaviour.
+
+- Users, workspaces, memberships and job bookkeeping are global and stay on the
+  default shard. The tables in SHARDED_TABLES hold per-workspace data and live
+  on the shard of their workspace. REFERENCE_TABLES (the platform catalog) are
+  copied to every shard so foreign keys and relationships to them resolve
+  locally.
+- The workspace_shards table (on the default shard) maps a workspace to its
+  shard. Workspaces without a row live on the default shard. ShardMap caches the
+  table per process for SHARD_MAP_CACHE_SECONDS.
+- A session is only ever bound to one shard. app.database.get_workspace_db and
+  friends pick it from the workspace in the path, so a CRUD call never spans
+  two databases in one transaction.
+- Moves (app.services.shard_mover) set moving_to first. Writes to a moving
+  workspace are refused with 503 and its publish tasks are parked until the
+  map flips to the new shard.
+"""
+import threading
+import time
+
+from .config import settings
+
+DEFAULT_SHARD = "default"
+# Per-workspace data, in copy order (parents first)
+SHARDED_TABLES = (
+    "connected_accounts", "post_groups", "post_series", "posts", "posts_archive", "post_daily_counts", "post_status_counts",
+    "posting_hour_counts", "outbox_messages", "publish_leases",
+)
+# Small catalogs mirrored to every shard
+REFERENCE_TABLES = ("social_platforms",)
+
+def shard_urls() -> dict[str, str]:
+    """
+    Extra shards from DATABASE_SHARD_URLS ("name=url,name=url"), in configuration order.
+    """
+    shards = {}
+    for entry in settings.DATABASE_SHARD_URLS.split(","):
+        if entry.strip():
+            name, _, url = entry.partition("=")
+            if not url or name.strip() == DEFAULT_SHARD:
+                raise ValueError(f"Invalid DATABASE_SHARD_URLS entry {entry!r} (expected name=url, name not '{DEFAULT_SHARD}')")
+            shards[name.strip()] = url.strip()
+    return shards
+
+class WorkspaceMovingError(Exception):
+    """
+    The workspace is being moved between shards; writes must wait for the move to finish.
+    """
+
+class ShardMap:
+    def __init__(self, engine, shard_names: list[str], cache_seconds: float | None = None):
+        self.engine = engine # The default shard, which holds workspace_shards
+        self.shard_names = shard_names
+        self.cache_seconds = settings.SHARD_MAP_CACHE_SECONDS if cache_seconds is None else cache_seconds
+        self._entries: dict[int, tuple[str, str | None]] = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.shard_names) > 1
+
+    def _load(self) -> None:
+        from sqlalchemy import text
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(text("SELECT workspace_id, shard, moving_to FROM workspace_shards")).all()
+        except Exception as e: # Table not created yet: everything is on the default shard
+            if self._loaded_at is None:
+                print(f"Shard map unavailable ({e}); using the default shard")
+            rows = []
+        self._entries = {row[0]: (row[1], row[2]) for row in rows}
+        self._loaded_at = time.monotonic()
+
+    def entry(self, workspace_id: int | None) -> tuple[str, str | None]:
+        """
+        (shard, moving_to) for the workspace; moving_to is None unless a move is in progress.
+        """
+        if not self.sharded or workspace_id is None:
+            return DEFAULT_SHARD, None
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.cache_seconds:
+                self._load()
+            return self._entries.get(workspace_id, (DEFAULT_SHARD, None))
+
+    def shard_for(self, workspace_id: int | None) -> str:
+        return self.entry(workspace_id)[0]
+
+    def is_moving(self, workspace_id: int | None) -> bool:
+        return self.entry(workspace_id)[1] is not None
+
+    def moving_workspaces(self) -> list[int]:
+        if not self.sharded:
+            return []
+        self.entry(-1) # Refresh if stale
+        with self._lock:
+            return [workspace_id for workspace_id, (_, moving_to) in self._entries.items() if moving_to is not None]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+def prepare_shard(engine, index: int) -> None:
+    """
+    One-time setup of a non-default shard after create_all: drop foreign keys to global
+    tables (they are empty there) and, on Postgres, start id sequences at index *
+    SHARD_ID_STRIDE so ids stay unique across shards and rows can move without renumbering.
+    """
+    from sqlalchemy import inspect, text
+    if engine.dialect.name != "postgresql":
+        return # SQLite does not enforce foreign keys here; moves fail on id conflicts instead
+    inspector = inspect(engine)
+    local = set(SHARDED_TABLES) | set(REFERENCE_TABLES)
+    with engine.begin() as conn:
+        for table in SHARDED_TABLES:
+            for fk in inspector.get_foreign_keys(table):
+                if fk["referred_table"] not in local and fk.get("name"):
+                    conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{fk["name"]}"'))
+            if table != "publish_leases": # Keyed by idempotency key
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"GREATEST(:start, (SELECT COALESCE(MAX(id), 0) FROM {table}) + 1), false)"
+                ), {"start": index * settings.SHARD_ID_STRIDE})
+
+def sync_reference_tables(source, targets: list) -> None:
+    """
+    Upsert the reference tables from the default shard into the other shards.
+    """
+    from sqlalchemy import MetaData, Table, insert, select, update
+    metadata = MetaData()
+    for name in REFERENCE_TABLES:
+        table = Table(name, metadata, autoload_with=source)
+        with source.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(select(table))]
+        for target in targets:
+            with target.begin() as conn:
+                for row in rows:
+                    if not conn.execute(update(table).where(table.c.id == row["id"]).values(**row)).rowcount:
+                        conn.execute(insert(table).values(**row))
@@ -0,0 +1,323 @@
+"""
+Lightweight distributed tracing: API request -> outbox -> broker -> publish_post_task
+-> DB and platform calls.
+
+Context is propagated in the W3C `traceparent` format
+(00-<trace id>-<span id>-<flags>). It is accepted on incoming HTTP requests,
+stored with outbox messages, and carried in Celery message headers, so one
+trace covers a post from the request that scheduled it to the platform call.
+
+The sampling decision is made once at the root (TRACING_SAMPLE_RATE) and
+inherited downstream. Unsampled spans still propagate ids but record and
+export nothing. Finished spans go to the configured exporter:
+
+    TRACING_EXPORTER=memory                  in-process list (tests, debugging)
+    TRACING_EXPORTER=file                    JSON lines appended to TRACING_FILE_PATH
+    TRACING_EXPORTER=package.module:factory  any object with export(span: dict)
+"""
+import importlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from .config import settings
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+class Span:
+    __slots__ = ("name", "context", "parent_id", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: str | None, attributes: dict | None = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+# --- Exporters ---
+
+class InMemoryExporter:
+    """
+    Keeps the most recent finished spans in memory.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self.spans = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def export(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def get_trace(self, trace_id: str) -> list[dict]:
+        with self._lock:
+            return [span for span in self.spans if span["trace_id"] == trace_id]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+class FileExporter:
+    """
+    Appends finished spans to a file as JSON lines (one span per line).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: dict):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def _build_exporter(name: str):
+    if name == "memory":
+        return InMemoryExporter()
+    if name == "file":
+        return FileExporter(settings.TRACING_FILE_PATH)
+    if ":" in name:
+        module_name, factory = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), factory)()
+    raise ValueError(f"Unknown TRACING_EXPORTER '{name}'")
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _build_exporter(settings.TRACING_EXPORTER)
+    return _exporter
+
+def set_exporter(exporter):
+    """
+    Replace the exporter (e.g. an InMemoryExporter in a test).
+    """
+    global _exporter
+    _exporter = exporter
+
+# --- Context propagation ---
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(parts[1], parts[2], sampled)
+
+def current_traceparent() -> str | None:
+    span = _current_span.get()
+    return format_traceparent(span.context) if span is not None else None
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+# --- Spans ---
+
+def _new_span(name: str, parent: SpanContext | None, attributes: dict | None) -> Span:
+    if parent is not None:
+        context = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+        return Span(name, context, parent.span_id, attributes if parent.sampled else None)
+    sampled = settings.TRACING_SAMPLE_RATE >= 1.0 or random.random() < settings.TRACING_SAMPLE_RATE
+    context = SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}", sampled)
+    return Span(name, context, None, attributes if sampled else None)
+
+@contextmanager
+def start_span(name: str, parent: SpanContext | None = None, root: bool = False, **attributes):
+    """
+    Run the block in a child span of `parent`, or of the current span.
+    Without either, a new trace is started only when `root` is set (entry points:
+    HTTP requests, tasks, jobs); inner spans with no trace are skipped.
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    if parent is None:
+        current = _current_span.get()
+        parent = current.context if current is not None else None
+        if parent is None and not root:
+            yield None
+            return
+    span = _new_span(name, parent, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        finish_span(span)
+
+def finish_span(span: Span):
+    span.end_ns = time.time_ns()
+    if span.context.sampled:
+        try:
+            get_exporter().export(span.to_dict())
+        except Exception as e: # Tracing must never break the traced code
+            print(f"Tracing: failed to export span '{span.name}': {e}")
+
+def traced(name: str):
+    """
+    Decorator form of start_span for functions that should appear in traces
+    (CRUD calls, crypto). Costs one settings check and a ContextVar lookup when
+    there is no active trace.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not settings.TRACING_ENABLED or _current_span.get() is None:
+                return func(*args, **kwargs)
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# --- Celery ---
+# A task span is opened in task_prerun and closed in task_postrun, which run in
+# the same thread as the task body.
+
+_task_spans: dict[str, tuple[Span, object]] = {}
+
+def _traceparent_from_request(task) -> str | None:
+    request = task.request
+    value = getattr(request, "traceparent", None)
+    if value:
+        return value
+    headers = getattr(request, "headers", None) or {}
+    return headers.get("traceparent")
+
+def inject_task_headers(headers=None, **kwargs):
+    # before_task_publish: carry the publisher's span in the message headers
+    if headers is None or not settings.TRACING_ENABLED or "traceparent" in headers:
+        return
+    traceparent = current_traceparent()
+    if traceparent:
+        headers["traceparent"] = traceparent
+
+def start_task_span(task_id=None, task=None, **kwargs):
+    # task_prerun
+    if not settings.TRACING_ENABLED or task is None:
+        return
+    parent = parse_traceparent(_traceparent_from_request(task))
+    span = _new_span(f"celery.task {task.name}", parent, {"celery.task_id": task_id, "celery.retries": task.request.retries})
+    _task_spans[task_id] = (span, _current_span.set(span))
+
+def end_task_span(task_id=None, state=None, **kwargs):
+    # task_postrun
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    span, token = entry
+    span.set_attribute("celery.state", state)
+    if state not in (None, "SUCCESS"):
+        span.status = "error"
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        _current_span.set(None) # Different context (eager apply inside another task)
+    finish_span(span)
+
+def connect_celery_signals():
+    from celery.signals import before_task_publish, task_postrun, task_prerun
+
+    before_task_publish.connect(inject_task_headers, weak=False)
+    task_prerun.connect(start_task_span, weak=False)
+    task_postrun.connect(end_task_span, weak=False)
+
+# --- ASGI ---
+
+class TracingMiddleware:
+    """
+    Starts (or continues, from an incoming traceparent header) a trace per HTTP request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        from .metrics import route_template
+
+        incoming = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                incoming = parse_traceparent(value.decode("latin-1"))
+                break
+
+        status_code = 500
+
+        with start_span(f"HTTP {scope['method']}", parent=incoming, root=True, **{"http.method": scope["method"], "http.path": scope["path"]}) as span:
+            async def send_wrapper(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"traceparent", format_traceparent(span.context).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                span.name = f"HTTP {scope['method']} {route}"
+                span.set_attribute("http.route", route)
+                span.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    span.status = "error"
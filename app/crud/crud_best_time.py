@@ -0,0 +1,131 @@
+"""
+Hour-of-week publishing histograms (models.PostingHourCount) behind the best-time
+recommendations (app.services.best_time).
+
+record_published() adds a post to its account's histogram in the transaction that
+marks it POSTED (crud_post.update_post_status). rebuild_histograms() recomputes
+them from the posted_at of every published post, hot and archived, with NumPy
+(`python -m app.cli rebuild-best-times`, after a bulk import or to repair drift).
+NumPy is imported by the functions that use it: crud_post imports this module in
+every API and worker process.
+"""
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.tracing import traced
+from .crud_outbox import as_utc
+from .crud_post_rollup import increment
+
+if TYPE_CHECKING:
+    import numpy as np
+
+HOURS_PER_WEEK = 168
+PUBLISHED_STATUSES = (models.PostStatus.POSTED, models.PostStatus.ARCHIVED)
+# datetime64 hours count from 1970-01-01, a Thursday: shift so that 0 is Monday 00:00
+_EPOCH_HOUR_OF_WEEK = 3 * 24
+
+def hour_of_week(value: datetime) -> int:
+    value = as_utc(value)
+    return value.weekday() * 24 + value.hour
+
+def hours_of_week(values: Iterable[datetime]) -> "np.ndarray":
+    """
+    Vectorized hour_of_week() of many datetimes (naive ones are taken as UTC).
+    """
+    import numpy as np
+    hours = np.array([as_utc(value).replace(tzinfo=None) for value in values], dtype="datetime64[h]").astype(np.int64)
+    return (hours + _EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+def record_published(db: Session, post: models.Post) -> None:
+    """
+    Count a post that was just published in its account's histogram. Does not commit.
+    """
+    if post.posted_at is None:
+        return
+    increment(
+        db, models.PostingHourCount,
+        {"connected_account_id": post.connected_account_id, "hour_of_week": hour_of_week(post.posted_at)}, 1,
+        workspace_id=post.workspace_id,
+    )
+
+def get_histograms(db: Session, account_ids: Iterable[int]) -> Dict[int, "np.ndarray"]:
+    """
+    The 168-bin histogram of each account, as {account_id: counts}; zeros without history.
+    """
+    import numpy as np
+    account_ids = list(account_ids)
+    histograms = {account_id: np.zeros(HOURS_PER_WEEK, dtype=np.int64) for account_id in account_ids}
+    if not account_ids:
+        return histograms
+    rows = db.execute(
+        select(models.PostingHourCount.connected_account_id, models.PostingHourCount.hour_of_week, models.PostingHourCount.count)
+        .where(models.PostingHourCount.connected_account_id.in_(account_ids))
+    ).all()
+    if rows:
+        accounts, hours, counts = (np.array(column, dtype=np.int64) for column in zip(*rows))
+        for account_id in np.unique(accounts):
+            mine = accounts == account_id
+            histograms[int(account_id)][hours[mine]] = counts[mine]
+    return histograms
+
+def get_platform_histogram(db: Session, platform_id: int) -> "np.ndarray":
+    """
+    The summed histogram of every account of the platform in this database.
+    """
+    import numpy as np
+    counter, account = models.PostingHourCount, models.ConnectedAccount
+    rows = db.execute(
+        select(counter.hour_of_week, func.sum(counter.count)) # Summed in SQL: 168 rows back, not one per account and hour
+        .join(account, account.id == counter.connected_account_id)
+        .where(account.platform_id == platform_id)
+        .group_by(counter.hour_of_week)
+    ).all()
+    histogram = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+    for hour, count in rows:
+        histogram[hour] = count
+    return histogram
+
+@traced("crud_best_time.rebuild_histograms")
+def rebuild_histograms(db: Session, workspace_id: Optional[int] = None) -> int:
+    """
+    Recompute the histograms of every account (of one workspace, or all) from the
+    posted_at of their published posts, one workspace per transaction. Returns the
+    number of posts counted. Commits.
+    """
+    import numpy as np
+    if workspace_id is not None:
+        workspace_ids: List[int] = [workspace_id]
+    else:
+        workspace_ids = db.execute(select(models.ConnectedAccount.workspace_id).distinct()).scalars().all()
+    counted = 0
+    for workspace_id in workspace_ids:
+        account_ids, posted_at = [], []
+        for model in (models.Post, models.PostArchive):
+            rows = db.execute(
+                select(model.connected_account_id, model.posted_at)
+                .where(model.workspace_id == workspace_id, model.status.in_(PUBLISHED_STATUSES), model.posted_at.isnot(None))
+                .execution_options(yield_per=10000)
+            )
+            for account_id, value in rows:
+                account_ids.append(account_id)
+                posted_at.append(value)
+
+        rows = []
+        if account_ids:
+            accounts, slots = np.unique(np.array(account_ids, dtype=np.int64), return_inverse=True)
+            # One bincount over (account, hour) cells instead of a loop per post
+            cells = np.bincount(slots * HOURS_PER_WEEK + hours_of_week(posted_at), minlength=len(accounts) * HOURS_PER_WEEK)
+            cells = cells.reshape(len(accounts), HOURS_PER_WEEK)
+            for slot, hour in zip(*np.nonzero(cells)):
+                rows.append({"workspace_id": workspace_id, "connected_account_id": int(accounts[slot]),
+                             "hour_of_week": int(hour), "count": int(cells[slot, hour])})
+        db.execute(delete(models.PostingHourCount).where(models.PostingHourCount.workspace_id == workspace_id))
+        if rows:
+            db.execute(insert(models.PostingHourCount), rows)
+        db.commit()
+        counted += len(account_ids)
+    return counted
@@ -1,18 +1,24 @@
+from sqlalchemy import and_, or_, update
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
 from app import models, schemas
-from app.crud.crud_workspace import is_user_member_of_workspace # For authorization check
+from app.core.security import encrypt_data
 
 def get_connected_account(db: Session, account_id: int) -> Optional[models.ConnectedAccount]:
-    return db.query(models.ConnectedAccount).filter(models.ConnectedAccount.id == account_id).first()
+    return (
+        db.query(models.ConnectedAccount)
+        .filter(models.ConnectedAccount.id == account_id, models.ConnectedAccount.deleting_at.is_(None))
+        .first()
+    )
 
 def get_connected_accounts_for_workspace(
     db: Session, workspace_id: int, skip: int = 0, limit: int = 100
 ) -> List[models.ConnectedAccount]:
     return (
         db.query(models.ConnectedAccount)
-        .filter(models.ConnectedAccount.workspace_id == workspace_id)
+        .filter(models.ConnectedAccount.workspace_id == workspace_id, models.ConnectedAccount.deleting_at.is_(None))
         .offset(skip)
         .limit(limit)
         .all()
@@ -21,12 +27,8 @@ def get_connected_accounts_for_workspace(
 def create_connected_account(
     db: Session, account_in: schemas.ConnectedAccountCreate, user_id: int
 ) -> models.ConnectedAccount:
-    # Authorize: Check if the user is a member of the target workspace
-    if not is_user_member_of_workspace(db, user_id=user_id, workspace_id=account_in.workspace_id):
-        # In a real scenario, we'd raise HTTPException here, but CRUD layers typically don't handle HTTP directly.
-        # The API layer should handle this before calling the CRUD function.
-        # For now, let's raise a ValueError or return None, or expect the API layer to ensure this.
-        raise ValueError("User is not a member of the target workspace.")
+    # Membership (global data) is checked by the API before calling; this module only
+    # touches the workspace's shard.
 
     # Create the object, letting the model's setters handle encryption
     db_account = models.ConnectedAccount(
@@ -38,6 +40,7 @@ def create_connected_account(
         access_token=account_in.access_token, # Setter will encrypt
         refresh_token=account_in.refresh_token, # Setter will encrypt
         token_expires_at=account_in.token_expires_at,
+        min_post_spacing_seconds=account_in.min_post_spacing_seconds,
         # scopes field is not in ConnectedAccountCreate schema in this version
         is_active=True # Default, or from schema if added
     )
@@ -70,10 +73,77 @@ def update_connected_account(
     db.refresh(db_account)
     return db_account
 
-def delete_connected_account(db: Session, account_id: int) -> Optional[models.ConnectedAccount]:
-    db_account = get_connected_account(db, account_id=account_id)
-    if db_account:
-        # Consider if there are related posts that need to be handled or if a cascade is set up
-        db.delete(db_account)
-        db.commit()
-    return db_account
+def delete_connected_account(db: Session, account_id: int, requested_by: Optional[int] = None, account_dbs=()) -> Optional[models.DeletionJob]:
+    """
+    Hide the account and queue the removal of its posts (app.services.deletion).
+    `db` is the global session; pass the account's shard session in account_dbs when it
+    is a different one. Returns the DeletionJob, or None if there is no such account.
+    """
+    from .crud_deletion_job import request_deletion
+    return request_deletion(db, "connected_account", account_id, requested_by=requested_by, account_dbs=account_dbs)
+
+def get_accounts_expiring_before(
+    db: Session, cutoff: datetime, limit: int = 100, after: Optional[tuple] = None, exclude_workspace_ids=()
+) -> List[models.ConnectedAccount]:
+    """
+    Active accounts with a refresh token whose access token expires before `cutoff`,
+    in (token_expires_at, id) order starting after `after` (keyset pagination).
+    Rows are locked; concurrent refresh jobs skip each other's rows on Postgres.
+    """
+    account = models.ConnectedAccount
+    query = db.query(account).filter(
+        account.is_active.is_(True),
+        account.deleting_at.is_(None),
+        account._refresh_token.isnot(None),
+        account.token_expires_at.isnot(None),
+        account.token_expires_at <= cutoff,
+    )
+    if exclude_workspace_ids:
+        query = query.filter(account.workspace_id.notin_(exclude_workspace_ids))
+    if after is not None:
+        last_expires_at, last_id = after
+        query = query.filter(or_(
+            account.token_expires_at > last_expires_at,
+            and_(account.token_expires_at == last_expires_at, account.id > last_id),
+        ))
+    return (
+        query.order_by(account.token_expires_at, account.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+def lock_connected_account(db: Session, account_id: int) -> Optional[models.ConnectedAccount]:
+    return (
+        db.query(models.ConnectedAccount)
+        .filter(models.ConnectedAccount.id == account_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+
+def bulk_update_tokens(db: Session, updates: List[dict]) -> None:
+    """
+    Write refreshed tokens in one executemany. Each dict has "id", "access_token",
+    optionally "refresh_token", and "token_expires_at". Does not commit.
+    """
+    rows = []
+    for item in updates:
+        row = {"id": item["id"], "_access_token": encrypt_data(item["access_token"]), "token_expires_at": item["token_expires_at"]}
+        if item.get("refresh_token"):
+            row["_refresh_token"] = encrypt_data(item["refresh_token"])
+        rows.append(row)
+    # Rows with and without a rotated refresh token need separate statements
+    for has_refresh in (True, False):
+        batch = [row for row in rows if ("_refresh_token" in row) == has_refresh]
+        if batch:
+            db.execute(update(models.ConnectedAccount), batch)
+
+def deactivate_accounts(db: Session, account_ids: List[int]) -> None:
+    """
+    Mark accounts whose refresh token was rejected as inactive (they must be reconnected). Does not commit.
+    """
+    if account_ids:
+        db.query(models.ConnectedAccount).filter(models.ConnectedAccount.id.in_(account_ids)).update(
+            {"is_active": False}, synchronize_session=False
+        )
@@ -0,0 +1,145 @@
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+
+from app import models
+from app.core.config import settings
+from . import crud_outbox
+
+RUN_DELETION_JOB_TASK = "run_deletion_job_task"
+
+ENTITY_MODELS = {
+    "workspace": models.Workspace,
+    "user": models.User,
+    "connected_account": models.ConnectedAccount,
+}
+
+def get_job(db: Session, job_id: int) -> Optional[models.DeletionJob]:
+    return db.query(models.DeletionJob).filter(models.DeletionJob.id == job_id).populate_existing().first()
+
+def get_job_for_entity(db: Session, entity_type: str, entity_id: int) -> Optional[models.DeletionJob]:
+    return db.query(models.DeletionJob).filter(
+        models.DeletionJob.entity_type == entity_type, models.DeletionJob.entity_id == entity_id
+    ).first()
+
+def _account_criteria(entity_type: str, entity_id: int):
+    accounts = models.ConnectedAccount
+    column = {"workspace": accounts.workspace_id, "user": accounts.user_id, "connected_account": accounts.id}[entity_type]
+    return (column == entity_id, accounts.deleting_at.is_(None))
+
+def request_deletion(db: Session, entity_type: str, entity_id: int, requested_by: Optional[int] = None,
+                     account_dbs=()) -> Optional[models.DeletionJob]:
+    """
+    Mark the entity as deleting (hiding it from reads), record a DeletionJob and stage
+    run_deletion_job_task in the outbox, all in one transaction on the global session `db`.
+    Connected accounts under the entity (or the account itself) are marked in the same
+    transaction as far as they live in `db`; account_dbs are the other shard sessions
+    holding them, marked right after (app.core.sharding). Returns the existing job if one was
+    already requested, None if the entity does not exist. Commits.
+    """
+    job = get_job_for_entity(db, entity_type, entity_id)
+    if job is not None:
+        return job
+    account_dbs = [session for session in account_dbs if session is not db]
+    now = datetime.now(timezone.utc)
+    if entity_type != "connected_account":
+        model = ENTITY_MODELS[entity_type]
+        marked = db.execute(
+            update(model).where(model.id == entity_id, model.deleting_at.is_(None)).values(deleting_at=now)
+        ).rowcount
+        if not marked:
+            db.rollback()
+            return None
+    # Accounts stop publishing and refreshing right away, not when the job reaches them
+    if entity_type != "connected_account" or not account_dbs:
+        marked = db.execute(update(models.ConnectedAccount).where(*_account_criteria(entity_type, entity_id)).values(deleting_at=now)).rowcount
+        if entity_type == "connected_account" and not marked:
+            db.rollback()
+            return None
+
+    job = models.DeletionJob(entity_type=entity_type, entity_id=entity_id, status="pending", requested_by=requested_by, progress={})
+    try:
+        with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        db.rollback() # Lost a race with a concurrent request
+        return get_job_for_entity(db, entity_type, entity_id)
+    crud_outbox.add_task_message(db, RUN_DELETION_JOB_TASK, [job.id], dedup_key=f"{RUN_DELETION_JOB_TASK}:{job.id}")
+    db.commit()
+    db.refresh(job)
+    # Other shards cannot share the transaction; the job deletes these accounts either way
+    for account_db in account_dbs:
+        account_db.execute(update(models.ConnectedAccount).where(*_account_criteria(entity_type, entity_id)).values(deleting_at=now))
+        account_db.commit()
+    return job
+
+def claim_job(db: Session, job_id: int, holder: str) -> bool:
+    """
+    Take the job for `holder` if it is pending or its runner went quiet for
+    DELETION_JOB_STALL_SECONDS. Commits.
+    """
+    now = datetime.now(timezone.utc)
+    stalled_before = now - timedelta(seconds=settings.DELETION_JOB_STALL_SECONDS)
+    claimed = db.execute(
+        update(models.DeletionJob)
+        .where(
+            models.DeletionJob.id == job_id,
+            or_(
+                models.DeletionJob.status == "pending",
+                (models.DeletionJob.status == "running") & (models.DeletionJob.heartbeat_at < stalled_before),
+            ),
+        )
+        .values(status="running", holder=holder, heartbeat_at=now, attempts=models.DeletionJob.attempts + 1)
+        .execution_options(synchronize_session=False) # get_job() reloads the row
+    ).rowcount
+    db.commit()
+    return bool(claimed)
+
+def record_progress(db: Session, job: models.DeletionJob, table: str, rows: int) -> None:
+    """
+    Add `rows` to the job's count for `table` and bump its heartbeat. Does not commit;
+    runs in the transaction of the batch it reports.
+    """
+    progress = dict(job.progress or {})
+    progress[table] = progress.get(table, 0) + rows
+    job.progress = progress
+    job.heartbeat_at = datetime.now(timezone.utc)
+
+def finish_job(db: Session, job: models.DeletionJob) -> None:
+    job.status = "done"
+    job.holder = None
+    job.error = None
+    job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+def release_job(db: Session, job_id: int, error: str) -> None:
+    """
+    Hand a failed run back to the sweeper (status pending), keeping its progress. Commits.
+    """
+    db.execute(
+        update(models.DeletionJob)
+        .where(models.DeletionJob.id == job_id, models.DeletionJob.status == "running")
+        .values(status="pending", holder=None, error=error[:500])
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def get_resumable_jobs(db: Session, limit: int = 10) -> List[models.DeletionJob]:
+    """
+    Unfinished jobs that nobody is running: pending for longer than the stall timeout
+    (the staged task was lost or failed) or running with a stale heartbeat.
+    """
+    stalled_before = datetime.now(timezone.utc) - timedelta(seconds=settings.DELETION_JOB_STALL_SECONDS)
+    return (
+        db.query(models.DeletionJob)
+        .filter(or_(
+            (models.DeletionJob.status == "pending") & (models.DeletionJob.created_at < stalled_before)
+            & or_(models.DeletionJob.heartbeat_at.is_(None), models.DeletionJob.heartbeat_at < stalled_before),
+            (models.DeletionJob.status == "running") & (models.DeletionJob.heartbeat_at < stalled_before),
+        ))
+        .order_by(models.DeletionJob.id)
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,144 @@
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+
+from app import models
+from app.core.config import settings
+from app.core.tracing import current_traceparent, traced
+
+PUBLISH_POST_TASK = "publish_post_task"
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; everything is stored as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def publish_dedup_key(post_id: int, scheduled_at: datetime) -> str:
+    return f"{PUBLISH_POST_TASK}:{post_id}:{as_utc(scheduled_at).isoformat()}"
+
+def publish_target(post) -> tuple:
+    # What a post's publish message depends on: one is staged only when this changes
+    return post.status, as_utc(post.scheduled_at) if post.scheduled_at else None
+
+def get_pending_messages(db: Session, now: datetime, limit: int = 100) -> List[models.OutboxMessage]:
+    """
+    Lock and return the next batch of due, undispatched messages (dead letters excluded).
+    On Postgres, concurrent relays skip each other's locked rows.
+    """
+    return (
+        db.query(models.OutboxMessage)
+        .filter(
+            models.OutboxMessage.dispatched_at.is_(None),
+            models.OutboxMessage.dead_lettered_at.is_(None),
+            models.OutboxMessage.available_at <= now,
+        )
+        .order_by(models.OutboxMessage.available_at, models.OutboxMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+def cancel_pending_for_post(db: Session, post_id: int, keep_dedup_key: Optional[str] = None) -> int:
+    """
+    Drop undispatched publish messages for a post (e.g. it was rescheduled, unscheduled
+    or deleted). Does not commit; runs in the caller's transaction.
+    """
+    query = db.query(models.OutboxMessage).filter(
+        models.OutboxMessage.post_id == post_id,
+        models.OutboxMessage.dispatched_at.is_(None),
+    )
+    if keep_dedup_key is not None:
+        query = query.filter(models.OutboxMessage.dedup_key != keep_dedup_key)
+    return query.delete(synchronize_session=False)
+
+@traced("crud_outbox.add_publish_message")
+def add_publish_message(db: Session, post: models.Post) -> Optional[models.OutboxMessage]:
+    """
+    Stage publish_post_task for a scheduled post in the caller's transaction.
+    Idempotent per (post, scheduled_at) among undispatched messages: a pending message with
+    the same dedup key is kept, and pending messages for an older schedule are cancelled.
+    Once dispatched, the same schedule can be staged again (e.g. a failed post set back
+    to scheduled), so callers stage only when publish_target() changed. Does not commit.
+    """
+    dedup_key = publish_dedup_key(post.id, post.scheduled_at)
+    cancel_pending_for_post(db, post.id, keep_dedup_key=dedup_key)
+
+    eta = as_utc(post.scheduled_at)
+    message = models.OutboxMessage(
+        task_name=PUBLISH_POST_TASK,
+        args=[post.id],
+        kwargs={"scheduled_for": eta.isoformat(), "workspace_id": post.workspace_id}, # workspace_id picks the shard
+        dedup_key=dedup_key,
+        traceparent=current_traceparent(),
+        post_id=post.id,
+        eta=eta,
+        available_at=eta - timedelta(seconds=settings.OUTBOX_RELAY_LOOKAHEAD_SECONDS),
+    )
+    try:
+        with db.begin_nested(): # Savepoint, so a duplicate key leaves the post change intact
+            db.add(message)
+    except IntegrityError:
+        return None # Already pending for this exact schedule
+    return message
+
+def add_task_message(db: Session, task_name: str, args: list, dedup_key: str) -> Optional[models.OutboxMessage]:
+    """
+    Stage any other task to run as soon as the caller's transaction commits.
+    Idempotent per dedup_key while the message is pending. Does not commit.
+    """
+    now = datetime.now(timezone.utc)
+    message = models.OutboxMessage(
+        task_name=task_name,
+        args=args,
+        kwargs={},
+        dedup_key=dedup_key,
+        traceparent=current_traceparent(),
+        available_at=now,
+    )
+    try:
+        with db.begin_nested():
+            db.add(message)
+    except IntegrityError:
+        return None
+    return message
+
+def mark_dispatched(db: Session, message: models.OutboxMessage, dispatched_at: datetime) -> None:
+    message.dispatched_at = dispatched_at
+    message.attempts += 1
+    message.last_error = None
+
+def retry_delay(attempts: int) -> float:
+    # Exponential backoff after the given number of failed sends
+    return min(settings.OUTBOX_RELAY_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RELAY_RETRY_MAX_SECONDS)
+
+def mark_failed(db: Session, message: models.OutboxMessage, error: str, now: datetime) -> None:
+    """
+    Record a failed send: the message is retried after a backoff, or dead-lettered once it
+    failed OUTBOX_RELAY_MAX_ATTEMPTS times. Setting dead_lettered_at back to NULL (and
+    available_at to now) queues a dead letter again.
+    """
+    message.attempts += 1
+    message.last_error = error[:1000]
+    if message.attempts >= settings.OUTBOX_RELAY_MAX_ATTEMPTS:
+        message.dead_lettered_at = now
+    else:
+        message.available_at = now + timedelta(seconds=retry_delay(message.attempts))
+
+def purge_dispatched(db: Session, before: datetime, batch_size: int) -> int:
+    """
+    Delete up to batch_size messages dispatched before `before`, oldest first.
+    Returns the number deleted. Commits.
+    """
+    ids = db.execute(
+        select(models.OutboxMessage.id)
+        .where(models.OutboxMessage.dispatched_at.isnot(None), models.OutboxMessage.dispatched_at < before)
+        .order_by(models.OutboxMessage.dispatched_at)
+        .limit(batch_size)
+    ).scalars().all()
+    if ids:
+        db.execute(delete(models.OutboxMessage).where(models.OutboxMessage.id.in_(ids)))
+    db.commit()
+    return len(ids)
@@ -1,13 +1,33 @@
+import heapq
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 from .. import models
 from .. import schemas
+from . import crud_best_time, crud_outbox, crud_post_archive, crud_post_rollup, crud_post_search, crud_schedule
+from ..core.tracing import traced
 
-def get_post(db: Session, post_id: int) -> Optional[models.Post]:
-    return db.query(models.Post).filter(models.Post.id == post_id).first()
+def _sync_publish_outbox(db: Session, db_post: models.Post) -> None:
+    # Stage (or cancel) the publish task in the same transaction as the post change,
+    # so the enqueue can neither be lost nor happen for an uncommitted change.
+    if db_post.status == models.PostStatus.SCHEDULED and db_post.scheduled_at:
+        crud_outbox.add_publish_message(db, db_post)
+    else:
+        crud_outbox.cancel_pending_for_post(db, db_post.id)
 
+@traced("crud_post.get_post")
+def get_post(db: Session, post_id: int, include_archived: bool = True) -> Optional[Union[models.Post, models.PostArchive]]:
+    """
+    Look the post up in the hot table, then in the archive. Archived posts come back as
+    read-only PostArchive rows; writers pass include_archived=False.
+    """
+    db_post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    if db_post is None and include_archived:
+        return crud_post_archive.get_archived_post(db, post_id)
+    return db_post
+
+@traced("crud_post.get_posts_by_workspace")
 def get_posts_by_workspace(
     db: Session, 
     workspace_id: int, 
@@ -16,14 +36,57 @@ def get_posts_by_workspace(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None
 ) -> List[models.Post]:
+    """
+    Posts in the workspace, optionally within a scheduled_at range. Ranges reaching back
+    to the workspace's archived posts (and unbounded listings) also return them, after
+    the hot ones; current calendar views only touch the hot table.
+    """
     query = db.query(models.Post).filter(models.Post.workspace_id == workspace_id)
     if start_date:
         query = query.filter(models.Post.scheduled_at >= start_date)
     if end_date:
         query = query.filter(models.Post.scheduled_at <= end_date)
-    return query.offset(skip).limit(limit).all()
+    posts = query.offset(skip).limit(limit).all()
+    if len(posts) == limit or not crud_post_archive.archive_covers(db, workspace_id, start_date):
+        return posts
+    # Page through hot rows then archived rows, as if they were one list
+    hot_total = skip + len(posts) if posts or not skip else query.count()
+    return posts + crud_post_archive.get_archived_posts_by_workspace(
+        db, workspace_id, skip=max(0, skip - hot_total), limit=limit - len(posts), start_date=start_date, end_date=end_date
+    )
 
+@traced("crud_post.get_posts_in_range")
+def get_posts_in_range(
+    db: Session,
+    workspace_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[Union[models.Post, models.PostArchive]]:
+    """
+    Posts scheduled within [start_date, end_date] from both the hot table and the
+    archive, ordered by scheduled_at. Each tier reads at most skip + limit rows.
+    """
+    hot = (
+        db.query(models.Post)
+        .filter(models.Post.workspace_id == workspace_id, models.Post.scheduled_at >= start_date, models.Post.scheduled_at <= end_date)
+        .order_by(models.Post.scheduled_at, models.Post.id)
+        .limit(skip + limit)
+        .all()
+    )
+    archived = []
+    if crud_post_archive.archive_covers(db, workspace_id, start_date):
+        archived = crud_post_archive.get_archived_posts_by_workspace(
+            db, workspace_id, limit=skip + limit, start_date=start_date, end_date=end_date, ordered=True
+        )
+    merged = heapq.merge(hot, archived, key=lambda post: (crud_outbox.as_utc(post.scheduled_at), post.id))
+    return list(merged)[skip:skip + limit]
+
+@traced("crud_post.create_post")
 def create_post(db: Session, post: schemas.PostCreateData, author_id: Optional[int] = None) -> models.Post:
+    if crud_schedule.is_scheduled(post.status, post.scheduled_at): # Raises ScheduleConflictError
+        crud_schedule.check_schedule(db, post.workspace_id, [crud_schedule.Proposal(post.connected_account_id, post.scheduled_at)])
     db_post = models.Post(
         workspace_id=post.workspace_id,
         connected_account_id=post.connected_account_id,
@@ -34,38 +97,108 @@ def create_post(db: Session, post: schemas.PostCreateData, author_id: Optional[i
         author_id=author_id # Can be set here
     )
     db.add(db_post)
+    db.flush() # Assigns db_post.id for the outbox message
+    if db_post.status == models.PostStatus.SCHEDULED and db_post.scheduled_at:
+        crud_outbox.add_publish_message(db, db_post)
+    crud_post_search.index_posts(db, [db_post.id]) # Same transaction as the post
+    crud_post_rollup.record_change(db, None, crud_post_rollup.bucket_of(db_post))
     db.commit()
     db.refresh(db_post)
     return db_post
 
+@traced("crud_post.update_post")
 def update_post(db: Session, post_id: int, post_update: schemas.PostUpdate) -> Optional[models.Post]:
-    db_post = get_post(db, post_id)
+    db_post = get_post(db, post_id, include_archived=False)
     if not db_post:
         return None
     
     update_data = post_update.model_dump(exclude_unset=True)
+    if update_data.get("media_url") is not None:
+        update_data["media_url"] = str(update_data["media_url"])
+    status, scheduled_at = update_data.get("status", db_post.status), update_data.get("scheduled_at", db_post.scheduled_at)
+    if ("status" in update_data or "scheduled_at" in update_data) and crud_schedule.is_scheduled(status, scheduled_at):
+        crud_schedule.check_schedule(db, db_post.workspace_id, [crud_schedule.Proposal(db_post.connected_account_id, scheduled_at, db_post.id)])
+    before, target = crud_post_rollup.bucket_of(db_post), crud_outbox.publish_target(db_post)
     for key, value in update_data.items():
         setattr(db_post, key, value)
+    if "scheduled_at" in update_data:
+        db_post.series_id = None # A moved occurrence leaves its series: series edits no longer touch it
     
     db.add(db_post)
+    crud_post_rollup.record_change(db, before, crud_post_rollup.bucket_of(db_post))
+    if crud_outbox.publish_target(db_post) != target:
+        _sync_publish_outbox(db, db_post)
+    if "content_text" in update_data:
+        crud_post_search.index_posts(db, [db_post.id])
     db.commit()
     db.refresh(db_post)
     return db_post
 
+@traced("crud_post.reschedule_posts")
+def reschedule_posts(db: Session, workspace_id: int, changes: Dict[int, datetime]) -> List[models.Post]:
+    """
+    Move many drafts and scheduled posts of the workspace at once ({post_id: new
+    scheduled_at}), in one transaction: all of them, or none if any scheduled one would
+    break its account's spacing (crud_schedule.ScheduleConflictError). Raises ValueError
+    for posts that are not in the workspace or already published. Statuses are kept.
+    """
+    db_posts = (
+        db.query(models.Post)
+        .filter(models.Post.id.in_(list(changes)), models.Post.workspace_id == workspace_id)
+        .order_by(models.Post.id)
+        .all()
+    )
+    missing = set(changes) - {db_post.id for db_post in db_posts}
+    if missing:
+        raise ValueError(f"Posts not found in this workspace: {sorted(missing)}")
+    published = [db_post.id for db_post in db_posts if db_post.status not in (models.PostStatus.DRAFT, models.PostStatus.SCHEDULED)]
+    if published:
+        raise ValueError(f"Only drafts and scheduled posts can be rescheduled: {published}")
+    crud_schedule.check_schedule(db, workspace_id, [ # Every move at once: posts may swap places
+        crud_schedule.Proposal(db_post.connected_account_id, changes[db_post.id], db_post.id)
+        for db_post in db_posts if crud_schedule.is_scheduled(db_post.status, changes[db_post.id])
+    ])
+    for db_post in db_posts:
+        before, target = crud_post_rollup.bucket_of(db_post), crud_outbox.publish_target(db_post)
+        db_post.scheduled_at = changes[db_post.id]
+        db_post.series_id = None # As in update_post
+        crud_post_rollup.record_change(db, before, crud_post_rollup.bucket_of(db_post))
+        if crud_outbox.publish_target(db_post) != target:
+            _sync_publish_outbox(db, db_post)
+    db.commit()
+    for db_post in db_posts:
+        db.refresh(db_post)
+    return db_posts
+
+@traced("crud_post.delete_post")
 def delete_post(db: Session, post_id: int) -> Optional[models.Post]:
-    db_post = get_post(db, post_id)
+    db_post = get_post(db, post_id, include_archived=False)
     if not db_post:
         return None
     # Add logic here: only allow deletion if post is 'draft' or 'scheduled', not 'posted' or 'error'
     # For now, we'll allow deletion regardless of status for simplicity.
+    crud_outbox.cancel_pending_for_post(db, post_id)
+    crud_post_search.unindex_posts(db, [post_id])
+    crud_post_rollup.record_change(db, crud_post_rollup.bucket_of(db_post), None)
     db.delete(db_post)
+    db.flush()
+    if db_post.group_id is not None: # The last target of a group takes the shared content with it
+        still_used = (
+            db.query(models.Post.id).filter(models.Post.group_id == db_post.group_id).first()
+            or db.query(models.PostArchive.id).filter(models.PostArchive.group_id == db_post.group_id).first()
+            or db.query(models.PostSeries.id).filter(models.PostSeries.group_id == db_post.group_id).first() # A series template
+        )
+        if not still_used:
+            db.query(models.PostGroup).filter(models.PostGroup.id == db_post.group_id).delete(synchronize_session=False)
     db.commit()
     return db_post
 
+@traced("crud_post.update_post_status")
 def update_post_status(db: Session, post_id: int, status: models.PostStatus, error_message: Optional[str] = None, platform_post_id: Optional[str] = None) -> Optional[models.Post]:
-    db_post = get_post(db, post_id)
+    db_post = get_post(db, post_id, include_archived=False)
     if not db_post:
         return None
+    before = crud_post_rollup.bucket_of(db_post)
     db_post.status = status
     if status == models.PostStatus.POSTED:
         db_post.posted_at = datetime.utcnow()
@@ -73,6 +206,9 @@ def update_post_status(db: Session, post_id: int, status: models.PostStatus, err
         db_post.platform_post_id = platform_post_id
     elif status == models.PostStatus.ERROR:
         db_post.error_message = error_message
+    crud_post_rollup.record_change(db, before, crud_post_rollup.bucket_of(db_post))
+    if status == models.PostStatus.POSTED and before[2] != models.PostStatus.POSTED:
+        crud_best_time.record_published(db, db_post) # Best-time histograms learn from every publish
     db.commit()
     db.refresh(db_post)
     return db_post
\ No newline at end of file
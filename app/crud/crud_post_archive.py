@@ -0,0 +1,92 @@
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime, timezone
+
+from app import models
+from app.core.tracing import traced
+from app.crud import crud_post_search
+from app.crud.crud_outbox import as_utc
+
+# Posts in these statuses never change again, so they can leave the hot table
+ARCHIVABLE_STATUSES = (models.PostStatus.POSTED, models.PostStatus.ARCHIVED)
+# Columns copied from posts to posts_archive (everything but archived_at)
+ARCHIVED_COLUMNS = [column.name for column in models.PostArchive.__table__.columns if column.name != "archived_at"]
+
+def archive_cutoff(db: Session, workspace_id: int) -> Optional[datetime]:
+    """
+    The latest scheduled_at among the workspace's archived posts (None if it has none):
+    ranges starting after it have nothing in the archive. This is what was actually
+    archived, whatever cutoff the archiver ran with (--older-than-days, or an earlier
+    POST_ARCHIVE_AFTER_DAYS). One probe of ix_posts_archive_workspace_scheduled.
+    """
+    latest = db.query(func.max(models.PostArchive.scheduled_at)).filter(models.PostArchive.workspace_id == workspace_id).scalar()
+    return as_utc(latest) if latest is not None else None
+
+def archive_covers(db: Session, workspace_id: int, start_date: Optional[datetime]) -> bool:
+    """
+    Whether a range starting at start_date (None: unbounded) may include archived posts.
+    """
+    cutoff = archive_cutoff(db, workspace_id)
+    return cutoff is not None and (start_date is None or as_utc(start_date) <= cutoff)
+
+def _archivable(cutoff: datetime, exclude_workspace_ids=()):
+    criteria = (models.Post.status.in_(ARCHIVABLE_STATUSES), models.Post.scheduled_at < cutoff)
+    if exclude_workspace_ids:
+        criteria += (models.Post.workspace_id.notin_(exclude_workspace_ids),)
+    return criteria
+
+@traced("crud_post_archive.archive_batch")
+def archive_batch(db: Session, cutoff: datetime, batch_size: int, exclude_workspace_ids=()) -> int:
+    """
+    Move up to batch_size archivable posts scheduled before `cutoff` into posts_archive,
+    in one transaction. Returns the number moved (0 when nothing is left). Commits.
+    Posts without a scheduled_at, and posts of exclude_workspace_ids, are never archived.
+    """
+    ids = db.execute(
+        select(models.Post.id)
+        .where(*_archivable(cutoff, exclude_workspace_ids))
+        .order_by(models.Post.scheduled_at) # Walks ix_posts_scheduled_at from the oldest
+        .limit(batch_size)
+        .with_for_update(skip_locked=True) # Postgres: leave rows alone that a request is changing
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return 0
+
+    posts = models.Post.__table__
+    moved = posts.c.id.in_(ids)
+    db.execute(insert(models.PostArchive.__table__).from_select(
+        ARCHIVED_COLUMNS + ["archived_at"],
+        select(*[posts.c[name] for name in ARCHIVED_COLUMNS], literal(datetime.now(timezone.utc), models.PostArchive.archived_at.type))
+        .where(moved, *_archivable(cutoff)),
+    ))
+    # Dependent rows go explicitly: SQLite does not enforce ON DELETE CASCADE by default
+    db.execute(delete(models.OutboxMessage).where(models.OutboxMessage.post_id.in_(ids)))
+    db.execute(delete(models.PublishLease).where(models.PublishLease.post_id.in_(ids)))
+    crud_post_search.unindex_posts(db, ids) # Search covers the hot table only
+    result = db.execute(delete(models.Post).where(moved, *_archivable(cutoff)))
+    db.commit()
+    return result.rowcount
+
+@traced("crud_post_archive.get_archived_post")
+def get_archived_post(db: Session, post_id: int) -> Optional[models.PostArchive]:
+    return db.query(models.PostArchive).filter(models.PostArchive.id == post_id).first()
+
+def get_archived_posts_by_workspace(
+    db: Session,
+    workspace_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    ordered: bool = False,
+) -> List[models.PostArchive]:
+    query = db.query(models.PostArchive).filter(models.PostArchive.workspace_id == workspace_id)
+    if start_date:
+        query = query.filter(models.PostArchive.scheduled_at >= start_date)
+    if end_date:
+        query = query.filter(models.PostArchive.scheduled_at <= end_date)
+    if ordered:
+        query = query.order_by(models.PostArchive.scheduled_at, models.PostArchive.id)
+    return query.offset(skip).limit(limit).all()
@@ -0,0 +1,123 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import List, Optional, Union
+
+from .. import models
+from .. import schemas
+from . import crud_outbox, crud_post_rollup, crud_post_search, crud_schedule
+from ..core.tracing import traced
+
+# Targets in these statuses were published with the group's content as it was then
+PUBLISHED_STATUSES = (models.PostStatus.POSTED, models.PostStatus.ARCHIVED)
+# Targets in these statuses follow a group reschedule
+RESCHEDULABLE_STATUSES = (models.PostStatus.DRAFT, models.PostStatus.SCHEDULED)
+
+@traced("crud_post_group.create_grouped_posts")
+def create_grouped_posts(db: Session, post: schemas.PostCreateData, connected_account_ids: List[int],
+                         author_id: Optional[int] = None) -> List[models.Post]:
+    """
+    Store the content once in a PostGroup and create one content-less Post per account,
+    with their publish tasks, in a single transaction.
+    """
+    if crud_schedule.is_scheduled(post.status, post.scheduled_at): # Raises ScheduleConflictError
+        crud_schedule.check_schedule(db, post.workspace_id, [
+            crud_schedule.Proposal(account_id, post.scheduled_at) for account_id in connected_account_ids
+        ])
+    db_group = models.PostGroup(
+        workspace_id=post.workspace_id,
+        author_id=author_id,
+        content_text=post.content_text,
+        media_url=str(post.media_url) if post.media_url else None,
+    )
+    db.add(db_group)
+    db_posts = [
+        models.Post(
+            workspace_id=post.workspace_id,
+            connected_account_id=account_id,
+            author_id=author_id,
+            group=db_group,
+            status=post.status,
+            scheduled_at=post.scheduled_at,
+        )
+        for account_id in connected_account_ids
+    ]
+    db.add_all(db_posts)
+    db.flush() # Assigns ids for the outbox messages
+    for db_post in db_posts:
+        if db_post.status == models.PostStatus.SCHEDULED and db_post.scheduled_at:
+            crud_outbox.add_publish_message(db, db_post)
+    crud_post_search.index_posts(db, [db_post.id for db_post in db_posts])
+    for db_post in db_posts:
+        crud_post_rollup.record_change(db, None, crud_post_rollup.bucket_of(db_post))
+    db.commit()
+    for db_post in db_posts:
+        db.refresh(db_post)
+    return db_posts
+
+@traced("crud_post_group.get_post_group")
+def get_post_group(db: Session, group_id: int) -> Optional[models.PostGroup]:
+    return db.query(models.PostGroup).filter(models.PostGroup.id == group_id).first()
+
+@traced("crud_post_group.get_group_targets")
+def get_group_targets(db: Session, group_id: int) -> List[Union[models.Post, models.PostArchive]]:
+    """
+    The group's posts, hot and archived, by id.
+    """
+    hot = db.query(models.Post).filter(models.Post.group_id == group_id).all()
+    archived = db.query(models.PostArchive).filter(models.PostArchive.group_id == group_id).all()
+    return sorted(hot + archived, key=lambda post: post.id)
+
+def _freeze_published_content(db: Session, db_group: models.PostGroup) -> None:
+    # Published targets keep the content they went out with: copy it onto them before the edit.
+    # Column by column: a target that overrode one field still inherits the other.
+    for model in (models.Post, models.PostArchive):
+        table = model.__table__
+        for column in ("content_text", "media_url"):
+            db.execute(
+                update(table)
+                .where(table.c.group_id == db_group.id, table.c.status.in_(PUBLISHED_STATUSES), table.c[column].is_(None))
+                .values({column: getattr(db_group, column)})
+            )
+
+@traced("crud_post_group.update_post_group")
+def update_post_group(db: Session, group_id: int, group_update: schemas.PostGroupUpdate) -> Optional[models.PostGroup]:
+    """
+    Edit the shared content (one row, whatever the number of targets) and/or reschedule
+    every target that is not published yet, in one transaction. Targets that were
+    already published, or whose content was edited individually, keep their content.
+    """
+    db_group = get_post_group(db, group_id)
+    if not db_group:
+        return None
+
+    update_data = group_update.model_dump(exclude_unset=True)
+    scheduled_at = update_data.pop("scheduled_at", None)
+    if "scheduled_at" in group_update.model_fields_set and scheduled_at is not None:
+        crud_schedule.check_schedule(db, db_group.workspace_id, [
+            crud_schedule.Proposal(db_post.connected_account_id, scheduled_at, db_post.id)
+            for db_post in db_group.posts if db_post.status == models.PostStatus.SCHEDULED and db_post.series_id is None
+        ])
+    if update_data.get("media_url") is not None:
+        update_data["media_url"] = str(update_data["media_url"])
+    if update_data:
+        _freeze_published_content(db, db_group)
+        for key, value in update_data.items():
+            setattr(db_group, key, value)
+
+    if "scheduled_at" in group_update.model_fields_set:
+        for db_post in db_group.posts:
+            if db_post.status in RESCHEDULABLE_STATUSES and db_post.series_id is None: # Series occurrences follow their rule
+                before, target = crud_post_rollup.bucket_of(db_post), crud_outbox.publish_target(db_post)
+                db_post.scheduled_at = scheduled_at
+                crud_post_rollup.record_change(db, before, crud_post_rollup.bucket_of(db_post))
+                if crud_outbox.publish_target(db_post) == target:
+                    continue
+                if db_post.status == models.PostStatus.SCHEDULED and scheduled_at:
+                    crud_outbox.add_publish_message(db, db_post)
+                else:
+                    crud_outbox.cancel_pending_for_post(db, db_post.id)
+    if "content_text" in update_data:
+        crud_post_search.reindex_group(db, group_id) # Index rows are per post
+    db.commit()
+    db.refresh(db_group)
+    return db_group
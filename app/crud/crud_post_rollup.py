@@ -0,0 +1,222 @@
+"""
+Post counters for dashboards, calendar density and workspace listings:
+models.PostDailyCount per (workspace, day, status, account) and
+models.PostStatusCount per (workspace, status, account).
+
+Every post change that moves a post between buckets calls record_change() in
+its own transaction: -1 on the old bucket, +1 on the new one, as upserts on
+both tables. Archiving keeps the buckets (archived posts are counted too). Bulk paths that bypass the CRUD functions (workspace and account
+deletion remove the rows of the entity wholesale) and any bug that misses a
+change are repaired by reconcile(), which recounts a workspace from posts and
+posts_archive (beat task reconcile_post_rollups_task, or
+`python -m app.cli reconcile-post-rollups`).
+
+A reconcile and the changes of its workspace must not interleave: a change counted
+by the recount whose +1 commits on the side would be applied twice by the relative
+correction. lock_counters() orders them: record_change() takes the workspace's lock
+shared (changes never wait for each other), reconcile_workspace() exclusive, before
+counting. On Postgres this is a transaction-level advisory lock; SQLite has one
+writer at a time, so reconcile starts its write transaction before counting.
+"""
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, literal, select, text, union, union_all, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.tracing import traced
+from .crud_outbox import as_utc
+
+Rollup = models.PostDailyCount
+StatusCount = models.PostStatusCount
+Bucket = Tuple[int, date, models.PostStatus, int] # workspace_id, day, status, connected_account_id
+# Key columns of each counter table, taken from a Bucket
+KEYS = {
+    Rollup: ("workspace_id", "day", "status", "connected_account_id"),
+    StatusCount: ("workspace_id", "status", "connected_account_id"),
+}
+
+def _key(model, bucket: Bucket) -> tuple:
+    return bucket if model is Rollup else (bucket[0], bucket[2], bucket[3])
+
+def _day(scheduled_at: Optional[datetime], created_at: Optional[datetime]) -> date:
+    value = scheduled_at or created_at
+    return as_utc(value).date() if value else datetime.now(timezone.utc).date()
+
+def bucket_of(post: Optional[models.Post]) -> Optional[Bucket]:
+    """
+    The bucket a post counts in, or None for no post. Read it before changing the post.
+    """
+    if post is None:
+        return None
+    return (post.workspace_id, _day(post.scheduled_at, post.created_at), models.PostStatus(post.status), post.connected_account_id)
+
+def increment(db: Session, model, keys: dict, delta: int, **values) -> None:
+    """
+    Add delta to the count of the counter row with these key columns (a unique index
+    of `model`), creating it with `values` if missing. Does not commit.
+    """
+    row = dict(keys, count=delta, **values)
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(model).values(**row)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=list(keys), set_={"count": model.count + statement.excluded.count},
+        ))
+        return
+    updated = db.execute(
+        update(model)
+        .where(*[getattr(model, column) == value for column, value in keys.items()])
+        .values(count=model.count + delta)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.add(model(**row))
+        db.flush()
+
+# Advisory lock namespace of the post counters (pg_advisory_xact_lock(class, workspace_id))
+COUNTER_LOCK_CLASS = 0x506f7374 # "Post"
+
+def lock_counters(db: Session, workspace_id: int, exclusive: bool = False) -> None:
+    """
+    Take the workspace's counter lock until the transaction ends: shared for post
+    changes, exclusive for a recount. Does not commit.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        function = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        db.execute(
+            text(f"SELECT {function}(CAST(:lock_class AS integer), CAST(:workspace_id AS integer))"),
+            {"lock_class": COUNTER_LOCK_CLASS, "workspace_id": workspace_id},
+        )
+    elif dialect == "sqlite" and exclusive:
+        # A write (of nothing) takes the database's write lock now, and the count that
+        # follows reads in the same transaction: no change can commit in between
+        db.execute(update(StatusCount).where(StatusCount.workspace_id == workspace_id, literal(False)).values(count=StatusCount.count))
+
+def _adjust(db: Session, model, key: tuple, delta: int) -> None:
+    increment(db, model, dict(zip(KEYS[model], key)), delta)
+
+def record_change(db: Session, before: Optional[Bucket], after: Optional[Bucket]) -> None:
+    """
+    Move one post from bucket `before` to `after` (None: created / deleted). Does not commit.
+    """
+    if before != after:
+        lock_counters(db, (after or before)[0])
+    for model in (Rollup, StatusCount):
+        old, new = (_key(model, bucket) if bucket is not None else None for bucket in (before, after))
+        if old == new:
+            continue # e.g. a reschedule within the same status
+        if old is not None:
+            _adjust(db, model, old, -1)
+        if new is not None:
+            _adjust(db, model, new, 1)
+
+@traced("crud_post_rollup.get_daily_counts")
+def get_daily_counts(
+    db: Session,
+    workspace_id: int,
+    start_day: date,
+    end_day: date,
+    connected_account_id: Optional[int] = None,
+) -> List[dict]:
+    """
+    Post counts per day in [start_day, end_day] with their split by status, for days
+    that have posts. One range scan of the rollup index.
+    """
+    query = (
+        select(Rollup.day, Rollup.status, func.sum(Rollup.count))
+        .where(Rollup.workspace_id == workspace_id, Rollup.day >= start_day, Rollup.day <= end_day)
+        .group_by(Rollup.day, Rollup.status)
+        .order_by(Rollup.day)
+    )
+    if connected_account_id is not None:
+        query = query.where(Rollup.connected_account_id == connected_account_id)
+    days: Dict[date, dict] = {}
+    for day, status, count in db.execute(query):
+        if not count:
+            continue
+        entry = days.setdefault(day, {"day": day, "total": 0, "by_status": {}})
+        entry["total"] += int(count)
+        entry["by_status"][models.PostStatus(status).value] = int(count)
+    return list(days.values())
+
+def get_status_counts(db: Session, workspace_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """
+    Post counts by status of each of the workspaces, as {workspace_id: {status: count}}.
+    One grouped query over a handful of rows per workspace.
+    """
+    counts: Dict[int, Dict[str, int]] = {}
+    rows = db.execute(
+        select(StatusCount.workspace_id, StatusCount.status, func.sum(StatusCount.count))
+        .where(StatusCount.workspace_id.in_(list(workspace_ids)))
+        .group_by(StatusCount.workspace_id, StatusCount.status)
+    )
+    for workspace_id, status, count in rows:
+        if count:
+            counts.setdefault(workspace_id, {})[models.PostStatus(status).value] = int(count)
+    return counts
+
+def _actual_counts(db: Session, workspace_id: int) -> Counter:
+    # Both tiers in one statement: an archive batch committing meanwhile is seen in one of them
+    tiers = [
+        select(model.scheduled_at, model.created_at, model.status, model.connected_account_id).where(model.workspace_id == workspace_id)
+        for model in (models.Post, models.PostArchive)
+    ]
+    counts: Counter = Counter()
+    for scheduled_at, created_at, status, account_id in db.execute(union_all(*tiers).execution_options(yield_per=10000)):
+        counts[(workspace_id, _day(scheduled_at, created_at), models.PostStatus(status), account_id)] += 1
+    return counts
+
+@traced("crud_post_rollup.reconcile_workspace")
+def reconcile_workspace(db: Session, workspace_id: int) -> int:
+    """
+    Recount the workspace's posts and correct the counters that drifted. Returns the
+    number of counter rows corrected. Commits.
+    """
+    # Changes that committed before the lock are in both the count and the counters;
+    # later ones wait and land their +1/-1 on top of the corrected values
+    lock_counters(db, workspace_id, exclusive=True)
+    stored = {}
+    for model in (Rollup, StatusCount):
+        rows = db.execute(select(model).where(model.workspace_id == workspace_id)).scalars()
+        stored[model] = Counter({tuple(getattr(row, column) for column in KEYS[model]): row.count for row in rows})
+    actual = {Rollup: _actual_counts(db, workspace_id), StatusCount: Counter()}
+    for bucket, count in actual[Rollup].items():
+        actual[StatusCount][_key(StatusCount, bucket)] += count
+
+    corrected = 0
+    for model in (Rollup, StatusCount):
+        for key in set(stored[model]) | set(actual[model]):
+            delta = actual[model][key] - stored[model][key]
+            if delta:
+                _adjust(db, model, key, delta)
+                corrected += 1
+        db.execute(delete(model).where(model.workspace_id == workspace_id, model.count == 0))
+    db.commit()
+    return corrected
+
+def reconcile(db: Session, workspace_ids: Optional[Iterable[int]] = None, exclude_workspace_ids=()) -> Dict[str, int]:
+    """
+    Reconcile the given workspaces, or every workspace with posts or counts in this
+    database, one transaction each. Returns totals.
+    """
+    if workspace_ids is None:
+        workspace_ids = db.execute(union(
+            select(models.Post.workspace_id), select(models.PostArchive.workspace_id),
+            select(Rollup.workspace_id), select(StatusCount.workspace_id),
+        )).scalars().all()
+    totals = {"workspaces": 0, "corrected": 0}
+    for workspace_id in sorted(set(workspace_ids) - set(exclude_workspace_ids)):
+        corrected = reconcile_workspace(db, workspace_id)
+        if corrected:
+            print(f"Post rollups: corrected {corrected} bucket(s) of workspace {workspace_id}")
+        totals["workspaces"] += 1
+        totals["corrected"] += corrected
+    return totals
@@ -0,0 +1,235 @@
+"""
+Full-text index over post content, per shard.
+
+- SQLite: an FTS5 table post_search(workspace, content) keyed by rowid = post id,
+  with the porter stemmer. Ranked with bm25.
+- Postgres: a post_search table (post_id, document tsvector) with a GIN index,
+  english configuration. Ranked with ts_rank_cd.
+
+The workspace is part of the index, so a workspace's matches are found there
+instead of filtering every match of a term across all workspaces. On SQLite
+every content word is indexed as w<workspace>x<word>: a term's doclist then
+only holds that workspace's posts (FTS5 would otherwise walk the term's global
+doclist). The workspace column is only used to drop a workspace's documents.
+On Postgres it is a lexeme the parser can never produce; GIN intersects it with
+the terms cheaply.
+
+Documents hold a post's effective content (its own, or its post group's). They
+are written in the caller's transaction by crud_post, crud_post_group, the
+archiver (hot posts only are searchable) and the deletion and shard-move jobs;
+rebuild_index() (python -m app.cli reindex-posts) fills it for existing data.
+Other dialects have no index and no search.
+"""
+import base64
+import json
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.tracing import traced
+
+def _dialect(db) -> str:
+    return db.get_bind().dialect.name
+
+def create_search_index(engine) -> None:
+    """
+    Create the index structures if missing (called by init_db on every shard).
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5("
+                "workspace, content, tokenize = 'porter unicode61 remove_diacritics 2')"
+            ))
+        elif engine.dialect.name == "postgresql":
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS post_search ("
+                "post_id INTEGER PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE, document tsvector NOT NULL)"
+            ))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_post_search_document ON post_search USING GIN (document)"))
+
+def _workspace_token(workspace_id: int) -> str:
+    return f"w{workspace_id}"
+
+def _words(content: str) -> List[str]:
+    # unicode61 also splits on "_", so it must not end up inside a scoped word
+    return re.findall(r"[^\W_]+", content.lower())
+
+def _scoped(workspace_id: int, words: Iterable[str]) -> List[str]:
+    return [f"{_workspace_token(workspace_id)}x{word}" for word in words]
+
+def _documents(db: Session, post_ids: Iterable[int]) -> List[dict]:
+    posts, groups = models.Post.__table__, models.PostGroup.__table__
+    rows = db.execute(
+        select(posts.c.id, posts.c.workspace_id, posts.c.content_text, groups.c.content_text)
+        .select_from(posts.outerjoin(groups, posts.c.group_id == groups.c.id))
+        .where(posts.c.id.in_(list(post_ids)))
+    ).all()
+    documents = [{"id": id_, "ws": _workspace_token(workspace_id), "content": own if own is not None else shared or ""}
+                 for id_, workspace_id, own, shared in rows]
+    if _dialect(db) == "sqlite":
+        for document, (_, workspace_id, _, _) in zip(documents, rows):
+            document["content"] = " ".join(_scoped(workspace_id, _words(document["content"])))
+    return documents
+
+@traced("crud_post_search.index_posts")
+def index_posts(db: Session, post_ids: Iterable[int]) -> int:
+    """
+    (Re)index the given hot posts from their current content. Does not commit.
+    """
+    post_ids = list(post_ids)
+    dialect = _dialect(db)
+    if not post_ids or dialect not in ("sqlite", "postgresql"):
+        return 0
+    db.flush() # Index what the caller just wrote
+    documents = _documents(db, post_ids)
+    if dialect == "sqlite":
+        unindex_posts(db, post_ids)
+        if documents:
+            db.execute(text("INSERT INTO post_search (rowid, workspace, content) VALUES (:id, :ws, :content)"), documents)
+    elif documents:
+        db.execute(text(
+            "INSERT INTO post_search (post_id, document) "
+            "VALUES (:id, to_tsvector('english', :content) || array_to_tsvector(ARRAY['~' || :ws])) "
+            "ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document"
+        ), documents)
+    return len(documents)
+
+def unindex_posts(db: Session, post_ids: Iterable[int]) -> None:
+    """
+    Drop the documents of posts that are deleted or leave the hot table. Does not commit.
+    """
+    post_ids = list(post_ids)
+    dialect = _dialect(db)
+    if not post_ids or dialect not in ("sqlite", "postgresql"):
+        return
+    key = "rowid" if dialect == "sqlite" else "post_id"
+    db.execute(text(f"DELETE FROM post_search WHERE {key} IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": post_ids})
+
+def reindex_group(db: Session, group_id: int) -> int:
+    """
+    Reindex the hot posts sharing a group's content after it changed. Does not commit.
+    """
+    ids = db.execute(select(models.Post.id).where(models.Post.group_id == group_id)).scalars().all()
+    return index_posts(db, ids)
+
+def rebuild_index(db: Session, workspace_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """
+    Index every hot post (of one workspace, or all), in keyset batches of batch_size
+    with a commit each. Returns the number of posts indexed.
+    """
+    indexed, last = 0, 0
+    while True:
+        query = select(models.Post.id).where(models.Post.id > last).order_by(models.Post.id).limit(batch_size)
+        if workspace_id is not None:
+            query = query.where(models.Post.workspace_id == workspace_id)
+        ids = db.execute(query).scalars().all()
+        if not ids:
+            return indexed
+        indexed += index_posts(db, ids)
+        db.commit()
+        last = ids[-1]
+
+def unindex_workspace(db: Session, workspace_id: int, batch_size: int = 5000) -> None:
+    """
+    Drop a workspace's documents in batches (its posts left this shard). Commits.
+    On Postgres they went with the posts (ON DELETE CASCADE).
+    """
+    if _dialect(db) != "sqlite":
+        return
+    while True:
+        ids = db.execute(text("SELECT rowid FROM post_search WHERE post_search MATCH :match LIMIT :n"),
+                         {"match": f'workspace : "{_workspace_token(workspace_id)}"', "n": batch_size}).scalars().all()
+        unindex_posts(db, ids)
+        db.commit()
+        if len(ids) < batch_size:
+            return
+
+# --- Search ---
+
+def encode_cursor(score: float, post_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, post_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(post_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+@traced("crud_post_search.search_posts")
+def search_posts(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    statuses: Optional[List[models.PostStatus]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[models.Post], Optional[str]]:
+    """
+    Hot posts of the workspace whose content matches every word of `query` (stemmed;
+    a trailing * makes the last word a prefix, which is slower), best match first,
+    optionally filtered by status and scheduled_at.
+    Returns the page and the cursor of the next one (None on the last page).
+    Raises ValueError for a malformed cursor, NotImplementedError on a database other
+    than SQLite or Postgres (no index).
+    """
+    terms = _words(query)
+    if not terms:
+        return [], None
+    prefix = query.rstrip().endswith("*")
+    after = decode_cursor(cursor) if cursor else None
+    dialect = _dialect(db)
+
+    filters, params = ["p.workspace_id = :workspace_id"], {"workspace_id": workspace_id, "limit": limit + 1}
+    if statuses:
+        filters.append("p.status IN :statuses")
+        params["statuses"] = [models.PostStatus(status).name for status in statuses] # Stored by name
+    if start_date:
+        filters.append("p.scheduled_at >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        filters.append("p.scheduled_at <= :end_date")
+        params["end_date"] = end_date
+    if after:
+        filters.append("(s.score > :after_score OR (s.score = :after_score AND s.id > :after_id))")
+        params["after_score"], params["after_id"] = after
+
+    # Every source yields (id, score), lower scores first
+    if dialect == "sqlite":
+        words = " AND ".join(f'"{term}"' for term in _scoped(workspace_id, terms)) + ("*" if prefix else "")
+        params["match"] = f"content : ({words})"
+        source = "SELECT rowid AS id, bm25(post_search, 0.0, 1.0) AS score FROM post_search WHERE post_search MATCH :match"
+    elif dialect == "postgresql":
+        params["tsquery"] = " & ".join(terms) + (":*" if prefix else "")
+        params["workspace_lexeme"] = f"'~{_workspace_token(workspace_id)}'"
+        source = (
+            "SELECT post_id AS id, -ts_rank_cd(document, q) AS score "
+            "FROM post_search, to_tsquery('english', :tsquery) AS q "
+            "WHERE document @@ (q && CAST(:workspace_lexeme AS tsquery))"
+        )
+    else:
+        raise NotImplementedError(f"Post search is not available on {dialect}")
+
+    statement = text(
+        f"SELECT s.id, s.score FROM ({source}) AS s JOIN posts AS p ON p.id = s.id "
+        f"WHERE {' AND '.join(filters)} ORDER BY s.score, s.id LIMIT :limit"
+    )
+    if statuses:
+        statement = statement.bindparams(bindparam("statuses", expanding=True))
+    for name in ("start_date", "end_date"):
+        if name in params: # Stored the way the column type stores them (SQLite keeps text)
+            statement = statement.bindparams(bindparam(name, type_=models.Post.scheduled_at.type))
+    rows = db.execute(statement, params).all()
+
+    page, more = rows[:limit], len(rows) > limit
+    posts = {post.id: post for post in db.query(models.Post).filter(models.Post.id.in_([row.id for row in page])).all()}
+    results = [posts[row.id] for row in page if row.id in posts]
+    next_cursor = encode_cursor(page[-1].score, page[-1].id) if more else None
+    return results, next_cursor
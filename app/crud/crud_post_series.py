@@ -0,0 +1,321 @@
+"""
+Recurring post series (models.PostSeries): a content template (a PostGroup) plus a
+daily or weekly rule, instead of hundreds of pre-created posts.
+
+- Occurrences become Post rows (series_id set, content shared through the group)
+  only within POST_SERIES_HORIZON_HOURS: materialize_due() runs from the beat
+  task materialize_post_series_task and advances each series' materialized_until.
+  Occurrences the materializer missed while it was down are skipped, not published
+  in a burst.
+- Occurrences count towards the account's spacing (crud_schedule) whether or not
+  they are posts yet. A new or edited series is checked over its next
+  POST_SERIES_CHECK_DAYS; materialize_due() checks each occurrence again against
+  the posts, and skips (and logs) one that conflicts.
+- Later occurrences are expanded on the fly for calendar reads
+  (get_virtual_occurrences): the rule is arithmetic, so expansion jumps straight to
+  the requested range and costs only the occurrences returned, however long the
+  range or old the series.
+- Edits never rewrite history. Content edits go to the group, and published
+  occurrences keep the content they went out with (as for group edits). Rule edits,
+  pauses and ends drop the materialized occurrences not published yet and
+  rematerialize from now. An occurrence moved individually leaves its series
+  (crud_post.update_post), so series edits do not move it back.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Iterator, List, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from .. import schemas
+from ..core.config import settings
+from ..core.tracing import traced
+from . import crud_outbox, crud_post_group, crud_post_rollup, crud_post_search, crud_schedule
+from .crud_outbox import as_utc
+
+# Fields of PostSeriesUpdate that change which occurrences exist
+RULE_FIELDS = ("frequency", "interval", "weekdays", "starts_at", "ends_at", "is_active")
+
+def _series_weekdays(series: models.PostSeries) -> List[int]:
+    weekdays = sorted(set(series.weekdays or [as_utc(series.starts_at).weekday()]))
+    if any(day < 0 or day > 6 for day in weekdays):
+        raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+    return weekdays
+
+def iter_occurrences(series: models.PostSeries, start: datetime, end: datetime) -> Iterator[datetime]:
+    """
+    The series' occurrences in [start, end), in order (UTC). Jumps to the first period
+    overlapping `start` instead of walking from starts_at.
+    """
+    first = as_utc(series.starts_at)
+    start = max(as_utc(start), first)
+    end = min(as_utc(end), as_utc(series.ends_at)) if series.ends_at else as_utc(end)
+    if start >= end:
+        return
+    if models.SeriesFrequency(series.frequency) == models.SeriesFrequency.DAILY:
+        step = timedelta(days=series.interval)
+        at = first + -((first - start) // step) * step # The first occurrence at or after start
+        while at < end:
+            yield at
+            at += step
+        return
+    # Weekly: each period of `interval` weeks starts on the Monday of the first week
+    period = timedelta(weeks=series.interval)
+    midnight = first.replace(hour=0, minute=0, second=0, microsecond=0)
+    origin = midnight - timedelta(days=first.weekday())
+    offsets = [timedelta(days=day) + (first - midnight) for day in _series_weekdays(series)]
+    base = origin + ((start - origin) // period) * period
+    while base < end:
+        for offset in offsets:
+            at = base + offset
+            if at >= end:
+                return
+            if at >= start:
+                yield at
+        base += period
+
+@traced("crud_post_series.get_series")
+def get_series(db: Session, series_id: int) -> Optional[models.PostSeries]:
+    return db.query(models.PostSeries).filter(models.PostSeries.id == series_id).first()
+
+def get_series_for_workspace(db: Session, workspace_id: int) -> List[models.PostSeries]:
+    return db.query(models.PostSeries).filter(models.PostSeries.workspace_id == workspace_id).order_by(models.PostSeries.id).all()
+
+def _horizon(now: datetime) -> datetime:
+    return now + timedelta(hours=settings.POST_SERIES_HORIZON_HOURS)
+
+def _proposals(series: models.PostSeries, start: datetime, end: datetime) -> List[crud_schedule.Proposal]:
+    return [crud_schedule.Proposal(series.connected_account_id, at, series_id=series.id) for at in iter_occurrences(series, start, end)]
+
+def _check_spacing(db: Session, series: models.PostSeries, now: datetime) -> None:
+    # The occurrences of the next POST_SERIES_CHECK_DAYS must respect the account's spacing
+    if series.is_active:
+        start = max(as_utc(series.materialized_until), now)
+        end = max(start + timedelta(days=settings.POST_SERIES_CHECK_DAYS), _horizon(now))
+        crud_schedule.check_schedule(db, series.workspace_id, _proposals(series, start, end))
+
+def _conflicting_occurrences(db: Session, series: models.PostSeries, until: datetime, now: datetime) -> set:
+    # Occurrences about to be materialized that conflict with the account's posts (e.g. further
+    # out than the check of the series, or the spacing changed since): skipped, and logged
+    proposals = _proposals(series, max(as_utc(series.materialized_until), now), until)
+    try:
+        # Against posts only: of two series due in one run, the one materialized first keeps its slot
+        conflicts = crud_schedule.find_conflicts(db, series.workspace_id, proposals, lock=True, series_occurrences=False)
+    except ValueError as e: # The account is being deleted (or left the workspace)
+        print(f"Series {series.id}: not materializing: {e}")
+        return {proposal.scheduled_at for proposal in proposals}
+    for conflict in conflicts:
+        print(f"Series {series.id}: skipping the occurrence at {conflict['scheduled_at'].isoformat()}: "
+              f"within {conflict['min_spacing_seconds']}s of {conflict['conflicting_scheduled_at'].isoformat()}")
+    return {conflict["scheduled_at"] for conflict in conflicts}
+
+def _materialize(db: Session, series: models.PostSeries, until: datetime, now: datetime, skip=frozenset()) -> List[models.Post]:
+    # Create the posts of the occurrences in [materialized_until, until) that are not past
+    # (nor in `skip`). Does not commit.
+    db_posts = [
+        models.Post(
+            workspace_id=series.workspace_id,
+            connected_account_id=series.connected_account_id,
+            author_id=series.author_id,
+            group_id=series.group_id,
+            series_id=series.id,
+            status=models.PostStatus.SCHEDULED,
+            scheduled_at=at,
+        )
+        for at in iter_occurrences(series, max(as_utc(series.materialized_until), now), until)
+        if at not in skip
+    ]
+    if db_posts:
+        db.add_all(db_posts)
+        db.flush() # Assigns ids for the outbox messages
+        for db_post in db_posts:
+            crud_outbox.add_publish_message(db, db_post)
+            crud_post_rollup.record_change(db, None, crud_post_rollup.bucket_of(db_post))
+        crud_post_search.index_posts(db, [db_post.id for db_post in db_posts])
+    series.materialized_until = min(until, as_utc(series.ends_at)) if series.ends_at else until
+    return db_posts
+
+def _drop_pending(db: Session, series: models.PostSeries, now: datetime) -> int:
+    # Remove the materialized occurrences that are still to be published. Does not commit.
+    db_posts = db.query(models.Post).filter(
+        models.Post.series_id == series.id,
+        models.Post.status == models.PostStatus.SCHEDULED,
+        models.Post.scheduled_at >= now,
+    ).all()
+    for db_post in db_posts:
+        crud_outbox.cancel_pending_for_post(db, db_post.id)
+        crud_post_rollup.record_change(db, crud_post_rollup.bucket_of(db_post), None)
+        db.delete(db_post)
+    crud_post_search.unindex_posts(db, [db_post.id for db_post in db_posts])
+    db.flush()
+    return len(db_posts)
+
+@traced("crud_post_series.create_series")
+def create_series(db: Session, workspace_id: int, series_in: schemas.PostSeriesCreate, author_id: Optional[int] = None) -> models.PostSeries:
+    """
+    Create the series and its template, and materialize the occurrences within the
+    horizon, in one transaction. Raises ValueError for an account not in the workspace
+    or an invalid rule, crud_schedule.ScheduleConflictError if its occurrences of the
+    next POST_SERIES_CHECK_DAYS break the account's spacing.
+    """
+    now = datetime.now(timezone.utc)
+    db_series = models.PostSeries(
+        workspace_id=workspace_id,
+        connected_account_id=series_in.connected_account_id,
+        author_id=author_id,
+        frequency=models.SeriesFrequency(series_in.frequency),
+        interval=series_in.interval,
+        weekdays=series_in.weekdays,
+        starts_at=series_in.starts_at,
+        ends_at=series_in.ends_at,
+        is_active=True,
+        materialized_until=max(as_utc(series_in.starts_at), now),
+    )
+    _series_weekdays(db_series) # Validates them
+    account = db.query(models.ConnectedAccount).filter(
+        models.ConnectedAccount.id == series_in.connected_account_id,
+        models.ConnectedAccount.workspace_id == workspace_id,
+        models.ConnectedAccount.deleting_at.is_(None),
+    ).first()
+    if account is None:
+        raise ValueError(f"Connected account {series_in.connected_account_id} not found in this workspace")
+    _check_spacing(db, db_series, now)
+    db_series.group = models.PostGroup(
+        workspace_id=workspace_id,
+        author_id=author_id,
+        content_text=series_in.content_text,
+        media_url=str(series_in.media_url) if series_in.media_url else None,
+    )
+    db.add(db_series)
+    db.flush() # Assigns the ids the posts refer to
+    _materialize(db, db_series, _horizon(now), now)
+    db.commit()
+    db.refresh(db_series)
+    return db_series
+
+@traced("crud_post_series.update_series")
+def update_series(db: Session, series_id: int, series_update: schemas.PostSeriesUpdate) -> Optional[models.PostSeries]:
+    """
+    Edit the template and/or the rule, in one transaction. Published occurrences are
+    left as they went out; pending ones follow the edit (see the module docstring).
+    """
+    db_series = get_series(db, series_id)
+    if not db_series:
+        return None
+    now = datetime.now(timezone.utc)
+    update_data = series_update.model_dump(exclude_unset=True)
+
+    content = {key: update_data.pop(key) for key in ("content_text", "media_url") if key in update_data}
+    if content.get("media_url") is not None:
+        content["media_url"] = str(content["media_url"])
+    if content:
+        crud_post_group._freeze_published_content(db, db_series.group)
+        for key, value in content.items():
+            setattr(db_series.group, key, value)
+
+    if any(key in RULE_FIELDS for key in update_data):
+        _drop_pending(db, db_series, now)
+        for key, value in update_data.items():
+            setattr(db_series, key, models.SeriesFrequency(value) if key == "frequency" else value)
+        _series_weekdays(db_series)
+        # From now on under the new rule; earlier occurrences stay as they happened
+        db_series.materialized_until = max(as_utc(db_series.starts_at), now)
+        _check_spacing(db, db_series, now)
+        if db_series.is_active:
+            _materialize(db, db_series, _horizon(now), now)
+    if "content_text" in content:
+        crud_post_search.reindex_group(db, db_series.group_id)
+    db.commit()
+    db.refresh(db_series)
+    return db_series
+
+@traced("crud_post_series.end_series")
+def end_series(db: Session, series_id: int) -> Optional[models.PostSeries]:
+    """
+    Stop the series now: its pending occurrences are removed, its published ones stay.
+    """
+    db_series = get_series(db, series_id)
+    if not db_series:
+        return None
+    now = datetime.now(timezone.utc)
+    _drop_pending(db, db_series, now)
+    db_series.ends_at = db_series.materialized_until = now
+    db_series.is_active = False
+    db.commit()
+    db.refresh(db_series)
+    return db_series
+
+@traced("crud_post_series.get_virtual_occurrences")
+def get_virtual_occurrences(
+    db: Session,
+    workspace_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    connected_account_id: Optional[int] = None,
+    limit: int = 1000,
+) -> List[dict]:
+    """
+    Occurrences in [start_date, end_date) of the workspace's active series that are not
+    posts yet (at or after their materialized_until, and not past), ordered by time, at
+    most `limit`. Merged lazily across series, so only what is returned is expanded.
+    Posts of materialized occurrences come from the post listings as usual.
+    """
+    now = datetime.now(timezone.utc)
+    query = db.query(models.PostSeries).filter(
+        models.PostSeries.workspace_id == workspace_id,
+        models.PostSeries.is_active.is_(True),
+        models.PostSeries.starts_at < end_date,
+        or_(models.PostSeries.ends_at.is_(None), models.PostSeries.ends_at > start_date),
+    )
+    if connected_account_id is not None:
+        query = query.filter(models.PostSeries.connected_account_id == connected_account_id)
+
+    def occurrences(series: models.PostSeries) -> Iterator[tuple]:
+        start = max(as_utc(start_date), as_utc(series.materialized_until), now)
+        for at in iter_occurrences(series, start, end_date):
+            yield at, series.id, series
+
+    merged = heapq.merge(*[occurrences(series) for series in query.all()], key=lambda entry: entry[:2])
+    return [
+        {
+            "series_id": series.id,
+            "connected_account_id": series.connected_account_id,
+            "scheduled_at": at,
+            "content_text": series.group.content_text,
+            "media_url": series.group.media_url,
+        }
+        for at, _, series in islice(merged, limit)
+    ]
+
+@traced("crud_post_series.materialize_due")
+def materialize_due(db: Session, batch_size: Optional[int] = None, exclude_workspace_ids=()) -> int:
+    """
+    Materialize the occurrences entering the horizon for every active series that fell
+    behind it, batch_size series per transaction. Returns the number of posts created.
+    Commits. Occurrences that conflict with the account's posts are skipped.
+    """
+    batch_size = batch_size or settings.POST_SERIES_BATCH_SIZE
+    now = datetime.now(timezone.utc)
+    until = _horizon(now)
+    created = 0
+    while True:
+        query = (
+            select(models.PostSeries.id)
+            .where(models.PostSeries.is_active.is_(True), models.PostSeries.materialized_until < until,
+                   or_(models.PostSeries.ends_at.is_(None), models.PostSeries.materialized_until < models.PostSeries.ends_at))
+            .order_by(models.PostSeries.materialized_until)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True) # Postgres: concurrent runs take different series
+        )
+        if exclude_workspace_ids:
+            query = query.where(models.PostSeries.workspace_id.notin_(list(exclude_workspace_ids)))
+        ids = db.execute(query).scalars().all()
+        if ids:
+            for db_series in db.query(models.PostSeries).filter(models.PostSeries.id.in_(ids)).all():
+                created += len(_materialize(db, db_series, until, now, skip=_conflicting_occurrences(db, db_series, until, now)))
+        db.commit()
+        if len(ids) < batch_size:
+            return created
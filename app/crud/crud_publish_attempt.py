@@ -0,0 +1,162 @@
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+
+from app import models
+from .crud_outbox import as_utc
+
+# Upper bounds (ms) of the latency histogram buckets kept in the rollups; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+def insert_attempts(db: Session, rows: List[dict]) -> None:
+    """
+    Bulk insert ledger rows (one executemany). Does not commit.
+    """
+    if rows:
+        db.execute(insert(models.PublishAttempt), rows)
+
+def get_attempts_for_post(db: Session, post_id: int) -> List[models.PublishAttempt]:
+    return (
+        db.query(models.PublishAttempt)
+        .filter(models.PublishAttempt.post_id == post_id)
+        .order_by(models.PublishAttempt.created_at, models.PublishAttempt.id)
+        .all()
+    )
+
+def hour_floor(value: datetime) -> datetime:
+    return as_utc(value).replace(minute=0, second=0, microsecond=0)
+
+def rollup_hours(db: Session, start: datetime, end: datetime) -> int:
+    """
+    Rebuild the hourly rollups for [hour_floor(start), end) from the ledger.
+    Idempotent; one grouped query per hour, served by the created_at index.
+    Returns the number of rollup rows written. Commits.
+    """
+    attempt = models.PublishAttempt
+    is_failure = case((attempt.outcome != "posted", 1), else_=0)
+    # Cumulative counts per bucket bound; differenced below into per-bucket counts
+    cumulative = [func.sum(case((attempt.latency_ms <= bound, 1), else_=0)) for bound in LATENCY_BUCKETS_MS]
+
+    hour = hour_floor(start)
+    end = as_utc(end)
+    written = 0
+    while hour < end:
+        next_hour = hour + timedelta(hours=1)
+        rows = (
+            db.query(
+                attempt.platform,
+                attempt.connected_account_id,
+                func.count(),
+                func.sum(is_failure),
+                func.sum(attempt.latency_ms),
+                *cumulative,
+            )
+            .filter(attempt.created_at >= hour, attempt.created_at < next_hour)
+            .group_by(attempt.platform, attempt.connected_account_id)
+            .all()
+        )
+        db.query(models.PublishAttemptRollup).filter(models.PublishAttemptRollup.bucket_start == hour).delete(synchronize_session=False)
+        rollups = []
+        for platform, account_id, count, failures, latency_sum, *cumulative_counts in rows:
+            cumulative_counts = [int(c or 0) for c in cumulative_counts] + [int(count)]
+            buckets = [cumulative_counts[0]] + [b - a for a, b in zip(cumulative_counts, cumulative_counts[1:])]
+            rollups.append({
+                "bucket_start": hour,
+                "platform": platform,
+                "connected_account_id": account_id,
+                "attempts": int(count),
+                "failures": int(failures or 0),
+                "latency_sum_ms": int(latency_sum or 0),
+                "latency_buckets": buckets,
+            })
+        if rollups:
+            db.execute(insert(models.PublishAttemptRollup), rollups)
+        written += len(rollups)
+        hour = next_hour
+    db.commit()
+    return written
+
+def latency_quantile(buckets: List[int], quantile: float) -> Optional[float]:
+    """
+    Estimate a latency quantile (ms) from histogram counts, interpolating linearly
+    within the bucket (as Prometheus' histogram_quantile does).
+    """
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = quantile * total
+    seen = 0
+    lower = 0
+    for index, count in enumerate(buckets):
+        if index == len(LATENCY_BUCKETS_MS):
+            return float(LATENCY_BUCKETS_MS[-1]) # Open-ended bucket: report its lower bound
+        upper = LATENCY_BUCKETS_MS[index]
+        if count and seen + count >= rank:
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    return float(LATENCY_BUCKETS_MS[-1])
+
+def get_attempt_stats(
+    db: Session,
+    start: datetime,
+    end: Optional[datetime] = None,
+    group_by: str = "platform",
+    bucket: str = "window",
+    platform: Optional[str] = None,
+    connected_account_id: Optional[int] = None,
+) -> List[dict]:
+    """
+    Failure rate and p95 latency from the hourly rollups.
+    group_by: "platform" or "account"; bucket: "hour", "day" or "window" (one row per group).
+    """
+    rollup = models.PublishAttemptRollup
+    query = db.query(rollup).filter(rollup.bucket_start >= hour_floor(start))
+    if end is not None:
+        query = query.filter(rollup.bucket_start < as_utc(end))
+    if platform:
+        query = query.filter(rollup.platform == platform.lower())
+    if connected_account_id is not None:
+        query = query.filter(rollup.connected_account_id == connected_account_id)
+
+    merged: Dict[tuple, dict] = {}
+    for row in query.order_by(rollup.bucket_start).all():
+        bucket_start = as_utc(row.bucket_start)
+        if bucket == "day":
+            bucket_start = bucket_start.replace(hour=0)
+        elif bucket == "window":
+            bucket_start = None
+        account_id = row.connected_account_id if group_by == "account" else None
+        key = (bucket_start, row.platform, account_id)
+        entry = merged.get(key)
+        if entry is None:
+            entry = merged[key] = {
+                "bucket_start": bucket_start,
+                "platform": row.platform,
+                "connected_account_id": account_id,
+                "attempts": 0,
+                "failures": 0,
+                "latency_sum_ms": 0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        entry["attempts"] += row.attempts
+        entry["failures"] += row.failures
+        entry["latency_sum_ms"] += row.latency_sum_ms
+        for index, count in enumerate(row.latency_buckets or ()):
+            entry["latency_buckets"][index] += count
+
+    results = []
+    for entry in merged.values():
+        attempts = entry["attempts"]
+        results.append({
+            "bucket_start": entry["bucket_start"],
+            "platform": entry["platform"],
+            "connected_account_id": entry["connected_account_id"],
+            "attempts": attempts,
+            "failures": entry["failures"],
+            "failure_rate": entry["failures"] / attempts if attempts else 0.0,
+            "avg_latency_ms": entry["latency_sum_ms"] / attempts if attempts else None,
+            "p95_latency_ms": latency_quantile(entry["latency_buckets"], 0.95),
+        })
+    return results
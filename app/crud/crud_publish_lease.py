@@ -0,0 +1,79 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+from app import models
+from .crud_outbox import as_utc
+from app.core.tracing import traced
+
+LEASE_ACQUIRED = "acquired"
+LEASE_HELD = "held"           # Another execution is calling the platform right now
+LEASE_COMPLETED = "completed" # Already published; lease.platform_post_id is set
+
+def get_lease(db: Session, idempotency_key: str) -> Optional[models.PublishLease]:
+    return db.query(models.PublishLease).filter(models.PublishLease.idempotency_key == idempotency_key).populate_existing().first()
+
+@traced("crud_publish_lease.acquire_lease")
+def acquire_lease(db: Session, idempotency_key: str, post_id: int, holder: str, lease_seconds: int) -> Tuple[str, models.PublishLease]:
+    """
+    Claim the publish attempt for `holder`. Commits, so other workers see the claim
+    before the platform is called. An expired lease (its holder died mid-call) is
+    taken over; the platform dedups that retry through the idempotency key.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=lease_seconds)
+    lease = get_lease(db, idempotency_key)
+    if lease is None:
+        lease = models.PublishLease(idempotency_key=idempotency_key, post_id=post_id, holder=holder, lease_expires_at=expires_at)
+        try:
+            with db.begin_nested():
+                db.add(lease)
+            db.commit()
+            return LEASE_ACQUIRED, lease
+        except IntegrityError:
+            lease = get_lease(db, idempotency_key) # Lost the race to another worker
+
+    if lease.completed_at is not None:
+        return LEASE_COMPLETED, lease
+
+    # Conditional update so only one worker can take over an expired lease
+    taken = (
+        db.query(models.PublishLease)
+        .filter(
+            models.PublishLease.idempotency_key == idempotency_key,
+            models.PublishLease.completed_at.is_(None),
+            models.PublishLease.lease_expires_at <= now,
+        )
+        .update({"holder": holder, "lease_expires_at": expires_at}, synchronize_session=False)
+    )
+    db.commit()
+    lease = get_lease(db, idempotency_key)
+    if taken:
+        return LEASE_ACQUIRED, lease
+    if lease.completed_at is not None:
+        return LEASE_COMPLETED, lease
+    return LEASE_HELD, lease
+
+def complete_lease(db: Session, idempotency_key: str, platform_post_id: str) -> None:
+    """
+    Record the platform's post id. Does not commit; commit together with the post status.
+    """
+    db.query(models.PublishLease).filter(models.PublishLease.idempotency_key == idempotency_key).update(
+        {"platform_post_id": platform_post_id, "completed_at": datetime.now(timezone.utc), "holder": None},
+        synchronize_session=False,
+    )
+
+def release_lease(db: Session, idempotency_key: str, holder: str) -> None:
+    """
+    Give up a lease after a failed call so the retry can claim it immediately.
+    """
+    db.query(models.PublishLease).filter(
+        models.PublishLease.idempotency_key == idempotency_key,
+        models.PublishLease.holder == holder,
+        models.PublishLease.completed_at.is_(None),
+    ).update({"holder": None, "lease_expires_at": datetime.now(timezone.utc)}, synchronize_session=False)
+    db.commit()
+
+def lease_seconds_remaining(lease: models.PublishLease) -> float:
+    return max((as_utc(lease.lease_expires_at) - datetime.now(timezone.utc)).total_seconds(), 0.0)
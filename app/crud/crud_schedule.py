@@ -0,0 +1,205 @@
+"""
+Minimum spacing between the scheduled posts of an account, so that a burst of posts
+on one account is refused when it is scheduled instead of hitting the platform's
+rate limits when it is published.
+
+An account's spacing is its own min_post_spacing_seconds if set, else its platform's
+entry in SCHEDULE_PLATFORM_MIN_SPACING, else SCHEDULE_MIN_SPACING_SECONDS (0: no
+check). Only SCHEDULED posts with a scheduled_at take part; drafts never publish.
+So do the occurrences of active post series that are not posts yet (expanded with
+crud_post_series.iter_occurrences): a post scheduled on a future occurrence, or a
+second series on the account, is refused as if the occurrences were posts.
+
+find_conflicts() checks a batch of proposed times with one range scan of
+ix_posts_account_scheduled per account, from its earliest proposal to its latest
+(+/- the spacing), then bisects each proposal into the sorted times found: the
+cost follows the posts around the proposals, not all the account has scheduled.
+(One scan of the span beats a query per proposal: fetching a covering-index row
+costs far less than building and running a statement.) The accounts' active series
+are read in one query and expanded over the same span.
+check_schedule() runs it with the accounts locked and raises ScheduleConflictError;
+crud_post and crud_post_group call it before every write that schedules a post.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from ..core.platform_catalog import platform_catalog
+from ..core.tracing import traced
+from .crud_outbox import as_utc
+
+class Proposal(NamedTuple):
+    connected_account_id: int
+    scheduled_at: datetime
+    post_id: Optional[int] = None # The post being moved, if any: its current time does not count
+    series_id: Optional[int] = None # The series it is an occurrence of: its other occurrences are proposals too
+
+class ScheduleConflictError(Exception):
+    """
+    Posts would be scheduled closer together than their account allows.
+    """
+    def __init__(self, conflicts: List[dict]):
+        self.conflicts = conflicts
+        first = conflicts[0]
+        if first["conflicting_post_id"] is not None:
+            other = f"post {first['conflicting_post_id']}"
+        elif first["conflicting_series_id"] is not None:
+            other = f"an occurrence of series {first['conflicting_series_id']}"
+        else:
+            other = "another post of the batch"
+        super().__init__(
+            f"Account {first['connected_account_id']} already has {other} scheduled at "
+            f"{first['conflicting_scheduled_at'].isoformat()}: posts must be at least "
+            f"{first['min_spacing_seconds']}s apart ({len(conflicts)} conflict(s))"
+        )
+
+@lru_cache(maxsize=4)
+def _parse_platform_spacing(value: str) -> Dict[str, int]:
+    spacings = {}
+    for entry in value.split(","):
+        if entry.strip():
+            name, _, seconds = entry.partition("=")
+            if not seconds.strip().isdigit():
+                raise ValueError(f"Invalid SCHEDULE_PLATFORM_MIN_SPACING entry {entry!r} (expected name=seconds)")
+            spacings[name.strip().lower()] = int(seconds)
+    return spacings
+
+def spacing_for(account: models.ConnectedAccount) -> int:
+    """
+    Minimum number of seconds between two scheduled posts of the account.
+    """
+    if account.min_post_spacing_seconds is not None:
+        return account.min_post_spacing_seconds
+    by_platform = _parse_platform_spacing(settings.SCHEDULE_PLATFORM_MIN_SPACING)
+    platform = (platform_catalog.get(account.platform_id) or account.platform) if by_platform else None
+    if platform is not None and platform.name.lower() in by_platform:
+        return by_platform[platform.name.lower()]
+    return settings.SCHEDULE_MIN_SPACING_SECONDS
+
+def _scheduled_between(db: Session, account_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, int]]:
+    # (scheduled_at, post id) of the account's scheduled posts strictly between start and end, by time
+    rows = db.execute(
+        select(models.Post.scheduled_at, models.Post.id)
+        .where(models.Post.connected_account_id == account_id, models.Post.status == models.PostStatus.SCHEDULED,
+               models.Post.scheduled_at > start, models.Post.scheduled_at < end)
+        .order_by(models.Post.scheduled_at)
+    )
+    return [(as_utc(at), post_id) for at, post_id in rows]
+
+def _series_occurrences(db: Session, account_ids: Iterable[int], exclude_series_ids) -> Dict[int, List[models.PostSeries]]:
+    # The accounts' active series, by account, but the ones being checked themselves
+    query = db.query(models.PostSeries).filter(
+        models.PostSeries.connected_account_id.in_(list(account_ids)), models.PostSeries.is_active.is_(True),
+    )
+    if exclude_series_ids:
+        query = query.filter(models.PostSeries.id.notin_(list(exclude_series_ids)))
+    by_account: Dict[int, List[models.PostSeries]] = {}
+    for series in query.all():
+        by_account.setdefault(series.connected_account_id, []).append(series)
+    return by_account
+
+def _occurrences_between(series_list: List[models.PostSeries], start: datetime, end: datetime, now: datetime) -> List[Tuple[datetime, None, int]]:
+    # (scheduled_at, None, series id) of the occurrences that are not posts yet (from materialized_until, not past)
+    from .crud_post_series import iter_occurrences # crud_post_series checks spacing with this module
+    return [
+        (at, None, series.id)
+        for series in series_list
+        for at in iter_occurrences(series, max(start, as_utc(series.materialized_until), now), end)
+    ]
+
+def _conflict(index: int, proposal: Proposal, spacing: int, other_at: datetime,
+              other_post_id: Optional[int] = None, other_index: Optional[int] = None,
+              other_series_id: Optional[int] = None) -> dict:
+    return {
+        "index": index,
+        "connected_account_id": proposal.connected_account_id,
+        "post_id": proposal.post_id,
+        "scheduled_at": as_utc(proposal.scheduled_at),
+        "conflicting_post_id": other_post_id,
+        "conflicting_index": other_index,
+        "conflicting_series_id": other_series_id,
+        "conflicting_scheduled_at": other_at,
+        "min_spacing_seconds": spacing,
+    }
+
+@traced("crud_schedule.find_conflicts")
+def find_conflicts(db: Session, workspace_id: int, proposals: Iterable[Proposal], lock: bool = False,
+                   series_occurrences: bool = True) -> List[dict]:
+    """
+    Pairs of posts that would be closer than their account's spacing if the proposals
+    were applied: each proposal (by its index in the batch) against the scheduled
+    posts of its account, the occurrences of its series not materialized yet (unless
+    series_occurrences=False), and the other proposals. The posts and series being
+    moved are checked at their proposed times only. Raises ValueError for accounts not
+    in the workspace. With lock=True the accounts are locked (Postgres) until the
+    transaction ends, so concurrent checks for the same accounts run one after the other.
+    """
+    proposals = list(proposals)
+    by_account: Dict[int, List[int]] = {}
+    for index, proposal in enumerate(proposals):
+        by_account.setdefault(proposal.connected_account_id, []).append(index)
+    if not by_account:
+        return []
+
+    query = db.query(models.ConnectedAccount).filter(
+        models.ConnectedAccount.id.in_(sorted(by_account)),
+        models.ConnectedAccount.workspace_id == workspace_id,
+        models.ConnectedAccount.deleting_at.is_(None),
+    )
+    if lock:
+        query = query.order_by(models.ConnectedAccount.id).with_for_update() # Always in id order: no deadlocks
+    accounts = {account.id: account for account in query.all()}
+    missing = set(by_account) - set(accounts)
+    if missing:
+        raise ValueError(f"Connected accounts not found in this workspace: {sorted(missing)}")
+    moving = {proposal.post_id for proposal in proposals if proposal.post_id is not None}
+    checked = [account_id for account_id, account in accounts.items() if spacing_for(account) > 0]
+    series = {}
+    if series_occurrences and checked:
+        series = _series_occurrences(db, checked, {proposal.series_id for proposal in proposals if proposal.series_id is not None})
+    now = datetime.now(timezone.utc)
+
+    conflicts = []
+    for account_id, indexes in by_account.items():
+        spacing = spacing_for(accounts[account_id])
+        if spacing <= 0:
+            continue
+        gap = timedelta(seconds=spacing)
+        indexes.sort(key=lambda index: (as_utc(proposals[index].scheduled_at), index))
+        times = [as_utc(proposals[index].scheduled_at) for index in indexes]
+
+        existing = [(at, post_id, None) for at, post_id in _scheduled_between(db, account_id, times[0] - gap, times[-1] + gap)
+                    if post_id not in moving]
+        if account_id in series:
+            existing = sorted(existing + _occurrences_between(series[account_id], times[0] - gap, times[-1] + gap, now),
+                              key=lambda entry: entry[0])
+        existing_times = [at for at, _, _ in existing]
+        for position, index in enumerate(indexes):
+            at = times[position]
+            for other_at, other_post_id, other_series_id in existing[bisect_right(existing_times, at - gap):bisect_left(existing_times, at + gap)]:
+                conflicts.append(_conflict(index, proposals[index], spacing, other_at, other_post_id=other_post_id, other_series_id=other_series_id))
+            # Against the later proposals of the account, while within the gap
+            for other_position in range(position + 1, len(indexes)):
+                if times[other_position] - at >= gap:
+                    break
+                conflicts.append(_conflict(index, proposals[index], spacing, times[other_position], other_index=indexes[other_position]))
+    return sorted(conflicts, key=lambda conflict: (conflict["index"], conflict["conflicting_scheduled_at"]))
+
+def check_schedule(db: Session, workspace_id: int, proposals: Iterable[Proposal]) -> None:
+    """
+    Raise ScheduleConflictError if the proposals break their accounts' spacing, else
+    keep the accounts locked for the rest of the caller's transaction.
+    """
+    conflicts = find_conflicts(db, workspace_id, proposals, lock=True)
+    if conflicts:
+        db.rollback() # Releases the locks
+        raise ScheduleConflictError(conflicts)
+
+def is_scheduled(status, scheduled_at: Optional[datetime]) -> bool:
+    return models.PostStatus(status) == models.PostStatus.SCHEDULED and scheduled_at is not None
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app import models, schemas
+from app.core.platform_catalog import platform_catalog
 
 def get_social_platform(db: Session, platform_id: int) -> Optional[models.SocialPlatform]:
     return db.query(models.SocialPlatform).filter(models.SocialPlatform.id == platform_id).first()
@@ -28,6 +29,7 @@ def create_social_platform(db: Session, platform_in: schemas.SocialPlatformCreat
     db.add(db_platform)
     db.commit()
     db.refresh(db_platform)
+    platform_catalog.invalidate()
     return db_platform
 
 # Optional: Update and Delete for social platforms, typically admin-only
@@ -46,6 +48,7 @@ def update_social_platform(db: Session, platform_id: int, platform_in: schemas.S
     db.add(db_platform)
     db.commit()
     db.refresh(db_platform)
+    platform_catalog.invalidate()
     return db_platform
 
 def delete_social_platform(db: Session, platform_id: int) -> Optional[models.SocialPlatform]:
@@ -54,4 +57,5 @@ def delete_social_platform(db: Session, platform_id: int) -> Optional[models.Soc
         # Consider if related ConnectedAccounts should be handled (e.g., set platform_id to null, or prevent delete if linked)
         db.delete(db_platform)
         db.commit()
+        platform_catalog.invalidate()
     return db_platform
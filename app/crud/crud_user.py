@@ -15,7 +15,7 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
 
 def authenticate_user(db: Session, email: str, password: str) -> models.User | None:
     user = get_user_by_email(db, email=email)
-    if not user:
+    if not user or user.deleting_at is not None:
         return None
     if not verify_password(password, user.hashed_password):
         return None
@@ -24,13 +24,13 @@ def authenticate_user(db: Session, email: str, password: str) -> models.User | N
 from typing import List, Optional
 
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.query(models.User).filter(models.User.id == user_id, models.User.deleting_at.is_(None)).first()
 
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+    return db.query(models.User).filter(models.User.deleting_at.is_(None)).offset(skip).limit(limit).all()
 
 def update_user(db: Session, user_id: int, user_in: schemas.UserUpdate) -> Optional[models.User]:
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    db_user = get_user(db, user_id=user_id)
     if not db_user:
         return None
 
@@ -49,9 +49,11 @@ def update_user(db: Session, user_id: int, user_in: schemas.UserUpdate) -> Optio
     db.refresh(db_user)
     return db_user
 
-def delete_user(db: Session, user_id: int) -> Optional[models.User]:
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if db_user:
-        db.delete(db_user)
-        db.commit()
-    return db_user
+def delete_user(db: Session, user_id: int, requested_by: Optional[int] = None, account_dbs=()) -> Optional[models.DeletionJob]:
+    """
+    Hide the user and queue the removal of their accounts, posts and memberships
+    (app.services.deletion). account_dbs: shard sessions holding its accounts, when
+    not `db`. Returns the DeletionJob, or None if there is no such user.
+    """
+    from .crud_deletion_job import request_deletion
+    return request_deletion(db, "user", user_id, requested_by=requested_by, account_dbs=account_dbs)
@@ -1,10 +1,12 @@
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timezone
 
 from app import models, schemas
 
 def get_workspace(db: Session, workspace_id: int) -> Optional[models.Workspace]:
-    return db.query(models.Workspace).filter(models.Workspace.id == workspace_id).first()
+    return db.query(models.Workspace).filter(models.Workspace.id == workspace_id, models.Workspace.deleting_at.is_(None)).first()
 
 def is_user_member_of_workspace(db: Session, user_id: int, workspace_id: int) -> bool:
     workspace = get_workspace(db, workspace_id=workspace_id)
@@ -42,14 +44,50 @@ def get_workspaces_for_user(db: Session, user_id: int, skip: int = 0, limit: int
     return (
         db.query(models.Workspace)
         .join(models.user_workspace_association)
-        .filter(models.user_workspace_association.c.user_id == user_id)
+        .filter(models.user_workspace_association.c.user_id == user_id, models.Workspace.deleting_at.is_(None))
         .offset(skip)
         .limit(limit)
         .all()
     )
 
+def get_workspace_stats(db: Session, workspace_ids: Iterable[int], now: Optional[datetime] = None) -> Dict[int, dict]:
+    """
+    Accounts, post counts by status and next scheduled post of each workspace, as
+    {workspace_id: stats}, from the shard session holding them. Three grouped queries
+    for all the workspaces together: accounts, the post counters (crud_post_rollup)
+    and the earliest upcoming scheduled post (ix_posts_workspace_status_scheduled).
+    """
+    from .crud_post_rollup import get_status_counts
+
+    workspace_ids = list(workspace_ids)
+    stats = {
+        workspace_id: {"accounts": 0, "active_accounts": 0, "posts_by_status": {}, "next_scheduled_at": None}
+        for workspace_id in workspace_ids
+    }
+    if not workspace_ids:
+        return stats
+    account = models.ConnectedAccount
+    accounts = db.execute(
+        select(account.workspace_id, func.count(), func.sum(case((account.is_active.is_(True), 1), else_=0)))
+        .where(account.workspace_id.in_(workspace_ids), account.deleting_at.is_(None))
+        .group_by(account.workspace_id)
+    )
+    for workspace_id, total, active in accounts:
+        stats[workspace_id]["accounts"], stats[workspace_id]["active_accounts"] = total, int(active or 0)
+    for workspace_id, counts in get_status_counts(db, workspace_ids).items():
+        stats[workspace_id]["posts_by_status"] = counts
+    upcoming = db.execute(
+        select(models.Post.workspace_id, func.min(models.Post.scheduled_at))
+        .where(models.Post.workspace_id.in_(workspace_ids), models.Post.status == models.PostStatus.SCHEDULED,
+               models.Post.scheduled_at >= (now or datetime.now(timezone.utc)))
+        .group_by(models.Post.workspace_id)
+    )
+    for workspace_id, scheduled_at in upcoming:
+        stats[workspace_id]["next_scheduled_at"] = scheduled_at
+    return stats
+
 def update_workspace(db: Session, workspace_id: int, workspace_in: schemas.WorkspaceUpdate) -> Optional[models.Workspace]:
-    db_workspace = db.query(models.Workspace).filter(models.Workspace.id == workspace_id).first()
+    db_workspace = get_workspace(db, workspace_id=workspace_id)
     if not db_workspace:
         return None
 
@@ -62,13 +100,11 @@ def update_workspace(db: Session, workspace_id: int, workspace_in: schemas.Works
     db.refresh(db_workspace)
     return db_workspace
 
-def delete_workspace(db: Session, workspace_id: int) -> Optional[models.Workspace]:
-    db_workspace = db.query(models.Workspace).filter(models.Workspace.id == workspace_id).first()
-    if db_workspace:
-        # Consider implications: what happens to posts, connected_accounts in this workspace?
-        # SQLAlchemy can be configured for cascade deletes on relationships,
-        # or you might need to handle it manually here if specific logic is needed.
-        # For now, a simple delete:
-        db.delete(db_workspace)
-        db.commit()
-    return db_workspace
+def delete_workspace(db: Session, workspace_id: int, requested_by: Optional[int] = None, account_dbs=()) -> Optional[models.DeletionJob]:
+    """
+    Hide the workspace and queue the removal of its posts, accounts and memberships
+    (app.services.deletion). account_dbs: shard sessions holding its accounts, when
+    not `db`. Returns the DeletionJob, or None if there is no such workspace.
+    """
+    from .crud_deletion_job import request_deletion
+    return request_deletion(db, "workspace", workspace_id, requested_by=requested_by, account_dbs=account_dbs)
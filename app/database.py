@@ -1,23 +1,172 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
+from .core.metrics import instrument_engine
+from .core import profiling
+from .core.config import settings
+from .core.read_routing import ReplicaLagMonitor, route_read
+from .core.sharding import DEFAULT_SHARD, ShardMap, prepare_shard, shard_urls, sync_reference_tables
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db") # Default to SQLite for easy setup
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} # check_same_thread is only for SQLite
-)
+def _create_engine(url: str):
+    # check_same_thread is only for SQLite (other drivers reject unknown connect args)
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    new_engine = create_engine(url, connect_args=connect_args)
+    instrument_engine(new_engine) # Query counts/timings and pool checkout waits for /metrics
+    profiling.instrument_engine(new_engine) # SQL capture for profiled requests (no-op otherwise)
+    return new_engine
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replicas for GET routes; see app.core.read_routing. The lag monitor is started by the API lifespan.
+replica_engines = [_create_engine(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+replica_monitor = ReplicaLagMonitor(engine, replica_engines)
+
+# Workspace shards; see app.core.sharding. The default shard is the engine above.
+shard_engines = {DEFAULT_SHARD: engine, **{name: _create_engine(url) for name, url in shard_urls().items()}}
+shard_map = ShardMap(engine, list(shard_engines))
+
 Base = declarative_base()
 
+def init_db(bind=None):
+    """
+    Create any missing tables. Run explicitly (app lifespan when
+    DB_CREATE_TABLES_ON_STARTUP is set, or `python -m app.cli init-db`);
+    never at import time. It never alters existing tables: columns and indexes added
+    to them ship as Alembic revisions (`alembic upgrade head`, see migrations/README).
+    """
+    from . import models # Registers the models with Base.metadata
+    from .crud.crud_post_search import create_search_index
+    if bind is not None:
+        Base.metadata.create_all(bind=bind)
+        create_search_index(bind)
+        return
+    for index, (name, shard_engine) in enumerate(shard_engines.items()):
+        Base.metadata.create_all(bind=shard_engine)
+        create_search_index(shard_engine) # Not a mapped table: FTS5 / tsvector, by dialect
+        if name != DEFAULT_SHARD:
+            prepare_shard(shard_engine, index)
+    sync_platforms_to_shards()
+
+def sync_platforms_to_shards():
+    """
+    Copy the reference tables (platform catalog) from the default shard to the others.
+    """
+    if shard_map.sharded:
+        sync_reference_tables(engine, [e for name, e in shard_engines.items() if name != DEFAULT_SHARD])
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Session for read-only routes: on a replica within the lag budget, unless there are
+    none or the caller wrote recently (then the primary). Never write through it.
+    """
+    replica = route_read(replica_monitor, request.headers.get("authorization"))
+    db = SessionLocal(bind=replica) if replica is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# --- Shard routing ---
+
+def session_for_workspace(workspace_id: int | None):
+    """
+    A new session on the shard holding the workspace (the default shard for None).
+    """
+    return SessionLocal(bind=shard_engines[shard_map.shard_for(workspace_id)])
+
+@contextmanager
+def shard_sessions(default_db=None):
+    """
+    A session per shard, as {name: session}. `default_db` is reused for the default shard
+    (so single-shard setups keep one transaction); the other sessions are closed on exit.
+    """
+    sessions = {name: default_db if name == DEFAULT_SHARD and default_db is not None else SessionLocal(bind=shard_engine)
+                for name, shard_engine in shard_engines.items()}
+    try:
+        yield sessions
+    finally:
+        for session in sessions.values():
+            if session is not default_db:
+                session.close()
+
+def each_shard_session():
+    """
+    Yield (name, session) for every shard in turn, for background jobs that sweep all data.
+    """
+    for name, shard_engine in shard_engines.items():
+        db = SessionLocal(bind=shard_engine)
+        try:
+            yield name, db
+        finally:
+            db.close()
+
+def find_post_workspace(post_id: int) -> int | None:
+    """
+    The workspace of a post (hot or archived) on whichever shard has it.
+    """
+    for shard_engine in shard_engines.values():
+        with shard_engine.connect() as conn:
+            workspace_id = conn.execute(text(
+                "SELECT workspace_id FROM posts WHERE id = :id UNION ALL SELECT workspace_id FROM posts_archive WHERE id = :id"
+            ), {"id": post_id}).scalar()
+        if workspace_id is not None:
+            return workspace_id
+    return None
+
+def _workspace_session(workspace_id: int | None, db, for_write: bool):
+    shard, moving_to = shard_map.entry(workspace_id)
+    if for_write and moving_to is not None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="This workspace is being moved to another database; retry shortly",
+            headers={"Retry-After": str(int(settings.SHARD_MOVE_DRAIN_SECONDS))},
+        )
+    if shard == DEFAULT_SHARD:
+        yield db # Same session (and transaction) as the route's global reads
+        return
+    shard_db = SessionLocal(bind=shard_engines[shard])
+    try:
+        yield shard_db
+    finally:
+        shard_db.close()
+
+def get_workspace_db(workspace_id: int, db=Depends(get_db)):
+    """
+    Session on the shard of the workspace in the path, for routes that change its accounts
+    or posts. Refused with 503 while the workspace is being moved.
+    """
+    yield from _workspace_session(workspace_id, db, for_write=True)
+
+def get_workspace_read_db(workspace_id: int, db=Depends(get_read_db)):
+    """
+    Read-only session on the shard of the workspace in the path (replicas apply to the default shard).
+    """
+    yield from _workspace_session(workspace_id, db, for_write=False)
+
+def get_post_db(post_id: int, db=Depends(get_db)):
+    """
+    Session on the shard of the post in the path, for routes that change it.
+    """
+    workspace_id = find_post_workspace(post_id) if shard_map.sharded else None
+    yield from _workspace_session(workspace_id, db, for_write=True)
+
+def get_post_read_db(post_id: int, db=Depends(get_read_db)):
+    workspace_id = find_post_workspace(post_id) if shard_map.sharded else None
+    yield from _workspace_session(workspace_id, db, for_write=False)
@@ -5,20 +5,18 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.crud import crud_user # This will be created later
-from app.database import SessionLocal # Assuming this is how you get a DB session
+# Re-exported, not redefined: shard-routed dependencies (get_workspace_db, ...) reuse the route's
+# get_db session for the default shard, which only works if every route depends on this one function
+from app.database import get_db, get_read_db
 from app import models # Assuming your User model is here
 from app import schemas # Assuming your User schema is here
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+# Plain def: the user lookup is blocking DB I/O, so FastAPI runs it in the threadpool. As an
+# async def it blocked the event loop while waiting for a pooled connection, which stalled
+# the requests holding connections and deadlocked the server under load.
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -36,7 +34,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
 
     user = crud_user.get_user_by_email(db, email=token_data.email) # This function will be created in crud_user.py
-    if user is None:
+    if user is None or user.deleting_at is not None: # Tokens die with the account
         raise credentials_exception
     return user
 
@@ -44,3 +42,8 @@ async def get_current_active_user(current_user: models.User = Depends(get_curren
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
+
+async def get_current_active_superuser(current_user: models.User = Depends(get_current_active_user)) -> models.User:
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
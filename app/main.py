@@ -1,25 +1,54 @@
-from fastapi import FastAPI
-from .database import engine, Base # Import Base and engine
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from .database import init_db, replica_monitor
 from .core.config import settings # Import settings for API prefix
-# Import your models here to ensure they are registered with Base.metadata
-from . import models # This will make SQLAlchemy aware of your models
+from .core.platform_catalog import platform_catalog
+from .core.metrics import PrometheusMiddleware, render_latest
+from .core.profiling import ProfilingMiddleware, instrument_routes
+from .core.read_routing import ReadYourWritesMiddleware
+from .core.tracing import TracingMiddleware
 
-# Create database tables (For development only. Use Alembic for production)
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema creation is an explicit startup step, not an import side effect,
+    # so importing app.main (tests, tooling, cold starts) stays cheap.
+    if settings.DB_CREATE_TABLES_ON_STARTUP:
+        init_db()
+    try:
+        platform_catalog.load() # Preload; lookups load lazily if the database is not reachable yet
+    except Exception as e:
+        print(f"Platform catalog preload failed: {e}")
+    replica_monitor.start() # No-op without DATABASE_REPLICA_URLS
+    yield
+    replica_monitor.stop()
 
 app = FastAPI(
     title="Social Media Manager API",
     description="API for managing social media posts and accounts.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+app.add_middleware(ReadYourWritesMiddleware) # Pins writers to the primary for their next reads
+app.add_middleware(ProfilingMiddleware) # Opt-in via PROFILING_* settings; reports at /api/v1/admin/slow-requests
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(TracingMiddleware) # Outermost, so the request span covers the other middleware
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Social Media Manager API!"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus scrape endpoint; Celery workers serve the same metrics on CELERY_METRICS_PORT
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
 from .api import api_router # Import the consolidated API router
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+instrument_routes(app) # Lets the profiling middleware see inside sync (threadpool) endpoints
 
 # Expose Celery app for easier worker startup if desired, though worker can point to core.celery_app directly
 # from .core.celery_app import celery_app
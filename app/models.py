@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Enum as SAEnum, LargeBinary, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Enum as SAEnum, LargeBinary, Boolean, JSON, Index, SmallInteger, Date
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -21,6 +21,7 @@ class User(Base):
     full_name = Column(String, index=True)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    deleting_at = Column(DateTime(timezone=True), nullable=True) # Set while a DeletionJob removes the user; hidden from reads
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -34,6 +35,7 @@ class Workspace(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
     description = Column(String, nullable=True)
+    deleting_at = Column(DateTime(timezone=True), nullable=True) # Set while a DeletionJob removes the workspace; hidden from reads
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -67,6 +69,8 @@ class ConnectedAccount(Base):
     scopes = Column(String, nullable=True) # Comma-separated list of granted permissions
     is_active = Column(Boolean, default=True)
     last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    deleting_at = Column(DateTime(timezone=True), nullable=True) # Set while a DeletionJob removes the account (or its workspace/user)
+    min_post_spacing_seconds = Column(Integer, nullable=True) # Overrides the platform's minimum spacing of scheduled posts (crud_schedule)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -75,6 +79,15 @@ class ConnectedAccount(Base):
     platform = relationship("SocialPlatform", back_populates="connected_accounts")
     posts = relationship("Post", back_populates="connected_account")
 
+    __table_args__ = (
+        # The token refresh job scans refreshable accounts in expiry order
+        Index(
+            "ix_connected_accounts_token_expiry", "token_expires_at", "id",
+            postgresql_where=(is_active.is_(True)) & (_refresh_token.isnot(None)),
+            sqlite_where=(is_active.is_(True)) & (_refresh_token.isnot(None)),
+        ),
+    )
+
     @property
     def access_token(self) -> str:
         return decrypt_data(self._access_token)
@@ -103,18 +116,117 @@ class PostStatus(str, enum.Enum):
     ERROR = "error"
     ARCHIVED = "archived"
 
-class Post(Base):
+class PostGroup(Base):
+    """
+    Content shared by the posts created together for several accounts: the caption and
+    media are stored (and edited) once here, each target account gets a Post row carrying
+    only its own schedule, status and result. See GroupContentMixin.
+    """
+    __tablename__ = "post_groups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workspace_id = Column(Integer, ForeignKey('workspaces.id'), nullable=False, index=True)
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    content_text = Column(String, nullable=True)
+    media_url = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    posts = relationship("Post", back_populates="group")
+
+class SeriesFrequency(str, enum.Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+
+class PostSeries(Base):
+    """
+    A recurring post (weekly tips, an evergreen queue): content kept once in a PostGroup
+    (the template) plus a recurrence rule. Occurrences only become Post rows (with
+    series_id set) once they enter the materialization horizon; later ones are expanded
+    on the fly for calendar reads. See app.crud.crud_post_series.
+    """
+    __tablename__ = "post_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workspace_id = Column(Integer, ForeignKey('workspaces.id'), nullable=False)
+    connected_account_id = Column(Integer, ForeignKey('connected_accounts.id'), nullable=False)
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    group_id = Column(Integer, ForeignKey('post_groups.id'), nullable=False) # The template content
+    frequency = Column(SAEnum(SeriesFrequency), nullable=False)
+    interval = Column(Integer, default=1, nullable=False) # Every `interval` days / weeks
+    _weekdays = Column("weekdays", String, nullable=True) # Weekly: comma-separated, 0 = Monday; default the weekday of starts_at
+    starts_at = Column(DateTime(timezone=True), nullable=False) # First occurrence; all share its time of day (UTC)
+    ends_at = Column(DateTime(timezone=True), nullable=True) # No occurrences from then on
+    is_active = Column(Boolean, default=True, nullable=False) # Paused series neither materialize nor expand
+    materialized_until = Column(DateTime(timezone=True), nullable=False) # Occurrences before this are posts (or were skipped)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    group = relationship("PostGroup", lazy="joined")
+
+    @property
+    def weekdays(self) -> list[int] | None:
+        return [int(day) for day in self._weekdays.split(",")] if self._weekdays else None
+
+    @weekdays.setter
+    def weekdays(self, value: list[int] | None):
+        self._weekdays = ",".join(str(day) for day in sorted(set(value))) if value else None
+
+    @property
+    def content_text(self) -> str | None:
+        return self.group.content_text if self.group is not None else None
+
+    @property
+    def media_url(self) -> str | None:
+        return self.group.media_url if self.group is not None else None
+
+    __table_args__ = (
+        # The materializer picks active series whose horizon fell behind, oldest first
+        Index("ix_post_series_materialize", "is_active", "materialized_until"),
+        # Calendar expansion: a workspace's series
+        Index("ix_post_series_workspace", "workspace_id"),
+    )
+
+class GroupContentMixin:
+    """
+    content_text / media_url of a post: its own value if set, else its group's. Posts in
+    a group leave their own columns NULL; setting a value on one post overrides the
+    shared content for that target only.
+    """
+    @property
+    def content_text(self) -> str | None:
+        if self._content_text is None and self.group is not None:
+            return self.group.content_text
+        return self._content_text
+
+    @content_text.setter
+    def content_text(self, value: str | None):
+        self._content_text = value
+
+    @property
+    def media_url(self) -> str | None:
+        if self._media_url is None and self.group is not None:
+            return self.group.media_url
+        return self._media_url
+
+    @media_url.setter
+    def media_url(self, value: str | None):
+        self._media_url = value
+
+class Post(GroupContentMixin, Base):
     __tablename__ = "posts"
 
     id = Column(Integer, primary_key=True, index=True)
     workspace_id = Column(Integer, ForeignKey('workspaces.id'), nullable=False)
     connected_account_id = Column(Integer, ForeignKey('connected_accounts.id'), nullable=False)
     author_id = Column(Integer, ForeignKey('users.id'), nullable=True) # User who created/scheduled the post
+    group_id = Column(Integer, ForeignKey('post_groups.id'), nullable=True, index=True) # Shared content, if cross-posted
+    series_id = Column(Integer, ForeignKey('post_series.id'), nullable=True, index=True) # Materialized occurrence of a series
     
-    content_text = Column(String, nullable=True)
+    _content_text = Column("content_text", String, nullable=True)
     # content_media_urls = Column(JSON, nullable=True) # For multiple images/videos, store as list of URLs
     # For simplicity, let's start with a single media URL
-    media_url = Column(String, nullable=True)
+    _media_url = Column("media_url", String, nullable=True)
     status = Column(SAEnum(PostStatus), default=PostStatus.DRAFT, nullable=False)
     scheduled_at = Column(DateTime(timezone=True), nullable=True, index=True)
     posted_at = Column(DateTime(timezone=True), nullable=True)
@@ -127,6 +239,255 @@ class Post(Base):
     workspace = relationship("Workspace", back_populates="posts")
     connected_account = relationship("ConnectedAccount", back_populates="posts")
     author = relationship("User", back_populates="posts_created")
+    group = relationship("PostGroup", back_populates="posts", lazy="selectin") # One query per page, not per post
+
+    __table_args__ = (
+        # A workspace's posts by status and schedule (e.g. its next scheduled post)
+        Index("ix_posts_workspace_status_scheduled", "workspace_id", "status", "scheduled_at"),
+        # An account's posts around a time: the spacing check of crud_schedule
+        Index("ix_posts_account_scheduled", "connected_account_id", "scheduled_at", "status"),
+    )
+
+class PostArchive(GroupContentMixin, Base):
+    """
+    Cold tier for posts: POSTED and ARCHIVED posts older than POST_ARCHIVE_AFTER_DAYS
+    are moved here by the archiver (app.services.post_archiver), keeping the hot
+    posts table and its indexes small. Same columns and ids as posts; read-only.
+    No foreign keys, so archived history never blocks changes to the hot tables.
+    """
+    __tablename__ = "posts_archive"
+
+    id = Column(Integer, primary_key=True) # Same id as the post had in the posts table
+    workspace_id = Column(Integer, nullable=False)
+    connected_account_id = Column(Integer, nullable=False)
+    author_id = Column(Integer, nullable=True)
+    group_id = Column(Integer, nullable=True) # Post groups stay while archived posts refer to them
+    series_id = Column(Integer, nullable=True)
+    _content_text = Column("content_text", String, nullable=True)
+    _media_url = Column("media_url", String, nullable=True)
+    status = Column(SAEnum(PostStatus), nullable=False)
+    scheduled_at = Column(DateTime(timezone=True), nullable=True)
+    posted_at = Column(DateTime(timezone=True), nullable=True)
+    error_message = Column(String, nullable=True)
+    platform_post_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
+    group = relationship("PostGroup", primaryjoin="foreign(PostArchive.group_id) == PostGroup.id", lazy="selectin", viewonly=True)
+
+    __table_args__ = (
+        # Historical range queries are per workspace, by schedule time
+        Index("ix_posts_archive_workspace_scheduled", "workspace_id", "scheduled_at"),
+    )
+
+class OutboxMessage(Base):
+    """
+    Transactional outbox: a task to enqueue, written in the same transaction as
+    the post change that requires it and relayed to the broker afterwards
+    (see app.core.outbox_relay).
+    """
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_name = Column(String, nullable=False)
+    args = Column(JSON, nullable=False, default=list)
+    kwargs = Column(JSON, nullable=False, default=dict)
+    dedup_key = Column(String, nullable=False) # Unique among undispatched messages; also used to derive the Celery task id
+    traceparent = Column(String(55), nullable=True) # Trace context of the request that staged it
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete="CASCADE"), nullable=True, index=True)
+    eta = Column(DateTime(timezone=True), nullable=True) # When the task should run
+    available_at = Column(DateTime(timezone=True), nullable=False) # When the relay may send it (eta minus lookahead)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
+    dead_lettered_at = Column(DateTime(timezone=True), nullable=True) # Sending failed OUTBOX_RELAY_MAX_ATTEMPTS times; never sent
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # The relay only ever scans undispatched, live rows in due order
+        Index(
+            "ix_outbox_messages_pending", "available_at", "id",
+            postgresql_where=dispatched_at.is_(None) & dead_lettered_at.is_(None),
+            sqlite_where=dispatched_at.is_(None) & dead_lettered_at.is_(None),
+        ),
+        # A dispatched or dead-lettered message does not block staging the same task again
+        # (e.g. a failed post rescheduled to the same time)
+        Index(
+            "ux_outbox_messages_pending_dedup", "dedup_key", unique=True,
+            postgresql_where=dispatched_at.is_(None) & dead_lettered_at.is_(None),
+            sqlite_where=dispatched_at.is_(None) & dead_lettered_at.is_(None),
+        ),
+        # The retention purge walks dispatched rows from the oldest
+        Index(
+            "ix_outbox_messages_dispatched", "dispatched_at",
+            postgresql_where=dispatched_at.isnot(None),
+            sqlite_where=dispatched_at.isnot(None),
+        ),
+    )
+
+class PublishLease(Base):
+    """
+    One row per publish attempt (post + schedule), keyed by the idempotency key sent
+    to the platform. A worker holds the lease while it calls the platform; a completed
+    lease records the platform's post id so redelivered tasks never publish twice.
+    """
+    __tablename__ = "publish_leases"
+
+    idempotency_key = Column(String, primary_key=True)
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete="CASCADE"), nullable=False, index=True)
+    holder = Column(String, nullable=True) # Token of the task execution holding the lease
+    lease_expires_at = Column(DateTime(timezone=True), nullable=False)
+    platform_post_id = Column(String, nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PublishAttempt(Base):
+    """
+    Append-only ledger: one row per platform call made by publish_post_task.
+    Written in batches by the worker (app.core.attempt_ledger); dashboards read
+    PublishAttemptRollup instead of scanning this table.
+    """
+    __tablename__ = "publish_attempts"
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, nullable=False, index=True) # No FK: history outlives deleted posts
+    connected_account_id = Column(Integer, nullable=True)
+    platform = Column(String(32), nullable=False)
+    attempt = Column(SmallInteger, nullable=False) # 1-based
+    latency_ms = Column(Integer, nullable=False)
+    outcome = Column(String(16), nullable=False) # posted, retrying, failed
+    error_class = Column(String(16), nullable=True) # see app.services.platforms.ErrorClass
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class PublishAttemptRollup(Base):
+    """
+    Hourly aggregate of publish_attempts per platform and account, with a latency
+    histogram (counts per app.crud.crud_publish_attempt.LATENCY_BUCKETS_MS bucket).
+    """
+    __tablename__ = "publish_attempt_rollups"
+
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    platform = Column(String(32), nullable=False)
+    connected_account_id = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+    latency_sum_ms = Column(Integer, nullable=False, default=0)
+    latency_buckets = Column(JSON, nullable=False, default=list)
+
+    __table_args__ = (
+        Index("ux_publish_attempt_rollups_bucket", "bucket_start", "platform", "connected_account_id", unique=True),
+        Index("ix_publish_attempt_rollups_platform_account", "platform", "connected_account_id", "bucket_start"),
+    )
+
+class PostDailyCount(Base):
+    """
+    Number of posts, hot and archived, per workspace, UTC day, status and account: the
+    day of scheduled_at, or of created_at for unscheduled posts. Kept in step with every
+    post change by app.crud.crud_post_rollup, in the same transaction; its reconciliation
+    job repairs drift. No foreign keys, like the archive.
+    """
+    __tablename__ = "post_daily_counts"
+
+    id = Column(Integer, primary_key=True)
+    workspace_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    status = Column(SAEnum(PostStatus), nullable=False)
+    connected_account_id = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Also serves the per-day range query of a workspace
+        Index("ux_post_daily_counts_bucket", "workspace_id", "day", "status", "connected_account_id", unique=True),
+    )
+
+class PostStatusCount(Base):
+    """
+    Number of posts, hot and archived, per workspace, status and account: the same
+    counts as post_daily_counts without the day, small enough to sum for every
+    workspace of a user at once. Maintained alongside it.
+    """
+    __tablename__ = "post_status_counts"
+
+    id = Column(Integer, primary_key=True)
+    workspace_id = Column(Integer, nullable=False)
+    status = Column(SAEnum(PostStatus), nullable=False)
+    connected_account_id = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ux_post_status_counts_bucket", "workspace_id", "status", "connected_account_id", unique=True),
+    )
+
+class PostingHourCount(Base):
+    """
+    Number of posts an account published in each hour of the week (0 = Monday
+    00:00-01:00 UTC ... 167), from posted_at. Incremented as posts are published and
+    rebuilt from history by app.crud.crud_best_time; feeds the best-time
+    recommendations (app.services.best_time).
+    """
+    __tablename__ = "posting_hour_counts"
+
+    id = Column(Integer, primary_key=True)
+    workspace_id = Column(Integer, nullable=False)
+    connected_account_id = Column(Integer, nullable=False)
+    hour_of_week = Column(SmallInteger, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ux_posting_hour_counts_account_hour", "connected_account_id", "hour_of_week", unique=True),
+        Index("ix_posting_hour_counts_workspace", "workspace_id"),
+    )
+
+class DeletionJob(Base):
+    """
+    Background removal of a workspace, user or connected account and everything under
+    it, in bounded batches (app.services.deletion). The entity is marked deleting_at
+    when the job is requested and hidden from reads from then on; progress holds the
+    rows removed so far per table.
+    """
+    __tablename__ = "deletion_jobs"
+
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String(32), nullable=False) # workspace, user, connected_account
+    entity_id = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False, default="pending") # pending, running, done
+    requested_by = Column(Integer, nullable=True) # No FK: the requester may be deleted too
+    progress = Column(JSON, nullable=False, default=dict)
+    holder = Column(String, nullable=True) # Token of the execution running the job
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True) # Bumped after every batch
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # One job per entity: repeated delete requests return the existing job
+        Index("ux_deletion_jobs_entity", "entity_type", "entity_id", unique=True),
+    )
+
+class WorkspaceShard(Base):
+    """
+    Shard map (app.core.sharding): the database holding a workspace's accounts and posts.
+    Workspaces without a row are on the default shard. Global, like workspaces.
+    """
+    __tablename__ = "workspace_shards"
+
+    workspace_id = Column(Integer, primary_key=True) # No FK: removed by the deletion job, not by cascade
+    shard = Column(String(64), nullable=False)
+    moving_to = Column(String(64), nullable=True) # Set while app.services.shard_mover copies the workspace
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ReplicationHeartbeat(Base):
+    """
+    A single row whose timestamp the API bumps on the primary (app.core.read_routing).
+    Replicas receive it like any other write, so its age on a replica is that replica's lag.
+    """
+    __tablename__ = "replication_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    beat_at = Column(DateTime(timezone=True), nullable=False)
 
 # To create all tables in the database (run this once, e.g., in a migration script or initial setup)
 # from .database import engine
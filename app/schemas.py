@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, HttpUrl
-from typing import List, Optional, Union
-from datetime import datetime
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, HttpUrl
+from typing import Dict, List, Optional, Union
+from datetime import date, datetime
 
 # User Schemas
 class UserBase(BaseModel):
@@ -42,7 +42,7 @@ class WorkspaceUpdate(WorkspaceBase):
 
 class WorkspaceInDBBase(WorkspaceBase):
     id: int
-    owner_id: int
+    owner_id: Optional[int] = None # Not stored on workspaces (yet): members are in user_workspace
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -52,6 +52,15 @@ class WorkspaceInDBBase(WorkspaceBase):
 class Workspace(WorkspaceInDBBase):
     pass
 
+class WorkspaceStats(BaseModel):
+    accounts: int = 0
+    active_accounts: int = 0
+    posts_by_status: Dict[str, int] = {} # Hot and archived posts, e.g. {"scheduled": 12, "posted": 340}
+    next_scheduled_at: Optional[datetime] = None
+
+class WorkspaceWithStats(Workspace):
+    stats: Optional[WorkspaceStats] = None # Only with ?include_stats=true
+
 # SocialPlatform Schemas
 class SocialPlatformBase(BaseModel):
     name: str
@@ -77,12 +86,14 @@ class SocialPlatform(SocialPlatformInDBBase):
 
 # ConnectedAccount Schemas
 class ConnectedAccountBase(BaseModel):
-    account_name: str
-    account_id_on_platform: Optional[str] = None # e.g., Facebook Page ID, Twitter User ID
+    # The model columns are platform_account_name / platform_account_id; accept both when reading from ORM objects
+    account_name: str = Field(validation_alias=AliasChoices("account_name", "platform_account_name"))
+    account_id_on_platform: Optional[str] = Field(default=None, validation_alias=AliasChoices("account_id_on_platform", "platform_account_id")) # e.g., Facebook Page ID, Twitter User ID
     # access_token: str # Sensitive, will be handled carefully
     # refresh_token: Optional[str] = None # Sensitive
     # token_expires_at: Optional[datetime] = None
     is_active: bool = True
+    min_post_spacing_seconds: Optional[int] = Field(default=None, ge=0) # None: the platform's default spacing
 
 class ConnectedAccountCreate(ConnectedAccountBase):
     workspace_id: int
@@ -97,6 +108,7 @@ class ConnectedAccountUpdate(BaseModel):
     access_token: Optional[str] = None # For token refresh, will be encrypted
     refresh_token: Optional[str] = None # Will be encrypted
     token_expires_at: Optional[datetime] = None
+    min_post_spacing_seconds: Optional[int] = Field(default=None, ge=0)
 
 class ConnectedAccountInDBBase(ConnectedAccountBase):
     id: int
@@ -127,6 +139,7 @@ class PostBase(BaseModel):
 
 class PostCreateData(PostBase): # Renamed from PostCreate for clarity
     workspace_id: int
+    connected_account_id: Optional[int] = None # Set per target account by the API; ignored in requests
     # connected_account_id will be handled by PostCreateRequest for multiple accounts
 
 class PostCreateRequest(BaseModel): # New schema for API request
@@ -146,6 +159,8 @@ class PostInDBBase(PostBase):
     id: int
     workspace_id: int
     connected_account_id: int # Each post is linked to one specific account instance
+    group_id: Optional[int] = None # Set for posts sharing content with other accounts
+    series_id: Optional[int] = None # Set for occurrences of a recurring series
     created_at: datetime
     updated_at: Optional[datetime] = None
     connected_account: Optional[ConnectedAccount] = None # For eager loading
@@ -156,6 +171,132 @@ class PostInDBBase(PostBase):
 class Post(PostInDBBase):
     pass
 
+class PostSearchResults(BaseModel):
+    items: List[Post]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= for the next page; None on the last page
+
+class PostDayCount(BaseModel):
+    day: date # UTC
+    total: int
+    by_status: Dict[str, int] # e.g. {"scheduled": 3, "posted": 1}
+
+class BestTimeSlot(BaseModel):
+    at: datetime # Start of a whole hour, UTC
+    score: float # Share of the account's (smoothed) publishing history in that hour of the week
+
+class BestTimeSuggestion(BaseModel):
+    connected_account_id: int
+    platform_id: int
+    history_posts: int # Published posts the account's own histogram is built from
+    slots: List[BestTimeSlot]
+
+# Scheduling spacing (app.crud.crud_schedule)
+class PostReschedule(BaseModel):
+    post_id: int
+    scheduled_at: datetime
+
+class PostRescheduleRequest(BaseModel):
+    posts: List[PostReschedule]
+
+class ScheduleProposal(BaseModel):
+    connected_account_id: int
+    scheduled_at: datetime
+    post_id: Optional[int] = None # An existing post being moved: its current time is ignored
+
+class ScheduleConflictCheck(BaseModel):
+    posts: List[ScheduleProposal]
+
+class ScheduleConflict(BaseModel):
+    index: int # Of the proposal in the request
+    connected_account_id: int
+    post_id: Optional[int] = None
+    scheduled_at: datetime
+    conflicting_post_id: Optional[int] = None # A post already scheduled...
+    conflicting_index: Optional[int] = None # ...or another proposal of the request...
+    conflicting_series_id: Optional[int] = None # ...or an occurrence of a series not materialized yet
+    conflicting_scheduled_at: datetime
+    min_spacing_seconds: int
+
+# PostGroup Schemas: content shared by the posts created for several accounts at once
+class PostGroupUpdate(BaseModel):
+    content_text: Optional[str] = None
+    media_url: Optional[HttpUrl] = None
+    scheduled_at: Optional[datetime] = None # Reschedules every target not published yet
+
+class PostGroupTarget(BaseModel): # One account's copy: only what differs per account
+    id: int
+    connected_account_id: int
+    status: str
+    scheduled_at: Optional[datetime] = None
+    posted_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+    platform_post_id: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class PostGroup(BaseModel):
+    id: int
+    workspace_id: int
+    author_id: Optional[int] = None
+    content_text: Optional[str] = None
+    media_url: Optional[HttpUrl] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    targets: List[PostGroupTarget] = []
+
+    class Config:
+        from_attributes = True
+
+# PostSeries Schemas: recurring posts, materialized as they enter the scheduling horizon
+class PostSeriesCreate(BaseModel):
+    connected_account_id: int
+    content_text: Optional[str] = None
+    media_url: Optional[HttpUrl] = None
+    frequency: str = Field(pattern="^(daily|weekly)$")
+    interval: int = Field(1, ge=1, le=52) # Every `interval` days or weeks
+    weekdays: Optional[List[int]] = None # Weekly: 0 = Monday; default the weekday of starts_at
+    starts_at: datetime # The first occurrence; its time of day is every occurrence's
+    ends_at: Optional[datetime] = None
+
+class PostSeriesUpdate(BaseModel):
+    content_text: Optional[str] = None
+    media_url: Optional[HttpUrl] = None
+    frequency: Optional[str] = Field(None, pattern="^(daily|weekly)$")
+    interval: Optional[int] = Field(None, ge=1, le=52)
+    weekdays: Optional[List[int]] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    is_active: Optional[bool] = None # Pause or resume
+
+class PostSeries(BaseModel):
+    id: int
+    workspace_id: int
+    connected_account_id: int
+    author_id: Optional[int] = None
+    group_id: int
+    content_text: Optional[str] = None
+    media_url: Optional[HttpUrl] = None
+    frequency: str
+    interval: int
+    weekdays: Optional[List[int]] = None
+    starts_at: datetime
+    ends_at: Optional[datetime] = None
+    is_active: bool
+    materialized_until: datetime # Occurrences before this are posts; later ones are listed by /occurrences
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class SeriesOccurrence(BaseModel): # Not a post yet
+    series_id: int
+    connected_account_id: int
+    scheduled_at: datetime
+    content_text: Optional[str] = None
+    media_url: Optional[str] = None
+
 # Token Schemas (for authentication - placeholder)
 class Token(BaseModel):
     access_token: str
@@ -190,4 +331,49 @@ class PostIdea(BaseModel):
     brief: str
 
 class AIGeneratedIdeasResponse(BaseModel):
-    ideas: List[PostIdea]
\ No newline at end of file
+    ideas: List[PostIdea]
+
+# Admin / diagnostics Schemas
+class SlowRequestStatement(BaseModel):
+    statement: str
+    duration_ms: float
+
+class SlowRequestSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    route: str
+    status_code: int
+    started_at: datetime
+    duration_ms: float
+    sql_count: int
+    sql_total_ms: float
+
+class SlowRequestReport(SlowRequestSummary):
+    sql_statements: List[SlowRequestStatement]
+    profile: Optional[str] = None
+
+class PublishAttemptStats(BaseModel):
+    bucket_start: Optional[datetime] = None # None when aggregated over the whole window
+    platform: str
+    connected_account_id: Optional[int] = None # Set when grouped by account
+    attempts: int
+    failures: int
+    failure_rate: float
+    avg_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
+
+# Background deletion Schemas
+class DeletionJob(BaseModel):
+    id: int
+    entity_type: str
+    entity_id: int
+    status: str # pending, running, done
+    progress: dict # Rows removed so far per table
+    attempts: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1 @@
+# Integrations with external services (social platform APIs).
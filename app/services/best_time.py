@@ -0,0 +1,141 @@
+"""
+Best-time-to-post recommendations.
+
+There are no engagement metrics in the data, so an account's best hours are the
+hours of the week its posts have been going out successfully, from the
+histograms of app.crud.crud_best_time:
+
+- An account's histogram is smoothed towards its platform's (summed over every
+  account of the platform), weighted as BEST_TIME_PRIOR_WEIGHT posts, so a new
+  account starts from the platform's habits and moves to its own as it publishes.
+- Counts are spread to the neighbouring hours ([1/4, 1/2, 1/4], wrapping around
+  the week): a post that went out at 09:00 also speaks for 08:00 and 10:00.
+
+Account histograms are read on every call (one query for all the accounts, at most
+168 rows each), so a publish shows up in the next suggestion whichever process
+recorded it. Platform histograms, sums over every account of the platform that a
+publish barely moves, are cached per platform for BEST_TIME_CACHE_SECONDS in each
+process. suggest() then ranks the coming hours in a few NumPy operations, skipping
+hours within BEST_TIME_MIN_GAP_HOURS of the account's scheduled posts and of each other.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from ..crud import crud_best_time
+from ..crud.crud_outbox import as_utc
+
+HOURS_PER_WEEK = crud_best_time.HOURS_PER_WEEK
+NEIGHBOUR_WEIGHTS = (0.25, 0.5, 0.25)
+
+def _spread(counts: np.ndarray) -> np.ndarray:
+    before, here, after = NEIGHBOUR_WEIGHTS
+    counts = counts.astype(np.float64)
+    return before * np.roll(counts, 1) + here * counts + after * np.roll(counts, -1)
+
+def score_hours(account_counts: np.ndarray, platform_counts: np.ndarray, prior_weight: float) -> np.ndarray:
+    """
+    Probability-like score of each hour of the week for an account: its smoothed
+    share of posts, shrunk towards the platform's (itself Laplace-smoothed).
+    """
+    platform = _spread(platform_counts) + 1.0
+    platform /= platform.sum()
+    account = _spread(account_counts)
+    return (account + prior_weight * platform) / (account.sum() + prior_weight)
+
+class BestTimeRecommender:
+    def __init__(self, cache_seconds: float | None = None):
+        self.cache_seconds = settings.BEST_TIME_CACHE_SECONDS if cache_seconds is None else cache_seconds
+        self._platforms: Dict[int, Tuple[float, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < self.cache_seconds
+
+    def _platform_counts(self, db: Session, platform_id: int) -> np.ndarray:
+        cached = self._platforms.get(platform_id)
+        if cached is None or not self._fresh(cached[0]):
+            cached = (time.monotonic(), crud_best_time.get_platform_histogram(db, platform_id))
+            self._platforms[platform_id] = cached
+        return cached[1]
+
+    def scores(self, db: Session, accounts: List[models.ConnectedAccount]) -> Dict[int, Tuple[np.ndarray, int]]:
+        """
+        {account_id: (168 hour scores, number of published posts behind them)}.
+        """
+        histograms = crud_best_time.get_histograms(db, [account.id for account in accounts]) # One query for all
+        results = {}
+        with self._lock:
+            for account in accounts:
+                counts = histograms[account.id]
+                scores = score_hours(counts, self._platform_counts(db, account.platform_id), settings.BEST_TIME_PRIOR_WEIGHT)
+                results[account.id] = (scores, int(counts.sum()))
+        return results
+
+    def suggest(
+        self,
+        db: Session,
+        accounts: List[models.ConnectedAccount],
+        count: int = 5,
+        now: Optional[datetime] = None,
+        horizon_hours: Optional[int] = None,
+        min_gap_hours: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        The `count` best upcoming whole hours for each account, best first, as
+        [{connected_account_id, platform_id, history_posts, slots: [{at, score}]}].
+        """
+        horizon_hours = horizon_hours or settings.BEST_TIME_HORIZON_HOURS
+        min_gap_hours = settings.BEST_TIME_MIN_GAP_HOURS if min_gap_hours is None else min_gap_hours
+        start = as_utc(now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        offsets = np.arange(horizon_hours)
+        candidate_hours = (crud_best_time.hour_of_week(start) + offsets) % HOURS_PER_WEEK
+        end = start + timedelta(hours=horizon_hours)
+
+        # Hours already taken by scheduled posts, for all the accounts in one query
+        taken: Dict[int, List[int]] = {account.id: [] for account in accounts}
+        if accounts:
+            scheduled = db.execute(
+                select(models.Post.connected_account_id, models.Post.scheduled_at)
+                .where(models.Post.workspace_id.in_({account.workspace_id for account in accounts}),
+                       models.Post.status == models.PostStatus.SCHEDULED,
+                       models.Post.scheduled_at >= start - timedelta(hours=min_gap_hours),
+                       models.Post.scheduled_at < end + timedelta(hours=min_gap_hours),
+                       models.Post.connected_account_id.in_(list(taken)))
+            )
+            for account_id, scheduled_at in scheduled:
+                taken[account_id].append(int((as_utc(scheduled_at) - start).total_seconds() // 3600))
+
+        scores = self.scores(db, accounts)
+        results = []
+        for account in accounts:
+            hour_scores, history = scores[account.id]
+            candidate_scores = hour_scores[candidate_hours]
+            blocked = np.zeros(horizon_hours, dtype=bool)
+            for offset in taken[account.id]:
+                blocked[max(0, offset - min_gap_hours + 1):max(0, offset + min_gap_hours)] = True
+            slots = []
+            # Best score first, earliest first among equals
+            for offset in np.lexsort((offsets, -candidate_scores)):
+                if len(slots) == count:
+                    break
+                if blocked[offset]:
+                    continue
+                slots.append({"at": start + timedelta(hours=int(offset)), "score": round(float(candidate_scores[offset]), 6)})
+                blocked[max(0, offset - min_gap_hours + 1):offset + min_gap_hours] = True
+            results.append({
+                "connected_account_id": account.id,
+                "platform_id": account.platform_id,
+                "history_posts": history,
+                "slots": slots,
+            })
+        return results
+
+best_times = BestTimeRecommender()
@@ -0,0 +1,195 @@
+"""
+Background deletion of workspaces, users and connected accounts.
+
+DELETE endpoints only call crud_deletion_job.request_deletion(): the entity is
+marked deleting_at (hidden from reads, its accounts stop publishing) and a
+DeletionJob is committed together with an outbox message for
+run_deletion_job_task, so the request returns 202 in a few milliseconds however
+much data hangs off the entity.
+
+run_deletion_job() then walks the entity's plan: a list of steps, each removing
+(or detaching) at most DELETION_BATCH_SIZE child rows per transaction, with a
+short pause between batches so other writers get the tables in between. The
+entity row itself goes last. Progress per table and a heartbeat are written
+with every batch; a run that dies is picked up again by resume_deletion_jobs
+(beat task resume_deletion_jobs_task) and continues where it stopped, since
+every step only ever looks at what is left. With sharding, steps on accounts and
+posts run on the shard(s) holding them, the rest on the global database.
+"""
+import time
+import uuid
+from typing import Callable, List, Tuple
+
+from sqlalchemy import delete, exists, select, update
+
+from .. import models
+from ..crud import crud_post_search
+from ..core.config import settings
+
+Post = models.Post
+PostArchive = models.PostArchive
+PostDailyCount = models.PostDailyCount
+PostStatusCount = models.PostStatusCount
+PostingHourCount = models.PostingHourCount
+PostSeries = models.PostSeries
+PostGroup = models.PostGroup
+Account = models.ConnectedAccount
+memberships = models.user_workspace_association
+
+def _delete_posts(db, *criteria, batch_size: int) -> int:
+    ids = db.execute(select(Post.id).where(*criteria).limit(batch_size)).scalars().all()
+    if not ids:
+        return 0
+    # Dependent rows go explicitly: SQLite does not enforce ON DELETE CASCADE by default
+    db.execute(delete(models.OutboxMessage).where(models.OutboxMessage.post_id.in_(ids)))
+    db.execute(delete(models.PublishLease).where(models.PublishLease.post_id.in_(ids)))
+    crud_post_search.unindex_posts(db, ids)
+    return db.execute(delete(Post).where(Post.id.in_(ids))).rowcount
+
+def _delete_rows(db, model, *criteria, batch_size: int) -> int:
+    ids = db.execute(select(model.id).where(*criteria).limit(batch_size)).scalars().all()
+    if not ids:
+        return 0
+    return db.execute(delete(model).where(model.id.in_(ids))).rowcount
+
+def _delete_orphaned_groups(db, workspace_ids, batch_size: int) -> int:
+    # Groups whose last posts or series just went (as crud_post.delete_post does for one post)
+    return _delete_rows(
+        db, PostGroup, PostGroup.workspace_id.in_(workspace_ids),
+        ~exists().where(Post.group_id == PostGroup.id),
+        ~exists().where(PostArchive.group_id == PostGroup.id),
+        ~exists().where(PostSeries.group_id == PostGroup.id),
+        batch_size=batch_size,
+    )
+
+def _detach_author(db, model, user_id: int, batch_size: int) -> int:
+    ids = db.execute(select(model.id).where(model.author_id == user_id).limit(batch_size)).scalars().all()
+    if not ids:
+        return 0
+    return db.execute(update(model).where(model.id.in_(ids)).values(author_id=None)).rowcount
+
+def _delete_memberships(db, column, entity_id: int, batch_size: int) -> int:
+    # Association rows have no id column; the table holds one row per member, so one statement
+    return db.execute(delete(memberships).where(column == entity_id)).rowcount
+
+# A step removes (or detaches) at most batch_size rows and returns how many it touched;
+# it is repeated until it returns 0. Steps are keyed by the name recorded in progress and
+# run either on the global database or on the shards holding the entity's data.
+GLOBAL, SHARDS = "global", "shards"
+Step = Tuple[str, Callable[[object, int, int], int], str]
+
+PLANS: dict[str, List[Step]] = {
+    "workspace": [
+        ("posts", lambda db, id_, n: _delete_posts(db, Post.workspace_id == id_, batch_size=n), SHARDS),
+        ("posts_archive", lambda db, id_, n: _delete_rows(db, PostArchive, PostArchive.workspace_id == id_, batch_size=n), SHARDS),
+        ("post_daily_counts", lambda db, id_, n: _delete_rows(db, PostDailyCount, PostDailyCount.workspace_id == id_, batch_size=n), SHARDS),
+        ("post_status_counts", lambda db, id_, n: _delete_rows(db, PostStatusCount, PostStatusCount.workspace_id == id_, batch_size=n), SHARDS),
+        ("posting_hour_counts", lambda db, id_, n: _delete_rows(db, PostingHourCount, PostingHourCount.workspace_id == id_, batch_size=n), SHARDS),
+        ("post_series", lambda db, id_, n: _delete_rows(db, PostSeries, PostSeries.workspace_id == id_, batch_size=n), SHARDS),
+        ("post_groups", lambda db, id_, n: _delete_rows(db, PostGroup, PostGroup.workspace_id == id_, batch_size=n), SHARDS),
+        ("connected_accounts", lambda db, id_, n: _delete_rows(db, Account, Account.workspace_id == id_, batch_size=n), SHARDS),
+        ("user_workspace", lambda db, id_, n: _delete_memberships(db, memberships.c.workspace_id, id_, n), GLOBAL),
+        ("workspace_shards", lambda db, id_, n: db.execute(delete(models.WorkspaceShard).where(models.WorkspaceShard.workspace_id == id_)).rowcount, GLOBAL),
+    ],
+    "connected_account": [
+        ("posts", lambda db, id_, n: _delete_posts(db, Post.connected_account_id == id_, batch_size=n), SHARDS),
+        ("posts_archive", lambda db, id_, n: _delete_rows(db, PostArchive, PostArchive.connected_account_id == id_, batch_size=n), SHARDS),
+        ("post_daily_counts", lambda db, id_, n: _delete_rows(
+            db, PostDailyCount, PostDailyCount.connected_account_id == id_, batch_size=n), SHARDS),
+        ("post_status_counts", lambda db, id_, n: _delete_rows(
+            db, PostStatusCount, PostStatusCount.connected_account_id == id_, batch_size=n), SHARDS),
+        ("posting_hour_counts", lambda db, id_, n: _delete_rows(
+            db, PostingHourCount, PostingHourCount.connected_account_id == id_, batch_size=n), SHARDS),
+        ("post_series", lambda db, id_, n: _delete_rows(db, PostSeries, PostSeries.connected_account_id == id_, batch_size=n), SHARDS),
+        # Before the account, whose row still tells which workspace's groups to look at
+        ("post_groups", lambda db, id_, n: _delete_orphaned_groups(
+            db, select(Account.workspace_id).where(Account.id == id_), batch_size=n), SHARDS),
+        ("connected_accounts", lambda db, id_, n: _delete_rows(db, Account, Account.id == id_, batch_size=n), SHARDS),
+    ],
+    "user": [
+        # Posts published through the user's accounts go with the accounts...
+        ("posts", lambda db, id_, n: _delete_posts(
+            db, Post.connected_account_id.in_(select(Account.id).where(Account.user_id == id_)), batch_size=n), SHARDS),
+        ("posts_archive", lambda db, id_, n: _delete_rows(
+            db, PostArchive, PostArchive.connected_account_id.in_(select(Account.id).where(Account.user_id == id_)), batch_size=n), SHARDS),
+        ("post_daily_counts", lambda db, id_, n: _delete_rows(
+            db, PostDailyCount, PostDailyCount.connected_account_id.in_(select(Account.id).where(Account.user_id == id_)), batch_size=n), SHARDS),
+        ("post_status_counts", lambda db, id_, n: _delete_rows(
+            db, PostStatusCount, PostStatusCount.connected_account_id.in_(select(Account.id).where(Account.user_id == id_)), batch_size=n), SHARDS),
+        ("posting_hour_counts", lambda db, id_, n: _delete_rows(
+            db, PostingHourCount, PostingHourCount.connected_account_id.in_(select(Account.id).where(Account.user_id == id_)), batch_size=n), SHARDS),
+        ("post_series", lambda db, id_, n: _delete_rows(
+            db, PostSeries, PostSeries.connected_account_id.in_(select(Account.id).where(Account.user_id == id_)), batch_size=n), SHARDS),
+        ("post_groups", lambda db, id_, n: _delete_orphaned_groups(
+            db, select(Account.workspace_id).where(Account.user_id == id_), batch_size=n), SHARDS),
+        ("connected_accounts", lambda db, id_, n: _delete_rows(db, Account, Account.user_id == id_, batch_size=n), SHARDS),
+        # ...posts the user only wrote for other accounts stay, without an author
+        ("posts_author", lambda db, id_, n: _detach_author(db, Post, id_, n), SHARDS),
+        ("posts_archive_author", lambda db, id_, n: _detach_author(db, PostArchive, id_, n), SHARDS),
+        ("post_groups_author", lambda db, id_, n: _detach_author(db, PostGroup, id_, n), SHARDS),
+        ("post_series_author", lambda db, id_, n: _detach_author(db, PostSeries, id_, n), SHARDS),
+        ("user_workspace", lambda db, id_, n: _delete_memberships(db, memberships.c.user_id, id_, n), GLOBAL),
+    ],
+}
+
+def run_deletion_job(db, job_id: int, batch_size: int | None = None, pause_seconds: float | None = None) -> bool:
+    """
+    Claim the job and run its plan to the end. Returns False if the job is done
+    already or another runner holds it. Safe to call repeatedly for the same job.
+    On error the job goes back to pending (keeping its progress) and the error is re-raised.
+    """
+    from ..crud import crud_deletion_job
+    from ..database import shard_map, shard_sessions
+
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    pause_seconds = settings.DELETION_BATCH_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    holder = uuid.uuid4().hex
+    if not crud_deletion_job.claim_job(db, job_id, holder):
+        return False
+    job = crud_deletion_job.get_job(db, job_id)
+    model = crud_deletion_job.ENTITY_MODELS[job.entity_type]
+    try:
+        with shard_sessions(default_db=db) as sessions:
+            # A workspace's data is on its shard; a user's or account's could be on any
+            if job.entity_type == "workspace":
+                data_dbs = [sessions[shard_map.shard_for(job.entity_id)]]
+            else:
+                data_dbs = list(sessions.values())
+            for table, step, scope in PLANS[job.entity_type]:
+                for target in (data_dbs if scope == SHARDS else [db]):
+                    while True:
+                        removed = step(target, job.entity_id, batch_size)
+                        if removed:
+                            crud_deletion_job.record_progress(db, job, table, removed)
+                        target.commit()
+                        if target is not db:
+                            db.commit() # Progress lives in the global database
+                        if removed < batch_size:
+                            break
+                        if pause_seconds:
+                            time.sleep(pause_seconds) # Let other writers in between batches
+        if model is not Account: # Accounts were removed by their plan, on their shard
+            removed = db.execute(delete(model).where(model.id == job.entity_id)).rowcount
+            if removed:
+                crud_deletion_job.record_progress(db, job, model.__tablename__, removed)
+        crud_deletion_job.finish_job(db, job)
+    except Exception as e:
+        db.rollback()
+        crud_deletion_job.release_job(db, job_id, f"{type(e).__name__}: {e}")
+        raise
+    print(f"Deletion job {job_id}: {job.entity_type} {job.entity_id} removed ({job.progress})")
+    return True
+
+def resume_deletion_jobs(db, limit: int = 10) -> int:
+    """
+    Run jobs whose task was lost or whose runner stopped reporting. Returns the number finished.
+    """
+    from ..crud import crud_deletion_job
+
+    finished = 0
+    for job in crud_deletion_job.get_resumable_jobs(db, limit=limit):
+        try:
+            finished += run_deletion_job(db, job.id)
+        except Exception as e:
+            print(f"Deletion job {job.id} failed: {e}")
+    return finished
@@ -0,0 +1,114 @@
+"""
+Local mock of a social platform API, for development, smoke tests and benchmarks.
+It speaks the protocol HTTPAdapter expects:
+
+    POST /oauth/token   grant_type=refresh_token&refresh_token=...  -> {access_token, refresh_token, expires_in}
+    POST /posts         Bearer token, Idempotency-Key, JSON body     -> {id}
+
+Refresh tokens rotate on every use. Refresh tokens starting with "revoked" are
+rejected with invalid_grant, as are previously rotated ones. Posts are
+deduplicated by Idempotency-Key. Latency and failure rates come from the
+arguments of create_mock_platform() or from MOCK_PLATFORM_* environment
+variables.
+
+Point a SocialPlatform's api_base_url at it, e.g.:
+    uvicorn app.services.mock_platform:app --port 9100
+    api_base_url = "http://127.0.0.1:9100"
+"""
+import asyncio
+import itertools
+import os
+import random
+import secrets
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+def create_mock_platform(
+    latency_ms: float = 0.0,
+    latency_jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    token_error_rate: float = 0.0,
+    token_ttl_seconds: int = 3600,
+    seed: int | None = None,
+) -> FastAPI:
+    """
+    Build a mock platform app. error_rate is the fraction of /posts calls answered
+    with 503, rate_limit_rate the fraction answered with 429 + Retry-After and
+    token_error_rate the fraction of /oauth/token calls answered with 503.
+    """
+    app = FastAPI(title="Mock social platform")
+    rng = random.Random(seed)
+    post_ids = itertools.count(1)
+    state = app.state
+    state.used_refresh_tokens = set() # Rotated out; presenting one again is rejected
+    state.access_tokens = set()
+    state.posts = {}            # Idempotency-Key -> post id
+    state.stats = {"posts": 0, "duplicates": 0, "errors": 0, "rate_limited": 0, "refreshes": 0}
+
+    async def simulate_latency():
+        delay = latency_ms + (rng.uniform(-latency_jitter_ms, latency_jitter_ms) if latency_jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    @app.post("/oauth/token")
+    async def token(request: Request):
+        form = await request.form()
+        await simulate_latency()
+        if form.get("grant_type") != "refresh_token":
+            return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+        if token_error_rate and rng.random() < token_error_rate:
+            state.stats["errors"] += 1
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        refresh_token = form.get("refresh_token") or ""
+        # Any token not yet used is accepted, so accounts seeded outside the mock work
+        if refresh_token.startswith("revoked") or refresh_token in state.used_refresh_tokens:
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        state.used_refresh_tokens.add(refresh_token)
+        access_token = f"mock_at_{secrets.token_hex(12)}"
+        new_refresh_token = f"mock_rt_{secrets.token_hex(12)}"
+        state.access_tokens.add(access_token)
+        state.stats["refreshes"] += 1
+        return {"access_token": access_token, "refresh_token": new_refresh_token, "expires_in": token_ttl_seconds, "token_type": "bearer"}
+
+    @app.post("/posts")
+    async def create_post(
+        request: Request,
+        authorization: str | None = Header(default=None),
+        idempotency_key: str | None = Header(default=None),
+    ):
+        await simulate_latency()
+        if not authorization or not authorization.startswith("Bearer ") or authorization.endswith("expired"):
+            raise HTTPException(status_code=401, detail="invalid_token")
+        if idempotency_key and idempotency_key in state.posts:
+            state.stats["duplicates"] += 1
+            return {"id": state.posts[idempotency_key], "duplicate": True}
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            state.stats["rate_limited"] += 1
+            return JSONResponse({"error": "rate_limited"}, status_code=429, headers={"Retry-After": "1"})
+        if roll < rate_limit_rate + error_rate:
+            state.stats["errors"] += 1
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        await request.body()
+        post_id = f"mock_{next(post_ids)}"
+        if idempotency_key:
+            state.posts[idempotency_key] = post_id
+        state.stats["posts"] += 1
+        return {"id": post_id}
+
+    @app.get("/stats")
+    async def stats():
+        return state.stats
+
+    return app
+
+app = create_mock_platform(
+    latency_ms=float(os.getenv("MOCK_PLATFORM_LATENCY_MS", "0")),
+    latency_jitter_ms=float(os.getenv("MOCK_PLATFORM_LATENCY_JITTER_MS", "0")),
+    error_rate=float(os.getenv("MOCK_PLATFORM_ERROR_RATE", "0")),
+    rate_limit_rate=float(os.getenv("MOCK_PLATFORM_RATE_LIMIT_RATE", "0")),
+    token_error_rate=float(os.getenv("MOCK_PLATFORM_TOKEN_ERROR_RATE", "0")),
+    token_ttl_seconds=int(os.getenv("MOCK_PLATFORM_TOKEN_TTL_SECONDS", "3600")),
+)
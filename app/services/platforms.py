@@ -0,0 +1,190 @@
+"""
+Platform adapters used by publish_post_task, and the error classes they raise.
+
+Every failure surfaced to the task is one of four classes, which decide how
+the task reacts:
+
+- transient:    network errors, timeouts, 5xx       -> retry with backoff, counts toward the circuit breaker
+- rate_limited: 429 / platform throttling            -> retry after the platform's Retry-After (or backoff)
+- auth:         401/403, expired or revoked token    -> fail the post; the account needs attention
+- permanent:    invalid content, unsupported platform -> fail the post, never retry
+"""
+import enum
+import sys
+import uuid
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    import requests
+
+class ErrorClass(str, enum.Enum):
+    TRANSIENT = "transient"
+    RATE_LIMITED = "rate_limited"
+    AUTH = "auth"
+    PERMANENT = "permanent"
+
+class PlatformError(Exception):
+    error_class = ErrorClass.TRANSIENT
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class TransientPlatformError(PlatformError):
+    error_class = ErrorClass.TRANSIENT
+
+class RateLimitedError(PlatformError):
+    error_class = ErrorClass.RATE_LIMITED
+
+    def __init__(self, message: str, retry_after: float | None = None, status_code: int | None = 429):
+        super().__init__(message, status_code=status_code)
+        self.retry_after = retry_after
+
+class PlatformAuthError(PlatformError):
+    error_class = ErrorClass.AUTH
+
+class PermanentPlatformError(PlatformError):
+    error_class = ErrorClass.PERMANENT
+
+def classify_error(exc: BaseException) -> ErrorClass:
+    """
+    Map any exception raised while publishing to an ErrorClass.
+    Unknown errors are treated as transient so they are retried a bounded number of times.
+    """
+    if isinstance(exc, PlatformError):
+        return exc.error_class
+    requests = sys.modules.get("requests") # Imported by HTTPAdapter; without one its errors cannot occur
+    if requests is not None and isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return ErrorClass.TRANSIENT
+    if isinstance(exc, (NotImplementedError, ValueError)):
+        return ErrorClass.PERMANENT
+    return ErrorClass.TRANSIENT
+
+def error_for_response(response: "requests.Response") -> PlatformError:
+    detail = f"{response.status_code} from {response.url}: {response.text[:200]}"
+    if response.status_code == 429:
+        retry_after = response.headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None # HTTP-date form; fall back to our own backoff
+        return RateLimitedError(f"Rate limited: {detail}", retry_after=retry_after)
+    if response.status_code in (401, 403):
+        return PlatformAuthError(f"Authorization failed: {detail}", status_code=response.status_code)
+    if response.status_code >= 500 or response.status_code in (408, 409, 425):
+        return TransientPlatformError(f"Platform error: {detail}", status_code=response.status_code)
+    return PermanentPlatformError(f"Rejected by platform: {detail}", status_code=response.status_code)
+
+class TokenGrant(NamedTuple):
+    access_token: str
+    refresh_token: str | None # None when the platform keeps the old refresh token valid
+    expires_in: int | None    # Seconds; None if the platform does not say
+
+class PlatformAdapter:
+    name = "base"
+
+    def publish(self, *, access_token: str, account_id: str, content_text: str | None,
+                media_url: str | None, idempotency_key: str | None = None) -> str:
+        """
+        Publish and return the platform's post id. Raises PlatformError subclasses.
+        """
+        raise NotImplementedError
+
+    def refresh_token(self, *, refresh_token: str) -> TokenGrant:
+        """
+        Exchange a refresh token for a new access token. A rejected refresh token
+        raises PlatformAuthError (the account must be reconnected).
+        """
+        raise NotImplementedError
+
+class SimulatedAdapter(PlatformAdapter):
+    """
+    Stand-in until the real platform integrations land: logs and returns a fake id.
+    """
+
+    def __init__(self, name: str, id_prefix: str):
+        self.name = name
+        self.id_prefix = id_prefix
+
+    def publish(self, *, access_token, account_id, content_text, media_url, idempotency_key=None):
+        print(f"[SIMULATE] Posting to {self.name} for account {account_id}")
+        return f"{self.id_prefix}_sim_{idempotency_key or account_id}"
+
+    def refresh_token(self, *, refresh_token):
+        print(f"[SIMULATE] Refreshing {self.name} token")
+        return TokenGrant(access_token=f"{self.id_prefix}_sim_at_{uuid.uuid4().hex}", refresh_token=None, expires_in=60 * 24 * 3600)
+
+class HTTPAdapter(PlatformAdapter):
+    """
+    Generic JSON-over-HTTP adapter for platforms configured with an api_base_url
+    (also used against the local mock platform in benchmarks).
+    """
+    timeout = (3.05, 15) # (connect, read) seconds
+
+    def __init__(self, name: str, api_base_url: str, session: "requests.Session | None" = None):
+        import requests # On first use: the worker boots without it (simulated platforms never need it)
+        self.name = name
+        self.api_base_url = api_base_url.rstrip("/")
+        self.session = session or requests.Session()
+
+    def publish(self, *, access_token, account_id, content_text, media_url, idempotency_key=None):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        response = self.session.post(
+            f"{self.api_base_url}/posts",
+            json={"account_id": account_id, "text": content_text, "media_url": media_url},
+            headers=headers,
+            timeout=self.timeout,
+        )
+        if response.status_code >= 400:
+            raise error_for_response(response)
+        return str(response.json()["id"])
+
+    def refresh_token(self, *, refresh_token):
+        response = self.session.post(
+            f"{self.api_base_url}/oauth/token",
+            data={"grant_type": "refresh_token", "refresh_token": refresh_token},
+            timeout=self.timeout,
+        )
+        if response.status_code in (400, 401):
+            # OAuth reports revoked/expired refresh tokens as 400 invalid_grant
+            raise PlatformAuthError(f"Token refresh rejected: {response.status_code} {response.text[:200]}", status_code=response.status_code)
+        if response.status_code >= 400:
+            raise error_for_response(response)
+        payload = response.json()
+        expires_in = payload.get("expires_in")
+        return TokenGrant(
+            access_token=payload["access_token"],
+            refresh_token=payload.get("refresh_token"),
+            expires_in=int(expires_in) if expires_in is not None else None,
+        )
+
+_SIMULATED_ADAPTERS = {
+    "facebook": SimulatedAdapter("Facebook", "fb"),
+    "twitter": SimulatedAdapter("Twitter", "tw"),
+    "instagram": SimulatedAdapter("Instagram", "ig"),
+    "linkedin": SimulatedAdapter("LinkedIn", "li"),
+}
+_http_adapters: dict[tuple[str, str], HTTPAdapter] = {}
+
+def get_adapter(platform_name: str, api_base_url: str | None = None) -> PlatformAdapter:
+    """
+    Adapter for a platform. Platforms with an api_base_url use the HTTP adapter
+    (one pooled session per base URL); known platforms without one are simulated.
+    """
+    platform_name = platform_name.lower()
+    if api_base_url:
+        key = (platform_name, api_base_url)
+        if key not in _http_adapters:
+            _http_adapters[key] = HTTPAdapter(platform_name, api_base_url)
+        return _http_adapters[key]
+    if platform_name in _SIMULATED_ADAPTERS:
+        return _SIMULATED_ADAPTERS[platform_name]
+    raise PermanentPlatformError(f"Platform '{platform_name}' not supported for automated posting.")
+
+def is_simulated(platform_name: str, api_base_url: str | None = None) -> bool:
+    """
+    True when get_adapter() would hand out a SimulatedAdapter for this platform.
+    """
+    return not api_base_url and platform_name.lower() in _SIMULATED_ADAPTERS
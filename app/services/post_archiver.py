@@ -0,0 +1,44 @@
+"""
+Hot/cold tiering for posts.
+
+archive_old_posts() runs periodically (Celery beat task archive_posts_task, or
+`python -m app.cli archive-posts`). It moves POSTED and ARCHIVED posts scheduled
+more than POST_ARCHIVE_AFTER_DAYS ago from posts to posts_archive, in batches of
+POST_ARCHIVE_BATCH_SIZE, one short transaction per batch, so the calendar and
+scheduler queries keep working on a table (and indexes) sized by recent activity.
+
+Reads fall through to the archive: crud_post.get_post returns archived posts,
+crud_post.get_posts_by_workspace includes them for ranges reaching back to the
+workspace's latest archived post (crud_post_archive.archive_cutoff),
+and GET /workspaces/{id}/posts/history merges both tiers. Archived posts are
+read-only.
+"""
+import time
+
+from ..core.config import settings
+
+def archive_old_posts(db, older_than_days: int | None = None, batch_size: int | None = None,
+                      max_batches: int | None = None, pause_seconds: float | None = None,
+                      exclude_workspace_ids=()) -> int:
+    """
+    Archive everything eligible (or at most max_batches batches) on the shard `db` is
+    bound to. Returns the number of posts moved.
+    """
+    from datetime import datetime, timedelta, timezone
+    from ..crud import crud_post_archive
+
+    older_than_days = settings.POST_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.POST_ARCHIVE_BATCH_SIZE
+    pause_seconds = settings.POST_ARCHIVE_BATCH_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = crud_post_archive.archive_batch(db, cutoff, batch_size, exclude_workspace_ids=exclude_workspace_ids)
+        total += moved
+        batches += 1
+        if moved < batch_size:
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds) # Let other writers in between batches
+    return total
@@ -0,0 +1,153 @@
+"""
+Moving a workspace's data to another shard (app.core.sharding).
+
+move_workspace() runs in five phases, each safe to interrupt before the flip:
+
+1. Mark the workspace moving_to=<target> in workspace_shards and wait for every
+   process's shard map cache to see it (SHARD_MAP_CACHE_SECONDS) plus
+   SHARD_MOVE_DRAIN_SECONDS for writes already in flight. From then on writes
+   get 503 with Retry-After, publish tasks are parked and background sweeps skip
+   the workspace; reads keep going to the old shard.
+2. Copy the rows of SHARDED_TABLES in keyset batches of SHARD_MOVE_BATCH_SIZE,
+   parents first, keeping their ids, and index the posts for search there.
+3. Compare row counts per table between the two shards.
+4. Flip the map to the target and wait out the cache again, so nothing reads the
+   old shard any more.
+5. Delete the rows from the old shard in batches, children first.
+
+A failure before the flip removes what was copied and clears moving_to, leaving
+the workspace where it was. Run with:
+    python -m app.cli move-workspace WORKSPACE_ID SHARD
+"""
+import time
+
+from sqlalchemy import delete, func, select
+
+from .. import models
+from ..core.config import settings
+from ..core.sharding import DEFAULT_SHARD, SHARDED_TABLES, sync_reference_tables
+from ..crud import crud_post_search
+
+def _criteria(table, posts, workspace_id: int):
+    # Outbox messages and leases have no workspace_id; they follow their post
+    if "workspace_id" in table.c:
+        return table.c.workspace_id == workspace_id
+    return table.c.post_id.in_(select(posts.c.id).where(posts.c.workspace_id == workspace_id))
+
+def _key(table):
+    return list(table.primary_key.columns)[0]
+
+def _copy_table(source, target, table, posts, workspace_id: int, batch_size: int) -> int:
+    key = _key(table)
+    copied, last = 0, None
+    while True:
+        query = select(table).where(_criteria(table, posts, workspace_id)).order_by(key).limit(batch_size)
+        if last is not None:
+            query = query.where(key > last)
+        with source.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(query)]
+        if not rows:
+            return copied
+        with target.begin() as conn:
+            conn.execute(table.insert(), rows)
+        copied += len(rows)
+        last = rows[-1][key.name]
+        if len(rows) < batch_size:
+            return copied
+
+def _count(engine, table, posts, workspace_id: int) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table).where(_criteria(table, posts, workspace_id))).scalar()
+
+def _delete_table(engine, table, posts, workspace_id: int, batch_size: int) -> int:
+    key = _key(table)
+    removed = 0
+    while True:
+        with engine.begin() as conn:
+            keys = conn.execute(select(key).where(_criteria(table, posts, workspace_id)).limit(batch_size)).scalars().all()
+            if not keys:
+                return removed
+            removed += conn.execute(delete(table).where(key.in_(keys))).rowcount
+
+def _set_entry(db, workspace_id: int, shard: str, moving_to: str | None) -> None:
+    entry = db.get(models.WorkspaceShard, workspace_id)
+    if shard == DEFAULT_SHARD and moving_to is None:
+        if entry is not None:
+            db.delete(entry) # No row means the default shard
+    elif entry is None:
+        db.add(models.WorkspaceShard(workspace_id=workspace_id, shard=shard, moving_to=moving_to))
+    else:
+        entry.shard, entry.moving_to = shard, moving_to
+    db.commit()
+
+def move_workspace(workspace_id: int, target: str, batch_size: int | None = None,
+                   drain_seconds: float | None = None) -> dict:
+    """
+    Move the workspace's accounts, posts and their outbox messages and leases to the
+    `target` shard. Returns the number of rows moved per table.
+    Raises ValueError for an unknown shard or a workspace that is already moving.
+    """
+    from ..database import SessionLocal, shard_engines, shard_map
+
+    batch_size = batch_size or settings.SHARD_MOVE_BATCH_SIZE
+    drain_seconds = settings.SHARD_MOVE_DRAIN_SECONDS if drain_seconds is None else drain_seconds
+    if target not in shard_engines:
+        raise ValueError(f"Unknown shard {target!r} (configured: {', '.join(shard_engines)})")
+    tables = [models.Base.metadata.tables[name] for name in SHARDED_TABLES]
+    posts = models.Base.metadata.tables["posts"]
+
+    db = SessionLocal()
+    try:
+        if db.get(models.Workspace, workspace_id) is None:
+            raise ValueError(f"Workspace {workspace_id} not found")
+        shard_map.invalidate()
+        current, moving_to = shard_map.entry(workspace_id)
+        if moving_to is not None:
+            raise ValueError(f"Workspace {workspace_id} is already moving to shard {moving_to!r}")
+        if current == target:
+            raise ValueError(f"Workspace {workspace_id} is already on shard {target!r}")
+        source, destination = shard_engines[current], shard_engines[target]
+
+        # 1. Stop writes and let every process notice
+        _set_entry(db, workspace_id, current, target)
+        shard_map.invalidate()
+        print(f"Workspace {workspace_id}: moving {current} -> {target}, draining writes")
+        time.sleep(settings.SHARD_MAP_CACHE_SECONDS + drain_seconds)
+
+        # 2. Copy, 3. verify
+        copied = {}
+        try:
+            if target != DEFAULT_SHARD:
+                sync_reference_tables(shard_engines[DEFAULT_SHARD], [destination])
+            for table in tables:
+                copied[table.name] = _copy_table(source, destination, table, posts, workspace_id, batch_size)
+                print(f"Workspace {workspace_id}: copied {copied[table.name]} {table.name} rows")
+            for table in tables:
+                expected, found = _count(source, table, posts, workspace_id), _count(destination, table, posts, workspace_id)
+                if expected != found:
+                    raise RuntimeError(f"{table.name}: {found} rows on {target}, {expected} on {current}")
+            with SessionLocal(bind=destination) as target_db: # The search index is rebuilt, not copied
+                crud_post_search.rebuild_index(target_db, workspace_id, batch_size=batch_size)
+        except Exception:
+            with SessionLocal(bind=destination) as target_db:
+                crud_post_search.unindex_workspace(target_db, workspace_id, batch_size=batch_size)
+            for table in reversed(tables):
+                _delete_table(destination, table, posts, workspace_id, batch_size)
+            _set_entry(db, workspace_id, current, None)
+            shard_map.invalidate()
+            raise
+
+        # 4. Flip, then wait until no process reads the old shard
+        _set_entry(db, workspace_id, target, None)
+        shard_map.invalidate()
+        time.sleep(settings.SHARD_MAP_CACHE_SECONDS)
+    finally:
+        db.close()
+
+    # 5. Clean up the old shard
+    with SessionLocal(bind=source) as source_db:
+        crud_post_search.unindex_workspace(source_db, workspace_id, batch_size=batch_size)
+    for table in reversed(tables):
+        _delete_table(source, table, posts, workspace_id, batch_size)
+    print(f"Workspace {workspace_id}: now on shard {target}")
+    return copied
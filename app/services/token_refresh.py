@@ -0,0 +1,134 @@
+"""
+Proactive OAuth token refresh for connected accounts.
+
+refresh_expiring_tokens() runs periodically (Celery beat task refresh_expiring_tokens_task,
+or `python -m app.cli refresh-tokens`). It walks refreshable accounts expiring
+within TOKEN_REFRESH_HORIZON_SECONDS in token_expires_at order, in batches
+(served by ix_connected_accounts_token_expiry). For each batch it calls the
+platform adapters in a bounded thread pool and writes all new tokens back in
+one statement per batch. Batch rows stay locked until the write commits, so a
+concurrent job or an inline refresh cannot spend a rotated refresh token twice.
+Accounts on simulated platforms are skipped (their stored tokens are kept) unless
+TOKEN_REFRESH_SIMULATED is set.
+
+refresh_account_token() is the inline path used by publish_post_task when a
+token is about to expire.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from ..core.config import settings
+from .platforms import ErrorClass, PlatformAuthError, classify_error, get_adapter, is_simulated
+
+def _expires_at(grant, now: datetime) -> datetime | None:
+    return now + timedelta(seconds=grant.expires_in) if grant.expires_in else None
+
+def token_needs_refresh(account, skew_seconds: int | None = None) -> bool:
+    if account.token_expires_at is None:
+        return False
+    from ..crud.crud_outbox import as_utc
+
+    skew = settings.TOKEN_REFRESH_SKEW_SECONDS if skew_seconds is None else skew_seconds
+    return as_utc(account.token_expires_at) <= datetime.now(timezone.utc) + timedelta(seconds=skew)
+
+def _refresh_one(job: tuple):
+    account_id, platform_name, api_base_url, refresh_token = job
+    try:
+        grant = get_adapter(platform_name, api_base_url).refresh_token(refresh_token=refresh_token)
+        return account_id, grant, None
+    except Exception as e:
+        return account_id, None, e
+
+def refresh_expiring_tokens(db, horizon_seconds: int | None = None, concurrency: int | None = None,
+                            batch_size: int | None = None, exclude_workspace_ids=()) -> dict:
+    """
+    Refresh all tokens expiring within the horizon (on the shard `db` is bound to). Returns
+    counts of refreshed, failed (retried next run), deactivated (refresh token rejected) and
+    skipped (simulated platform) accounts.
+    """
+    from ..core.platform_catalog import platform_catalog
+    from ..crud import crud_connected_account
+
+    horizon_seconds = horizon_seconds or settings.TOKEN_REFRESH_HORIZON_SECONDS
+    concurrency = concurrency or settings.TOKEN_REFRESH_CONCURRENCY
+    batch_size = batch_size or settings.TOKEN_REFRESH_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) + timedelta(seconds=horizon_seconds)
+    totals = {"refreshed": 0, "failed": 0, "deactivated": 0, "skipped": 0}
+
+    after = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="token-refresh") as pool:
+        while True:
+            accounts = crud_connected_account.get_accounts_expiring_before(
+                db, cutoff, limit=batch_size, after=after, exclude_workspace_ids=exclude_workspace_ids
+            )
+            if not accounts:
+                db.rollback()
+                break
+            after = (accounts[-1].token_expires_at, accounts[-1].id)
+            jobs = []
+            for account in accounts:
+                platform = platform_catalog.get(account.platform_id) or account.platform
+                if is_simulated(platform.name, platform.api_base_url) and not settings.TOKEN_REFRESH_SIMULATED:
+                    totals["skipped"] += 1
+                    continue
+                jobs.append((account.id, platform.name, platform.api_base_url, account.refresh_token))
+
+            now = datetime.now(timezone.utc)
+            updates, rejected = [], []
+            for account_id, grant, error in pool.map(_refresh_one, jobs):
+                if grant is not None:
+                    updates.append({
+                        "id": account_id,
+                        "access_token": grant.access_token,
+                        "refresh_token": grant.refresh_token,
+                        "token_expires_at": _expires_at(grant, now),
+                    })
+                elif classify_error(error) in (ErrorClass.AUTH, ErrorClass.PERMANENT):
+                    print(f"Token refresh: refresh token for account {account_id} rejected, deactivating: {error}")
+                    rejected.append(account_id)
+                else:
+                    print(f"Token refresh: account {account_id} failed, will retry next run: {error}")
+                    totals["failed"] += 1
+
+            crud_connected_account.bulk_update_tokens(db, updates)
+            crud_connected_account.deactivate_accounts(db, rejected)
+            db.commit() # Releases this batch's row locks
+            totals["refreshed"] += len(updates)
+            totals["deactivated"] += len(rejected)
+            if len(accounts) < batch_size:
+                break
+    return totals
+
+def refresh_account_token(db, account_id: int):
+    """
+    Refresh one account's token now, unless another refresher beat us to it.
+    Raises PlatformError subclasses; a rejected refresh token deactivates the account.
+    Commits.
+    """
+    from ..core.platform_catalog import platform_catalog
+    from ..crud import crud_connected_account
+
+    account = crud_connected_account.lock_connected_account(db, account_id)
+    if account is None or not token_needs_refresh(account):
+        db.commit()
+        return account
+    if not account.refresh_token:
+        db.commit()
+        raise PlatformAuthError("Access token expired and the account has no refresh token.")
+
+    platform = platform_catalog.get(account.platform_id) or account.platform
+    _, grant, error = _refresh_one((account.id, platform.name, platform.api_base_url, account.refresh_token))
+    if error is not None:
+        if classify_error(error) in (ErrorClass.AUTH, ErrorClass.PERMANENT):
+            crud_connected_account.deactivate_accounts(db, [account.id])
+        db.commit()
+        raise error
+    crud_connected_account.bulk_update_tokens(db, [{
+        "id": account.id,
+        "access_token": grant.access_token,
+        "refresh_token": grant.refresh_token,
+        "token_expires_at": _expires_at(grant, datetime.now(timezone.utc)),
+    }])
+    db.commit()
+    db.refresh(account)
+    return account
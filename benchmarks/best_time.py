@@ -0,0 +1,142 @@
+"""
+Best-time recommendation benchmark (app.services.best_time).
+
+Seeds a database with benchmarks/seed_data.py, rebuilds the hour-of-week
+histograms from the published posts (what `python -m app.cli rebuild-best-times`
+runs; the vectorized NumPy pass) and measures, for random workspaces:
+
+- naive_history:  what the recommendation would cost without the histograms:
+                  loading the posted_at of every published post of the accounts
+- suggest_cold:   5 slots for every account of the workspace, histograms and
+                  platform priors read from the database (cache emptied first)
+- suggest_warm:   the same with the platform priors cached (the common case;
+                  account histograms are always read)
+- record_publish: one incremental update, as done when a post is published
+
+Usage (from the repository root):
+    python benchmarks/best_time.py --scale 0.05
+    python benchmarks/best_time.py --scale 0.1 --json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import seed_data  # noqa: E402  (sets up sys.path for app/)
+from post_archive import timed  # noqa: E402
+
+
+def measure(db, workspace_ids: list[int], runs: int, seed: int) -> dict:
+    from sqlalchemy import select, text
+    from app import models
+    from app.crud import crud_best_time
+    from app.services.best_time import BestTimeRecommender
+
+    if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+        db.execute(text("ANALYZE"))
+        db.commit()
+    rng = random.Random(seed)
+    recommender = BestTimeRecommender()
+    accounts_by_workspace = {}
+    for account in db.query(models.ConnectedAccount).filter(models.ConnectedAccount.workspace_id.in_(workspace_ids)).all():
+        accounts_by_workspace.setdefault(account.workspace_id, []).append(account)
+    db.expunge_all()
+    workspace_ids = [workspace_id for workspace_id in workspace_ids if workspace_id in accounts_by_workspace]
+
+    def naive_history():
+        accounts = accounts_by_workspace[rng.choice(workspace_ids)]
+        db.execute(
+            select(models.Post.connected_account_id, models.Post.posted_at)
+            .where(models.Post.connected_account_id.in_([account.id for account in accounts]),
+                   models.Post.status == models.PostStatus.POSTED)
+        ).all()
+
+    def suggest_cold():
+        recommender._platforms.clear()
+        recommender.suggest(db, accounts_by_workspace[rng.choice(workspace_ids)])
+
+    def suggest_warm():
+        recommender.suggest(db, accounts_by_workspace[rng.choice(workspace_ids)])
+
+    def record_publish():
+        account = rng.choice(accounts_by_workspace[rng.choice(workspace_ids)])
+        post = models.Post(workspace_id=account.workspace_id, connected_account_id=account.id, posted_at=datetime.now(timezone.utc))
+        crud_best_time.record_published(db, post)
+        db.rollback()
+
+    for accounts in accounts_by_workspace.values(): # Warm every platform prior
+        recommender.suggest(db, accounts)
+    return {
+        "naive_history": timed(naive_history, runs),
+        "suggest_cold": timed(suggest_cold, runs),
+        "suggest_warm": timed(suggest_warm, runs),
+        "record_publish": timed(record_publish, runs),
+    }
+
+
+def run(args) -> dict:
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='best-time-bench-'), 'bench.db')}"
+    seeded = seed_data.seed(database_url, args.scale, args.seed, args.processes, log=lambda message: print(message, file=sys.stderr))
+
+    from app import models
+    from app.crud import crud_best_time
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        counted = crud_best_time.rebuild_histograms(db)
+        rebuild_seconds = time.perf_counter() - started
+        workspace_ids = [row[0] for row in db.query(models.Workspace.id).all()]
+        results = measure(db, workspace_ids, args.queries, args.seed)
+    finally:
+        db.close()
+
+    return {
+        "config": {
+            "database": seeded["database"],
+            "scale": args.scale,
+            "queries": args.queries,
+        },
+        "posts": seeded["counts"]["posts"],
+        "workspaces": len(workspace_ids),
+        "published_posts": counted,
+        "rebuild_seconds": round(rebuild_seconds, 2),
+        "queries": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="An empty database; defaults to a fresh temporary SQLite file")
+    parser.add_argument("--scale", type=float, default=0.05, help="seed_data scale (0.1 = 1M posts)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queries", type=int, default=200, help="Runs per measured operation")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{result['posts']:,} posts in {result['workspaces']:,} workspaces; histograms rebuilt from "
+          f"{result['published_posts']:,} published posts in {result['rebuild_seconds']}s")
+    print(f"{'operation':<16} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, timing in result["queries"].items():
+        print(f"{name:<16} {timing['p50_ms']:>9.3f} {timing['p95_ms']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
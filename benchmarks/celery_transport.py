@@ -0,0 +1,213 @@
+"""
+Broker round trips and memory per in-flight task for publish_post_task,
+comparing the previous transport settings ("baseline") with the
+social_posting worker profile ("tuned").
+
+Each configuration gets its own Celery app on the in-memory broker and result
+backend, running an in-thread worker against a stand-in task with the same
+options as publish_post_task (no DB or platform calls). The script counts:
+
+- broker puts/gets and result-backend writes per task (each is a network round
+  trip on Redis/RabbitMQ),
+- message size on the wire,
+- tracemalloc bytes retained per reserved (prefetched, unacked) message, and
+  the resulting in-flight memory per worker process at its prefetch limit.
+
+Usage (from the repository root):
+    python benchmarks/celery_transport.py --tasks 500
+    python benchmarks/celery_transport.py --tasks 500 --json > transport.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from kombu.transport import memory
+
+from app.core.celery_app import SOCIAL_POSTING_TASK_OPTIONS, WORKER_PROFILES
+
+CONFIGS = {
+    # What app/core/celery_app.py used before the social_posting profile
+    "baseline": {
+        "conf": dict(task_serializer="json", accept_content=["json"], result_serializer="json",
+                     worker_prefetch_multiplier=4),
+        "task_options": dict(max_retries=3, default_retry_delay=60),
+    },
+    "tuned": {
+        "conf": dict(accept_content=["json", "msgpack"], **WORKER_PROFILES["social_posting"]),
+        "task_options": dict(max_retries=3, default_retry_delay=60, **SOCIAL_POSTING_TASK_OPTIONS),
+    },
+}
+
+
+class BrokerCounters:
+    """
+    Counts calls into the in-memory transport; each maps to one broker round trip.
+    """
+
+    def __init__(self):
+        self.puts = 0
+        self.gets = 0
+        self.bytes_put = 0
+        self.body_bytes_put = 0
+
+    def install(self):
+        original_put = memory.Channel._put
+        original_get = memory.Channel._get
+        counters = self
+
+        def _put(channel, queue, message, **kwargs):
+            counters.puts += 1
+            counters.bytes_put += len(json.dumps(message))
+            counters.body_bytes_put += len(message["body"])
+            return original_put(channel, queue, message, **kwargs)
+
+        def _get(channel, queue, timeout=None):
+            message = original_get(channel, queue, timeout)
+            counters.gets += 1
+            return message
+
+        memory.Channel._put = _put
+        memory.Channel._get = _get
+        return original_put, original_get
+
+
+def build_app(name: str, config: dict) -> Celery:
+    app = Celery(f"bench_{name}", broker="memory://", backend="cache+memory://")
+    app.conf.update(task_default_queue="social_posting", broker_connection_retry_on_startup=True, **config["conf"])
+
+    @app.task(name="publish_post_task", bind=True, **config["task_options"])
+    def publish_post_task(self, post_id: int):
+        return f"Success: Post ID {post_id} published to bench."
+
+    app.loader.import_default_modules()
+    return app, publish_post_task
+
+
+def count_backend_writes() -> tuple[dict, object]:
+    # Backends are per-thread, so patch the class the worker thread will use.
+    from celery.backends.cache import CacheBackend
+
+    writes = {"count": 0}
+    original_set = CacheBackend.set
+
+    def counting_set(backend, key, value, **kwargs):
+        writes["count"] += 1
+        return original_set(backend, key, value, **kwargs)
+
+    CacheBackend.set = counting_set
+    return writes, original_set
+
+
+def measure_round_trips(name: str, config: dict, tasks: int) -> dict:
+    app, task = build_app(name, config)
+    counters = BrokerCounters()
+    original_put, original_get = counters.install()
+    backend_writes, original_backend_set = count_backend_writes()
+    try:
+        with start_worker(app, pool="solo", perform_ping_check=False, shutdown_timeout=10):
+            start = time.perf_counter()
+            for post_id in range(tasks):
+                task.apply_async(args=[post_id])
+            # Wait until the worker has drained the queue
+            deadline = time.time() + 60
+            with app.connection_for_read() as conn:
+                while time.time() < deadline:
+                    _, remaining, _ = conn.default_channel.queue_declare("social_posting", passive=True)
+                    if remaining == 0 and counters.gets >= tasks:
+                        break
+                    time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+    finally:
+        memory.Channel._put = original_put
+        memory.Channel._get = original_get
+        from celery.backends.cache import CacheBackend
+        CacheBackend.set = original_backend_set
+    return {
+        "tasks": tasks,
+        "seconds": round(elapsed, 3),
+        "broker_puts_per_task": round(counters.puts / tasks, 3),
+        "broker_gets_per_task": round(counters.gets / tasks, 3),
+        "result_backend_writes_per_task": round(backend_writes["count"] / tasks, 3),
+        "round_trips_per_task": round((counters.puts + counters.gets + backend_writes["count"]) / tasks, 3),
+        "bytes_per_message": round(counters.bytes_put / max(counters.puts, 1), 1),
+        "body_bytes_per_message": round(counters.body_bytes_put / max(counters.puts, 1), 1),
+    }
+
+
+def measure_inflight_memory(name: str, config: dict, messages: int, concurrency: int) -> dict:
+    """
+    Bytes retained per reserved message: build the worker-side Request objects a
+    consumer holds for prefetched messages and measure them with tracemalloc.
+    """
+    from celery.worker.request import Request
+    from kombu.serialization import dumps, enable_insecure_serializers
+    from kombu.transport.virtual import Message
+
+    app, task = build_app(name, config)
+    # Starting a worker disables content types outside its accept_content
+    # process-wide; re-enable this configuration's types.
+    enable_insecure_serializers(choices=app.conf.accept_content)
+    serializer = config["task_options"].get("serializer") or app.conf.task_serializer
+    raw = []
+    for post_id in range(messages):
+        task_message = app.amqp.as_task_v2(f"bench-{post_id}", task.name, args=[post_id])
+        content_type, content_encoding, body = dumps(task_message.body, serializer=serializer)
+        raw.append({
+            "body": body,
+            "content-type": content_type,
+            "content-encoding": content_encoding,
+            "headers": task_message.headers,
+            "properties": {"delivery_tag": post_id + 1,
+                           "delivery_info": {"exchange": "", "routing_key": "social_posting"}},
+        })
+
+    with app.connection_for_write() as conn:
+        channel = conn.default_channel
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        reserved = [Request(Message(payload, channel=channel), app=app, task=task) for payload in raw]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    per_message = retained / len(reserved)
+    prefetch = app.conf.worker_prefetch_multiplier * concurrency
+    return {
+        "bytes_per_reserved_message": round(per_message, 1),
+        "prefetch_limit_per_worker": prefetch,
+        "inflight_bytes_per_worker": round(per_message * prefetch, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--memory-messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker processes assumed for the in-flight estimate")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, config in CONFIGS.items():
+        results[name] = measure_round_trips(name, config, args.tasks)
+        results[name].update(measure_inflight_memory(name, config, args.memory_messages, args.concurrency))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    keys = list(results["baseline"].keys())
+    print(f"{'metric':<32} {'baseline':>12} {'tuned':>12}")
+    for key in keys:
+        print(f"{key:<32} {results['baseline'][key]:>12} {results['tuned'][key]:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Import-time budget check for the API and Celery worker entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter several
+times per entry point, takes the median cumulative import time of the entry
+module and fails if it exceeds its budget. The slowest imports are listed so a
+regression can be traced to the dependency that caused it.
+
+Usage (from the repository root):
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 7 --api-budget-ms 900 --worker-budget-ms 700 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets for a warm filesystem cache on a developer laptop. Tighten them as
+# startup gets faster; loosening one should come with a reason in the commit.
+ENTRY_POINTS = {
+    "api": ("app.main", 1500.0),
+    "worker": ("app.core.celery_app", 600.0),
+}
+
+
+def measure(module: str) -> tuple[float, list[tuple[float, str]]]:
+    """
+    Return (cumulative ms for `module`, [(cumulative ms, name), ...] for every import).
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    total_ms = None
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            cumulative_ms = int(cumulative) / 1000
+        except ValueError:
+            continue # Header line
+        imports.append((cumulative_ms, name.rstrip()))
+        if name.strip() == module:
+            total_ms = cumulative_ms
+    if total_ms is None:
+        raise RuntimeError(f"No importtime entry for {module}")
+    return total_ms, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--api-budget-ms", type=float, default=ENTRY_POINTS["api"][1])
+    parser.add_argument("--worker-budget-ms", type=float, default=ENTRY_POINTS["worker"][1])
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    budgets = {"api": args.api_budget_ms, "worker": args.worker_budget_ms}
+    results = {}
+    failed = False
+    for name, (module, _) in ENTRY_POINTS.items():
+        samples = []
+        imports = []
+        for _ in range(args.runs):
+            total_ms, imports = measure(module)
+            samples.append(total_ms)
+        median_ms = statistics.median(samples)
+        over_budget = median_ms > budgets[name]
+        failed = failed or over_budget
+        results[name] = {
+            "module": module,
+            "median_ms": round(median_ms, 1),
+            "min_ms": round(min(samples), 1),
+            "max_ms": round(max(samples), 1),
+            "budget_ms": budgets[name],
+            "over_budget": over_budget,
+            "slowest_imports": [
+                {"module": mod.strip(), "cumulative_ms": round(ms, 1)}
+                for ms, mod in sorted(imports, reverse=True)[1:args.top + 1]
+            ],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            status = "OVER BUDGET" if result["over_budget"] else "ok"
+            print(f"{name:<7} {result['module']:<22} median {result['median_ms']:>7.1f} ms "
+                  f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f}) budget {result['budget_ms']:.0f} ms  {status}")
+            for entry in result["slowest_imports"]:
+                print(f"        {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
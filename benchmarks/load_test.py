@@ -0,0 +1,529 @@
+"""
+HTTP load test for the API: virtual users on asyncio replay realistic scenarios
+against a running server and report per-endpoint latency histograms and error rates.
+
+Fixtures are written straight to the database before the run: one user per
+virtual user, each with a workspace, connected accounts and a calendar of
+existing posts. Each virtual user logs in through /api/v1/auth/token and then
+loops over scenarios picked by weight, with exponential think time between them:
+
+    calendar     browse month views of the workspace calendar, open a post
+    create       create a post for several connected accounts at once
+    reschedule   drag a scheduled post to another day (GET then PUT scheduled_at)
+    ai_caption   ask the AI assistant for captions
+
+By default the harness starts the API itself (uvicorn in a subprocess, fresh
+SQLite database) with AI_PROVIDER=ollama pointed at a mock Ollama server in
+this process, so AI calls never leave the machine. With --base-url it targets an
+already running server; --database-url must then point at that server's
+database, and the server needs its own AI provider configuration.
+
+Results can be saved (--output) and compared against a baseline (--compare).
+Baselines for the default settings of each --scenario are kept in
+benchmarks/baselines/ (local SQLite server, one uvicorn worker). Latencies are
+machine-specific: compare runs from the same machine, or regenerate the
+baseline on it first from the base branch.
+
+Usage (from the repository root):
+    python benchmarks/load_test.py --users 50 --duration 30
+    python benchmarks/load_test.py --scenario calendar --users 100 --duration 60 --json
+    python benchmarks/load_test.py --output benchmarks/baselines/load_test_mixed.json
+    python benchmarks/load_test.py --compare benchmarks/baselines/load_test_mixed.json --tolerance 0.3
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --database-url postgresql://localhost/social
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+API = "/api/v1"
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is everything above
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+PASSWORD = "load-test-password"
+CAPTION_TOPICS = ("product launch", "summer sale", "team offsite", "customer story", "webinar", "new feature")
+
+
+def configure_environment(args) -> str:
+    # Must run before anything under app/ is imported: Settings read the environment once.
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='load-test-'), 'load.db')}"
+    os.environ.update(DATABASE_URL=database_url, CELERY_BROKER_URL="memory://", DB_CREATE_TABLES_ON_STARTUP="false")
+    os.environ.setdefault("SECRET_KEY", "load-test-secret-key-load-test-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    return database_url
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- Local services ---
+
+def create_mock_ai_provider(latency_ms: float, seed: int):
+    """
+    A minimal Ollama-compatible server: POST /api/generate -> {"response": ...}.
+    """
+    from fastapi import FastAPI
+
+    app = FastAPI(title="Mock AI provider")
+    rng = random.Random(seed)
+
+    @app.post("/api/generate")
+    async def generate(body: dict):
+        if latency_ms:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * latency_ms / 1000)
+        prompt = body.get("prompt", "")
+        return {
+            "model": body.get("model"),
+            "response": "\n".join(f"{i}. Caption {i} for: {prompt[:60]}" for i in range(1, 4)),
+            "done": True,
+        }
+
+    return app
+
+
+def start_mock_ai_provider(args) -> str:
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_mock_ai_provider(args.ai_latency_ms, args.seed), host="127.0.0.1",
+                                           port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, name="mock-ai-provider", daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Mock AI provider did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def start_api_server(args, ai_url: str) -> tuple[subprocess.Popen, str]:
+    # Same DATABASE_URL and SECRET_KEY as the fixtures; scheduling only writes the outbox, no relay runs
+    env = dict(os.environ)
+    env.update(AI_PROVIDER="ollama", OLLAMA_BASE_URL=ai_url, PYTHONPATH=REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""))
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", "--workers", str(args.server_workers)],
+        cwd=REPO_ROOT, env=env, stdout=sys.stderr, stderr=sys.stderr,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_for_server(client, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        if time.time() > deadline:
+            raise RuntimeError("API server did not start")
+        await asyncio.sleep(0.1)
+
+
+def seed_fixtures(args, run_id: str) -> list[dict]:
+    """
+    Create one user with a workspace, connected accounts and posts per virtual user.
+    Returns [{email, workspace_id, account_ids, scheduled_post_ids}] in user order.
+    """
+    from app import models
+    from app.crud import crud_outbox
+    from app.core.security import get_password_hash
+    from app.database import SessionLocal, init_db
+
+    init_db()
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    password_hash = get_password_hash(PASSWORD) # One bcrypt hash for everyone
+    db = SessionLocal()
+    try:
+        platform = db.query(models.SocialPlatform).filter(models.SocialPlatform.name == "Loadtest").first()
+        if platform is None:
+            platform = models.SocialPlatform(name="Loadtest")
+            db.add(platform)
+            db.flush()
+
+        fixtures = []
+        for i in range(args.users):
+            user = models.User(email=f"load-{run_id}-{i}@example.com", hashed_password=password_hash, is_active=True)
+            workspace = models.Workspace(name=f"Load {run_id} {i}")
+            workspace.users.append(user)
+            db.add_all([user, workspace])
+            db.flush()
+            accounts = [models.ConnectedAccount(
+                user_id=user.id, workspace_id=workspace.id, platform_id=platform.id,
+                platform_account_id=f"load-{run_id}-{i}-{a}", platform_account_name=f"load-{i}-{a}",
+                access_token=f"load-token-{i}-{a}", is_active=True,
+            ) for a in range(args.accounts)]
+            db.add_all(accounts)
+            db.flush()
+
+            # A calendar's worth of history and upcoming posts
+            posts = []
+            for p in range(args.seed_posts):
+                scheduled_at = now + timedelta(minutes=rng.randrange(-45 * 1440, 45 * 1440))
+                future = scheduled_at > now
+                posts.append(models.Post(
+                    workspace_id=workspace.id, connected_account_id=rng.choice(accounts).id, author_id=user.id,
+                    content_text=f"Seeded post {p} for user {i}: {rng.choice(CAPTION_TOPICS)}",
+                    status=models.PostStatus.SCHEDULED if future else models.PostStatus.POSTED,
+                    scheduled_at=scheduled_at, posted_at=None if future else scheduled_at,
+                ))
+            db.add_all(posts)
+            db.flush()
+            for post in posts:
+                if post.status == models.PostStatus.SCHEDULED:
+                    crud_outbox.add_publish_message(db, post)
+            fixtures.append({
+                "email": user.email,
+                "workspace_id": workspace.id,
+                "account_ids": [account.id for account in accounts],
+                "scheduled_post_ids": [post.id for post in posts if post.status == models.PostStatus.SCHEDULED],
+            })
+        db.commit()
+        return fixtures
+    finally:
+        db.close()
+
+
+# --- Measurement ---
+
+class Recorder:
+    """
+    Latencies and outcomes per endpoint (method + route template).
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+        self.iterations: dict[str, int] = {}
+        self.recording = False
+
+    async def request(self, client, endpoint: str, method: str, url: str, expected=(200, 201), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except Exception as e:
+            response, status = None, type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self.recording:
+            self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+            statuses = self.statuses.setdefault(endpoint, {})
+            statuses[status] = statuses.get(status, 0) + 1
+            if response is None or response.status_code not in expected:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        total = errors = 0
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            count, failed = len(values), self.errors.get(endpoint, 0)
+            total, errors = total + count, errors + failed
+            histogram, index = {}, 0
+            for bound in HISTOGRAM_BUCKETS_MS:
+                start = index
+                while index < count and values[index] <= bound:
+                    index += 1
+                histogram[f"le_{bound}"] = index - start
+            histogram["inf"] = count - index
+            endpoints[endpoint] = {
+                "count": count,
+                "errors": failed,
+                "error_rate": round(failed / count, 4),
+                "rps": round(count / elapsed, 2),
+                "mean_ms": round(sum(values) / count, 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p90_ms": round(percentile(values, 90), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2),
+                "statuses": self.statuses[endpoint],
+                "histogram": histogram,
+            }
+        return {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "rps": round(total / elapsed, 2),
+            "scenarios": dict(sorted(self.iterations.items())),
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+# --- Virtual users ---
+
+class VirtualUser:
+    def __init__(self, index: int, client, recorder: Recorder, rng: random.Random):
+        self.index = index
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.workspace_id = None
+        self.account_ids: list[int] = []
+        self.scheduled_post_ids: list[int] = []
+        self.month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs):
+        return await self.recorder.request(self.client, endpoint, method, f"{API}{url}", **kwargs)
+
+    def random_time(self, days_back: int, days_ahead: int) -> datetime:
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        return now + timedelta(minutes=self.rng.randrange(-days_back * 1440, days_ahead * 1440))
+
+    async def create_posts(self, scheduled_at: datetime, accounts: int):
+        response = await self.call("POST /workspaces/{id}/posts", "POST", f"/workspaces/{self.workspace_id}/posts/", json={
+            "post_data": {
+                "workspace_id": self.workspace_id,
+                "content_text": f"Load test post from user {self.index}: {self.rng.choice(CAPTION_TOPICS)}",
+                "scheduled_at": scheduled_at.isoformat(),
+            },
+            "connected_account_ids": self.rng.sample(self.account_ids, accounts),
+        })
+        if response is not None and response.status_code == 201 and scheduled_at > datetime.now(timezone.utc):
+            self.scheduled_post_ids.extend(post["id"] for post in response.json())
+
+    async def login(self, fixture: dict):
+        self.workspace_id = fixture["workspace_id"]
+        self.account_ids = fixture["account_ids"]
+        self.scheduled_post_ids = list(fixture["scheduled_post_ids"])
+        response = await self.client.post(f"{API}/auth/token", data={"username": fixture["email"], "password": PASSWORD})
+        response.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    # Scenarios
+
+    async def calendar(self):
+        for _ in range(self.rng.randint(1, 3)):
+            start = self.month
+            end = (start + timedelta(days=32)).replace(day=1)
+            response = await self.call("GET /workspaces/{id}/posts", "GET", f"/workspaces/{self.workspace_id}/posts/",
+                                       params={"start_date": start.isoformat(), "end_date": end.isoformat(), "limit": 500})
+            if response is not None and response.status_code == 200 and response.json() and self.rng.random() < 0.5:
+                post = self.rng.choice(response.json())
+                await self.call("GET /posts/{id}", "GET", f"/posts/{post['id']}")
+            # Step to the previous or next month, staying within three months of today
+            step = self.rng.choice((-1, 1))
+            candidate = (self.month + timedelta(days=32 * step if step > 0 else -1)).replace(day=1)
+            if abs((candidate - datetime.now(timezone.utc)).days) < 100:
+                self.month = candidate
+
+    async def create(self):
+        await self.create_posts(self.random_time(0, 30) + timedelta(hours=1), self.rng.randint(1, len(self.account_ids)))
+
+    async def reschedule(self):
+        if not self.scheduled_post_ids:
+            return await self.create()
+        post_id = self.rng.choice(self.scheduled_post_ids)
+        response = await self.call("GET /posts/{id}", "GET", f"/posts/{post_id}")
+        if response is None or response.status_code != 200:
+            self.scheduled_post_ids.remove(post_id)
+            return
+        scheduled_at = datetime.fromisoformat(response.json()["scheduled_at"]).replace(tzinfo=timezone.utc)
+        moved = max(scheduled_at + timedelta(days=self.rng.randint(-3, 3), minutes=self.rng.choice((-30, 0, 30))),
+                    datetime.now(timezone.utc) + timedelta(hours=1))
+        await self.call("PUT /posts/{id}", "PUT", f"/posts/{post_id}", json={"scheduled_at": moved.isoformat()})
+
+    async def ai_caption(self):
+        await self.call("POST /ai/generate-caption", "POST", "/ai/generate-caption",
+                        json={"prompt": self.rng.choice(CAPTION_TOPICS), "tone": self.rng.choice(("witty", "professional"))})
+
+
+# (weight in the mixed scenario) -- roughly what the web app's traffic looks like
+SCENARIOS = {
+    "calendar": 60,
+    "create": 15,
+    "reschedule": 15,
+    "ai_caption": 10,
+}
+
+
+async def virtual_user_loop(user: VirtualUser, scenarios: dict, deadline: float, think_ms: float):
+    names, weights = list(scenarios), list(scenarios.values())
+    while time.time() < deadline:
+        name = user.rng.choices(names, weights)[0]
+        await getattr(user, name)()
+        user.recorder.iterations[name] = user.recorder.iterations.get(name, 0) + 1
+        if think_ms:
+            await asyncio.sleep(user.rng.expovariate(1000 / think_ms))
+
+
+async def run_load(args, base_url: str, fixtures: list[dict]) -> dict:
+    import httpx
+
+    scenarios = SCENARIOS if args.scenario == "mixed" else {args.scenario: 1}
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) for _ in range(args.users)]
+    try:
+        await wait_for_server(clients[0])
+        users = [VirtualUser(i, client, recorder, random.Random(args.seed * 100_003 + i)) for i, client in enumerate(clients)]
+
+        # Logins are not measured: bcrypt verification would dominate the first seconds
+        semaphore = asyncio.Semaphore(args.login_concurrency)
+
+        async def login(user, fixture):
+            async with semaphore:
+                await user.login(fixture)
+
+        login_started = time.time()
+        await asyncio.gather(*(login(user, fixture) for user, fixture in zip(users, fixtures)))
+        login_seconds = time.time() - login_started
+
+        recorder.recording = True
+        started = time.time()
+        deadline = started + args.duration
+
+        async def ramped(user, delay):
+            await asyncio.sleep(delay)
+            await virtual_user_loop(user, scenarios, deadline, args.think_ms)
+
+        await asyncio.gather(*(ramped(user, args.ramp * i / args.users) for i, user in enumerate(users)))
+        elapsed = time.time() - started
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+    return {
+        "config": {
+            "scenario": args.scenario,
+            "users": args.users,
+            "duration_seconds": args.duration,
+            "think_ms": args.think_ms,
+            "accounts_per_user": args.accounts,
+            "seed_posts_per_user": args.seed_posts,
+            "ai_latency_ms": args.ai_latency_ms if not args.base_url else None,
+            "server_workers": args.server_workers if not args.base_url else None,
+            "target": "external" if args.base_url else "local",
+        },
+        "login_seconds": round(login_seconds, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        **recorder.summary(elapsed),
+    }
+
+
+def run(args) -> dict:
+    if args.base_url and not args.database_url:
+        raise SystemExit("--base-url needs --database-url (the server's database) for the fixtures")
+    configure_environment(args)
+    fixtures = seed_fixtures(args, run_id=uuid.uuid4().hex[:8]) # Unique emails per run, so a database can be reused
+    if args.base_url:
+        return asyncio.run(run_load(args, args.base_url, fixtures))
+    ai_url = start_mock_ai_provider(args)
+    process, base_url = start_api_server(args, ai_url)
+    try:
+        return asyncio.run(run_load(args, base_url, fixtures))
+    finally:
+        process.terminate()
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            process.wait(timeout=10)
+
+
+# --- Comparison ---
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Throughput may not drop, and no endpoint's p95 may rise, by more than
+    `tolerance` (relative); error rates may not rise by more than one point.
+    """
+    regressions = []
+    if baseline["rps"] and (result["rps"] - baseline["rps"]) / baseline["rps"] < -tolerance:
+        regressions.append(f"rps: {baseline['rps']} -> {result['rps']}")
+    if result["error_rate"] - baseline["error_rate"] > 0.01:
+        regressions.append(f"error_rate: {baseline['error_rate']} -> {result['error_rate']}")
+    for endpoint, previous in baseline["endpoints"].items():
+        current = result["endpoints"].get(endpoint)
+        if current is None or not previous["p95_ms"]:
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"]
+        if change > tolerance:
+            regressions.append(f"{endpoint} p95_ms: {previous['p95_ms']} -> {current['p95_ms']} ({change:+.0%})")
+        if current["error_rate"] - previous["error_rate"] > 0.01:
+            regressions.append(f"{endpoint} error_rate: {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def print_report(result: dict, regressions: list[str]):
+    print(f"{result['requests']} requests in {result['elapsed_seconds']}s: {result['rps']} req/s, "
+          f"error rate {result['error_rate']:.2%} (logins {result['login_seconds']}s)")
+    print("scenarios  " + "  ".join(f"{name} {count}" for name, count in result["scenarios"].items()))
+    print()
+    print(f"{'endpoint':<40} {'count':>7} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<40} {stats['count']:>7} {stats['error_rate']:>6.1%} {stats['p50_ms']:>8.1f} "
+              f"{stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+    print()
+    bounds = [f"<={b}" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}"]
+    print(f"{'histogram (ms)':<40} " + " ".join(f"{b:>7}" for b in bounds))
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<40} " + " ".join(f"{n:>7}" for n in stats["histogram"].values()))
+    for regression in regressions:
+        print(f"REGRESSION  {regression}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="mixed", choices=["mixed", *SCENARIOS])
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which virtual users start")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="Mean think time between scenarios (0 for none)")
+    parser.add_argument("--accounts", type=int, default=3, help="Connected accounts per virtual user")
+    parser.add_argument("--seed-posts", type=int, default=30, help="Posts created per virtual user before the run")
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--base-url", default=None, help="Target a running server instead of starting one")
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh SQLite file for the local server")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--ai-latency-ms", type=float, default=300.0, help="Mock AI provider latency")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--output", metavar="FILE", help="Also write the JSON results to FILE (e.g. a new baseline)")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Fail if results regress beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result, regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
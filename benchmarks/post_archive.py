@@ -0,0 +1,154 @@
+"""
+Hot/cold tiering benchmark: calendar and scheduler query latency before and
+after moving old posts to the archive table.
+
+Seeds a database with benchmarks/seed_data.py (a year of history, so a large
+share of posts is archivable), measures the hot-path queries, runs the archiver
+(app.services.post_archiver) and measures them again:
+
+- calendar:   crud_post.get_posts_by_workspace for the current month of a workspace
+- scheduler:  SCHEDULED posts due within the next hour, in due order
+- get_post:   lookup by id of a hot post, and of an archived one (falls through)
+
+Usage (from the repository root):
+    python benchmarks/post_archive.py --scale 0.05
+    python benchmarks/post_archive.py --database-url postgresql://localhost/social_bench --scale 0.2 --json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import seed_data  # noqa: E402  (sets up sys.path for app/)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def timed(func, runs: int) -> dict:
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return {"p50_ms": round(percentile(durations, 50), 3), "p95_ms": round(percentile(durations, 95), 3)}
+
+
+def measure(db, workspace_ids: list[int], hot_ids: list[int], archived_ids: list[int], runs: int, seed: int) -> dict:
+    from sqlalchemy import text
+    from app import models
+    from app.crud import crud_post
+
+    if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+        db.execute(text("ANALYZE"))
+        db.commit()
+    rng = random.Random(seed) # Same query sequence before and after
+    now = datetime.now(timezone.utc)
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+
+    def calendar():
+        crud_post.get_posts_by_workspace(db, rng.choice(workspace_ids), start_date=month_start, end_date=month_end, limit=500)
+        db.expunge_all()
+
+    def scheduler():
+        (db.query(models.Post)
+         .filter(models.Post.status == models.PostStatus.SCHEDULED,
+                 models.Post.scheduled_at >= now, models.Post.scheduled_at < now + timedelta(hours=1))
+         .order_by(models.Post.scheduled_at).limit(500).all())
+        db.expunge_all()
+
+    results = {"calendar": timed(calendar, runs), "scheduler": timed(scheduler, runs)}
+    results["get_post_hot"] = timed(lambda: crud_post.get_post(db, rng.choice(hot_ids)), runs)
+    if archived_ids:
+        results["get_post_archived"] = timed(lambda: crud_post.get_post(db, rng.choice(archived_ids)), runs)
+    db.expunge_all()
+    return results
+
+
+def run(args) -> dict:
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='archive-bench-'), 'bench.db')}"
+    os.environ["POST_ARCHIVE_AFTER_DAYS"] = str(args.archive_after_days)
+    seeded = seed_data.seed(database_url, args.scale, args.seed, args.processes, log=lambda message: print(message, file=sys.stderr))
+
+    from app import models
+    from app.crud import crud_post_archive
+    from app.database import SessionLocal
+    from app.services.post_archiver import archive_old_posts
+
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=args.archive_after_days) # As archive_old_posts computes it
+        rng = random.Random(args.seed)
+        workspace_ids = [row[0] for row in db.query(models.Workspace.id).all()]
+        archivable_ids = [row[0] for row in db.query(models.Post.id).filter(
+            models.Post.status.in_(crud_post_archive.ARCHIVABLE_STATUSES), models.Post.scheduled_at < cutoff).all()]
+        hot_ids = [row[0] for row in db.query(models.Post.id).filter(models.Post.scheduled_at >= cutoff).all()]
+        hot_sample = rng.sample(hot_ids, min(1000, len(hot_ids)))
+        archived_sample = rng.sample(archivable_ids, min(1000, len(archivable_ids)))
+        total_posts = db.query(models.Post).count()
+
+        before = measure(db, workspace_ids, hot_sample, [], args.queries, args.seed)
+        started = time.perf_counter()
+        moved = archive_old_posts(db, batch_size=args.batch_size, pause_seconds=0)
+        archive_seconds = time.perf_counter() - started
+        after = measure(db, workspace_ids, hot_sample, archived_sample, args.queries, args.seed)
+    finally:
+        db.close()
+
+    return {
+        "config": {
+            "database": seeded["database"],
+            "scale": args.scale,
+            "archive_after_days": args.archive_after_days,
+            "batch_size": args.batch_size,
+            "queries": args.queries,
+        },
+        "posts": total_posts,
+        "archived": moved,
+        "archive_seconds": round(archive_seconds, 2),
+        "archive_posts_per_second": round(moved / max(archive_seconds, 1e-9)),
+        "before": before,
+        "after": after,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="An empty database; defaults to a fresh temporary SQLite file")
+    parser.add_argument("--scale", type=float, default=0.05, help="seed_data scale (1.0 = 10M posts)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--archive-after-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200, help="Runs per measured query")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{result['posts']:,} posts, {result['archived']:,} archived in {result['archive_seconds']}s "
+          f"({result['archive_posts_per_second']:,} posts/s)")
+    print(f"{'query':<20} {'before p50':>11} {'p95':>9} {'after p50':>11} {'p95':>9}")
+    for name, after in result["after"].items():
+        before = result["before"].get(name, {"p50_ms": float("nan"), "p95_ms": float("nan")})
+        print(f"{name:<20} {before['p50_ms']:>11.3f} {before['p95_ms']:>9.3f} {after['p50_ms']:>11.3f} {after['p95_ms']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
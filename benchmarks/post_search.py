@@ -0,0 +1,150 @@
+"""
+Post search benchmark: the full-text index (app.crud.crud_post_search) against
+the naive alternative, a LIKE filter on content_text.
+
+Seeds a database with benchmarks/seed_data.py, builds the search index with
+rebuild_index (what `python -m app.cli reindex-posts` runs after a bulk load)
+and measures, for random workspaces:
+
+- like_scan:       lower(content_text) LIKE '%analytics%' within the workspace, 20 rows
+                   (stops early: ~1 in 8 posts match)
+- like_scan_rare:  the same for "quick tip" + "design" (~1 in 50 posts: scans further)
+- search:          one common word ("analytics")
+- search_terms:    several words ("quick tip design")
+- search_prefix:   a word prefix ("autom*")
+- search_filtered: common word, POSTED only, scheduled in the last 90 days
+- search_page_2:   the page after the first one, via its cursor
+
+Scale 0.5 is 5,000,000 posts; that run (SQLite, one core) is recorded in
+benchmarks/baselines/post_search_5m.json.
+
+Usage (from the repository root):
+    python benchmarks/post_search.py --scale 0.05
+    python benchmarks/post_search.py --scale 0.5 --json
+    python benchmarks/post_search.py --database-url postgresql://localhost/social_bench --scale 0.5
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import seed_data  # noqa: E402  (sets up sys.path for app/)
+from post_archive import timed  # noqa: E402
+
+
+def measure(db, workspace_ids: list[int], runs: int, seed: int) -> dict:
+    from sqlalchemy import text
+    from app import models
+    from app.crud import crud_post_search
+
+    if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+        db.execute(text("ANALYZE"))
+        db.commit()
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    def like_scan():
+        db.execute(text(
+            "SELECT id FROM posts WHERE workspace_id = :ws AND lower(content_text) LIKE :pattern ORDER BY id LIMIT 20"
+        ), {"ws": rng.choice(workspace_ids), "pattern": "%analytics%"}).all()
+
+    def like_scan_rare():
+        db.execute(text(
+            "SELECT id FROM posts WHERE workspace_id = :ws AND lower(content_text) LIKE :first "
+            "AND lower(content_text) LIKE :second ORDER BY id LIMIT 20"
+        ), {"ws": rng.choice(workspace_ids), "first": "%quick tip%", "second": "%design%"}).all()
+
+    def search(query, **filters):
+        def run():
+            crud_post_search.search_posts(db, rng.choice(workspace_ids), query, **filters)
+            db.expunge_all()
+        return run
+
+    def page_2():
+        workspace_id = rng.choice(workspace_ids)
+        _, cursor = crud_post_search.search_posts(db, workspace_id, "analytics")
+        if cursor:
+            crud_post_search.search_posts(db, workspace_id, "analytics", cursor=cursor)
+        db.expunge_all()
+
+    return {
+        "like_scan": timed(like_scan, runs),
+        "like_scan_rare": timed(like_scan_rare, runs),
+        "search": timed(search("analytics"), runs),
+        "search_terms": timed(search("quick tip design"), runs),
+        "search_prefix": timed(search("autom*"), runs),
+        "search_filtered": timed(search("analytics", statuses=[models.PostStatus.POSTED],
+                                        start_date=now - timedelta(days=90), end_date=now), runs),
+        "search_page_2": timed(page_2, runs), # Both pages
+    }
+
+
+def run(args) -> dict:
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='search-bench-'), 'bench.db')}"
+    seeded = seed_data.seed(database_url, args.scale, args.seed, args.processes, log=lambda message: print(message, file=sys.stderr))
+
+    from app import models
+    from app.crud import crud_post_search
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        indexed = crud_post_search.rebuild_index(db, batch_size=args.batch_size)
+        index_seconds = time.perf_counter() - started
+        workspace_ids = [row[0] for row in db.query(models.Workspace.id).all()]
+        results = measure(db, workspace_ids, args.queries, args.seed)
+    finally:
+        db.close()
+
+    return {
+        "config": {
+            "database": seeded["database"],
+            "scale": args.scale,
+            "batch_size": args.batch_size,
+            "queries": args.queries,
+        },
+        "posts": seeded["counts"]["posts"],
+        "workspaces": len(workspace_ids),
+        "indexed": indexed,
+        "index_seconds": round(index_seconds, 2),
+        "index_posts_per_second": round(indexed / max(index_seconds, 1e-9)),
+        "queries": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="An empty database; defaults to a fresh temporary SQLite file")
+    parser.add_argument("--scale", type=float, default=0.05, help="seed_data scale (0.5 = 5M posts)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=20000, help="Posts per index transaction")
+    parser.add_argument("--queries", type=int, default=200, help="Runs per measured query")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{result['posts']:,} posts in {result['workspaces']:,} workspaces; indexed {result['indexed']:,} "
+          f"in {result['index_seconds']}s ({result['index_posts_per_second']:,} posts/s)")
+    print(f"{'query':<18} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, timing in result["queries"].items():
+        print(f"{name:<18} {timing['p50_ms']:>9.3f} {timing['p95_ms']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
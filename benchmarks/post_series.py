@@ -0,0 +1,177 @@
+"""
+Recurring post series benchmark (app.crud.crud_post_series).
+
+Seeds a database with benchmarks/seed_data.py, then creates --series daily series
+spread over the accounts of two workspaces:
+
+- lazy:  as the API does, occurrences materialized POST_SERIES_HORIZON_HOURS ahead
+- eager: the same series with a year of occurrences created as posts up front (what
+         clients did before series existed: hundreds of pre-created posts each)
+
+and measures the calendar reads of each:
+
+- month_eager:  get_posts_in_range over a month six months out (the posts)
+- month_lazy:   get_virtual_occurrences over the same month (expanded on the fly)
+- year_lazy:    get_virtual_occurrences over the next year, first 2000 occurrences
+- materialize_idle: a materialize_due pass with nothing due (the beat task most runs)
+
+It also reports the time and rows the two ways of creating the series cost, and one
+materialize_due pass after every lazy series' horizon is rewound by a day.
+
+Usage (from the repository root):
+    python benchmarks/post_series.py --scale 0.01
+    python benchmarks/post_series.py --scale 0.05 --series 200 --json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import seed_data  # noqa: E402  (sets up sys.path for app/)
+from post_archive import timed  # noqa: E402
+
+
+def create_series(db, workspace_id: int, account_ids: list[int], count: int, eager: bool) -> tuple[list[int], float]:
+    from app import schemas
+    from app.crud import crud_post_series
+
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    series_ids = []
+    started = time.perf_counter()
+    for index in range(count):
+        series_in = schemas.PostSeriesCreate(
+            connected_account_id=account_ids[index % len(account_ids)], content_text=f"Tip of the day #{index}",
+            frequency="daily", starts_at=now + timedelta(hours=1, minutes=7 * index),
+        )
+        db_series = crud_post_series.create_series(db, workspace_id, series_in)
+        if eager:
+            crud_post_series._materialize(db, db_series, now + timedelta(days=365), datetime.now(timezone.utc))
+            db.commit()
+        series_ids.append(db_series.id)
+    return series_ids, time.perf_counter() - started
+
+
+def measure(db, lazy_workspace_id: int, eager_workspace_id: int, runs: int) -> dict:
+    from sqlalchemy import text
+    from app.crud import crud_post, crud_post_series
+
+    if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+        db.execute(text("ANALYZE"))
+        db.commit()
+    now = datetime.now(timezone.utc)
+    month_start, month_end = now + timedelta(days=180), now + timedelta(days=210)
+
+    def month_eager():
+        crud_post.get_posts_in_range(db, workspace_id=eager_workspace_id, start_date=month_start, end_date=month_end, limit=5000)
+        db.expunge_all()
+
+    def month_lazy():
+        crud_post_series.get_virtual_occurrences(db, lazy_workspace_id, month_start, month_end, limit=5000)
+        db.expunge_all()
+
+    def year_lazy():
+        crud_post_series.get_virtual_occurrences(db, lazy_workspace_id, now, now + timedelta(days=365), limit=2000)
+        db.expunge_all()
+
+    def materialize_idle():
+        crud_post_series.materialize_due(db)
+
+    return {
+        "month_eager": timed(month_eager, runs),
+        "month_lazy": timed(month_lazy, runs),
+        "year_lazy": timed(year_lazy, runs),
+        "materialize_idle": timed(materialize_idle, runs),
+    }
+
+
+def run(args) -> dict:
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='series-bench-'), 'bench.db')}"
+    seeded = seed_data.seed(database_url, args.scale, args.seed, args.processes, log=lambda message: print(message, file=sys.stderr))
+
+    from sqlalchemy import func
+    from app import models
+    from app.core.config import settings
+    from app.crud import crud_post_series
+    from app.crud.crud_outbox import as_utc
+    from app.database import SessionLocal
+
+    settings.SCHEDULE_MIN_SPACING_SECONDS = 0 # Seeded posts sit at random times; spacing is measured by schedule_conflicts.py
+    db = SessionLocal()
+    try:
+        workspace_ids = [
+            row[0] for row in db.query(models.ConnectedAccount.workspace_id)
+            .group_by(models.ConnectedAccount.workspace_id).order_by(models.ConnectedAccount.workspace_id).limit(2)
+        ]
+        accounts = {
+            workspace_id: [row[0] for row in db.query(models.ConnectedAccount.id).filter(models.ConnectedAccount.workspace_id == workspace_id)]
+            for workspace_id in workspace_ids
+        }
+        lazy_workspace_id, eager_workspace_id = workspace_ids
+        lazy_ids, lazy_seconds = create_series(db, lazy_workspace_id, accounts[lazy_workspace_id], args.series, eager=False)
+        eager_ids, eager_seconds = create_series(db, eager_workspace_id, accounts[eager_workspace_id], args.series, eager=True)
+        rows = {
+            name: db.query(func.count(models.Post.id)).filter(models.Post.series_id.in_(ids)).scalar()
+            for name, ids in (("lazy", lazy_ids), ("eager", eager_ids))
+        }
+        results = measure(db, lazy_workspace_id, eager_workspace_id, args.queries)
+
+        for db_series in db.query(models.PostSeries).filter(models.PostSeries.id.in_(lazy_ids)):
+            db_series.materialized_until = as_utc(db_series.materialized_until) - timedelta(days=1)
+        db.commit()
+        started = time.perf_counter()
+        caught_up = crud_post_series.materialize_due(db)
+        catch_up_seconds = time.perf_counter() - started
+    finally:
+        db.close()
+
+    return {
+        "config": {
+            "database": seeded["database"],
+            "scale": args.scale,
+            "series": args.series,
+            "queries": args.queries,
+        },
+        "posts": seeded["counts"]["posts"],
+        "create_seconds": {"lazy": round(lazy_seconds, 2), "eager": round(eager_seconds, 2)},
+        "series_posts": rows,
+        "catch_up": {"posts": caught_up, "seconds": round(catch_up_seconds, 3)},
+        "queries": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="An empty database; defaults to a fresh temporary SQLite file")
+    parser.add_argument("--scale", type=float, default=0.01, help="seed_data scale (0.1 = 1M posts)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--series", type=int, default=100, help="Daily series per workspace")
+    parser.add_argument("--queries", type=int, default=100, help="Runs per measured operation")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{result['posts']:,} posts; {result['config']['series']} daily series per workspace")
+    for name in ("lazy", "eager"):
+        print(f"{name:<6} created in {result['create_seconds'][name]}s, {result['series_posts'][name]:,} posts stored")
+    print(f"catch-up after a day: {result['catch_up']['posts']} posts in {result['catch_up']['seconds']}s")
+    print(f"{'operation':<18} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, timing in result["queries"].items():
+        print(f"{name:<18} {timing['p50_ms']:>9.3f} {timing['p95_ms']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+End-to-end publish pipeline benchmark: scheduled post -> outbox relay -> broker
+-> publish_post_task -> platform -> POSTED.
+
+Everything runs in this process against stand-ins for the external services:
+
+- a fresh database (a temporary SQLite file by default, or --database-url),
+- the in-memory Celery broker, with an in-thread worker (start_worker, thread pool),
+- the outbox relay loop in a thread,
+- the mock platform (app/services/mock_platform.py) under uvicorn on a local
+  port, with configurable latency, jitter, error and rate-limit rates.
+
+The benchmark seeds N workspaces with accounts on the mock platform and posts
+due across --window seconds, starting --lead seconds from now. It waits until
+every post is POSTED or ERROR and reports:
+
+- throughput (posts/s between the first due time and the last publish),
+- queue lag percentiles (posted_at - scheduled_at),
+- DB load (statements and statement time per post, pool checkout wait),
+- platform calls, duplicates suppressed, errors and rate limits.
+
+The publish retry backoff is scaled down (--retry-base-seconds) so injected
+errors are retried within the run.
+
+Usage (from the repository root):
+    python benchmarks/publish_pipeline.py --posts 500 --window 10 --latency-ms 80 --error-rate 0.05
+    python benchmarks/publish_pipeline.py --posts 500 --json > pipeline.json
+    python benchmarks/publish_pipeline.py --posts 500 --compare pipeline.json --tolerance 0.25
+"""
+import argparse
+import contextlib
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def configure_environment(args) -> str:
+    # Must run before anything under app/ is imported: Settings read the environment once.
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='publish-bench-'), 'bench.db')}"
+    os.environ.update(
+        DATABASE_URL=database_url,
+        CELERY_BROKER_URL="memory://",
+        CELERY_METRICS_PORT="0",
+        DB_CREATE_TABLES_ON_STARTUP="false",
+        OUTBOX_RELAY_LOOKAHEAD_SECONDS=str(int(args.lead + args.window) + 60), # Relay everything up front
+        OUTBOX_RELAY_POLL_INTERVAL_SECONDS="0.2",
+        PUBLISH_RETRY_BASE_SECONDS=str(args.retry_base_seconds),
+        PUBLISH_RETRY_MAX_SECONDS=str(args.retry_base_seconds * 8),
+        CIRCUIT_BREAKER_FAILURE_THRESHOLD=str(args.breaker_threshold),
+        CIRCUIT_BREAKER_OPEN_SECONDS="2",
+    )
+    os.environ.setdefault("SECRET_KEY", "publish-pipeline-benchmark-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    return database_url
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_platform(args) -> tuple[object, str]:
+    import uvicorn
+    from app.services.mock_platform import create_mock_platform
+
+    mock = create_mock_platform(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, name="mock-platform", daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Mock platform did not start")
+        time.sleep(0.05)
+    return mock, f"http://127.0.0.1:{port}"
+
+
+def seed(args, api_base_url: str) -> tuple[list[int], float]:
+    """
+    Create workspaces, accounts and scheduled posts (with their outbox messages).
+    Returns (post ids, epoch seconds of the first due time).
+    """
+    from datetime import datetime, timedelta, timezone
+    from app import models
+    from app.crud import crud_outbox
+    from app.core.security import get_password_hash
+    from app.database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = models.User(email="bench@example.com", hashed_password=get_password_hash("bench"), is_active=True)
+        platform = models.SocialPlatform(name="Mockbench", api_base_url=api_base_url)
+        db.add_all([user, platform])
+        db.flush()
+
+        accounts = []
+        for w in range(args.workspaces):
+            workspace = models.Workspace(name=f"bench-{w}")
+            workspace.users.append(user)
+            db.add(workspace)
+            db.flush()
+            for a in range(args.accounts_per_workspace):
+                accounts.append(models.ConnectedAccount(
+                    user_id=user.id, workspace_id=workspace.id, platform_id=platform.id,
+                    platform_account_id=f"bench-{w}-{a}", platform_account_name=f"bench-{w}-{a}",
+                    access_token=f"token-{w}-{a}", is_active=True,
+                ))
+        db.add_all(accounts)
+        db.flush()
+
+        first_due = datetime.now(timezone.utc) + timedelta(seconds=args.lead)
+        step = args.window / max(args.posts - 1, 1)
+        posts = []
+        for i in range(args.posts):
+            account = accounts[i % len(accounts)]
+            posts.append(models.Post(
+                workspace_id=account.workspace_id, connected_account_id=account.id,
+                content_text=f"Benchmark post {i}", status=models.PostStatus.SCHEDULED,
+                scheduled_at=first_due + timedelta(seconds=i * step),
+            ))
+        db.add_all(posts)
+        db.flush()
+        for post in posts:
+            crud_outbox.add_publish_message(db, post)
+        db.commit()
+        return [post.id for post in posts], first_due.timestamp()
+    finally:
+        db.close()
+
+
+def metric_total(name: str) -> float:
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def wait_for_completion(post_ids: list[int], timeout: float) -> bool:
+    from sqlalchemy import func
+    from app import models
+    from app.database import SessionLocal
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        db = SessionLocal()
+        try:
+            pending = (
+                db.query(func.count(models.Post.id))
+                .filter(models.Post.status == models.PostStatus.SCHEDULED)
+                .scalar()
+            )
+        finally:
+            db.close()
+        if pending == 0:
+            return True
+        time.sleep(0.25)
+    return False
+
+
+def collect(post_ids: list[int], first_due: float) -> dict:
+    from app import models
+    from app.crud.crud_outbox import as_utc
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = db.query(models.Post.status, models.Post.scheduled_at, models.Post.posted_at).all()
+    finally:
+        db.close()
+    lags_ms = []
+    last_posted = first_due
+    counts = {"posted": 0, "error": 0, "scheduled": 0}
+    for status, scheduled_at, posted_at in rows:
+        key = status.value if hasattr(status, "value") else status
+        counts[key] = counts.get(key, 0) + 1
+        if posted_at is not None:
+            posted = as_utc(posted_at).timestamp()
+            lags_ms.append((posted - as_utc(scheduled_at).timestamp()) * 1000)
+            last_posted = max(last_posted, posted)
+    return {"counts": counts, "lags_ms": lags_ms, "last_posted": last_posted}
+
+
+def run(args) -> dict:
+    database_url = configure_environment(args)
+
+    from celery.contrib.testing.worker import start_worker
+    from app.core.celery_app import PUBLISH_BULK_QUEUE, PUBLISH_NOW_QUEUE, celery_app
+    from app.core.outbox_relay import run_relay
+
+    mock, api_base_url = start_mock_platform(args)
+    post_ids, first_due = seed(args, api_base_url)
+
+    queries_before = metric_total("db_query_duration_seconds_count")
+    query_seconds_before = metric_total("db_query_duration_seconds_sum")
+    pool_wait_before = metric_total("db_pool_checkout_wait_seconds_sum")
+
+    threading.Thread(target=run_relay, name="outbox-relay", daemon=True).start()
+    started = time.time()
+    with start_worker(celery_app, pool="threads", concurrency=args.concurrency, perform_ping_check=False,
+                      queues=[PUBLISH_NOW_QUEUE, PUBLISH_BULK_QUEUE], shutdown_timeout=30):
+        completed = wait_for_completion(post_ids, timeout=args.lead + args.window + args.timeout)
+    wall_seconds = time.time() - started
+
+    queries = metric_total("db_query_duration_seconds_count") - queries_before
+    query_seconds = metric_total("db_query_duration_seconds_sum") - query_seconds_before
+    pool_wait = metric_total("db_pool_checkout_wait_seconds_sum") - pool_wait_before
+
+    outcome = collect(post_ids, first_due)
+    posted = outcome["counts"].get("posted", 0)
+    publish_span = max(outcome["last_posted"] - first_due, 1e-9)
+    lags = outcome["lags_ms"]
+    return {
+        "config": {
+            "database": database_url.split(":", 1)[0],
+            "posts": args.posts,
+            "workspaces": args.workspaces,
+            "accounts": args.workspaces * args.accounts_per_workspace,
+            "window_seconds": args.window,
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+        },
+        "completed": completed,
+        "wall_seconds": round(wall_seconds, 3),
+        "posted": posted,
+        "errors": outcome["counts"].get("error", 0),
+        "throughput_posts_per_second": round(posted / publish_span, 2),
+        "queue_lag_ms": {
+            "p50": round(percentile(lags, 50) or 0, 1),
+            "p95": round(percentile(lags, 95) or 0, 1),
+            "p99": round(percentile(lags, 99) or 0, 1),
+            "max": round(max(lags) if lags else 0, 1),
+        },
+        "db": {
+            "statements": int(queries),
+            "statements_per_post": round(queries / max(args.posts, 1), 2),
+            "statement_ms_per_post": round(query_seconds * 1000 / max(args.posts, 1), 3),
+            "pool_wait_ms_total": round(pool_wait * 1000, 1),
+        },
+        "platform": dict(mock.state.stats),
+    }
+
+
+# Higher is better for throughput, lower is better for everything else compared here.
+COMPARED = [
+    ("throughput_posts_per_second", "higher"),
+    ("queue_lag_ms.p95", "lower"),
+    ("db.statements_per_post", "lower"),
+]
+
+
+def lookup(result: dict, path: str):
+    for key in path.split("."):
+        result = result[key]
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for path, better in COMPARED:
+        current, previous = lookup(result, path), lookup(baseline, path)
+        if not previous:
+            continue
+        change = (current - previous) / previous
+        if (better == "higher" and change < -tolerance) or (better == "lower" and change > tolerance):
+            regressions.append(f"{path}: {previous} -> {current} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--workspaces", type=int, default=10)
+    parser.add_argument("--accounts-per-workspace", type=int, default=3)
+    parser.add_argument("--window", type=float, default=5.0, help="Seconds over which the posts fall due")
+    parser.add_argument("--lead", type=float, default=2.0, help="Seconds from now until the first post is due")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker threads")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock platform latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of publish calls answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429")
+    parser.add_argument("--retry-base-seconds", type=float, default=0.5)
+    parser.add_argument("--breaker-threshold", type=int, default=1000, help="Circuit breaker failure threshold for the run")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait after the last post is due")
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Fail if results regress beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.json:
+        # Task and relay logging goes to stderr so stdout is only the JSON document
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run(args)
+    else:
+        result = run(args)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"posted {result['posted']}/{args.posts} (errors {result['errors']}, completed {result['completed']}) "
+              f"in {result['wall_seconds']}s")
+        print(f"throughput      {result['throughput_posts_per_second']} posts/s")
+        print(f"queue lag (ms)  " + "  ".join(f"{k} {v}" for k, v in result["queue_lag_ms"].items()))
+        print(f"db              " + "  ".join(f"{k} {v}" for k, v in result["db"].items()))
+        print(f"platform        " + "  ".join(f"{k} {v}" for k, v in result["platform"].items()))
+        for regression in regressions:
+            print(f"REGRESSION      {regression}")
+    return 1 if regressions or not result["completed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
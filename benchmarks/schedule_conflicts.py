@@ -0,0 +1,170 @@
+"""
+Scheduling spacing benchmark (app.crud.crud_schedule).
+
+Seeds a database with benchmarks/seed_data.py, gives one account --busy-posts
+extra scheduled posts over the next 90 days (a heavy publisher) and measures, on
+that account:
+
+- naive_single:    what the check would cost without the interval lookup: load
+                   every scheduled time of the account and compare in Python
+- check_single:    one proposed time (the check done on every create/update)
+- check_batch:     a batch of --batch-size proposals spread over 30 days
+                   (a bulk reschedule, or a /conflicts request)
+- check_workspace: the same batch spread over all accounts of a random workspace
+
+then drops ix_posts_account_scheduled and measures check_single and check_batch
+again (*_no_index), to show what the index buys.
+
+Usage (from the repository root):
+    python benchmarks/schedule_conflicts.py --scale 0.05
+    python benchmarks/schedule_conflicts.py --scale 0.1 --busy-posts 10000 --json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import seed_data  # noqa: E402  (sets up sys.path for app/)
+from post_archive import timed  # noqa: E402
+
+
+def add_busy_account(db, posts: int, seed: int):
+    from sqlalchemy import insert
+    from app import models
+
+    rng = random.Random(seed)
+    account = db.query(models.ConnectedAccount).order_by(models.ConnectedAccount.id).first()
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    rows = [{
+        "workspace_id": account.workspace_id, "connected_account_id": account.id, "content_text": "Busy account post",
+        "status": models.PostStatus.SCHEDULED, "scheduled_at": now + timedelta(seconds=rng.randrange(90 * 86400)),
+    } for _ in range(posts)]
+    for start in range(0, len(rows), 10000):
+        db.execute(insert(models.Post), rows[start:start + 10000])
+    db.commit()
+    return account
+
+
+def measure(db, account, workspace_ids: list[int], batch_size: int, runs: int, seed: int, index: bool) -> dict:
+    from sqlalchemy import select, text
+    from app import models
+    from app.crud import crud_schedule
+    from app.crud.crud_outbox import as_utc
+
+    if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+        db.execute(text("ANALYZE"))
+        db.commit()
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    spacing = timedelta(seconds=crud_schedule.spacing_for(account))
+    accounts_by_workspace = {}
+    for account_id, workspace_id in db.query(models.ConnectedAccount.id, models.ConnectedAccount.workspace_id).filter(
+        models.ConnectedAccount.workspace_id.in_(workspace_ids)
+    ):
+        accounts_by_workspace.setdefault(workspace_id, []).append(account_id)
+
+    def proposed_time() -> datetime:
+        return now + timedelta(seconds=rng.randrange(30 * 86400))
+
+    def naive_single():
+        at = proposed_time()
+        times = db.execute(
+            select(models.Post.scheduled_at)
+            .where(models.Post.connected_account_id == account.id, models.Post.status == models.PostStatus.SCHEDULED)
+        ).scalars().all()
+        [other for other in times if abs(as_utc(other) - at) < spacing]
+
+    def check_single():
+        crud_schedule.find_conflicts(db, account.workspace_id, [crud_schedule.Proposal(account.id, proposed_time())])
+        db.rollback()
+
+    def check_batch():
+        proposals = [crud_schedule.Proposal(account.id, proposed_time()) for _ in range(batch_size)]
+        crud_schedule.find_conflicts(db, account.workspace_id, proposals)
+        db.rollback()
+
+    def check_workspace():
+        workspace_id = rng.choice(list(accounts_by_workspace))
+        proposals = [crud_schedule.Proposal(rng.choice(accounts_by_workspace[workspace_id]), proposed_time()) for _ in range(batch_size)]
+        crud_schedule.find_conflicts(db, workspace_id, proposals)
+        db.rollback()
+
+    if not index:
+        return {"check_single_no_index": timed(check_single, runs), "check_batch_no_index": timed(check_batch, runs)}
+    return {
+        "naive_single": timed(naive_single, runs),
+        "check_single": timed(check_single, runs),
+        "check_batch": timed(check_batch, runs),
+        "check_workspace": timed(check_workspace, runs),
+    }
+
+
+def run(args) -> dict:
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='schedule-bench-'), 'bench.db')}"
+    seeded = seed_data.seed(database_url, args.scale, args.seed, args.processes, log=lambda message: print(message, file=sys.stderr))
+
+    from sqlalchemy import func, text
+    from app import models
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        account = add_busy_account(db, args.busy_posts, args.seed)
+        scheduled = db.query(func.count(models.Post.id)).filter(
+            models.Post.connected_account_id == account.id, models.Post.status == models.PostStatus.SCHEDULED
+        ).scalar()
+        workspace_ids = [row[0] for row in db.query(models.Workspace.id).all()]
+        results = measure(db, account, workspace_ids, args.batch_size, args.queries, args.seed, index=True)
+        db.execute(text("DROP INDEX ix_posts_account_scheduled"))
+        db.commit()
+        results.update(measure(db, account, workspace_ids, args.batch_size, args.queries, args.seed, index=False))
+    finally:
+        db.close()
+
+    return {
+        "config": {
+            "database": seeded["database"],
+            "scale": args.scale,
+            "batch_size": args.batch_size,
+            "queries": args.queries,
+        },
+        "posts": seeded["counts"]["posts"],
+        "busy_account_scheduled": scheduled,
+        "queries": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="An empty database; defaults to a fresh temporary SQLite file")
+    parser.add_argument("--scale", type=float, default=0.05, help="seed_data scale (0.1 = 1M posts)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--busy-posts", type=int, default=5000, help="Scheduled posts added to the measured account")
+    parser.add_argument("--batch-size", type=int, default=100, help="Proposals per batch check")
+    parser.add_argument("--queries", type=int, default=200, help="Runs per measured operation")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{result['posts']:,} posts; measured account has {result['busy_account_scheduled']:,} scheduled posts")
+    print(f"{'operation':<22} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, timing in result["queries"].items():
+        print(f"{name:<22} {timing['p50_ms']:>9.3f} {timing['p95_ms']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""
+Synthetic data generator for load tests: users, workspaces with memberships,
+connected accounts with encrypted tokens, and posts spread over time and statuses.
+
+Scale factor 1.0 is 10,000 users, 5,000 workspaces, 20,000 connected accounts
+and 10,000,000 posts. Output is deterministic for a given --seed and --scale:
+rows are generated in fixed-size chunks, each from its own seeded RNG. The
+exception is token ciphertext, because Fernet adds a random IV; the plaintexts
+are deterministic.
+
+It loads fast because it never goes through the ORM or per-row commits:
+
+- rows are generated as plain tuples with values already in storage format,
+  post chunks in a process pool ahead of the loader;
+- rows are written with DBAPI executemany in large chunks (one transaction per
+  chunk), or with COPY FROM STDIN on Postgres (psycopg2 or psycopg 3);
+- ids are assigned here, so foreign keys need no RETURNING round trips;
+- tokens are encrypted in a process pool before the load, and one bcrypt
+  hash is shared by all users (password "password");
+- secondary indexes on the big tables are dropped before the load and built
+  once at the end; on SQLite the load runs with synchronous=OFF.
+
+Rows are appended after the current max ids, so it can run against a database
+that already has data. Scheduled posts get no outbox messages; they are for API
+load tests, not for publishing.
+
+Usage (from the repository root):
+    python benchmarks/seed_data.py --database-url sqlite:///./load.db --scale 0.01
+    python benchmarks/seed_data.py --database-url postgresql://localhost/social --scale 1 --json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BASE_COUNTS = {
+    "users": 10_000,
+    "workspaces": 5_000,
+    "accounts": 20_000,
+    "posts": 10_000_000,
+}
+CHUNK_SIZE = 50_000
+PLATFORMS = ("Facebook", "Twitter", "Instagram", "LinkedIn")
+# (status name, weight): past posts are mostly published; the future is scheduled
+STATUS_WEIGHTS = (("POSTED", 70), ("SCHEDULED", 15), ("DRAFT", 10), ("ERROR", 5))
+POST_PAST_DAYS = 365
+POST_FUTURE_DAYS = 90
+CONTENT_TEMPLATES = (
+    "New on the blog: {topic} in {n} steps",
+    "Join us {day} for a live Q&A about {topic}",
+    "{n} things we learned shipping {topic}",
+    "Behind the scenes: how the team approaches {topic}",
+    "Quick tip #{n}: {topic}",
+    "We're hiring! Help us build {topic}",
+)
+TOPICS = ("scheduling", "analytics", "brand voice", "video", "community", "automation", "growth", "design")
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+ERROR_MESSAGES = ("transient: Platform error: 503", "auth: token refresh failed", "permanent: Rejected by platform: 422")
+
+
+def configure_environment(database_url: str):
+    # Settings and the engine read the environment at import time
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "synthetic-data-generator-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+
+
+def counts_for(scale: float) -> dict:
+    return {name: max(1, int(count * scale)) for name, count in BASE_COUNTS.items()}
+
+
+def ts(value: datetime | None) -> str | None:
+    # The format SQLAlchemy's DateTime stores on SQLite; Postgres parses it too
+    return value.isoformat(" ", "microseconds") if value is not None else None
+
+
+def _encrypt_chunk(tokens: list[str]) -> list[bytes]:
+    from app.core.security import encrypt_data
+    return [encrypt_data(token) for token in tokens]
+
+
+def encrypt_tokens(tokens: list[str], processes: int) -> list[bytes]:
+    chunks = [tokens[i:i + 2_000] for i in range(0, len(tokens), 2_000)]
+    if processes <= 1 or len(chunks) <= 1:
+        return [value for chunk in chunks for value in _encrypt_chunk(chunk)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return [value for chunk in pool.map(_encrypt_chunk, chunks) for value in chunk]
+
+
+class Loader:
+    """
+    Writes rows (tuples of storage-format values) to a table: COPY on Postgres,
+    DBAPI executemany elsewhere. Bypasses SQLAlchemy's per-value type processing.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver in ("psycopg2", "psycopg")
+        self.placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+
+    def load(self, table, columns: list[str], rows: list[tuple]):
+        if not rows:
+            return
+        if self.use_copy:
+            self._copy(table, columns, rows)
+        else:
+            statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join([self.placeholder] * len(columns))})"
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql(statement, rows)
+
+    def _copy(self, table, columns: list[str], rows: list[tuple]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if v is None else ("\\x" + v.hex() if isinstance(v, bytes) else v) for v in row])
+        buffer.seek(0)
+        statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')"
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if self.engine.dialect.driver == "psycopg2":
+                cursor.copy_expert(statement, buffer)
+            else:
+                with cursor.copy(statement) as copy:
+                    copy.write(buffer.getvalue())
+            raw.commit()
+        finally:
+            raw.close()
+
+
+def next_id(engine, table) -> int:
+    from sqlalchemy import func, select
+    with engine.connect() as conn:
+        return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def drop_indexes(engine, tables) -> list:
+    dropped = []
+    for table in tables:
+        for index in table.indexes:
+            index.drop(bind=engine, checkfirst=True)
+            dropped.append(index)
+    return dropped
+
+
+def create_indexes(engine, indexes):
+    for index in indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def reset_sequences(engine, tables):
+    if engine.dialect.name != "postgresql":
+        return
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+            ))
+
+
+def generate_posts_chunk(seed: int, chunk_index: int, first_id: int, size: int, accounts: list[tuple],
+                         user_ids: tuple[int, int], now: datetime) -> list[tuple]:
+    """
+    One chunk of post rows, deterministic for (seed, chunk_index).
+    accounts: [(account id, workspace id)]; user_ids: (first, last) inclusive.
+    """
+    rng = random.Random(seed * 1_000_003 + chunk_index)
+    random_float = rng.random # rng.random() scaled is several times faster than randrange()
+    # Cumulative status thresholds
+    total_weight = sum(weight for _, weight in STATUS_WEIGHTS)
+    thresholds, running = [], 0
+    for name, weight in STATUS_WEIGHTS:
+        running += weight
+        thresholds.append((running / total_weight, name))
+    past_seconds = POST_PAST_DAYS * 86400
+    future_seconds = POST_FUTURE_DAYS * 86400
+    first_user, last_user = user_ids
+    user_span = last_user - first_user + 1
+    contents = [
+        template.format(topic=topic, n=n, day=day)
+        for template in CONTENT_TEMPLATES for topic in TOPICS for n in range(2, 12) for day in DAYS[:1 if "{day}" not in template else None]
+    ]
+    n_accounts, n_contents = len(accounts), len(contents)
+    rows = []
+    for offset in range(size):
+        post_id = first_id + offset
+        account_id, workspace_id = accounts[int(random_float() * n_accounts)]
+        roll = random_float()
+        status = next(name for threshold, name in thresholds if roll < threshold)
+        if status == "SCHEDULED" or (status == "DRAFT" and random_float() < 0.5):
+            scheduled_at = now + timedelta(seconds=60 + int(random_float() * future_seconds))
+        elif status == "DRAFT":
+            scheduled_at = None
+        else:
+            scheduled_at = now - timedelta(seconds=60 + int(random_float() * past_seconds))
+        created_at = (scheduled_at or now) - timedelta(seconds=600 + int(random_float() * 14 * 86400))
+        posted_at = scheduled_at + timedelta(milliseconds=200 + int(random_float() * 30_000)) if status == "POSTED" else None
+        rows.append((
+            post_id,
+            workspace_id,
+            account_id,
+            first_user + int(random_float() * user_span),
+            contents[int(random_float() * n_contents)],
+            f"https://cdn.example.com/media/{post_id}.jpg" if random_float() < 0.3 else None,
+            status, # Enum columns store the member name
+            ts(scheduled_at),
+            ts(posted_at),
+            ERROR_MESSAGES[post_id % len(ERROR_MESSAGES)] if status == "ERROR" else None,
+            f"sim_{post_id}" if status == "POSTED" else None,
+            ts(created_at),
+        ))
+    return rows
+
+
+def _generate_posts_chunk(job: tuple) -> list[tuple]:
+    return generate_posts_chunk(*job)
+
+
+def log_progress(log, done: int, total: int, started: float):
+    if done % (CHUNK_SIZE * 20) == 0 or done == total:
+        log(f"posts: {done:,}/{total:,} ({done / (time.perf_counter() - started):,.0f} rows/s)")
+
+
+def seed(database_url: str, scale: float, seed_value: int, processes: int, log=print) -> dict:
+    configure_environment(database_url)
+    from sqlalchemy import event
+    from app.core.security import get_password_hash
+    from app.database import Base, engine, init_db
+
+    counts = counts_for(scale)
+    timings = {}
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0) # Stored as naive UTC
+    loader = Loader(engine)
+
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _fast_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.close()
+        engine.dispose() # Apply to new connections only
+
+    init_db()
+    tables = Base.metadata.tables
+    users, workspaces, members = tables["users"], tables["workspaces"], tables["user_workspace"]
+    platforms, accounts, posts = tables["social_platforms"], tables["connected_accounts"], tables["posts"]
+
+    started = time.perf_counter()
+    dropped = drop_indexes(engine, [posts, accounts])
+    timings["drop_indexes_s"] = round(time.perf_counter() - started, 2)
+
+    # Platforms (shared, created if missing)
+    with engine.begin() as conn:
+        existing = {name: pid for pid, name in conn.execute(platforms.select().with_only_columns(platforms.c.id, platforms.c.name))}
+    missing = [name for name in PLATFORMS if name not in existing]
+    if missing:
+        first = next_id(engine, platforms)
+        loader.load(platforms, ["id", "name", "created_at"], [(first + i, name, ts(now)) for i, name in enumerate(missing)])
+        existing.update({name: first + i for i, name in enumerate(missing)})
+    platform_ids = [existing[name] for name in PLATFORMS]
+
+    # Users
+    started = time.perf_counter()
+    first_user = next_id(engine, users)
+    password_hash = get_password_hash("password")
+    user_rows = [
+        (first_user + i, f"user{first_user + i}@example.com", password_hash, f"Load User {first_user + i}", True, False, ts(now))
+        for i in range(counts["users"])
+    ]
+    for i in range(0, len(user_rows), CHUNK_SIZE):
+        loader.load(users, ["id", "email", "hashed_password", "full_name", "is_active", "is_superuser", "created_at"], user_rows[i:i + CHUNK_SIZE])
+    last_user = first_user + counts["users"] - 1
+    timings["users_s"] = round(time.perf_counter() - started, 2)
+
+    # Workspaces and memberships (1-5 distinct members each)
+    started = time.perf_counter()
+    first_workspace = next_id(engine, workspaces)
+    workspace_rows, member_rows = [], []
+    for i in range(counts["workspaces"]):
+        workspace_id = first_workspace + i
+        workspace_rows.append((workspace_id, f"Workspace {workspace_id}", None, ts(now)))
+        for user_id in rng.sample(range(first_user, last_user + 1), k=min(rng.randint(1, 5), counts["users"])):
+            member_rows.append((user_id, workspace_id))
+    loader.load(workspaces, ["id", "name", "description", "created_at"], workspace_rows)
+    for i in range(0, len(member_rows), CHUNK_SIZE):
+        loader.load(members, ["user_id", "workspace_id"], member_rows[i:i + CHUNK_SIZE])
+    workspace_members = {}
+    for user_id, workspace_id in member_rows:
+        workspace_members.setdefault(workspace_id, []).append(user_id)
+    timings["workspaces_s"] = round(time.perf_counter() - started, 2)
+
+    # Connected accounts with tokens encrypted in a process pool
+    started = time.perf_counter()
+    first_account = next_id(engine, accounts)
+    account_specs = []
+    for i in range(counts["accounts"]):
+        account_id = first_account + i
+        workspace_id = first_workspace + (i % counts["workspaces"])
+        account_specs.append((account_id, workspace_id, rng.choice(workspace_members[workspace_id]), rng.choice(platform_ids)))
+    plaintexts = []
+    for account_id, *_ in account_specs:
+        plaintexts.append(f"at_{seed_value}_{account_id}")
+        plaintexts.append(f"rt_{seed_value}_{account_id}")
+    encrypted = encrypt_tokens(plaintexts, processes)
+    timings["encrypt_tokens_s"] = round(time.perf_counter() - started, 2)
+    account_rows = []
+    for index, (account_id, workspace_id, user_id, platform_id) in enumerate(account_specs):
+        account_rows.append((
+            account_id, user_id, workspace_id, platform_id,
+            f"acct_{account_id}", f"account_{account_id}",
+            encrypted[2 * index], encrypted[2 * index + 1],
+            ts(now + timedelta(seconds=rng.randrange(0, 60 * 86400))),
+            True, ts(now),
+        ))
+    account_columns = ["id", "user_id", "workspace_id", "platform_id", "platform_account_id", "platform_account_name",
+                       "_access_token", "_refresh_token", "token_expires_at", "is_active", "created_at"]
+    for i in range(0, len(account_rows), CHUNK_SIZE):
+        loader.load(accounts, account_columns, account_rows[i:i + CHUNK_SIZE])
+    timings["accounts_s"] = round(time.perf_counter() - started, 2)
+
+    # Posts, chunk by chunk
+    started = time.perf_counter()
+    first_post = next_id(engine, posts)
+    account_refs = [(account_id, workspace_id) for account_id, workspace_id, _, _ in account_specs]
+    post_columns = ["id", "workspace_id", "connected_account_id", "author_id", "content_text", "media_url", "status",
+                    "scheduled_at", "posted_at", "error_message", "platform_post_id", "created_at"]
+    total_posts = counts["posts"]
+    jobs = deque(
+        (seed_value, chunk_index, first_post + offset, min(CHUNK_SIZE, total_posts - offset), account_refs, (first_user, last_user), now)
+        for chunk_index, offset in enumerate(range(0, total_posts, CHUNK_SIZE))
+    )
+    done = 0
+    if processes > 1:
+        # Generate chunks in worker processes while this one loads; keep a bounded
+        # number in flight so memory stays flat.
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            pending = deque()
+            while jobs or pending:
+                while jobs and len(pending) < processes * 2:
+                    pending.append(pool.submit(_generate_posts_chunk, jobs.popleft()))
+                rows = pending.popleft().result()
+                loader.load(posts, post_columns, rows)
+                done += len(rows)
+                log_progress(log, done, total_posts, started)
+    else:
+        while jobs:
+            rows = _generate_posts_chunk(jobs.popleft())
+            loader.load(posts, post_columns, rows)
+            done += len(rows)
+            log_progress(log, done, total_posts, started)
+    timings["posts_s"] = round(time.perf_counter() - started, 2)
+
+    started = time.perf_counter()
+    create_indexes(engine, dropped)
+    reset_sequences(engine, [users, workspaces, platforms, accounts, posts])
+    timings["create_indexes_s"] = round(time.perf_counter() - started, 2)
+
+    return {
+        "database": engine.dialect.name,
+        "loader": "copy" if loader.use_copy else "executemany",
+        "scale": scale,
+        "seed": seed_value,
+        "counts": {**counts, "memberships": len(member_rows)},
+        "timings": timings,
+        "posts_per_second": round(total_posts / max(timings["posts_s"], 1e-9)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--scale", type=float, default=0.01, help="1.0 = 10M posts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Processes for token encryption")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result = seed(args.database_url, args.scale, args.seed, args.processes,
+                  log=(lambda message: print(message, file=sys.stderr)) if args.json else print)
+    result["total_seconds"] = round(time.perf_counter() - started, 2)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Loaded {result['counts']} into {result['database']} via {result['loader']} in {result['total_seconds']}s")
+        print("  " + "  ".join(f"{k} {v}" for k, v in result["timings"].items()))
+        print(f"  {result['posts_per_second']:,} posts/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
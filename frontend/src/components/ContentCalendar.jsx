@@ -23,6 +23,7 @@ const getStatusColor = (status) => {
         case 'posted': return 'green';
         case 'error': return 'red';
         case 'draft': return 'grey';
+        case 'recurring': return 'purple'; // A series occurrence not scheduled as a post yet
         default: return 'black';
     }
 };
@@ -35,6 +36,7 @@ const ContentCalendar = () => { // Removed workspaceId prop
     const { token } = useAuth(); // Get token for API calls
 
     const [events, setEvents] = useState([]);
+    const [dayCounts, setDayCounts] = useState({}); // Month view: post counts per day, keyed YYYY-MM-DD
     const [selectedPost, setSelectedPost] = useState(null);
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState(null);
@@ -51,13 +53,13 @@ const ContentCalendar = () => { // Removed workspaceId prop
         setIsLoading(true);
         setError(null);
         try {
-            const response = await apiClient.get(`/workspaces/${currentWorkspace.id}/posts`, {
-                params: {
-                    start_date: startDate.toISOString(),
-                    end_date: endDate.toISOString(),
-                    limit: 500
-                }
-            });
+            const params = { start_date: startDate.toISOString(), end_date: endDate.toISOString(), limit: 500 };
+            // Recurring series only become posts shortly before they are due: their later
+            // occurrences come from the series endpoint and are shown read-only
+            const [response, occurrences] = await Promise.all([
+                apiClient.get(`/workspaces/${currentWorkspace.id}/posts`, { params }),
+                apiClient.get(`/workspaces/${currentWorkspace.id}/post_series/occurrences`, { params }),
+            ]);
             const formattedEvents = response.data.map(post => ({
                 id: post.id.toString(),
                 title: `${getPlatformIcon(post.connected_account?.platform?.name)} ${post.content_text?.substring(0, 20) || 'No Content'}...`,
@@ -67,7 +69,17 @@ const ContentCalendar = () => { // Removed workspaceId prop
                 backgroundColor: getStatusColor(post.status),
                 borderColor: getStatusColor(post.status)
             }));
-            setEvents(formattedEvents);
+            const occurrenceEvents = occurrences.data.map(occurrence => ({
+                id: `series-${occurrence.series_id}-${occurrence.scheduled_at}`,
+                title: `🔁 ${occurrence.content_text?.substring(0, 20) || 'No Content'}...`,
+                start: occurrence.scheduled_at,
+                allDay: false,
+                editable: false, // Edit the series instead
+                extendedProps: { ...occurrence, status: 'recurring', isOccurrence: true, statusColor: getStatusColor('recurring') },
+                backgroundColor: getStatusColor('recurring'),
+                borderColor: getStatusColor('recurring')
+            }));
+            setEvents([...formattedEvents, ...occurrenceEvents]);
         } catch (err) {
             console.error('Error fetching posts:', err);
             const errorMessage = err.response?.data?.detail || 'Failed to load posts. Please try again.';
@@ -78,15 +90,50 @@ const ContentCalendar = () => { // Removed workspaceId prop
         setIsLoading(false);
     };
 
+    // The month view only shows how busy each day is, from the precomputed daily counts,
+    // instead of downloading every post of the month; the week view lists the posts.
+    const toDayKey = (date) => `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+
+    const fetchDailyCounts = async (startDate, endDate) => {
+        if (!currentWorkspace || !token) {
+            setDayCounts({});
+            return;
+        }
+        setIsLoading(true);
+        setError(null);
+        try {
+            const lastDay = new Date(endDate);
+            lastDay.setDate(lastDay.getDate() - 1); // activeEnd is exclusive, end_date inclusive
+            const response = await apiClient.get(`/workspaces/${currentWorkspace.id}/posts/daily_counts`, {
+                params: { start_date: toDayKey(startDate), end_date: toDayKey(lastDay) }
+            });
+            setDayCounts(Object.fromEntries(response.data.map(day => [day.day, day])));
+        } catch (err) {
+            console.error('Error fetching daily post counts:', err);
+            const errorMessage = err.response?.data?.detail || 'Failed to load post counts. Please try again.';
+            setError(errorMessage);
+            toast.error(errorMessage);
+            setDayCounts({});
+        }
+        setIsLoading(false);
+    };
+
+    const fetchForView = (view) => {
+        if (view.type === 'dayGridMonth') {
+            setEvents([]);
+            fetchDailyCounts(view.activeStart, view.activeEnd);
+        } else {
+            fetchPosts(view.activeStart, new Date(view.activeEnd));
+        }
+    };
+
     useEffect(() => {
         // Fetch posts for the initial view
         if (currentWorkspace && calendarRef.current) { // Check if currentWorkspace is available
             const calendarApi = calendarRef.current.getApi();
             const view = calendarApi.view;
             if (view.activeStart && view.activeEnd) {
-                const endDate = new Date(view.activeEnd);
-                // endDate.setDate(endDate.getDate()); // FullCalendar's activeEnd is usually exclusive, but API might be inclusive
-                fetchPosts(view.activeStart, endDate);
+                fetchForView(view);
             }
         } else if (!currentWorkspace) {
             setEvents([]); // Clear events if no workspace is selected
@@ -98,11 +145,31 @@ const ContentCalendar = () => { // Removed workspaceId prop
     const handleDatesSet = (dateInfo) => {
         // Called when the view's date range changes (e.g., navigating months)
         if (!currentWorkspace) return; // Don't fetch if no workspace
-        const { start, end } = dateInfo;
-        // Add a day to end because FullCalendar's activeEnd is exclusive for fetching
-        const fetchEndDate = new Date(end);
-        fetchEndDate.setDate(fetchEndDate.getDate());
-        fetchPosts(start, fetchEndDate);
+        fetchForView(dateInfo.view);
+    };
+
+    const handleDateClick = (clickInfo) => {
+        // From the month's density view, open the week with that day's posts
+        if (clickInfo.view.type === 'dayGridMonth' && calendarRef.current) {
+            calendarRef.current.getApi().changeView('dayGridWeek', clickInfo.date);
+        }
+    };
+
+    const renderDayCellContent = (cellInfo) => {
+        const counts = cellInfo.view.type === 'dayGridMonth' ? dayCounts[toDayKey(cellInfo.date)] : null;
+        return (
+            <div className="calendar-day-cell">
+                <span>{cellInfo.dayNumberText}</span>
+                {counts && (
+                    <span
+                        className="calendar-day-count"
+                        title={Object.entries(counts.by_status).map(([status, count]) => `${count} ${status}`).join(', ')}
+                    >
+                        {counts.total}
+                    </span>
+                )}
+            </div>
+        );
     };
 
     const handleEventClick = (clickInfo) => {
@@ -143,11 +210,7 @@ const ContentCalendar = () => { // Removed workspaceId prop
         ).then(() => {
             // On success, refetch posts to update colors/status accurately
             if (calendarRef.current) {
-                const calendarApi = calendarRef.current.getApi();
-                const view = calendarApi.view;
-                const fetchEndDate = new Date(view.activeEnd);
-                // fetchEndDate.setDate(fetchEndDate.getDate()); // Already handled in fetchPosts if needed
-                fetchPosts(view.activeStart, fetchEndDate);
+                fetchForView(calendarRef.current.getApi().view);
             }
         }).catch(() => {
             // Error already handled by toast.promise, and dropInfo.revert() called
@@ -158,7 +221,7 @@ const ContentCalendar = () => { // Removed workspaceId prop
     const renderEventContent = (eventInfo) => {
         return (
             <div className="calendar-event-card">
-                <span className="event-icon">{getPlatformIcon(eventInfo.event.extendedProps.platformName)}</span>
+                <span className="event-icon">{eventInfo.event.extendedProps.isOccurrence ? '🔁' : getPlatformIcon(eventInfo.event.extendedProps.platformName)}</span>
                 <span className="event-text">{eventInfo.event.title.substring(2).trim()}</span> {/* Remove icon part from title for display */}
                 <span 
                     className="event-status-dot"
@@ -191,6 +254,8 @@ const ContentCalendar = () => { // Removed workspaceId prop
                 editable={true} // Allows drag and drop
                 droppable={true} // Not strictly needed for event drag-drop within calendar
                 eventClick={handleEventClick}
+                dateClick={handleDateClick}
+                dayCellContent={renderDayCellContent} // Month view: number of posts per day
                 eventDrop={handleEventDrop}
                 datesSet={handleDatesSet} // Called when navigating months or changing view
                 eventContent={renderEventContent} // Custom rendering for event cards
@@ -204,7 +269,7 @@ const ContentCalendar = () => { // Removed workspaceId prop
                 <div className="modal-overlay" onClick={closeModal}>
                     <div className="modal-content" onClick={(e) => e.stopPropagation()}>
                         <button className="modal-close-button" onClick={closeModal} aria-label="Close modal">&times;</button>
-                        <h2>Post Details (ID: {selectedPost.id})</h2>
+                        <h2>{selectedPost.isOccurrence ? `Upcoming occurrence (series ${selectedPost.series_id})` : `Post Details (ID: ${selectedPost.id})`}</h2>
                         <p><strong>Platform:</strong> {selectedPost.connected_account?.platform?.name || 'N/A'}</p>
                         <p><strong>Status:</strong> <span style={{color: getStatusColor(selectedPost.status), fontWeight: 'var(--font-weight-bold)'}}>{selectedPost.status}</span></p>
                         <p><strong>Scheduled At:</strong> {new Date(selectedPost.scheduled_at).toLocaleString()}</p>
@@ -216,8 +281,12 @@ const ContentCalendar = () => { // Removed workspaceId prop
                         {selectedPost.error_message && (
                             <p><strong>Error:</strong> <span style={{color: 'var(--error)', fontWeight: 'var(--font-weight-bold)'}}>{selectedPost.error_message}</span></p>
                         )}
-                        <p><strong>Created At:</strong> {new Date(selectedPost.created_at).toLocaleString()}</p>
-                        <p><strong>Last Updated:</strong> {new Date(selectedPost.updated_at || selectedPost.created_at).toLocaleString()}</p>
+                        {!selectedPost.isOccurrence && (
+                            <>
+                                <p><strong>Created At:</strong> {new Date(selectedPost.created_at).toLocaleString()}</p>
+                                <p><strong>Last Updated:</strong> {new Date(selectedPost.updated_at || selectedPost.created_at).toLocaleString()}</p>
+                            </>
+                        )}
                         {/* The close button is now at the top right, so this one can be removed or restyled as a primary action if needed */}
                         {/* <button onClick={closeModal} className="nb-button">Close</button> */}
                     </div>
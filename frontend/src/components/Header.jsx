@@ -96,7 +96,9 @@ const Header = ({ sidebarVisible, toggleSidebar, isMobile }) => {
               >
                 {workspaceLoading && <option>Loading...</option>}
                 {!workspaceLoading && userWorkspaces.map(ws => (
-                  <option key={ws.id} value={ws.id}>{ws.name}</option>
+                  <option key={ws.id} value={ws.id}>
+                    {ws.name}{ws.stats ? ` (${ws.stats.accounts} accounts, ${ws.stats.posts_by_status.scheduled || 0} scheduled)` : ''}
+                  </option>
                 ))}
                 {!workspaceLoading && userWorkspaces.length === 0 && <option value="">No workspaces</option>}
               </select>
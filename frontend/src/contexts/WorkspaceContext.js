@@ -41,7 +41,8 @@ export const WorkspaceProvider = ({ children }) => {
         setError(null);
         try {
             // apiClient will automatically add Authorization header
-            const response = await apiClient.get('/workspaces');
+            // Counts come with the list in one request, not one accounts/posts request per workspace
+            const response = await apiClient.get('/workspaces', { params: { include_stats: true } });
             const fetchedWorkspaces = response.data || [];
             setUserWorkspaces(fetchedWorkspaces);
 
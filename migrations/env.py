@@ -0,0 +1,42 @@
+"""
+Alembic environment: migrates every database of the deployment in turn, the default
+one (DATABASE_URL) and each shard of DATABASE_SHARD_URLS, which share one schema.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name) # Logs each revision as it runs
+
+from app import models  # noqa: E402,F401  (registers the tables)
+from app.core.sharding import DEFAULT_SHARD  # noqa: E402
+from app.database import Base, shard_engines  # noqa: E402
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    # SQL for the default database only; render it once per shard if they differ
+    context.configure(url=shard_engines[DEFAULT_SHARD].url, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    for name, engine in shard_engines.items():
+        print(f"Migrating shard {name}")
+        with engine.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                render_as_batch=connection.dialect.name == "sqlite", # SQLite alters tables by copying them
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
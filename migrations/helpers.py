@@ -0,0 +1,56 @@
+"""
+Idempotent schema steps for the revisions. Databases were created by init-db
+(Base.metadata.create_all) at whatever version they ran, so a column or index a
+revision adds may already exist, and a table may not exist yet (init-db will then
+create it complete): every step checks first.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table: str) -> bool:
+    return _inspector().has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return has_table(table) and column in {c["name"] for c in _inspector().get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    return has_table(table) and name in {i["name"] for i in _inspector().get_indexes(table)}
+
+
+def add_column(table: str, column: sa.Column) -> None:
+    if has_table(table) and not has_column(table, column.name):
+        with op.batch_alter_table(table) as batch: # SQLite copies the table when the column has a foreign key
+            batch.add_column(column)
+
+
+def drop_column(table: str, column: str) -> None:
+    if has_column(table, column):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
+
+
+def create_index(name: str, table: str, columns: list, **kwargs) -> None:
+    if has_table(table) and not has_index(table, name):
+        op.create_index(name, table, columns, **kwargs)
+
+
+def drop_index(name: str, table: str) -> None:
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
+
+
+def drop_unique(table: str, columns: list) -> None:
+    # Column(unique=True) constraints are unnamed on SQLite and named by the server on Postgres
+    found = [u for u in _inspector().get_unique_constraints(table) if u["column_names"] == columns] if has_table(table) else []
+    for constraint in found:
+        name = constraint["name"] or f"uq_{table}_{'_'.join(columns)}"
+        naming_convention = {"uq": "uq_%(table_name)s_%(column_0_N_name)s"}
+        with op.batch_alter_table(table, naming_convention=naming_convention) as batch:
+            batch.drop_constraint(name, type_="unique")
@@ -0,0 +1,26 @@
+"""Mark workspaces, users and connected accounts being deleted
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+import helpers
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = ("users", "workspaces", "connected_accounts")
+
+
+def upgrade():
+    for table in TABLES:
+        helpers.add_column(table, sa.Column("deleting_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    for table in TABLES:
+        helpers.drop_column(table, "deleting_at")
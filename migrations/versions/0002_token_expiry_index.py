@@ -0,0 +1,26 @@
+"""Index refreshable connected accounts by token expiry
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+import helpers
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    refreshable = sa.and_(sa.column("is_active").is_(True), sa.column("_refresh_token").isnot(None))
+    helpers.create_index(
+        "ix_connected_accounts_token_expiry", "connected_accounts", ["token_expires_at", "id"],
+        postgresql_where=refreshable, sqlite_where=refreshable,
+    )
+
+
+def downgrade():
+    helpers.drop_index("ix_connected_accounts_token_expiry", "connected_accounts")
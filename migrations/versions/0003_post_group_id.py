@@ -0,0 +1,25 @@
+"""Link posts to the post group holding their shared content
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+import helpers
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # post_groups itself is created by init-db; the constraint gets the name Postgres gives it under create_all
+    helpers.add_column("posts", sa.Column("group_id", sa.Integer, sa.ForeignKey("post_groups.id", name="posts_group_id_fkey"), nullable=True))
+    helpers.create_index("ix_posts_group_id", "posts", ["group_id"])
+
+
+def downgrade():
+    helpers.drop_index("ix_posts_group_id", "posts")
+    helpers.drop_column("posts", "group_id")
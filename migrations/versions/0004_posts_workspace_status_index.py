@@ -0,0 +1,20 @@
+"""Index posts by workspace, status and schedule
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+import helpers
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    helpers.create_index("ix_posts_workspace_status_scheduled", "posts", ["workspace_id", "status", "scheduled_at"])
+
+
+def downgrade():
+    helpers.drop_index("ix_posts_workspace_status_scheduled", "posts")
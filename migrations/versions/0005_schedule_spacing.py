@@ -0,0 +1,24 @@
+"""Per-account minimum spacing of scheduled posts, and the index the check scans
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+import helpers
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    helpers.add_column("connected_accounts", sa.Column("min_post_spacing_seconds", sa.Integer, nullable=True))
+    helpers.create_index("ix_posts_account_scheduled", "posts", ["connected_account_id", "scheduled_at", "status"])
+
+
+def downgrade():
+    helpers.drop_index("ix_posts_account_scheduled", "posts")
+    helpers.drop_column("connected_accounts", "min_post_spacing_seconds")
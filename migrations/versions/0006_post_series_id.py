@@ -0,0 +1,25 @@
+"""Link posts to the recurring series they were materialized from
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+import helpers
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # post_series itself is created by init-db (run it first: the foreign key refers to it)
+    helpers.add_column("posts", sa.Column("series_id", sa.Integer, sa.ForeignKey("post_series.id", name="posts_series_id_fkey"), nullable=True))
+    helpers.create_index("ix_posts_series_id", "posts", ["series_id"])
+
+
+def downgrade():
+    helpers.drop_index("ix_posts_series_id", "posts")
+    helpers.drop_column("posts", "series_id")
@@ -0,0 +1,30 @@
+"""Make outbox dedup keys unique among undispatched messages only
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+from alembic import op
+
+import helpers
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    helpers.drop_unique("outbox_messages", ["dedup_key"])
+    pending = sa.column("dispatched_at").is_(None)
+    helpers.create_index("ux_outbox_messages_pending_dedup", "outbox_messages", ["dedup_key"], unique=True,
+                         postgresql_where=pending, sqlite_where=pending)
+
+
+def downgrade():
+    # Fails if a key was staged again after its message was dispatched
+    helpers.drop_index("ux_outbox_messages_pending_dedup", "outbox_messages")
+    if helpers.has_table("outbox_messages"):
+        with op.batch_alter_table("outbox_messages") as batch:
+            batch.create_unique_constraint("outbox_messages_dedup_key_key", ["dedup_key"])
@@ -0,0 +1,37 @@
+"""Dead-letter outbox messages that keep failing; index dispatched rows for the purge
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+import helpers
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def _recreate_pending_indexes(pending):
+    helpers.drop_index("ix_outbox_messages_pending", "outbox_messages")
+    helpers.drop_index("ux_outbox_messages_pending_dedup", "outbox_messages")
+    helpers.create_index("ix_outbox_messages_pending", "outbox_messages", ["available_at", "id"],
+                         postgresql_where=pending, sqlite_where=pending)
+    helpers.create_index("ux_outbox_messages_pending_dedup", "outbox_messages", ["dedup_key"], unique=True,
+                         postgresql_where=pending, sqlite_where=pending)
+
+
+def upgrade():
+    helpers.add_column("outbox_messages", sa.Column("dead_lettered_at", sa.DateTime(timezone=True), nullable=True))
+    _recreate_pending_indexes(sa.column("dispatched_at").is_(None) & sa.column("dead_lettered_at").is_(None))
+    dispatched = sa.column("dispatched_at").isnot(None)
+    helpers.create_index("ix_outbox_messages_dispatched", "outbox_messages", ["dispatched_at"],
+                         postgresql_where=dispatched, sqlite_where=dispatched)
+
+
+def downgrade():
+    helpers.drop_index("ix_outbox_messages_dispatched", "outbox_messages")
+    _recreate_pending_indexes(sa.column("dispatched_at").is_(None))
+    helpers.drop_column("outbox_messages", "dead_lettered_at")
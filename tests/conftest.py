@@ -0,0 +1,120 @@
+"""
+Shared fixtures. Settings and engines are read when `app` is first imported, so the
+environment is set here, before any test module imports it: a throwaway SQLite
+database, a single shard and the in-memory broker.
+
+Run from the repository root:
+    python -m pytest -q
+"""
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="socialoom-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_DATA_DIR, 'test.db')}",
+    DATABASE_REPLICA_URLS="",
+    DATABASE_SHARD_URLS="",
+    SECRET_KEY="test-secret-key-test-secret-key",
+    ALGORITHM="HS256",
+    CELERY_BROKER_URL="memory://",
+    CELERY_METRICS_PORT="0",
+)
+
+
+@pytest.fixture
+def db():
+    """
+    A session on a freshly created database (tables dropped and created for each test).
+    """
+    from sqlalchemy import text
+    from app import models  # noqa: F401  (registers the tables)
+    from app.database import Base, SessionLocal, engine, init_db
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS post_search"))
+    Base.metadata.drop_all(engine)
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def account(db):
+    """
+    A connected Twitter account, in a workspace of its own user.
+    """
+    from app import models
+
+    user = models.User(email="owner@example.com", hashed_password="x")
+    workspace = models.Workspace(name="Workspace", users=[user])
+    platform = models.SocialPlatform(name="Twitter")
+    db.add_all([user, workspace, platform])
+    db.flush()
+    db_account = models.ConnectedAccount(user_id=user.id, workspace_id=workspace.id, platform_id=platform.id,
+                                         platform_account_id="acct-1", platform_account_name="acct", access_token="token")
+    db.add(db_account)
+    db.commit()
+    return db_account
+
+
+@pytest.fixture
+def client(db):
+    """
+    An API client. The lifespan (table creation, replica lag monitor) is not run.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(account):
+    """
+    Authorization headers for the owner of `account`.
+    """
+    from app.core.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'owner@example.com'})}"}
+
+
+@pytest.fixture
+def spacing(monkeypatch):
+    """
+    Set SCHEDULE_MIN_SPACING_SECONDS for the test (returns a setter).
+    """
+    from app.core.config import settings
+
+    def set_spacing(seconds: int) -> None:
+        monkeypatch.setattr(settings, "SCHEDULE_MIN_SPACING_SECONDS", seconds)
+    return set_spacing
+
+
+@pytest.fixture
+def now() -> datetime:
+    """
+    The current UTC time, rounded down to the minute.
+    """
+    return datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+
+@pytest.fixture
+def make_post(db, account):
+    """
+    Create a post through crud_post.create_post (on `account` unless given another).
+    """
+    from app import schemas
+    from app.crud import crud_post
+
+    def make(scheduled_at=None, status="scheduled", account_id=None, content_text="Hello"):
+        return crud_post.create_post(db, schemas.PostCreateData(
+            workspace_id=account.workspace_id, connected_account_id=account_id or account.id,
+            content_text=content_text, status=status, scheduled_at=scheduled_at,
+        ))
+    return make
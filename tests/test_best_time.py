@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from app import models
+from app.crud import crud_post
+from app.services.best_time import BestTimeRecommender
+
+
+def test_a_publish_shows_up_in_the_next_suggestion(db, account, make_post, now):
+    recommender = BestTimeRecommender(cache_seconds=3600)
+    [before] = recommender.suggest(db, [account], count=3, now=now)
+    assert before["history_posts"] == 0 and len(before["slots"]) == 3
+
+    post = make_post(now - timedelta(minutes=1))
+    crud_post.update_post_status(db, post.id, models.PostStatus.POSTED, platform_post_id="p")
+    [after] = recommender.suggest(db, [account], count=3, now=now)
+    assert after["history_posts"] == 1
+
+
+def test_suggestions_keep_clear_of_scheduled_posts(db, account, make_post, now):
+    start = now.replace(minute=0) + timedelta(hours=1)
+    for hour in range(0, 168, 2): # Every other hour of the coming week is taken
+        make_post(start + timedelta(hours=hour))
+    [suggestion] = BestTimeRecommender().suggest(db, [account], count=5, now=now, min_gap_hours=1)
+    assert all((slot["at"] - start).total_seconds() // 3600 % 2 == 1 for slot in suggestion["slots"])
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models
+from app.crud import crud_deletion_job
+from app.services import deletion
+
+
+@pytest.fixture
+def workspace_with_posts(db, account, make_post):
+    for _ in range(5):
+        make_post(status="draft")
+    return account.workspace_id
+
+
+def test_request_marks_the_workspace_and_stages_the_job(db, account, workspace_with_posts):
+    job = crud_deletion_job.request_deletion(db, "workspace", workspace_with_posts)
+    assert job.status == "pending"
+    assert db.get(models.Workspace, workspace_with_posts).deleting_at is not None
+    assert db.get(models.ConnectedAccount, account.id).deleting_at is not None
+    [message] = db.query(models.OutboxMessage).filter(models.OutboxMessage.task_name == crud_deletion_job.RUN_DELETION_JOB_TASK).all()
+    assert message.args == [job.id]
+
+    assert crud_deletion_job.request_deletion(db, "workspace", workspace_with_posts).id == job.id # Same job again
+    assert crud_deletion_job.request_deletion(db, "workspace", workspace_with_posts + 1) is None
+
+
+def test_a_failed_run_resumes_where_it_stopped(db, workspace_with_posts, monkeypatch):
+    job_id = crud_deletion_job.request_deletion(db, "workspace", workspace_with_posts).id
+    delete_posts, calls = deletion._delete_posts, []
+
+    def crash_on_third_batch(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("worker lost")
+        return delete_posts(*args, **kwargs)
+
+    monkeypatch.setattr(deletion, "_delete_posts", crash_on_third_batch)
+    with pytest.raises(RuntimeError):
+        deletion.run_deletion_job(db, job_id, batch_size=2, pause_seconds=0)
+    job = crud_deletion_job.get_job(db, job_id)
+    assert (job.status, job.progress, job.error) == ("pending", {"posts": 4}, "RuntimeError: worker lost")
+    assert db.query(models.Post).count() == 1
+
+    monkeypatch.setattr(deletion, "_delete_posts", delete_posts)
+    assert deletion.run_deletion_job(db, job_id, batch_size=2, pause_seconds=0)
+    job = crud_deletion_job.get_job(db, job_id)
+    assert job.status == "done" and job.progress["posts"] == 5 and job.progress["workspaces"] == 1
+    assert db.query(models.Post).count() == 0 and db.query(models.ConnectedAccount).count() == 0
+    assert db.get(models.Workspace, workspace_with_posts) is None
+    assert not deletion.run_deletion_job(db, job_id) # Done: nothing to claim
+
+
+def test_only_stalled_jobs_are_resumed(db, workspace_with_posts):
+    job = crud_deletion_job.request_deletion(db, "workspace", workspace_with_posts)
+    job_id = job.id
+    assert crud_deletion_job.claim_job(db, job_id, "runner-1")
+    assert not deletion.run_deletion_job(db, job_id) # Held by a live runner
+    assert deletion.resume_deletion_jobs(db) == 0
+
+    job = crud_deletion_job.get_job(db, job_id)
+    job.heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1) # The runner went quiet
+    db.commit()
+    assert deletion.resume_deletion_jobs(db) == 1
+    assert crud_deletion_job.get_job(db, job_id).status == "done"
+
+
+@pytest.mark.parametrize("entity_type", ["connected_account", "user"])
+def test_groups_left_without_posts_or_series_are_deleted(db, account, spacing, entity_type):
+    from app import schemas
+    from app.crud import crud_post_group, crud_post_series
+
+    spacing(0)
+    owner = db.get(models.User, account.user_id)
+    other_user = models.User(email="other@example.com", hashed_password="x")
+    db.add(other_user)
+    db.flush()
+    other = models.ConnectedAccount(user_id=other_user.id, workspace_id=account.workspace_id, platform_id=account.platform_id,
+                                    platform_account_id="acct-2", access_token="token")
+    db.add(other)
+    db.commit()
+
+    def group(account_ids):
+        return crud_post_group.create_grouped_posts(db, schemas.PostCreateData(
+            workspace_id=account.workspace_id, content_text="Cross-post", status="draft",
+        ), account_ids)[0].group_id
+
+    def series(account_id):
+        return crud_post_series.create_series(db, account.workspace_id, schemas.PostSeriesCreate(
+            connected_account_id=account_id, content_text="Tip of the day", frequency="daily",
+            starts_at=datetime.now(timezone.utc) + timedelta(days=1),
+        )).group_id
+
+    orphaned = {group([account.id]), series(account.id)}
+    kept = {group([account.id, other.id]), series(other.id)}
+    entity_id = account.id if entity_type == "connected_account" else owner.id
+    job_id = crud_deletion_job.request_deletion(db, entity_type, entity_id).id
+
+    assert deletion.run_deletion_job(db, job_id, pause_seconds=0)
+    assert {group.id for group in db.query(models.PostGroup)} == kept
+    assert crud_deletion_job.get_job(db, job_id).progress["post_groups"] == len(orphaned)
@@ -0,0 +1,16 @@
+from app.crud import crud_deletion_job
+
+
+def test_default_shard_routes_share_the_request_session(db, account, client, auth_headers, monkeypatch):
+    # app.api.connected_accounts takes get_db from app.dependencies, get_workspace_db from app.database
+    calls = []
+    request_deletion = crud_deletion_job.request_deletion
+
+    def spy(db, *args, account_dbs=(), **kwargs):
+        calls.append(all(session is db for session in account_dbs))
+        return request_deletion(db, *args, account_dbs=account_dbs, **kwargs)
+
+    monkeypatch.setattr(crud_deletion_job, "request_deletion", spy)
+    response = client.delete(f"/api/v1/workspaces/{account.workspace_id}/connected_accounts/{account.id}", headers=auth_headers)
+    assert response.status_code == 202, response.text
+    assert calls == [True] # One session, so the job and the account mark commit together
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+from app import models, schemas
+from app.core.outbox_relay import purge_outbox, relay_batch, task_id_for
+from app.crud import crud_outbox, crud_post
+
+
+def messages(db, post_id):
+    return db.query(models.OutboxMessage).filter(models.OutboxMessage.post_id == post_id).order_by(models.OutboxMessage.id).all()
+
+
+def dispatch_all(db, post_id, now):
+    for message in messages(db, post_id):
+        if message.dispatched_at is None:
+            crud_outbox.mark_dispatched(db, message, now)
+    db.commit()
+
+
+def test_scheduling_stages_one_message(db, make_post, now):
+    post = make_post(now + timedelta(hours=1))
+    [message] = messages(db, post.id)
+    assert message.dedup_key == crud_outbox.publish_dedup_key(post.id, now + timedelta(hours=1))
+    assert message.args == [post.id]
+
+    # Same schedule again: the pending message is kept, not duplicated
+    crud_post.update_post(db, post.id, schemas.PostUpdate(status="scheduled", scheduled_at=now + timedelta(hours=1)))
+    assert [m.id for m in messages(db, post.id)] == [message.id]
+
+
+def test_reschedule_replaces_pending_message(db, make_post, now):
+    post = make_post(now + timedelta(hours=1))
+    crud_post.update_post(db, post.id, schemas.PostUpdate(scheduled_at=now + timedelta(hours=2)))
+    [message] = messages(db, post.id)
+    assert message.dedup_key == crud_outbox.publish_dedup_key(post.id, now + timedelta(hours=2))
+
+
+def test_unscheduling_cancels_pending_message(db, make_post, now):
+    post = make_post(now + timedelta(hours=1))
+    crud_post.update_post(db, post.id, schemas.PostUpdate(status="draft"))
+    assert messages(db, post.id) == []
+
+
+def test_failed_post_rescheduled_to_same_time_is_staged_again(db, make_post, now):
+    at = now + timedelta(minutes=5)
+    post = make_post(at)
+    dispatch_all(db, post.id, now)
+    crud_post.update_post_status(db, post.id, models.PostStatus.ERROR, "platform down")
+
+    crud_post.update_post(db, post.id, schemas.PostUpdate(status="scheduled", scheduled_at=at))
+    first, second = messages(db, post.id)
+    assert first.dispatched_at is not None and second.dispatched_at is None
+    assert first.dedup_key == second.dedup_key
+    assert task_id_for(first.dedup_key, first.id) != task_id_for(second.dedup_key, second.id)
+
+
+def test_unchanged_schedule_after_dispatch_is_not_staged_again(db, make_post, now):
+    at = now + timedelta(minutes=5)
+    post = make_post(at)
+    dispatch_all(db, post.id, now)
+
+    crud_post.update_post(db, post.id, schemas.PostUpdate(status="scheduled", scheduled_at=at, content_text="Edited"))
+    crud_post.reschedule_posts(db, post.workspace_id, {post.id: at})
+    assert len(messages(db, post.id)) == 1
+
+
+def test_pending_dedup_key_is_unique(db, make_post, now):
+    post = make_post(now + timedelta(hours=1))
+    assert crud_outbox.add_publish_message(db, post) is None
+    db.commit()
+    assert len(messages(db, post.id)) == 1
+
+
+def test_unsendable_message_backs_off_without_blocking_the_batch(db, make_post, now):
+    broken = crud_outbox.add_task_message(db, "no_such_task", [], dedup_key="broken")
+    post = make_post(now + timedelta(minutes=1))
+    db.commit()
+
+    assert relay_batch(db) == 1
+    db.refresh(broken)
+    [message] = messages(db, post.id)
+    assert message.dispatched_at is not None
+    assert broken.dispatched_at is None and broken.attempts == 1 and "no_such_task" in broken.last_error
+    assert crud_outbox.as_utc(broken.available_at) > datetime.now(timezone.utc)
+    assert relay_batch(db) == 0 # Backing off
+
+
+def test_message_is_dead_lettered_after_max_attempts(db, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "OUTBOX_RELAY_MAX_ATTEMPTS", 3)
+    broken = crud_outbox.add_task_message(db, "no_such_task", [], dedup_key="broken")
+    db.commit()
+    for attempt in range(3):
+        broken.available_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+        relay_batch(db)
+        db.refresh(broken)
+    assert broken.attempts == 3 and broken.dead_lettered_at is not None
+    assert crud_outbox.get_pending_messages(db, now=datetime.now(timezone.utc) + timedelta(days=1)) == []
+
+    # No longer pending, so the same task can be staged again
+    assert crud_outbox.add_task_message(db, "no_such_task", [], dedup_key="broken") is not None
+
+
+def test_purge_deletes_only_old_dispatched_messages(db, make_post, now):
+    old, recent, pending = (make_post(now + timedelta(hours=hours)) for hours in (1, 2, 3))
+    for post, dispatched_days_ago in ((old, 8), (recent, 1)):
+        crud_outbox.mark_dispatched(db, messages(db, post.id)[0], now - timedelta(days=dispatched_days_ago))
+    db.commit()
+
+    assert purge_outbox(db, older_than_days=7, batch_size=1) == 1
+    assert messages(db, old.id) == []
+    assert len(messages(db, recent.id)) == 1 and len(messages(db, pending.id)) == 1
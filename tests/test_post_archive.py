@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from app import models
+from app.core.celery_app import publish_post_task
+from app.crud import crud_post, crud_post_archive
+from app.services.post_archiver import archive_old_posts
+
+
+def test_archive_cutoff_is_the_latest_archived_post(db, make_post, now):
+    workspace_id = make_post(now - timedelta(days=10), status="posted").workspace_id
+    assert crud_post_archive.archive_cutoff(db, workspace_id) is None
+    make_post(now - timedelta(days=3), status="posted")
+
+    assert archive_old_posts(db, older_than_days=5, pause_seconds=0) == 1
+    assert crud_post_archive.archive_cutoff(db, workspace_id) == now - timedelta(days=10)
+    assert crud_post_archive.archive_cutoff(db, workspace_id + 1) is None
+
+
+def test_reads_find_posts_archived_with_a_shorter_cutoff(db, make_post, now, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "POST_ARCHIVE_AFTER_DAYS", 180)
+    old = make_post(now - timedelta(days=10), status="posted").id
+    hot = make_post(now - timedelta(days=1), status="posted").id
+    workspace_id = db.get(models.Post, hot).workspace_id
+    assert archive_old_posts(db, older_than_days=5, pause_seconds=0) == 1 # Well inside POST_ARCHIVE_AFTER_DAYS
+
+    start, end = now - timedelta(days=30), now
+    assert [post.id for post in crud_post.get_posts_in_range(db, workspace_id, start, end)] == [old, hot]
+    assert {post.id for post in crud_post.get_posts_by_workspace(db, workspace_id, start_date=start, end_date=end)} == {old, hot}
+    # Ranges after the latest archived post stay on the hot table
+    assert [post.id for post in crud_post.get_posts_in_range(db, workspace_id, now - timedelta(days=5), end)] == [hot]
+
+
+def test_publish_task_ignores_archived_posts(db, make_post, now):
+    post = make_post(now - timedelta(days=10), status="posted")
+    post_id, workspace_id = post.id, post.workspace_id
+    archive_old_posts(db, older_than_days=5, pause_seconds=0)
+    assert isinstance(crud_post.get_post(db, post_id), models.PostArchive)
+
+    result = publish_post_task.apply(args=[post_id], kwargs={"workspace_id": workspace_id}).get()
+    assert result == f"Error: Post ID {post_id} not found."
@@ -0,0 +1,21 @@
+from app import models, schemas
+from app.crud import crud_post, crud_post_group
+
+
+def test_published_targets_keep_the_content_they_went_out_with(db, account):
+    own_text, inherited, draft = crud_post_group.create_grouped_posts(db, schemas.PostCreateData(
+        workspace_id=account.workspace_id, content_text="Launch day", media_url="https://cdn.example.com/a.png",
+    ), [account.id] * 3)
+    group_id = own_text.group_id
+    crud_post.update_post(db, own_text.id, schemas.PostUpdate(content_text="Launch day (edited)"))
+    for db_post in (own_text, inherited):
+        crud_post.update_post_status(db, db_post.id, models.PostStatus.POSTED, platform_post_id="p")
+
+    crud_post_group.update_post_group(db, group_id, schemas.PostGroupUpdate(
+        content_text="Sale starts", media_url="https://cdn.example.com/b.png",
+    ))
+    rows = {db_post.id: (db_post.content_text, db_post.media_url) for db_post in db.query(models.Post)}
+    # Overrode the text only: the media it was published with is frozen too
+    assert rows[own_text.id] == ("Launch day (edited)", "https://cdn.example.com/a.png")
+    assert rows[inherited.id] == ("Launch day", "https://cdn.example.com/a.png")
+    assert rows[draft.id] == ("Sale starts", "https://cdn.example.com/b.png") # Still follows the group
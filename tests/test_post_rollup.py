@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.crud import crud_post, crud_post_rollup
+from app.database import engine
+from app.services.post_archiver import archive_old_posts
+
+
+def status_counts(db, workspace_id):
+    return crud_post_rollup.get_status_counts(db, [workspace_id]).get(workspace_id, {})
+
+
+def test_changes_move_posts_between_buckets(db, make_post, now):
+    post = make_post(now + timedelta(hours=1))
+    make_post(now + timedelta(hours=2), status="draft")
+    crud_post.update_post(db, post.id, schemas.PostUpdate(status="draft"))
+    assert status_counts(db, post.workspace_id) == {"draft": 2}
+    [day] = crud_post_rollup.get_daily_counts(db, post.workspace_id, now.date(), (now + timedelta(days=1)).date())
+    assert day["total"] == 2
+
+
+def test_reconcile_repairs_drift(db, make_post, now):
+    post = make_post(now + timedelta(hours=1))
+    workspace_id = post.workspace_id
+    db.execute(update(models.PostStatusCount).values(count=7))
+    db.add(models.PostStatusCount(workspace_id=workspace_id, status=models.PostStatus.ERROR, connected_account_id=post.connected_account_id, count=3))
+    db.commit()
+
+    assert crud_post_rollup.reconcile_workspace(db, workspace_id) == 2
+    assert status_counts(db, workspace_id) == {"scheduled": 1}
+    assert db.query(models.PostStatusCount).filter(models.PostStatusCount.count == 0).count() == 0
+    assert crud_post_rollup.reconcile_workspace(db, workspace_id) == 0
+
+
+def test_archived_posts_are_counted_once(db, make_post, now):
+    workspace_id = make_post(now - timedelta(days=10), status="posted").workspace_id
+    make_post(now - timedelta(days=1), status="posted")
+    archive_old_posts(db, older_than_days=5, pause_seconds=0)
+    assert crud_post_rollup.reconcile_workspace(db, workspace_id) == 0
+    assert status_counts(db, workspace_id) == {"posted": 2}
+
+
+def test_changes_cannot_commit_during_a_recount(db, make_post, now, monkeypatch):
+    workspace_id = make_post(now + timedelta(hours=1)).workspace_id
+    other = sessionmaker(bind=create_engine(engine.url, connect_args={"timeout": 0.2}))()
+    actual_counts = crud_post_rollup._actual_counts
+    blocked = []
+
+    def count_while_another_post_is_created(db, workspace_id):
+        # A change landing between the lock and the count would be counted twice
+        with pytest.raises(OperationalError, match="locked"):
+            make_post_in(other)
+        other.rollback()
+        blocked.append(True)
+        return actual_counts(db, workspace_id)
+
+    def make_post_in(session):
+        crud_post.create_post(session, schemas.PostCreateData(
+            workspace_id=workspace_id, connected_account_id=db.query(models.ConnectedAccount.id).scalar(), content_text="Later",
+        ))
+
+    monkeypatch.setattr(crud_post_rollup, "_actual_counts", count_while_another_post_is_created)
+    crud_post_rollup.reconcile_workspace(db, workspace_id)
+    assert blocked
+    make_post_in(other)
+    other.close()
+    assert status_counts(db, workspace_id) == {"scheduled": 1, "draft": 1}
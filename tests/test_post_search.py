@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+import pytest
+
+from app import models, schemas
+from app.crud import crud_post, crud_post_group
+from app.crud.crud_post_search import search_posts
+from app.services.post_archiver import archive_old_posts
+
+
+@pytest.fixture(autouse=True)
+def no_spacing(spacing):
+    spacing(0)
+
+
+def search(db, workspace_id, query, **kwargs):
+    return [post.id for post in search_posts(db, workspace_id, query, **kwargs)[0]]
+
+
+def other_workspace_account(db, account):
+    workspace = models.Workspace(name="Other")
+    db.add(workspace)
+    db.flush()
+    other = models.ConnectedAccount(user_id=account.user_id, workspace_id=workspace.id, platform_id=account.platform_id,
+                                    platform_account_id="acct-2", access_token="token")
+    db.add(other)
+    db.commit()
+    return other
+
+
+def test_ranked_and_scoped_to_the_workspace(db, account, make_post, now):
+    weak = make_post(now + timedelta(hours=1), content_text="Our launch is next week, with a sale on every plan and a webinar")
+    strong = make_post(now + timedelta(hours=2), content_text="Launch launch launch")
+    make_post(now + timedelta(hours=3), content_text="Nothing to see")
+    other = other_workspace_account(db, account)
+    elsewhere = crud_post.create_post(db, schemas.PostCreateData(
+        workspace_id=other.workspace_id, connected_account_id=other.id, content_text="Launch elsewhere", status="draft",
+    ))
+
+    assert search(db, account.workspace_id, "launch") == [strong.id, weak.id]
+    assert search(db, account.workspace_id, "launch sale") == [weak.id] # Every word must match
+    assert search(db, account.workspace_id, "launching") == [strong.id, weak.id] # Stemmed
+    assert search(db, other.workspace_id, "launch") == [elsewhere.id]
+    assert search(db, account.workspace_id, "elsewhere") == []
+
+
+def test_cursor_pages_have_no_duplicates_or_gaps(db, account, make_post, now):
+    ids = {make_post(now + timedelta(hours=hours), content_text="Weekly report").id for hours in range(7)}
+    make_post(now + timedelta(hours=8), content_text="Weekly report, weekly report")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = search_posts(db, account.workspace_id, "weekly report", limit=3, cursor=cursor)
+        seen += [post.id for post in page]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 8
+    assert ids < set(seen)
+
+
+def test_status_and_date_filters(db, account, make_post, now):
+    soon = make_post(now + timedelta(hours=1), content_text="Product update")
+    later = make_post(now + timedelta(days=3), content_text="Product update")
+    draft = make_post(None, status="draft", content_text="Product update")
+
+    assert search(db, account.workspace_id, "product", statuses=[models.PostStatus.DRAFT]) == [draft.id]
+    assert sorted(search(db, account.workspace_id, "product", statuses=[models.PostStatus.SCHEDULED])) == [soon.id, later.id]
+    assert search(db, account.workspace_id, "product", start_date=now + timedelta(days=1)) == [later.id]
+    assert search(db, account.workspace_id, "product", end_date=now + timedelta(days=1)) == [soon.id]
+
+
+def test_trailing_star_matches_a_prefix(db, account, make_post, now):
+    post = make_post(now + timedelta(hours=1), content_text="Announcement")
+    assert search(db, account.workspace_id, "announ") == []
+    assert search(db, account.workspace_id, "announ*") == [post.id]
+
+
+def test_index_follows_post_changes(db, account, make_post, now):
+    post = make_post(now + timedelta(hours=1), content_text="Spring collection")
+    assert search(db, account.workspace_id, "spring") == [post.id]
+
+    crud_post.update_post(db, post.id, schemas.PostUpdate(content_text="Summer collection"))
+    assert search(db, account.workspace_id, "spring") == []
+    assert search(db, account.workspace_id, "summer") == [post.id]
+
+    crud_post.delete_post(db, post.id)
+    assert search(db, account.workspace_id, "summer") == []
+
+
+def test_index_follows_group_edits_and_archiving(db, account, make_post, now):
+    first, second = crud_post_group.create_grouped_posts(db, schemas.PostCreateData(
+        workspace_id=account.workspace_id, content_text="Holiday hours",
+    ), [account.id] * 2)
+    assert sorted(search(db, account.workspace_id, "holiday")) == [first.id, second.id]
+
+    crud_post_group.update_post_group(db, first.group_id, schemas.PostGroupUpdate(content_text="Opening hours"))
+    assert search(db, account.workspace_id, "holiday") == []
+    assert sorted(search(db, account.workspace_id, "opening")) == [first.id, second.id]
+
+    posted = make_post(now - timedelta(days=10), status="posted", content_text="Archived news").id
+    assert search(db, account.workspace_id, "archived") == [posted]
+    archive_old_posts(db, older_than_days=5, pause_seconds=0)
+    assert search(db, account.workspace_id, "archived") == [] # Only hot posts are searchable
+
+
+def test_bad_cursor_is_a_400(db, account, client, auth_headers):
+    url = f"/api/v1/workspaces/{account.workspace_id}/posts/search"
+    assert client.get(url, params={"q": "launch"}, headers=auth_headers).json() == {"items": [], "next_cursor": None}
+    response = client.get(url, params={"q": "launch", "cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
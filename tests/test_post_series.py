@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+import pytest
+
+from app import models, schemas
+from app.crud import crud_post_series, crud_schedule
+
+
+def create_series(db, account, starts_at, **fields):
+    fields = {"frequency": "daily", **fields}
+    return crud_post_series.create_series(db, account.workspace_id, schemas.PostSeriesCreate(
+        connected_account_id=account.id, content_text="Tip of the day", starts_at=starts_at, **fields,
+    ))
+
+
+def series_posts(db, series_id):
+    return db.query(models.Post).filter(models.Post.series_id == series_id).order_by(models.Post.scheduled_at).all()
+
+
+def test_occurrences_within_the_horizon_become_posts(db, account, now):
+    series = create_series(db, account, now + timedelta(hours=1))
+    assert [post.scheduled_at for post in series_posts(db, series.id)] == [
+        (now + timedelta(hours=1, days=day)).replace(tzinfo=None) for day in range(2)
+    ]
+    assert all(post.status == models.PostStatus.SCHEDULED for post in series_posts(db, series.id))
+
+
+def test_weekly_occurrences_follow_the_weekdays(db, account, now):
+    monday = (now - timedelta(days=now.weekday())).replace(hour=9, minute=0) + timedelta(weeks=1)
+    series = create_series(db, account, monday, frequency="weekly", interval=2, weekdays=[0, 3])
+    occurrences = list(crud_post_series.iter_occurrences(series, monday, monday + timedelta(weeks=4)))
+    assert occurrences == [monday, monday + timedelta(days=3), monday + timedelta(weeks=2), monday + timedelta(weeks=2, days=3)]
+
+
+def test_a_post_on_a_future_occurrence_conflicts(db, account, spacing, now, make_post):
+    spacing(600)
+    series = create_series(db, account, now + timedelta(hours=1))
+    far = now + timedelta(hours=1, days=30) # Long after the horizon: not a post yet
+    with pytest.raises(crud_schedule.ScheduleConflictError) as raised:
+        make_post(far + timedelta(minutes=5))
+    assert raised.value.conflicts[0]["conflicting_series_id"] == series.id
+    make_post(far + timedelta(minutes=10)) # Exactly the spacing away
+
+
+def test_a_second_series_starting_after_the_horizon_conflicts(db, account, spacing, now):
+    spacing(600)
+    create_series(db, account, now + timedelta(hours=1))
+    with pytest.raises(crud_schedule.ScheduleConflictError):
+        create_series(db, account, now + timedelta(days=10, hours=1, minutes=2))
+    create_series(db, account, now + timedelta(days=10, hours=2))
+
+
+def test_materialize_due_skips_conflicting_occurrences(db, account, spacing, now, make_post, monkeypatch, capsys):
+    series = create_series(db, account, now + timedelta(hours=1))
+    series_id, day3 = series.id, now + timedelta(days=3, hours=1)
+    spacing(0)
+    make_post(day3 + timedelta(minutes=1)) # Allowed while the account had no spacing
+    spacing(600)
+
+    monkeypatch.setattr(crud_post_series, "_horizon", lambda at: at + timedelta(days=4))
+    assert crud_post_series.materialize_due(db) == 1 # Day 2 only
+    assert [post.scheduled_at for post in series_posts(db, series_id)][-1] == (now + timedelta(days=2, hours=1)).replace(tzinfo=None)
+    assert "skipping the occurrence at" in capsys.readouterr().out
+    assert crud_post_series.materialize_due(db) == 0 # Skipped for good, not retried
+
+
+def test_editing_the_rule_rematerializes_pending_occurrences(db, account, now):
+    series = create_series(db, account, now + timedelta(hours=1))
+    crud_post_series.update_series(db, series.id, schemas.PostSeriesUpdate(starts_at=now + timedelta(hours=3)))
+    assert [post.scheduled_at for post in series_posts(db, series.id)] == [
+        (now + timedelta(hours=3, days=day)).replace(tzinfo=None) for day in range(2)
+    ]
+    crud_post_series.end_series(db, series.id)
+    assert series_posts(db, series.id) == []
@@ -0,0 +1,101 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app import database, models
+from app.core import read_routing
+from app.core.read_routing import ReplicaLagMonitor
+
+
+@pytest.fixture
+def replica(db, tmp_path):
+    """
+    A second SQLite file standing in for a replica of the test database; replicate()
+    copies the primary over it.
+    """
+    path = tmp_path / "replica.db"
+    engine = database._create_engine(f"sqlite:///{path}")
+
+    def replicate():
+        engine.dispose()
+        source, target = sqlite3.connect(database.engine.url.database), sqlite3.connect(path)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+
+    engine.replicate = replicate
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def no_pins():
+    read_routing._local_pins.clear()
+    yield
+    read_routing._local_pins.clear()
+
+
+def monitor_for(replica, max_lag_seconds=5):
+    return ReplicaLagMonitor(database.engine, [replica], max_lag_seconds=max_lag_seconds, interval_seconds=1)
+
+
+def test_replica_within_budget_is_picked(replica):
+    monitor = monitor_for(replica)
+    monitor.beat(datetime.now(timezone.utc))
+    replica.replicate()
+    [lag] = monitor.check()
+    assert 0 <= lag < 5
+    assert monitor.pick() is replica
+
+
+def test_lagging_replica_is_skipped(replica):
+    monitor = monitor_for(replica)
+    monitor.beat(datetime.now(timezone.utc) - timedelta(seconds=60))
+    replica.replicate() # Holds a heartbeat from a minute ago
+    [lag] = monitor.check()
+    assert lag >= 60
+    assert monitor.pick() is None
+
+
+def test_unreachable_replica_is_skipped(db, tmp_path):
+    unreachable = database._create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monitor = monitor_for(unreachable)
+    assert monitor.check() == [None]
+    assert monitor.pick() is None
+
+
+def test_stale_measurements_fall_back_to_primary(replica):
+    monitor = monitor_for(replica)
+    monitor.beat(datetime.now(timezone.utc))
+    replica.replicate()
+    monitor.check()
+    assert monitor.pick() is replica
+    monitor.checked_at = time.monotonic() - 4 * monitor.interval_seconds # The monitor stopped
+    assert monitor.pick() is None
+
+
+def test_reads_after_a_write_go_to_the_primary(db, account, replica, client, auth_headers, monkeypatch):
+    monitor = monitor_for(replica)
+    monkeypatch.setattr(database, "replica_monitor", monitor)
+    monitor.beat(datetime.now(timezone.utc))
+    replica.replicate()
+    monitor.check()
+    url = f"/api/v1/workspaces/{account.workspace_id}/connected_accounts/"
+
+    response = client.post(url, headers=auth_headers, json={
+        "account_name": "fresh", "account_id_on_platform": "acct-2", "workspace_id": account.workspace_id,
+        "platform_id": account.platform_id, "access_token": "token",
+    })
+    assert response.status_code == 201, response.text
+    names = [item["account_name"] for item in client.get(url, headers=auth_headers).json()]
+    assert "fresh" in names # Pinned to the primary
+
+    read_routing._local_pins.clear() # Pin expired: the replica has not seen the write yet
+    names = [item["account_name"] for item in client.get(url, headers=auth_headers).json()]
+    assert names == ["acct"]
+    with replica.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM connected_accounts")).scalar() == db.query(models.ConnectedAccount).count() - 1
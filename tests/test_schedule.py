@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+import pytest
+
+from app import models
+from app.core.config import settings
+from app.crud import crud_post, crud_schedule
+from app.crud.crud_schedule import Proposal
+
+
+def test_spacing_comes_from_the_account_then_the_platform_then_the_default(db, account, spacing, monkeypatch):
+    spacing(300)
+    assert crud_schedule.spacing_for(account) == 300
+    monkeypatch.setattr(settings, "SCHEDULE_PLATFORM_MIN_SPACING", "twitter=900, linkedin=3600")
+    assert crud_schedule.spacing_for(account) == 900
+    account.min_post_spacing_seconds = 60
+    assert crud_schedule.spacing_for(account) == 60
+
+
+def test_invalid_platform_spacing_is_rejected(db, account, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULE_PLATFORM_MIN_SPACING", "twitter=soon")
+    with pytest.raises(ValueError, match="SCHEDULE_PLATFORM_MIN_SPACING"):
+        crud_schedule.spacing_for(account)
+
+
+def test_conflicts_with_scheduled_posts(db, account, spacing, now, make_post):
+    spacing(600)
+    at = now + timedelta(hours=1)
+    post = make_post(at)
+    make_post(at + timedelta(minutes=2), status="draft") # Drafts never publish: not counted
+
+    [conflict] = crud_schedule.find_conflicts(db, account.workspace_id, [Proposal(account.id, at + timedelta(minutes=9))])
+    assert conflict["conflicting_post_id"] == post.id and conflict["min_spacing_seconds"] == 600
+    # Exactly the spacing apart, on either side, is allowed
+    assert crud_schedule.find_conflicts(db, account.workspace_id, [
+        Proposal(account.id, at - timedelta(minutes=10)), Proposal(account.id, at + timedelta(minutes=10)),
+    ]) == []
+
+
+def test_conflicts_within_the_batch(db, account, spacing, now):
+    spacing(600)
+    at = now + timedelta(hours=1)
+    conflicts = crud_schedule.find_conflicts(db, account.workspace_id, [
+        Proposal(account.id, at + timedelta(minutes=5)), Proposal(account.id, at), Proposal(account.id, at + timedelta(hours=1)),
+    ])
+    assert [(conflict["index"], conflict["conflicting_index"]) for conflict in conflicts] == [(1, 0)]
+
+
+def test_a_moved_post_does_not_conflict_with_itself(db, account, spacing, now, make_post):
+    spacing(600)
+    at = now + timedelta(hours=1)
+    first, second = make_post(at), make_post(at + timedelta(minutes=10))
+    assert crud_schedule.find_conflicts(db, account.workspace_id, [Proposal(account.id, at + timedelta(minutes=1), first.id)]) != []
+    # Swapping two posts in one batch is fine
+    moved = crud_post.reschedule_posts(db, account.workspace_id, {first.id: at + timedelta(minutes=10), second.id: at})
+    assert sorted(post.id for post in moved) == sorted([first.id, second.id])
+
+
+def test_check_schedule_refuses_the_write(db, account, spacing, now, make_post):
+    spacing(600)
+    at = now + timedelta(hours=1)
+    make_post(at)
+    with pytest.raises(crud_schedule.ScheduleConflictError, match="at least 600s apart"):
+        make_post(at + timedelta(minutes=1))
+    assert db.query(models.Post).count() == 1
+    make_post(at + timedelta(minutes=1), status="draft")
+    assert crud_schedule.find_conflicts(db, account.workspace_id, [Proposal(account.id, at + timedelta(seconds=1))]) != []
+
+
+def test_no_spacing_means_no_check(db, account, spacing, now, make_post):
+    spacing(0)
+    at = now + timedelta(hours=1)
+    make_post(at)
+    make_post(at)
+    assert db.query(models.Post).count() == 2
+
+
+def test_accounts_outside_the_workspace_are_rejected(db, account, now):
+    with pytest.raises(ValueError, match="not found in this workspace"):
+        crud_schedule.find_conflicts(db, account.workspace_id + 1, [Proposal(account.id, now)])
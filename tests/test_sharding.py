@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import database, models
+from app.core.sharding import DEFAULT_SHARD, SHARDED_TABLES, ShardMap, sync_reference_tables
+from app.crud import crud_post_search
+from app.services import shard_mover
+
+
+@pytest.fixture
+def shard_b(db, tmp_path, monkeypatch):
+    """
+    A second SQLite shard named "b", with the shard map cache and move waits turned off.
+    """
+    from app.core.config import settings
+
+    engine = database._create_engine(f"sqlite:///{tmp_path / 'shard_b.db'}")
+    database.init_db(bind=engine)
+    monkeypatch.setitem(database.shard_engines, "b", engine)
+    monkeypatch.setattr(database.shard_map, "shard_names", [DEFAULT_SHARD, "b"])
+    monkeypatch.setattr(database.shard_map, "cache_seconds", 0)
+    monkeypatch.setattr(settings, "SHARD_MAP_CACHE_SECONDS", 0)
+    database.shard_map.invalidate()
+    yield engine
+    database.shard_map.invalidate()
+    engine.dispose()
+
+
+def counts(engine, workspace_id):
+    posts = models.Base.metadata.tables["posts"]
+    return {name: shard_mover._count(engine, models.Base.metadata.tables[name], posts, workspace_id) for name in SHARDED_TABLES}
+
+
+def search_ids(engine, workspace_id, query):
+    with database.SessionLocal(bind=engine) as session:
+        return sorted(post.id for post in crud_post_search.search_posts(session, workspace_id, query)[0])
+
+
+@pytest.fixture
+def workspace_data(db, account, make_post, now):
+    posts = [make_post(now + timedelta(hours=hours), content_text=f"Launch day {hours}") for hours in (1, 2, 3)]
+    make_post(None, status="draft", content_text="Draft notes")
+    return account.workspace_id, [post.id for post in posts]
+
+
+def test_shard_map_defaults_and_caches(db, account):
+    shard_map = ShardMap(database.engine, [DEFAULT_SHARD, "b"], cache_seconds=60)
+    assert shard_map.entry(account.workspace_id) == (DEFAULT_SHARD, None)
+    assert shard_map.entry(None) == (DEFAULT_SHARD, None)
+
+    shard_mover._set_entry(db, account.workspace_id, DEFAULT_SHARD, "b")
+    assert not shard_map.is_moving(account.workspace_id) # Cached
+    shard_map.invalidate()
+    assert shard_map.is_moving(account.workspace_id)
+    assert shard_map.moving_workspaces() == [account.workspace_id]
+
+    shard_mover._set_entry(db, account.workspace_id, "b", None)
+    shard_map.invalidate()
+    assert shard_map.entry(account.workspace_id) == ("b", None)
+    assert ShardMap(database.engine, [DEFAULT_SHARD]).shard_for(account.workspace_id) == DEFAULT_SHARD # Unsharded
+
+
+def test_sync_reference_tables_upserts_platforms(db, account, shard_b):
+    platforms = models.Base.metadata.tables["social_platforms"]
+    db.add(models.SocialPlatform(name="Mastodon"))
+    db.commit()
+    sync_reference_tables(database.engine, [shard_b])
+
+    db.query(models.SocialPlatform).filter(models.SocialPlatform.name == "Twitter").update({"name": "X"})
+    db.commit()
+    sync_reference_tables(database.engine, [shard_b])
+    with shard_b.connect() as conn:
+        assert sorted(conn.execute(select(platforms.c.name)).scalars()) == ["Mastodon", "X"]
+
+
+def test_move_workspace(db, shard_b, workspace_data):
+    workspace_id, post_ids = workspace_data
+    before = counts(database.engine, workspace_id)
+    assert before["posts"] == 4 and before["outbox_messages"] == 3
+
+    copied = shard_mover.move_workspace(workspace_id, "b", drain_seconds=0)
+    assert copied == before
+    assert counts(shard_b, workspace_id) == before
+    assert set(counts(database.engine, workspace_id).values()) == {0}
+    assert database.shard_map.entry(workspace_id) == ("b", None)
+
+    assert search_ids(shard_b, workspace_id, "launch") == post_ids # Rebuilt on the target
+    assert search_ids(database.engine, workspace_id, "launch") == []
+
+
+def test_failed_verify_leaves_workspace_in_place(db, shard_b, workspace_data, monkeypatch):
+    workspace_id, post_ids = workspace_data
+    before = counts(database.engine, workspace_id)
+    count = shard_mover._count
+    monkeypatch.setattr(shard_mover, "_count", lambda engine, *args: count(engine, *args) + (engine is shard_b))
+
+    with pytest.raises(RuntimeError):
+        shard_mover.move_workspace(workspace_id, "b", drain_seconds=0)
+    monkeypatch.setattr(shard_mover, "_count", count)
+    assert set(counts(shard_b, workspace_id).values()) == {0}
+    assert search_ids(shard_b, workspace_id, "launch") == []
+    assert counts(database.engine, workspace_id) == before
+    assert database.shard_map.entry(workspace_id) == (DEFAULT_SHARD, None)
+
+
+def test_writes_get_503_while_moving(db, shard_b, account, client, auth_headers):
+    shard_mover._set_entry(db, account.workspace_id, DEFAULT_SHARD, "b")
+    database.shard_map.invalidate()
+    url = f"/api/v1/workspaces/{account.workspace_id}/connected_accounts/"
+
+    response = client.delete(f"{url}{account.id}", headers=auth_headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert client.get(url, headers=auth_headers).status_code == 200 # Reads stay on the old shard
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.core.platform_catalog import platform_catalog
+from app.services import platforms
+from app.services.mock_platform import create_mock_platform
+from app.services.token_refresh import refresh_expiring_tokens
+
+
+@pytest.fixture
+def mock_platform(db, account, monkeypatch):
+    """
+    Returns a function that creates a platform served by a local mock platform app
+    (through HTTPAdapter, without a network) and an expiring account on it.
+    """
+    def make(name, refresh_token="rt-1", **mock_args):
+        api_base_url = f"http://{name.lower()}.mock"
+        mock = create_mock_platform(seed=1, **mock_args)
+        adapter = platforms.HTTPAdapter(name.lower(), api_base_url, session=TestClient(mock))
+        monkeypatch.setitem(platforms._http_adapters, (name.lower(), api_base_url), adapter)
+        platform = models.SocialPlatform(name=name, api_base_url=api_base_url)
+        db.add(platform)
+        db.flush()
+        db_account = expiring_account(db, account, platform.id, refresh_token)
+        platform_catalog.load()
+        return mock, db_account
+    return make
+
+
+def expiring_account(db, account, platform_id, refresh_token):
+    db_account = models.ConnectedAccount(
+        user_id=account.user_id, workspace_id=account.workspace_id, platform_id=platform_id,
+        platform_account_id=f"acct-{platform_id}", access_token="old-token", refresh_token=refresh_token,
+        token_expires_at=datetime.now(timezone.utc) + timedelta(minutes=5),
+    )
+    db.add(db_account)
+    db.commit()
+    return db_account
+
+
+def test_refreshes_expiring_token(db, mock_platform):
+    mock, db_account = mock_platform("Okplatform")
+    assert refresh_expiring_tokens(db) == {"refreshed": 1, "failed": 0, "deactivated": 0, "skipped": 0}
+    db.refresh(db_account)
+    assert db_account.access_token in mock.state.access_tokens
+    assert db_account.refresh_token.startswith("mock_rt_")
+    assert db_account.token_expires_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(minutes=30)
+
+
+def test_rejected_refresh_token_deactivates(db, mock_platform):
+    _, db_account = mock_platform("Okplatform", refresh_token="revoked-1")
+    assert refresh_expiring_tokens(db) == {"refreshed": 0, "failed": 0, "deactivated": 1, "skipped": 0}
+    db.refresh(db_account)
+    assert db_account.is_active is False
+    assert db_account.access_token == "old-token"
+
+
+def test_transient_failure_is_retried_next_run(db, mock_platform):
+    mock, db_account = mock_platform("Flakyplatform", token_error_rate=1.0)
+    assert refresh_expiring_tokens(db) == {"refreshed": 0, "failed": 1, "deactivated": 0, "skipped": 0}
+    db.refresh(db_account)
+    assert db_account.is_active is True
+    assert db_account.access_token == "old-token"
+
+    mock.state.stats["errors"] = 0
+    assert refresh_expiring_tokens(db)["failed"] == 1
+    assert mock.state.stats["errors"] == 1 # Picked up again by the next run
+
+
+def test_simulated_platform_keeps_stored_token(db, account, monkeypatch):
+    from app.core.config import settings
+
+    db_account = expiring_account(db, account, account.platform_id, "rt-1")
+    platform_catalog.load()
+    assert refresh_expiring_tokens(db) == {"refreshed": 0, "failed": 0, "deactivated": 0, "skipped": 1}
+    db.refresh(db_account)
+    assert db_account.access_token == "old-token"
+
+    monkeypatch.setattr(settings, "TOKEN_REFRESH_SIMULATED", True)
+    assert refresh_expiring_tokens(db)["refreshed"] == 1
+    db.refresh(db_account)
+    assert db_account.access_token.startswith("tw_sim_at_")
+
+
+def test_catalog_miss_falls_back_to_account_platform(db, mock_platform, monkeypatch):
+    _, db_account = mock_platform("Okplatform")
+    monkeypatch.setattr(platform_catalog, "get", lambda platform_id: None)
+    assert refresh_expiring_tokens(db)["refreshed"] == 1
+    db.refresh(db_account)
+    assert db_account.is_active is True